@@ -449,16 +449,17 @@ exports.getForecasting = async (req, res) => {
     const mlPredictionsByWard = {};
     const uniqueWards = [...new Set(occupiedBeds.map(bed => bed.ward))];
     
-    await Promise.all(uniqueWards.map(async ward => {
-      try {
-        const mlPrediction = await mlService.predictDischarge(ward, new Date());
-        if (mlPrediction.success && mlPrediction.data.prediction) {
-          mlPredictionsByWard[ward] = mlPrediction.data.prediction.hours_until_discharge;
-        }
-      } catch (error) {
-        console.error(`ML prediction failed for ward ${ward}:`, error.message);
+    if (uniqueWards.length > 0) {
+      const predictionTime = new Date();
+      const mlPrediction = await mlService.predictDischargeBatch(
+        uniqueWards.map(ward => ({ ward, admissionTime: predictionTime }))
+      );
+      if (mlPrediction.success && Array.isArray(mlPrediction.data.prediction)) {
+        mlPrediction.data.prediction.forEach((prediction, index) => {
+          mlPredictionsByWard[uniqueWards[index]] = prediction.hours_until_discharge;
+        });
       }
-    }));
+    }
     
     // Create BOTH manual and AI discharge lists
     const manualDischargesList = [];
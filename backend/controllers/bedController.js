@@ -201,15 +201,19 @@ exports.updateBedStatus = async (req, res) => {
       statusChangeType = 'assigned';
     }
 
+    // Events for the ML service's live bed state, sent once both logs are written
+    const bedEvents = [];
+
     // Create occupancy log entry
     try {
       console.log('Creating log - User ID:', req.user._id, 'Bed ID:', bed._id);
-      await OccupancyLog.create({
+      const occupancyLog = await OccupancyLog.create({
         bedId: bed._id,
         userId: req.user._id, // User who made the change (from JWT)
         statusChange: statusChangeType,
         timestamp: new Date()
       });
+      bedEvents.push(mlService.occupancyEvent(occupancyLog, bed.ward));
       console.log('✅ Occupancy log created successfully');
     } catch (logError) {
       console.error('Error creating occupancy log:', logError);
@@ -219,7 +223,7 @@ exports.updateBedStatus = async (req, res) => {
     // Create cleaning log entry when starting cleaning (any transition TO cleaning status)
     if (finalStatus === 'cleaning' && previousStatus !== 'cleaning' && bed.cleaningStartTime) {
       try {
-        await CleaningLog.create({
+        const cleaningLog = await CleaningLog.create({
           bedId: bed._id,
           ward: bed.ward,
           startTime: bed.cleaningStartTime,
@@ -227,6 +231,7 @@ exports.updateBedStatus = async (req, res) => {
           status: 'in_progress',
           assignedTo: req.user._id
         });
+        bedEvents.push(mlService.cleaningEvent(cleaningLog));
         console.log('✅ CleaningLog entry created successfully');
         
         // Emit bedCleaningStarted event via socket.io (ward-specific)
@@ -245,6 +250,9 @@ exports.updateBedStatus = async (req, res) => {
       }
     }
 
+    // Not awaited: the ML service must not delay or fail the status update
+    mlService.sendBedEvents(bedEvents);
+
     // Task 2.6: Emit bedStatusChanged event via socket.io (ward-specific for managers)
     if (req.io) {
       // Emit to specific ward for managers
@@ -780,17 +788,24 @@ exports.markCleaningComplete = async (req, res) => {
     // Cleaning fields will be auto-cleared by pre-save middleware
     await bed.save();
     
+    // Events for the ML service's live bed state: the completed cleaning, then the bed freed
+    const bedEvents = [mlService.cleaningEvent(cleaningLog)];
+
     // Create occupancy log entry for maintenance end
     try {
-      await OccupancyLog.create({
+      const occupancyLog = await OccupancyLog.create({
         bedId: bed._id,
         userId: req.user._id,
         statusChange: 'maintenance_end',
         timestamp: new Date()
       });
+      bedEvents.push(mlService.occupancyEvent(occupancyLog, bed.ward));
     } catch (logError) {
       console.error('Error creating occupancy log:', logError);
     }
+
+    // Not awaited: the ML service must not delay or fail the cleaning completion
+    mlService.sendBedEvents(bedEvents);
     
     // Emit bedCleaningCompleted event via socket.io (ward-specific)
     if (req.io) {
@@ -77,6 +77,41 @@ class MLService {
     }
   }
 
+  /**
+   * Predict discharge times for many beds in a single request
+   * 
+   * @param {Array<Object>} items - Items of { ward, admissionTime, bedId }
+   * @returns {Promise<Object>} Predictions in the same order as items
+   */
+  async predictDischargeBatch(items) {
+    try {
+      const payload = {
+        items: items.map(item => ({
+          ward: item.ward,
+          admission_time: item.admissionTime ? item.admissionTime.toISOString() : null,
+          bed_id: item.bedId || null
+        }))
+      };
+
+      const response = await this.client.post(
+        `${this.apiPrefix}/predict/discharge/batch`,
+        payload
+      );
+
+      return {
+        success: true,
+        data: response.data
+      };
+    } catch (error) {
+      console.error('Batch discharge prediction failed:', error.message);
+      return {
+        success: false,
+        error: error.message,
+        fallback: items.map(item => this._getFallbackDischargeEstimate(item.ward))
+      };
+    }
+  }
+
   /**
    * Predict bed availability in the next N hours
    * 
@@ -147,6 +182,144 @@ class MLService {
     }
   }
 
+  /**
+   * Predict bed availability for many wards in a single request
+   * 
+   * @param {Array<Object>} items - Items of { ward, horizonHours, currentTime }
+   * @returns {Promise<Object>} Per-item results in the same order as items
+   */
+  async predictBedAvailabilityBatch(items) {
+    try {
+      const payload = {
+        items: items.map(item => ({
+          ward: item.ward,
+          current_time: item.currentTime ? item.currentTime.toISOString() : null,
+          prediction_horizon_hours: item.horizonHours || 6
+        }))
+      };
+
+      const response = await this.client.post(
+        `${this.apiPrefix}/predict/bed-availability/batch`,
+        payload
+      );
+
+      return {
+        success: true,
+        data: response.data
+      };
+    } catch (error) {
+      console.error('Batch bed availability prediction failed:', error.message);
+      return {
+        success: false,
+        error: error.message,
+        fallback: items.map(() => ({ will_be_available: false, probability: 0.5 }))
+      };
+    }
+  }
+
+  /**
+   * Predict cleaning durations for many beds in a single request
+   * 
+   * @param {Array<Object>} items - Items of { ward, estimatedDuration, startTime }
+   * @returns {Promise<Object>} Per-item results in the same order as items
+   */
+  async predictCleaningDurationBatch(items) {
+    try {
+      const payload = {
+        items: items.map(item => ({
+          ward: item.ward,
+          estimated_duration: item.estimatedDuration || 30,
+          start_time: item.startTime ? item.startTime.toISOString() : null
+        }))
+      };
+
+      const response = await this.client.post(
+        `${this.apiPrefix}/predict/cleaning-duration/batch`,
+        payload
+      );
+
+      return {
+        success: true,
+        data: response.data
+      };
+    } catch (error) {
+      console.error('Batch cleaning duration prediction failed:', error.message);
+      return {
+        success: false,
+        error: error.message,
+        fallback: items.map(item => this._getFallbackCleaningDuration(item.estimatedDuration || 30))
+      };
+    }
+  }
+
+  /**
+   * Post bed status change events to the ML service's live bed state
+   *
+   * Fire-and-forget: never rejects, so callers need not await it. Lost
+   * events are corrected by the ML service's periodic reconciliation.
+   *
+   * @param {Array<Object>} events - Events built with occupancyEvent / cleaningEvent, in order
+   * @returns {Promise<Object>} Ingestion result
+   */
+  async sendBedEvents(events) {
+    if (!events.length) {
+      return { success: true, data: null };
+    }
+    try {
+      const response = await this.client.post(
+        `${this.apiPrefix}/events`,
+        { events }
+      );
+
+      return {
+        success: true,
+        data: response.data
+      };
+    } catch (error) {
+      // 503: bed state disabled (several ML workers) - nothing to retry
+      if (error.response?.status !== 503) {
+        console.error('Sending bed events failed:', error.message);
+      }
+      return {
+        success: false,
+        error: error.message
+      };
+    }
+  }
+
+  /**
+   * Bed event for an OccupancyLog document
+   *
+   * @param {Object} log - OccupancyLog (bedId, statusChange, timestamp)
+   * @param {string} ward - Bed's ward (lets the ML service add beds it does not know yet)
+   */
+  occupancyEvent(log, ward) {
+    return {
+      type: 'occupancy',
+      bedId: String(log.bedId),
+      statusChange: log.statusChange,
+      timestamp: new Date(log.timestamp || Date.now()).toISOString(),
+      ward
+    };
+  }
+
+  /**
+   * Bed event for a CleaningLog document
+   *
+   * @param {Object} log - CleaningLog (bedId, ward, status, startTime, endTime, actualDuration)
+   */
+  cleaningEvent(log) {
+    return {
+      type: 'cleaning',
+      bedId: String(log.bedId),
+      ward: log.ward,
+      status: log.status,
+      startTime: new Date(log.startTime).toISOString(),
+      endTime: log.endTime ? new Date(log.endTime).toISOString() : null,
+      actualDuration: log.actualDuration ?? null
+    };
+  }
+
   /**
    * Fallback discharge estimate if ML service is unavailable
    * @private
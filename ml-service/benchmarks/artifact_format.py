@@ -0,0 +1,135 @@
+"""
+Benchmark: compact artifact format vs joblib .pkl packages
+
+For each trained model in models/ this script:
+1. Converts the .pkl package to a compact artifact (metadata JSON + .npy blocks)
+2. Compares file size on disk
+3. Times loading each format in a fresh interpreter (including the imports
+   the format needs: sklearn for .pkl, NumPy only for artifacts)
+4. Checks the artifact's predictions against the sklearn model
+
+Artifacts are written to a temporary directory unless --write is given, in
+which case they are written next to the .pkl files and served from then on.
+
+Usage:
+    python benchmarks/artifact_format.py [--write] [--repeats 5]
+"""
+
+import sys
+import os
+import argparse
+import subprocess
+import tempfile
+import numpy as np
+import joblib
+import logging
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SERVICE_DIR)
+from config import settings
+from services.compiled_forest import parity_samples
+from services.model_artifact import (
+    artifact_path_for,
+    artifact_size_bytes,
+    load_artifact,
+    save_artifact
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MODEL_PATHS = {
+    'discharge': settings.DISCHARGE_MODEL_PATH,
+    'bed_availability': settings.BED_AVAILABILITY_MODEL_PATH,
+    'cleaning_duration': settings.CLEANING_DURATION_MODEL_PATH
+}
+
+# Loads one model in a fresh interpreter and prints the elapsed seconds
+LOAD_SNIPPETS = {
+    'pickle': (
+        "import time; t = time.perf_counter(); import joblib; "
+        "joblib.load({path!r}); print(time.perf_counter() - t)"
+    ),
+    'artifact': (
+        "import time; t = time.perf_counter(); "
+        "from services.model_artifact import load_artifact; "
+        "load_artifact({path!r}); print(time.perf_counter() - t)"
+    )
+}
+
+
+def cold_load_seconds(kind, path, repeats):
+    """Median load time of one model in a fresh interpreter"""
+    timings = []
+    for _ in range(repeats):
+        output = subprocess.check_output(
+            [sys.executable, '-c', LOAD_SNIPPETS[kind].format(path=path)],
+            cwd=SERVICE_DIR
+        )
+        timings.append(float(output.decode().strip().splitlines()[-1]))
+    return float(np.median(timings))
+
+
+def benchmark_model(name, model_path, artifact_path, repeats):
+    """Convert one package and compare both formats"""
+    model_package = joblib.load(model_path)
+    metadata = save_artifact(model_package, artifact_path)
+    
+    model = model_package['model']
+    artifact_package = load_artifact(artifact_path)
+    forest = artifact_package['model']
+    X = parity_samples(forest, 4096, seed=1)
+    if forest.classes_ is not None:
+        max_error = float(np.max(np.abs(model.predict_proba(X) - forest.predict_proba(X))))
+        label_mismatches = int((model.predict(X) != forest.predict(X)).sum())
+    else:
+        max_error = float(np.max(np.abs(model.predict(X) - forest.predict(X))))
+        label_mismatches = 0
+    
+    pickle_mb = os.path.getsize(model_path) / 1024 ** 2
+    artifact_mb = artifact_size_bytes(artifact_path) / 1024 ** 2
+    pickle_seconds = cold_load_seconds('pickle', model_path, repeats)
+    artifact_seconds = cold_load_seconds('artifact', artifact_path, repeats)
+    
+    logger.info("=" * 72)
+    logger.info(f"{name}: {metadata['n_trees']} trees, sha256 {metadata['content_sha256'][:12]}")
+    logger.info(f"  Size on disk: {pickle_mb:.2f} MB (.pkl) -> {artifact_mb:.2f} MB (artifact), {pickle_mb / artifact_mb:.1f}x smaller")
+    logger.info(
+        f"  Cold load:    {pickle_seconds * 1000:.0f} ms (.pkl) -> {artifact_seconds * 1000:.0f} ms (artifact), "
+        f"{pickle_seconds / artifact_seconds:.1f}x faster"
+    )
+    logger.info(f"  Parity:       max abs error {max_error:.2e}, label mismatches {label_mismatches}")
+    return label_mismatches == 0 and metadata['parity']['passed']
+
+
+def main():
+    """Main benchmark pipeline"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--write', action='store_true', help='Write artifacts next to the .pkl files')
+    parser.add_argument('--repeats', type=int, default=5, help='Cold loads per format')
+    args = parser.parse_args()
+    
+    all_passed = True
+    with tempfile.TemporaryDirectory() as scratch:
+        for name, model_path in MODEL_PATHS.items():
+            if not os.path.exists(model_path):
+                logger.warning(f"Skipping {name}: model not found at {model_path}")
+                continue
+            if args.write:
+                artifact_path = artifact_path_for(model_path)
+            else:
+                artifact_path = os.path.join(scratch, os.path.basename(artifact_path_for(model_path)))
+            all_passed &= benchmark_model(name, model_path, artifact_path, args.repeats)
+    
+    if not all_passed:
+        logger.error("❌ At least one artifact does not reproduce its model")
+        sys.exit(1)
+    logger.info("✅ All artifacts reproduce their models")
+
+
+if __name__ == "__main__":
+    main()
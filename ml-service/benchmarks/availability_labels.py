@@ -0,0 +1,153 @@
+"""
+Benchmark: look-ahead release labelling for the bed availability training set
+
+This script:
+1. Generates synthetic occupancy logs (benchmarks/synthetic_logs.py)
+2. Labels them with the per-bed look-ahead loop training used before
+   (every log, and the old every-len/20 subsample) as the reference
+3. Labels them with train_bed_availability.label_availability_samples
+4. Checks features and labels match the loop at every log and times both
+
+Usage:
+    python benchmarks/availability_labels.py [--events 1000000] [--beds 2000]
+"""
+
+import sys
+import os
+import argparse
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import logging
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SERVICE_DIR)
+sys.path.append(os.path.join(SERVICE_DIR, 'train'))
+from config import settings
+from train_bed_availability import label_availability_samples
+from synthetic_logs import synthetic_logs
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+COMPARED_COLUMNS = [
+    'bed_id', 'ward', 'hour', 'day_of_week', 'is_weekend', 'is_business_hours',
+    'is_occupied', 'is_cleaning', 'hours_until_release', 'hours_observed'
+]
+
+
+def loop_samples(occupancy_data, bed_wards, horizons, every_log=True):
+    """The per-bed look-ahead loop of the old extract_bed_availability_data"""
+    samples = []
+    data_end = occupancy_data[-1]['timestamp']
+
+    bed_timelines = {}
+    for log in occupancy_data:
+        bed_timelines.setdefault(log['bedId'], []).append(log)
+
+    for bed_id, timeline in bed_timelines.items():
+        if bed_id not in bed_wards:
+            continue
+        ward = bed_wards[bed_id]
+        step = 1 if every_log else max(1, len(timeline) // 20)
+        for i in range(0, len(timeline) - 1, step):
+            log = timeline[i]
+            current_time = log['timestamp']
+            status_change = log['statusChange']
+
+            hours_until_release = np.inf
+            for future_log in timeline[i+1:]:
+                if future_log['statusChange'] == 'released':
+                    hours_until_release = (future_log['timestamp'] - current_time).total_seconds() / 3600
+                    break
+
+            hour = current_time.hour
+            day_of_week = current_time.weekday()
+            sample = {
+                'bed_id': bed_id,
+                'ward': ward,
+                'timestamp': current_time,
+                'hour': hour,
+                'day_of_week': day_of_week,
+                'is_weekend': int(day_of_week >= 5),
+                'is_business_hours': int(8 <= hour <= 17),
+                'is_occupied': int(status_change in ['assigned', 'reserved']),
+                'is_cleaning': int(status_change in ['maintenance_start']),
+                'hours_until_release': hours_until_release,
+                'hours_observed': (data_end - current_time).total_seconds() / 3600
+            }
+            for horizon in horizons:
+                sample[f'released_within_{horizon:g}h'] = int(hours_until_release <= horizon)
+            samples.append(sample)
+
+    return pd.DataFrame(samples)
+
+
+def timed(fn):
+    """Wall time in seconds and the result"""
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main():
+    """Main benchmark pipeline"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=1_000_000, help='Synthetic occupancy logs')
+    parser.add_argument('--beds', type=int, default=2000, help='Beds')
+    args = parser.parse_args()
+
+    logs = synthetic_logs(args.events, args.beds)
+    # One bed left out of the beds collection, as training skips unknown beds
+    bed_wards = dict(list(logs['bed_wards'].items())[1:])
+    horizons = list(settings.AVAILABILITY_CURVE_HORIZONS)
+    logger.info("=" * 72)
+    logger.info(f"{len(logs['bedId']):,} occupancy logs, {args.beds:,} beds, {len(horizons)} horizons")
+
+    # Documents as the loop read them from MongoDB
+    occupancy_data = [
+        {'bedId': bed_id, 'timestamp': timestamp, 'statusChange': change}
+        for bed_id, timestamp, change in zip(
+            logs['bedId'].tolist(), logs['timestamp'].astype(datetime).tolist(), logs['statusChange'].tolist()
+        )
+    ]
+
+    seconds_subsample, subsampled = timed(lambda: loop_samples(occupancy_data, bed_wards, horizons, every_log=False))
+    logger.info(f"Loop, every len/20 log: {seconds_subsample:.2f} s, {len(subsampled):,} samples")
+    seconds_loop, expected = timed(lambda: loop_samples(occupancy_data, bed_wards, horizons))
+    logger.info(f"Loop, every log:        {seconds_loop:.2f} s, {len(expected):,} samples")
+    seconds_vectorized, labelled = timed(
+        lambda: label_availability_samples(logs['bedId'], logs['timestamp'], logs['statusChange'], bed_wards, horizons)
+    )
+    logger.info(
+        f"Vectorized, every log:  {seconds_vectorized:.2f} s, {len(labelled):,} samples "
+        f"({seconds_loop / seconds_vectorized:.0f}x the loop)"
+    )
+
+    # The loop emits beds in first-log order, the vectorized stage in bed id order
+    expected = expected.sort_values(['bed_id', 'timestamp'], kind='stable').reset_index(drop=True)
+    label_columns = [f'released_within_{horizon:g}h' for horizon in horizons]
+    same_rows = len(expected) == len(labelled) and bool(
+        (expected['timestamp'].to_numpy(dtype='datetime64[ms]') == labelled['timestamp'].to_numpy(dtype='datetime64[ms]')).all()
+    )
+    features_ok = same_rows and all(
+        np.allclose(expected[column], labelled[column], rtol=0, atol=1e-9)
+        if expected[column].dtype.kind == 'f' else (expected[column].to_numpy() == labelled[column].to_numpy()).all()
+        for column in COMPARED_COLUMNS
+    )
+    labels_ok = same_rows and np.array_equal(expected[label_columns].to_numpy(), labelled[label_columns].to_numpy())
+    logger.info(f"Checks: features {'ok' if features_ok else 'MISMATCH'}, labels {'ok' if labels_ok else 'MISMATCH'}")
+
+    if not (features_ok and labels_ok):
+        logger.error("❌ Vectorized labels differ from the look-ahead loop")
+        sys.exit(1)
+    logger.info("✅ Vectorized labels match the look-ahead loop")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark: point-in-time bed state index on synthetic occupancy logs
+
+This script:
+1. Generates synthetic occupancy logs (benchmarks/synthetic_logs.py)
+2. Builds the BedTimeline index from the log columns
+3. Checks status_at, next_change_after and count_at on a sample of query
+   points against a plain scan of each bed's log list
+4. Times each query type over the full batch of query points
+
+Usage:
+    python benchmarks/bed_timeline.py [--events 1000000] [--beds 2000] [--queries 1000000]
+"""
+
+import sys
+import os
+import argparse
+import time
+import numpy as np
+import logging
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SERVICE_DIR)
+from services.bed_timeline import STATUS_AFTER_CHANGE, STATUS_CODES, UNKNOWN, BedTimeline
+from synthetic_logs import synthetic_logs
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# Status a bed is assumed to be in before its first change (as in the index)
+STATUS_BEFORE = {'assigned': 'available', 'released': 'occupied', 'maintenance_end': 'cleaning'}
+
+
+def bed_logs_by_id(logs):
+    """Each bed's (timestamp, statusChange) list in time order"""
+    timelines = {}
+    for bed_id, timestamp, change in zip(logs['bedId'].tolist(), logs['timestamp'], logs['statusChange'].tolist()):
+        timelines.setdefault(bed_id, []).append((timestamp, change))
+    return timelines
+
+
+def scan_status(bed_logs, t):
+    """Status code at t by replaying the bed's logs up to t"""
+    before = STATUS_BEFORE.get(bed_logs[0][1]) if bed_logs else None
+    status = STATUS_CODES[before] if before else UNKNOWN
+    for timestamp, change in bed_logs:
+        if timestamp > t:
+            break
+        if STATUS_AFTER_CHANGE[change] is not None:
+            status = STATUS_CODES[STATUS_AFTER_CHANGE[change]]
+    return status
+
+
+def scan_next_release(bed_logs, t):
+    """First 'released' after t by scanning forward"""
+    for timestamp, change in bed_logs:
+        if timestamp > t and change == 'released':
+            return timestamp
+    return np.datetime64('NaT')
+
+
+def timed(fn, repeats):
+    """Best wall time in seconds and the last result"""
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    """Main benchmark pipeline"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=1_000_000, help='Synthetic occupancy logs')
+    parser.add_argument('--beds', type=int, default=2000, help='Beds')
+    parser.add_argument('--queries', type=int, default=1_000_000, help='Query points per query type')
+    parser.add_argument('--checks', type=int, default=2000, help='Query points checked against the scan')
+    parser.add_argument('--repeats', type=int, default=3, help='Timed runs (best is reported)')
+    args = parser.parse_args()
+
+    logs = synthetic_logs(args.events, args.beds)
+    logger.info("=" * 72)
+    logger.info(f"{len(logs['bedId']):,} occupancy logs, {args.beds:,} beds, {args.queries:,} query points")
+
+    seconds, timeline = timed(
+        lambda: BedTimeline(logs['bedId'], logs['timestamp'], logs['statusChange'], logs['bed_wards']), 1
+    )
+    logger.info(f"Index build: {seconds:.3f} s, {timeline.describe()['memory_bytes'] / 1e6:.1f} MB")
+
+    rng = np.random.default_rng(1)
+    first, last = logs['timestamp'].min(), logs['timestamp'].max()
+    span = int((last - first).astype(np.int64))
+    times = first + rng.integers(-span // 20, span + span // 20, args.queries).astype('timedelta64[ms]')
+    beds = rng.integers(0, timeline.n_beds, args.queries)
+
+    # Correctness against a scan of each bed's log list
+    timelines = bed_logs_by_id(logs)
+    check_beds, check_times = beds[:args.checks], times[:args.checks]
+    check_ids = [timeline.bed_ids[b] for b in check_beds]
+    statuses = np.array([scan_status(timelines[bed_id], t) for bed_id, t in zip(check_ids, check_times)])
+    releases = np.array(
+        [scan_next_release(timelines[bed_id], t) for bed_id, t in zip(check_ids, check_times)], dtype='datetime64[ms]'
+    )
+    status_ok = np.array_equal(timeline.status_at(check_beds, check_times), statuses)
+    following = timeline.next_change_after(check_beds, check_times)
+    release_ok = bool(np.all((following == releases) | (np.isnat(following) & np.isnat(releases))))
+
+    count_times = times[:20]
+    expected = np.zeros((len(timeline.wards), len(count_times)), dtype=np.int64)
+    occupied = STATUS_CODES['occupied']
+    for bed_id, bed_logs in timelines.items():
+        ward = timeline.wards.index(logs['bed_wards'][bed_id])
+        expected[ward] += [scan_status(bed_logs, t) == occupied for t in count_times]
+    count_ok = np.array_equal(timeline.count_at(count_times, 'occupied'), expected)
+    logger.info(
+        f"Checks on {args.checks} points: status_at {'ok' if status_ok else 'MISMATCH'}, "
+        f"next release {'ok' if release_ok else 'MISMATCH'}, occupied per ward {'ok' if count_ok else 'MISMATCH'}"
+    )
+
+    seconds, _ = timed(lambda: timeline.status_at(beds, times), args.repeats)
+    logger.info(f"status_at:          {seconds:.3f} s ({args.queries / seconds:,.0f} points/s)")
+    seconds, _ = timed(lambda: timeline.hours_until(beds, times), args.repeats)
+    logger.info(f"hours_until release: {seconds:.3f} s ({args.queries / seconds:,.0f} points/s)")
+    seconds, _ = timed(lambda: timeline.changes_between(beds, times, times + np.timedelta64(6, 'h')), args.repeats)
+    logger.info(f"releases in 6h:     {seconds:.3f} s ({args.queries / seconds:,.0f} points/s)")
+    n_times = max(1, args.queries // len(timeline.wards))
+    seconds, counts = timed(lambda: timeline.count_at(times[:n_times], 'occupied'), args.repeats)
+    logger.info(
+        f"occupied per ward:  {seconds:.3f} s for {n_times:,} times x {len(timeline.wards)} wards "
+        f"(mean {counts.mean():.1f} occupied of {timeline.n_beds / len(timeline.wards):.0f} beds)"
+    )
+
+    if not (status_ok and release_ok and count_ok):
+        logger.error("❌ Index answers differ from the log scan")
+        sys.exit(1)
+    logger.info("✅ Index matches the log scan")
+
+
+if __name__ == "__main__":
+    main()
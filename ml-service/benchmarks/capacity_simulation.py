@@ -0,0 +1,138 @@
+"""
+Benchmark: Monte Carlo capacity simulator on synthetic hospital data
+
+This script:
+1. Builds a synthetic hospital: occupied beds with per-tree stay samples,
+   ward capacities, hourly arrival rates and stay samples for new arrivals
+2. Checks the simulated mean occupancy of current patients (no arrivals)
+   against the exact expectation from services.occupancy_forecast
+3. Times the full simulation (current patients and arrivals) for the
+   requested number of trajectories, in this process and optionally over
+   a process pool
+
+Target: 10,000 trajectories x 168 hours x 500 beds in under a second.
+
+Usage:
+    python benchmarks/capacity_simulation.py [--simulations 10000] [--beds 500] [--processes 4]
+"""
+
+import sys
+import os
+import argparse
+import time
+import numpy as np
+import logging
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SERVICE_DIR)
+from services.capacity_simulator import shutdown_process_pool, simulate_capacity
+from services.occupancy_forecast import occupancy_curves, remaining_stay_hours
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def synthetic_hospital(n_beds: int, n_wards: int, n_trees: int, horizon_hours: int, seed: int = 0):
+    """Random occupied beds, capacities, arrival rates and stay samples"""
+    rng = np.random.default_rng(seed)
+    ward_index = rng.integers(0, n_wards, n_beds)
+    tree_hours = rng.gamma(2.0, 20.0, (n_beds, n_trees))
+    elapsed_hours = rng.uniform(0, 80, n_beds)
+    capacity = np.bincount(ward_index, minlength=n_wards) + rng.integers(0, 8, n_wards)
+    # Daily cycle of arrivals, busiest in the afternoon
+    daily = 1 + 0.5 * np.sin((np.arange(horizon_hours) % 24 - 8) / 24 * 2 * np.pi)
+    arrival_rates = rng.uniform(0.3, 1.2, n_wards)[:, None] * daily[None, :]
+    stay_hours = rng.gamma(2.0, 20.0, (n_wards, n_trees))
+    return ward_index, tree_hours, elapsed_hours, capacity, arrival_rates, stay_hours
+
+
+def check_expectation(ward_index, tree_hours, elapsed_hours, capacity, horizon_hours, n_simulations):
+    """Simulated mean occupancy without arrivals vs the exact expected occupancy"""
+    n_wards = len(capacity)
+    exact = occupancy_curves(ward_index, n_wards, tree_hours, elapsed_hours, horizon_hours)['expected_occupied']
+    simulated = simulate_capacity(
+        ward_index,
+        remaining_stay_hours(tree_hours, elapsed_hours),
+        capacity,
+        np.zeros((n_wards, horizon_hours)),
+        np.full((n_wards, 1), np.nan),
+        n_simulations=n_simulations,
+        seed=0
+    )['expected_occupied']
+    error = float(np.abs(simulated - exact).max())
+    # Monte Carlo error: standard deviation of a ward count is at most sqrt(beds) / 2
+    tolerance = 5 * np.sqrt(np.bincount(ward_index).max()) / 2 / np.sqrt(n_simulations)
+    return error, tolerance
+
+
+def time_simulation(args, inputs, processes: int) -> float:
+    """Best wall time in seconds over the repeats"""
+    ward_index, tree_hours, elapsed_hours, capacity, arrival_rates, stay_hours = inputs
+    bed_remaining = remaining_stay_hours(tree_hours, elapsed_hours)
+    best = float('inf')
+    for repeat in range(args.repeats):
+        started = time.perf_counter()
+        result = simulate_capacity(
+            ward_index, bed_remaining, capacity, arrival_rates, stay_hours,
+            n_simulations=args.simulations, seed=repeat,
+            chunk_size=args.chunk_size, processes=processes
+        )
+        best = min(best, time.perf_counter() - started)
+    logger.info(
+        f"  mean P(full by hour {args.horizon}) over wards: {result['p_full_by'][:, -1].mean():.3f}, "
+        f"chunks: {result['chunks']}"
+    )
+    return best
+
+
+def main():
+    """Main benchmark pipeline"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--simulations', type=int, default=10000, help='Trajectories per run')
+    parser.add_argument('--horizon', type=int, default=168, help='Hours simulated')
+    parser.add_argument('--beds', type=int, default=500, help='Occupied beds')
+    parser.add_argument('--wards', type=int, default=12, help='Number of wards')
+    parser.add_argument('--trees', type=int, default=250, help='Stay samples per bed (forest trees)')
+    parser.add_argument('--chunk-size', type=int, default=2500, help='Trajectories per array pass')
+    parser.add_argument('--processes', type=int, default=0, help='Also time with this many worker processes')
+    parser.add_argument('--repeats', type=int, default=3, help='Timed runs (best is reported)')
+    args = parser.parse_args()
+
+    inputs = synthetic_hospital(args.beds, args.wards, args.trees, args.horizon)
+    ward_index, tree_hours, elapsed_hours, capacity = inputs[:4]
+
+    logger.info("=" * 72)
+    logger.info(
+        f"{args.simulations} simulations x {args.horizon} hours, {args.beds} beds in {args.wards} wards, "
+        f"{args.trees} stay samples per bed"
+    )
+
+    error, tolerance = check_expectation(
+        ward_index, tree_hours, elapsed_hours, capacity, args.horizon, args.simulations
+    )
+    logger.info(f"Expected occupancy vs exact: max error {error:.4f} (tolerance {tolerance:.4f})")
+
+    logger.info("Single process:")
+    seconds = time_simulation(args, inputs, processes=0)
+    logger.info(f"  {seconds:.3f} s ({args.simulations / seconds:,.0f} trajectories/s)")
+
+    if args.processes > 0:
+        # First call starts the pool; time the steady state
+        time_simulation(argparse.Namespace(**{**vars(args), 'repeats': 1}), inputs, args.processes)
+        logger.info(f"{args.processes} worker processes:")
+        seconds = time_simulation(args, inputs, processes=args.processes)
+        logger.info(f"  {seconds:.3f} s ({args.simulations / seconds:,.0f} trajectories/s)")
+        shutdown_process_pool()
+
+    if error > tolerance:
+        logger.error("❌ Simulated occupancy does not match the exact expectation")
+        sys.exit(1)
+    logger.info("✅ Simulation matches the exact expectation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Micro-benchmark: compiled forest evaluator vs stock sklearn predict
+
+For each trained model in models/ this script:
+1. Compiles the forest into flat node arrays
+2. Checks parity with sklearn on threshold-centred samples
+3. Times single-row and batch predictions for both implementations
+
+Usage:
+    python benchmarks/forest_latency.py [--repeats 200] [--batch-sizes 1,16,256,4096]
+"""
+
+import sys
+import os
+import argparse
+import time
+import numpy as np
+import joblib
+import logging
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import settings
+from services.compiled_forest import CompiledForest, check_parity, parity_samples
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MODEL_PATHS = {
+    'discharge': settings.DISCHARGE_MODEL_PATH,
+    'bed_availability': settings.BED_AVAILABILITY_MODEL_PATH,
+    'cleaning_duration': settings.CLEANING_DURATION_MODEL_PATH
+}
+
+
+def time_call(fn, X, repeats):
+    """Median and p99 latency of fn(X) in milliseconds"""
+    fn(X)  # warm-up
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(X)
+        timings.append((time.perf_counter() - started) * 1000)
+    return np.median(timings), np.percentile(timings, 99)
+
+
+def benchmark_model(name, path, batch_sizes, repeats):
+    """Benchmark one model package"""
+    model_package = joblib.load(path)
+    model = model_package['model']
+    method = 'predict_proba' if hasattr(model, 'classes_') else 'predict'
+    
+    started = time.perf_counter()
+    compiled = CompiledForest.from_sklearn(model)
+    compile_ms = (time.perf_counter() - started) * 1000
+    
+    samples = parity_samples(compiled, max(batch_sizes))
+    parity = check_parity(model, compiled, samples)
+    
+    logger.info("=" * 72)
+    logger.info(
+        f"{name}: {compiled.n_trees} trees, {len(compiled.feature)} nodes, "
+        f"max depth {compiled.max_depth}, {compiled.nbytes / 1024 ** 2:.2f} MB, "
+        f"compiled in {compile_ms:.0f} ms"
+    )
+    logger.info(f"Parity ({method}): {parity}")
+    logger.info(f"{'rows':>6} {'sklearn p50':>12} {'p99':>9} {'compiled p50':>13} {'p99':>9} {'speedup':>8}")
+    
+    for batch_size in batch_sizes:
+        X = samples[:batch_size]
+        # Large batches need fewer repeats for a stable median
+        n = max(5, repeats // max(1, batch_size // 64))
+        stock_p50, stock_p99 = time_call(getattr(model, method), X, n)
+        fast_p50, fast_p99 = time_call(getattr(compiled, method), X, n)
+        logger.info(
+            f"{batch_size:>6} {stock_p50:>10.3f}ms {stock_p99:>7.3f}ms "
+            f"{fast_p50:>11.3f}ms {fast_p99:>7.3f}ms {stock_p50 / fast_p50:>7.1f}x"
+        )
+    
+    return parity['passed']
+
+
+def main():
+    """Main benchmark pipeline"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=200, help='Timed calls per batch size')
+    parser.add_argument('--batch-sizes', default='1,16,256,4096', help='Comma-separated row counts')
+    args = parser.parse_args()
+    
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',')]
+    all_passed = True
+    
+    for name, path in MODEL_PATHS.items():
+        if not os.path.exists(path):
+            logger.warning(f"Skipping {name}: model not found at {path}")
+            continue
+        all_passed &= benchmark_model(name, path, batch_sizes, args.repeats)
+    
+    if not all_passed:
+        logger.error("❌ Parity check failed for at least one model")
+        sys.exit(1)
+    logger.info("✅ All compiled forests match sklearn")
+
+
+if __name__ == "__main__":
+    main()
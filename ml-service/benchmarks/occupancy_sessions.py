@@ -0,0 +1,129 @@
+"""
+Benchmark: occupancy session pairing for discharge training
+
+This script:
+1. Generates synthetic occupancy logs (benchmarks/synthetic_logs.py) at each
+   scale and drops a share of them at random, so some releases have no open
+   admission and some admissions are never closed
+2. Pairs admissions with releases using the per-log loop discharge training
+   used before (reverse scan of the bed's sessions for each release)
+3. Pairs them with services.occupancy_sessions.pair_sessions
+4. Checks both give the same sessions in the same order and times both,
+   and the pairing alone on columns already converted to arrays
+
+Usage:
+    python benchmarks/occupancy_sessions.py [--scales 100000,1000000,10000000] [--drop 0.02]
+"""
+
+import sys
+import os
+import argparse
+import gc
+import time
+from datetime import datetime
+import numpy as np
+import logging
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SERVICE_DIR)
+from services.occupancy_sessions import as_times, pair_sessions
+from synthetic_logs import synthetic_logs
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def loop_sessions(event_beds, timestamps, status_changes):
+    """(assigned, released) log indices from the old extract_occupancy_data loop"""
+    bed_sessions = {}
+    for i, (bed_id, timestamp, status_change) in enumerate(zip(event_beds, timestamps, status_changes)):
+        if status_change == 'assigned':
+            if bed_id not in bed_sessions:
+                bed_sessions[bed_id] = []
+            bed_sessions[bed_id].append({'assigned': i, 'released': None, 'released_time': None})
+
+        elif status_change == 'released' and bed_id in bed_sessions:
+            for session in reversed(bed_sessions[bed_id]):
+                if session['released_time'] is None:
+                    session['released_time'] = timestamp
+                    session['released'] = i
+                    break
+
+    pairs = [
+        (session['assigned'], session['released'])
+        for sessions in bed_sessions.values() for session in sessions
+        if session['released_time'] is not None
+    ]
+    return np.array(pairs, dtype=np.int64).reshape(-1, 2)
+
+
+def log_columns(n_events, n_beds, drop, seed=0):
+    """Synthetic log columns as Python lists, as read from MongoDB"""
+    logs = synthetic_logs(n_events, n_beds, seed=seed)
+    keep = np.random.default_rng(seed + 1).random(len(logs['bedId'])) >= drop
+
+    # Codes into shared str objects, as pymongo would not copy them either
+    bed_names, bed_codes = np.unique(logs['bedId'][keep], return_inverse=True)
+    change_names, change_codes = np.unique(logs['statusChange'][keep], return_inverse=True)
+    bed_names, change_names = bed_names.tolist(), change_names.tolist()
+    return (
+        [bed_names[code] for code in bed_codes.tolist()],
+        logs['timestamp'][keep].astype(datetime).tolist(),
+        [change_names[code] for code in change_codes.tolist()]
+    )
+
+
+def main():
+    """Main benchmark pipeline"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', default='100000,1000000,10000000', help='Comma-separated log counts')
+    parser.add_argument('--beds', type=int, default=2000, help='Beds')
+    parser.add_argument('--drop', type=float, default=0.02, help='Share of logs dropped at random')
+    args = parser.parse_args()
+
+    all_ok = True
+    for n_events in [int(scale) for scale in args.scales.split(',')]:
+        event_beds, timestamps, status_changes = log_columns(n_events, args.beds, args.drop)
+        logger.info("=" * 72)
+        logger.info(f"{len(timestamps):,} occupancy logs, {args.beds:,} beds")
+
+        started = time.perf_counter()
+        expected = loop_sessions(event_beds, timestamps, status_changes)
+        seconds_loop = time.perf_counter() - started
+        gc.collect()
+
+        started = time.perf_counter()
+        assigned, released = pair_sessions(event_beds, timestamps, status_changes)
+        seconds_vectorized = time.perf_counter() - started
+
+        # The same on columns already converted to arrays: the pairing itself
+        columns = (np.asarray(event_beds, dtype=object), as_times(timestamps), np.asarray(status_changes, dtype=object))
+        started = time.perf_counter()
+        pair_sessions(*columns)
+        seconds_arrays = time.perf_counter() - started
+        del columns
+
+        ok = np.array_equal(np.column_stack([assigned, released]), expected)
+        all_ok &= ok
+        logger.info(f"Loop:       {seconds_loop:.2f} s, {len(expected):,} sessions")
+        logger.info(
+            f"Vectorized: {seconds_vectorized:.2f} s, {len(assigned):,} sessions "
+            f"({seconds_loop / seconds_vectorized:.1f}x the loop), {'ok' if ok else 'MISMATCH'}"
+        )
+        logger.info(f"Vectorized on arrays: {seconds_arrays:.2f} s (the rest converts the Python lists)")
+
+        del event_beds, timestamps, status_changes, expected
+        gc.collect()
+
+    if not all_ok:
+        logger.error("❌ Vectorized pairing differs from the loop")
+        sys.exit(1)
+    logger.info("✅ Vectorized pairing matches the loop")
+
+
+if __name__ == "__main__":
+    main()
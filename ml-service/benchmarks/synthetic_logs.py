@@ -0,0 +1,54 @@
+"""
+Synthetic occupancy logs for the benchmarks
+
+Each bed cycles through the backend's status changes: an optional
+reservation, 'assigned', 'released' after a gamma-distributed stay and
+'maintenance_end' after cleaning, then stays free for a while. Logs are
+returned as columns sorted by timestamp, the order training reads them in.
+"""
+
+from typing import Dict
+
+import numpy as np
+
+WARDS = ('ICU', 'Emergency', 'General', 'Pediatrics', 'Surgery')
+EVENTS_PER_CYCLE = 4  # reserved (sometimes), assigned, released, maintenance_end
+
+
+def synthetic_logs(n_events: int, n_beds: int = 2000, seed: int = 0, reservation_share: float = 0.2) -> Dict[str, np.ndarray]:
+    """
+    About n_events occupancy logs over n_beds beds
+
+    Returns:
+        Dict of columns: 'bedId' (str), 'timestamp' (datetime64[ms]),
+        'statusChange' (str), plus 'bed_wards' (bed id -> ward)
+    """
+    rng = np.random.default_rng(seed)
+    cycles = max(1, int(np.ceil(n_events / (n_beds * (EVENTS_PER_CYCLE - 1 + reservation_share)))))
+
+    # Hours between consecutive slots of a bed: gap before reserving, reservation to
+    # admission, stay, cleaning
+    gaps = np.stack([
+        rng.exponential(8.0, (n_beds, cycles)),
+        rng.uniform(0.2, 2.0, (n_beds, cycles)),
+        rng.gamma(2.0, 18.0, (n_beds, cycles)),
+        rng.gamma(4.0, 0.12, (n_beds, cycles))
+    ], axis=2).reshape(n_beds, -1)
+    start = np.datetime64('2024-01-01T00:00:00', 'ms') + rng.integers(0, 48 * 3600 * 1000, n_beds).astype('timedelta64[ms]')
+    offsets = np.cumsum(gaps, axis=1) * 3600 * 1000
+    timestamps = start[:, None] + offsets.astype(np.int64).astype('timedelta64[ms]')
+
+    changes = np.tile(np.array(['reserved', 'assigned', 'released', 'maintenance_end']), (n_beds, cycles))
+    keep = np.ones(changes.shape, dtype=bool)
+    keep[:, 0::EVENTS_PER_CYCLE] = rng.random((n_beds, cycles)) < reservation_share
+
+    bed_ids = np.char.add('bed-', np.arange(n_beds).astype(str))
+    beds = np.broadcast_to(bed_ids[:, None], changes.shape)
+
+    order = np.argsort(timestamps[keep], kind='stable')
+    return {
+        'bedId': beds[keep][order],
+        'timestamp': timestamps[keep][order],
+        'statusChange': changes[keep][order],
+        'bed_wards': {bed_id: WARDS[i % len(WARDS)] for i, bed_id in enumerate(bed_ids.tolist())}
+    }
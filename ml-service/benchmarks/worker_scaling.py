@@ -0,0 +1,218 @@
+"""
+Benchmark: memory and throughput of serve.py for 1, 2, 4 and 8 workers
+
+For each worker count this script:
+1. Starts `python serve.py --workers N` on a free port (prediction cache off,
+   so every request reaches a model)
+2. Waits for GET /ready
+3. Records memory of the parent and all workers: summed RSS, and summed PSS
+   (proportional set size, which splits shared pages between processes)
+4. Drives single-row discharge predictions from concurrent client processes
+   and reports requests per second and latency percentiles
+
+PSS is the number to watch: with models shared copy-on-write it should
+stay roughly flat as workers are added, while summed RSS counts the shared
+model pages once per process.
+
+Usage:
+    python benchmarks/worker_scaling.py [--workers 1,2,4,8] [--duration 10] [--clients 32]
+"""
+
+import sys
+import os
+import argparse
+import http.client
+import json
+import multiprocessing
+import random
+import socket
+import subprocess
+import time
+import numpy as np
+import logging
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SERVICE_DIR)
+from config import settings
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+WARDS = ['ICU', 'Emergency', 'General']
+
+
+def free_port():
+    """Ask the OS for an unused TCP port"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def process_tree(pid):
+    """pid plus all descendant pids (Linux /proc)"""
+    pids = [pid]
+    for child_pid in pids:
+        try:
+            with open(f'/proc/{child_pid}/task/{child_pid}/children') as children:
+                pids.extend(int(p) for p in children.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def memory_mb(pid):
+    """Summed RSS and PSS (MB) of a process tree"""
+    rss = pss = 0
+    for child_pid in process_tree(pid):
+        try:
+            with open(f'/proc/{child_pid}/smaps_rollup') as rollup:
+                for line in rollup:
+                    key, value = line.split(':', 1)
+                    if key == 'Rss':
+                        rss += int(value.split()[0])
+                    elif key == 'Pss':
+                        pss += int(value.split()[0])
+        except OSError:
+            pass
+    return rss / 1024, pss / 1024
+
+
+def wait_ready(port, timeout):
+    """Poll /ready until it answers 200"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/ready')
+            if connection.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def client(port, duration, seed, results):
+    """One keep-alive connection sending predictions back to back"""
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    path = f"{settings.API_PREFIX}/predict/discharge"
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    while time.perf_counter() < deadline:
+        body = json.dumps({
+            'ward': rng.choice(WARDS),
+            'admission_time': f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00"
+        })
+        started = time.perf_counter()
+        try:
+            connection.request('POST', path, body, {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    results.put((latencies, errors))
+
+
+def run_load(port, duration, clients):
+    """Requests per second and latency percentiles under concurrent load"""
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=client, args=(port, duration, seed, results))
+        for seed in range(clients)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    latencies = np.concatenate([np.asarray(l, dtype=float) for l, _ in collected]) if collected else np.array([])
+    errors = sum(e for _, e in collected)
+    return {
+        'rps': len(latencies) / duration,
+        'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+        'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+        'errors': errors
+    }
+
+
+def benchmark_workers(workers, duration, clients, ready_timeout):
+    """Start serve.py with N workers, measure memory and throughput, stop it"""
+    port = free_port()
+    env = dict(os.environ, PREDICTION_CACHE_ENABLED='false', LOG_LEVEL='WARNING')
+    server = subprocess.Popen(
+        [sys.executable, 'serve.py', '--workers', str(workers), '--host', '127.0.0.1', '--port', str(port)],
+        cwd=SERVICE_DIR,
+        env=env
+    )
+    try:
+        if not wait_ready(port, ready_timeout):
+            raise RuntimeError(f"serve.py with {workers} workers did not become ready")
+        # Let every worker finish its own start-up before measuring
+        time.sleep(2)
+        rss_idle, pss_idle = memory_mb(server.pid)
+        load = run_load(port, duration, clients)
+        rss_loaded, pss_loaded = memory_mb(server.pid)
+        return {
+            'workers': workers,
+            'rss_idle_mb': rss_idle,
+            'pss_idle_mb': pss_idle,
+            'rss_loaded_mb': rss_loaded,
+            'pss_loaded_mb': pss_loaded,
+            **load
+        }
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    """Main benchmark pipeline"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4,8', help='Comma-separated worker counts')
+    parser.add_argument('--duration', type=float, default=10.0, help='Load duration per run (seconds)')
+    parser.add_argument('--clients', type=int, default=32, help='Concurrent client connections')
+    parser.add_argument('--ready-timeout', type=float, default=120.0, help='Seconds to wait for /ready')
+    args = parser.parse_args()
+
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        logger.warning("Memory figures need Linux /proc; they will read 0")
+
+    logger.info(f"CPU cores: {os.cpu_count()}, clients: {args.clients}, duration: {args.duration}s")
+    rows = []
+    for workers in [int(n) for n in args.workers.split(',')]:
+        logger.info(f"Benchmarking {workers} worker(s)...")
+        rows.append(benchmark_workers(workers, args.duration, args.clients, args.ready_timeout))
+
+    logger.info("=" * 96)
+    logger.info(
+        f"{'workers':>7} {'RSS idle':>10} {'PSS idle':>10} {'RSS load':>10} {'PSS load':>10} "
+        f"{'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}"
+    )
+    for row in rows:
+        logger.info(
+            f"{row['workers']:>7} {row['rss_idle_mb']:>8.1f}MB {row['pss_idle_mb']:>8.1f}MB "
+            f"{row['rss_loaded_mb']:>8.1f}MB {row['pss_loaded_mb']:>8.1f}MB "
+            f"{row['rps']:>8.1f} {row['p50_ms'] or 0:>8.2f} {row['p99_ms'] or 0:>8.2f} {row['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
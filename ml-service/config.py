@@ -17,15 +17,28 @@ class Settings:
     # Server Configuration
     HOST: str = os.getenv("ML_SERVICE_HOST", "0.0.0.0")
     PORT: int = int(os.getenv("ML_SERVICE_PORT", "8000"))
+    WORKERS: int = int(os.getenv("ML_SERVICE_WORKERS", "1"))  # Worker processes (serve.py; >1 disables the event-fed bed state)
     
-    # MongoDB Configuration (for training only)
+    # MongoDB Configuration (training and duration statistics)
     MONGO_URI: str = os.getenv("MONGO_URI", "mongodb://localhost:27017/bedmanager")
+    MONGO_DEFAULT_DB: str = "bedmanager"  # Used when MONGO_URI names no database
+    
+    # MongoDB Connection Pool (shared client created in the app lifespan)
+    MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+    MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    MONGO_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+    MONGO_SOCKET_TIMEOUT_MS: int = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+    MONGO_READ_PREFERENCE: str = os.getenv("MONGO_READ_PREFERENCE", "secondaryPreferred")
     
     # Model Paths
     MODELS_DIR: str = os.path.join(os.path.dirname(__file__), "models")
     DISCHARGE_MODEL_PATH: str = os.path.join(MODELS_DIR, "discharge_model.pkl")
     BED_AVAILABILITY_MODEL_PATH: str = os.path.join(MODELS_DIR, "bed_availability_model.pkl")
     CLEANING_DURATION_MODEL_PATH: str = os.path.join(MODELS_DIR, "cleaning_duration_model.pkl")
+    BED_AVAILABILITY_CURVE_MODEL_PATH: str = os.path.join(MODELS_DIR, "bed_availability_curve_model.pkl")
     
     # CORS Configuration
     CORS_ORIGINS: list = [
@@ -40,9 +53,87 @@ class Settings:
     # Model Training Configuration
     RANDOM_STATE: int = 42
     TEST_SIZE: float = 0.2
+    CALIBRATION_SIZE: float = 0.2  # Share of the training split held out to calibrate classifier probabilities
     
     # Prediction Defaults
     DEFAULT_PREDICTION_HORIZON_HOURS: int = 24
     MAX_PREDICTION_HORIZON_HOURS: int = 168  # 7 days
+    # Discharge time quantiles returned with include_quantiles (from per-tree predictions)
+    DISCHARGE_QUANTILES: tuple = (0.1, 0.5, 0.9)
+    # Occupancy rate above which a ward is flagged (as the backend's occupancy_high alert)
+    OCCUPANCY_ALERT_THRESHOLD: float = float(os.getenv("OCCUPANCY_ALERT_THRESHOLD", "0.9"))
+    # Monte Carlo capacity simulation
+    SIMULATION_DEFAULT_RUNS: int = int(os.getenv("SIMULATION_DEFAULT_RUNS", "10000"))
+    SIMULATION_MAX_RUNS: int = int(os.getenv("SIMULATION_MAX_RUNS", "100000"))
+    SIMULATION_CHUNK_SIZE: int = int(os.getenv("SIMULATION_CHUNK_SIZE", "2500"))  # Trajectories per array pass
+    SIMULATION_PROCESSES: int = int(os.getenv("SIMULATION_PROCESSES", "0"))  # 0 = simulate in the request's thread
+    # Label horizon of the bed availability classifier; other horizons are served by the curve model
+    AVAILABILITY_CLASSIFIER_HORIZON_HOURS: int = 6
+    # Horizons learned by the availability curve model (hours in between are interpolated)
+    AVAILABILITY_CURVE_HORIZONS: tuple = (1, 2, 3, 4, 6, 8, 12, 18, 24, 36, 48, 72, 96, 120, 144, 168)
+    MAX_BATCH_SIZE: int = int(os.getenv("MAX_BATCH_SIZE", "5000"))
+    
+    # Execution Layer (bounded pools keep blocking work off the event loop)
+    INFERENCE_MAX_WORKERS: int = int(os.getenv("INFERENCE_MAX_WORKERS", str(os.cpu_count() or 4)))
+    IO_MAX_WORKERS: int = int(os.getenv("IO_MAX_WORKERS", "8"))
+    MODEL_MAX_CONCURRENCY: dict = {
+        "discharge": int(os.getenv("DISCHARGE_MAX_CONCURRENCY", "4")),
+        "bed_availability": int(os.getenv("BED_AVAILABILITY_MAX_CONCURRENCY", "4")),
+        "cleaning_duration": int(os.getenv("CLEANING_DURATION_MAX_CONCURRENCY", "4")),
+    }
+    
+    # Prediction Cache (per feature row, invalidated when a model is loaded)
+    PREDICTION_CACHE_ENABLED: bool = os.getenv("PREDICTION_CACHE_ENABLED", "true").lower() == "true"
+    PREDICTION_CACHE_MAX_ENTRIES: int = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "10000"))
+    PREDICTION_CACHE_TTL_SECONDS: int = int(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "300"))
+    
+    # Model Loading
+    MODEL_LOAD_WORKERS: int = int(os.getenv("MODEL_LOAD_WORKERS", "3"))
+    MODEL_MMAP_MODE: Optional[str] = os.getenv("MODEL_MMAP_MODE") or None  # joblib mmap_mode, e.g. "r"
+    MODEL_ARTIFACT_VERIFY: bool = os.getenv("MODEL_ARTIFACT_VERIFY", "true").lower() == "true"  # Check content hash on load
+    MODEL_RELOAD_POLL_SECONDS: float = float(os.getenv("MODEL_RELOAD_POLL_SECONDS", "30"))  # 0 disables the watcher
+    
+    # Admin endpoints (model reload/rollback); disabled when empty
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
+    
+    # Micro-batching of concurrent single-row requests (optional)
+    MICRO_BATCH_ENABLED: bool = os.getenv("MICRO_BATCH_ENABLED", "false").lower() == "true"
+    MICRO_BATCH_MAX_WAIT_MS: float = float(os.getenv("MICRO_BATCH_MAX_WAIT_MS", "2"))
+    MICRO_BATCH_MAX_SIZE: int = int(os.getenv("MICRO_BATCH_MAX_SIZE", "64"))
+    
+    # Compiled forests (array-backed evaluator for small requests)
+    COMPILED_FORESTS_ENABLED: bool = os.getenv("COMPILED_FORESTS_ENABLED", "true").lower() == "true"
+    COMPILED_FOREST_MAX_ROWS: int = int(os.getenv("COMPILED_FOREST_MAX_ROWS", "64"))  # Larger calls use sklearn
+    
+    # Precomputed Prediction Tables (optional full-domain lookup for discharge/cleaning)
+    LOOKUP_TABLES_ENABLED: bool = os.getenv("LOOKUP_TABLES_ENABLED", "false").lower() == "true"
+    LOOKUP_TABLE_WARDS: list = os.getenv("LOOKUP_TABLE_WARDS", "ICU,Emergency,General").split(",")
+    LOOKUP_TABLE_CLEANING_ESTIMATES: list = [
+        float(v) for v in os.getenv("LOOKUP_TABLE_CLEANING_ESTIMATES", "15,20,25,30,35,40,45,60").split(",")
+    ]
+    LOOKUP_TABLE_CHECK_SECONDS: int = int(os.getenv("LOOKUP_TABLE_CHECK_SECONDS", "30"))
+    LOOKUP_TABLE_CHUNK_ROWS: int = 65536
+    LOOKUP_TABLE_VERIFY_SAMPLES: int = 512
+    LOOKUP_TABLE_TOLERANCE: float = 1e-4  # Max relative error vs live model (float32 storage)
+    
+    # Discharge Duration Statistics (in-memory cache of historical averages)
+    DURATION_STATS_TTL_SECONDS: int = int(os.getenv("DURATION_STATS_TTL_SECONDS", "300"))
+    DURATION_STATS_WINDOW_DAYS: int = int(os.getenv("DURATION_STATS_WINDOW_DAYS", "30"))
+    
+    # Ward Snapshot (in-memory bed counts per ward for bed availability features)
+    WARD_SNAPSHOT_TTL_SECONDS: int = int(os.getenv("WARD_SNAPSHOT_TTL_SECONDS", "30"))
+    
+    # Demand Forecast (hour-of-week arrival tables, updated incrementally)
+    DEMAND_FORECAST_PATH: str = os.path.join(MODELS_DIR, "demand_forecast.npz")
+    DEMAND_UPDATE_SECONDS: int = int(os.getenv("DEMAND_UPDATE_SECONDS", "60"))
+    DEMAND_HISTORY_WEEKS: int = int(os.getenv("DEMAND_HISTORY_WEEKS", "26"))  # Initial build without an artifact
+    DEMAND_HALF_LIFE_WEEKS: float = float(os.getenv("DEMAND_HALF_LIFE_WEEKS", "8"))  # 0 = no decay
+    DEMAND_SMOOTHING_WEEKS: float = float(os.getenv("DEMAND_SMOOTHING_WEEKS", "2"))  # Weight of the hour-of-day profile
+    
+    # Bed State Events (in-memory bed state fed by POST /events, replayed on startup
+    # over DURATION_STATS_WINDOW_DAYS; single worker only)
+    EVENT_REPLAY_RETRY_SECONDS: int = int(os.getenv("EVENT_REPLAY_RETRY_SECONDS", "30"))
+    EVENT_RECONCILE_SECONDS: int = int(os.getenv("EVENT_RECONCILE_SECONDS", "300"))  # 0 = never
+    MAX_EVENT_BATCH: int = int(os.getenv("MAX_EVENT_BATCH", "1000"))
 
 settings = Settings()
@@ -13,13 +13,25 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
-import uvicorn
 from datetime import datetime
+import asyncio
 import logging
-import joblib
 import os
 
 from config import settings
+from services.bed_state import BedStateStore
+from services.capacity_simulator import shutdown_process_pool
+from services.compiled_forest import compile_model_package
+from services.demand_forecast import DemandForecaster
+from services.duration_stats import DurationStatsEngine
+from services.executor import InferenceExecutor
+from services.lookup_tables import LookupTableManager
+from services.metrics import metrics
+from services.model_artifact import artifact_path_for, is_artifact
+from services.model_loader import load_models_parallel, warm_up
+from services.model_reloader import ModelReloader
+from services.mongo import PoolMonitor, create_mongo_client, default_database
+from services.ward_snapshot import WardSnapshotEngine
 
 # Configure logging
 logging.basicConfig(
@@ -32,55 +44,140 @@ logger = logging.getLogger(__name__)
 models_loaded = {
     "discharge": False,
     "bed_availability": False,
-    "cleaning_duration": False
+    "cleaning_duration": False,
+    "bed_availability_curve": False
 }
 
 # Model storage
 loaded_models = {
     'discharge': None,
     'bed_availability': None,
-    'cleaning_duration': None
+    'cleaning_duration': None,
+    'bed_availability_curve': None
 }
 
 
+# Startup progress reported by /ready
+readiness = {
+    "ready": False,
+    "phase": "starting",
+    "started_at": datetime.utcnow().isoformat(),
+    "ready_at": None,
+    "load": None,
+    "warm_up_ms": {},
+    "error": None
+}
+
+
+# Set by preload_models() when a parent process loaded the models before forking
+models_preloaded = False
+
+
+def model_paths():
+    """Path to load per model name: the compact artifact if present, else the .pkl"""
+    pickle_paths = {
+        'discharge': settings.DISCHARGE_MODEL_PATH,
+        'bed_availability': settings.BED_AVAILABILITY_MODEL_PATH,
+        'cleaning_duration': settings.CLEANING_DURATION_MODEL_PATH,
+        'bed_availability_curve': settings.BED_AVAILABILITY_CURVE_MODEL_PATH
+    }
+    return {
+        name: artifact_path_for(path) if is_artifact(artifact_path_for(path)) else path
+        for name, path in pickle_paths.items()
+    }
+
+
 def load_ml_models():
-    """Load ML models from disk"""
+    """Load ML models from disk (concurrently, one thread per model file)"""
     logger.info("Loading ML models...")
     
-    # Load discharge model
-    if os.path.exists(settings.DISCHARGE_MODEL_PATH):
-        try:
-            loaded_models['discharge'] = joblib.load(settings.DISCHARGE_MODEL_PATH)
-            models_loaded['discharge'] = True
-            logger.info("✓ Discharge model loaded successfully")
-        except Exception as e:
-            logger.error(f"Failed to load discharge model: {e}")
-    else:
-        logger.warning(f"Discharge model not found at {settings.DISCHARGE_MODEL_PATH}")
-    
-    # Load bed availability model
-    if os.path.exists(settings.BED_AVAILABILITY_MODEL_PATH):
-        try:
-            loaded_models['bed_availability'] = joblib.load(settings.BED_AVAILABILITY_MODEL_PATH)
-            models_loaded['bed_availability'] = True
-            logger.info("✓ Bed availability model loaded successfully")
-        except Exception as e:
-            logger.error(f"Failed to load bed availability model: {e}")
-    else:
-        logger.warning(f"Bed availability model not found at {settings.BED_AVAILABILITY_MODEL_PATH}")
-    
-    # Load cleaning duration model
-    if os.path.exists(settings.CLEANING_DURATION_MODEL_PATH):
-        try:
-            loaded_models['cleaning_duration'] = joblib.load(settings.CLEANING_DURATION_MODEL_PATH)
-            models_loaded['cleaning_duration'] = True
-            logger.info("✓ Cleaning duration model loaded successfully")
-        except Exception as e:
-            logger.error(f"Failed to load cleaning duration model: {e}")
-    else:
-        logger.warning(f"Cleaning duration model not found at {settings.CLEANING_DURATION_MODEL_PATH}")
-    
-    logger.info(f"Models loaded: {sum(models_loaded.values())}/3")
+    # Flatten forests for low-latency small requests (sklearn stays the fallback)
+    post_load = compile_model_package if settings.COMPILED_FORESTS_ENABLED else None
+    
+    packages, report = load_models_parallel(model_paths(), post_load=post_load)
+    
+    for name, model_package in packages.items():
+        info = report['models'][name]
+        loaded_models[name] = model_package
+        models_loaded[name] = model_package is not None
+        
+        if info['status'] == 'missing':
+            logger.warning(f"{name} model not found at {info['path']}")
+        elif info['status'] == 'failed':
+            logger.error(f"Failed to load {name} model: {info['error']}")
+        else:
+            logger.info(
+                f"✓ {name} model loaded from {info['format']} in {info['load_seconds']}s "
+                f"({info['file_mb']} MB on disk, {info['resident_mb']} MB resident)"
+            )
+            compiled_info = model_package.get('compiled_info')
+            if 'compiled' in model_package:
+                logger.info(
+                    f"✓ {name} forest compiled: {compiled_info['nodes']} nodes, {compiled_info['memory_mb']} MB, "
+                    f"parity max error {compiled_info['parity']['max_abs_error']:.2e}"
+                )
+    
+    logger.info(
+        f"Models loaded: {sum(models_loaded.values())}/{len(models_loaded)} in {report['wall_seconds']}s "
+        f"(process RSS {report['rss_mb']} MB)"
+    )
+    return report
+
+
+def preload_models():
+    """
+    Load and warm up models in the current process before workers are forked
+    
+    Used by serve.py: forked workers inherit the loaded models copy-on-write
+    and skip loading in their own lifespan.
+    """
+    global models_preloaded
+    readiness["load"] = load_ml_models()
+    for model_package in loaded_models.values():
+        if model_package is not None:
+            warm_up(model_package)
+    models_preloaded = True
+
+
+async def prepare_models(reloader=None):
+    """Load, install and warm up the models, then mark the service ready"""
+    from routes.predictions import set_models
+    
+    try:
+        if models_preloaded:
+            logger.info("Using models preloaded by the parent process")
+        else:
+            readiness["phase"] = "loading"
+            readiness["load"] = await asyncio.to_thread(load_ml_models)
+        
+        # Set models in prediction routes
+        set_models(
+            loaded_models['discharge'],
+            loaded_models['bed_availability'],
+            loaded_models['cleaning_duration'],
+            loaded_models['bed_availability_curve']
+        )
+        
+        readiness["phase"] = "warming_up"
+        for name, model_package in loaded_models.items():
+            if model_package is not None:
+                elapsed_ms = await asyncio.to_thread(warm_up, model_package)
+                readiness["warm_up_ms"][name] = round(elapsed_ms, 2)
+                logger.info(f"✓ {name} model warmed up in {elapsed_ms:.1f} ms")
+        
+        # Hot reload starts from the files just loaded
+        if reloader is not None:
+            await asyncio.to_thread(reloader.track_loaded)
+            reloader.start()
+        
+        readiness["ready"] = any(models_loaded.values())
+        readiness["phase"] = "ready" if readiness["ready"] else "no_models"
+        readiness["ready_at"] = datetime.utcnow().isoformat()
+        logger.info(f"ML Service ready: {readiness['phase']}")
+    except Exception as e:
+        readiness["phase"] = "failed"
+        readiness["error"] = str(e)
+        logger.error(f"Model preparation failed: {e}", exc_info=True)
 
 
 @asynccontextmanager
@@ -90,16 +187,75 @@ async def lifespan(app: FastAPI):
     logger.info(f"Starting {settings.SERVICE_NAME} v{settings.VERSION}")
     logger.info(f"Models directory: {settings.MODELS_DIR}")
     
-    # Load ML models
-    load_ml_models()
-    
-    # Set models in prediction routes
-    from routes.predictions import set_models
-    set_models(
-        loaded_models['discharge'],
-        loaded_models['bed_availability'],
-        loaded_models['cleaning_duration']
+    from routes.predictions import (
+        micro_batcher, models, prediction_cache, set_duration_stats, set_executor, set_lookup_tables,
+        set_ward_snapshot
     )
+    from routes.admin import set_reloader
+    from routes.forecast import set_demand_forecaster
+    from routes.events import set_bed_state
+    
+    # Bounded pools for model inference and blocking I/O
+    executor = InferenceExecutor()
+    set_executor(executor)
+    app.state.executor = executor
+    metrics.register("executor", executor.snapshot)
+    metrics.register("prediction_cache", prediction_cache.snapshot)
+    metrics.register("micro_batcher", micro_batcher.snapshot)
+    
+    # Shared pooled MongoDB client
+    pool_monitor = PoolMonitor(settings.MONGO_MAX_POOL_SIZE)
+    mongo_client = create_mongo_client(pool_monitor)
+    app.state.mongo_client = mongo_client
+    metrics.register("mongo_pool", pool_monitor.snapshot)
+    database = default_database(mongo_client)
+    
+    # Bed state fed by POST /events, replayed from MongoDB once in the background;
+    # one process only, so disabled with several workers
+    bed_state = BedStateStore(database, executor, enabled=settings.WORKERS == 1)
+    bed_state.start()
+    set_bed_state(bed_state)
+    app.state.bed_state = bed_state
+    metrics.register("bed_state", bed_state.status)
+    
+    # Start background refresh of historical discharge duration averages
+    duration_stats = DurationStatsEngine(database, executor, bed_state=bed_state)
+    duration_stats.start()
+    set_duration_stats(duration_stats)
+    app.state.duration_stats = duration_stats
+    
+    # Live ward bed counts for bed availability features
+    ward_snapshot = WardSnapshotEngine(database, executor, bed_state=bed_state)
+    ward_snapshot.start()
+    set_ward_snapshot(ward_snapshot)
+    app.state.ward_snapshot = ward_snapshot
+    
+    # Hour-of-week arrival tables, updated incrementally in the background
+    demand_forecaster = DemandForecaster(database, executor)
+    demand_forecaster.start()
+    set_demand_forecaster(demand_forecaster)
+    app.state.demand_forecaster = demand_forecaster
+    metrics.register("demand_forecast", demand_forecaster.status)
+    
+    # Optional precomputed prediction tables, built in the background
+    lookup_tables = LookupTableManager(models, duration_stats, executor)
+    lookup_tables.start()
+    set_lookup_tables(lookup_tables)
+    app.state.lookup_tables = lookup_tables
+    metrics.register("lookup_tables", lookup_tables.snapshot)
+    
+    # Hot reload: atomic swap of the shared models dict, previous version kept
+    def on_model_swap(name, model_package):
+        loaded_models[name] = model_package
+        models_loaded[name] = model_package is not None
+        prediction_cache.invalidate(name)
+    
+    reloader = ModelReloader(models, model_paths(), executor, on_swap=on_model_swap)
+    set_reloader(reloader)
+    app.state.reloader = reloader
+    
+    # Load and warm up models in the background; /ready reports progress
+    model_startup = asyncio.create_task(prepare_models(reloader))
     
     logger.info("ML Service started successfully")
     
@@ -107,6 +263,25 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("ML Service shutting down...")
+    if not model_startup.done():
+        model_startup.cancel()
+    await reloader.stop()
+    await lookup_tables.stop()
+    metrics.unregister("lookup_tables")
+    await duration_stats.stop()
+    await ward_snapshot.stop()
+    await demand_forecaster.stop()
+    metrics.unregister("demand_forecast")
+    await bed_state.stop()
+    metrics.unregister("bed_state")
+    metrics.unregister("mongo_pool")
+    mongo_client.close()
+    logger.info("MongoDB client closed")
+    metrics.unregister("executor")
+    metrics.unregister("prediction_cache")
+    metrics.unregister("micro_batcher")
+    executor.shutdown()
+    shutdown_process_pool()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -137,12 +312,25 @@ async def root():
         "timestamp": datetime.utcnow().isoformat(),
         "endpoints": {
             "health": "/health",
+            "ready": "/ready",
             "docs": "/docs",
             "models_status": "/models/status",
+            "metrics": "/metrics",
             "predictions": {
                 "discharge": f"{settings.API_PREFIX}/predict/discharge",
                 "bed_availability": f"{settings.API_PREFIX}/predict/bed-availability",
+                "bed_availability_curve": f"{settings.API_PREFIX}/predict/bed-availability/curve",
                 "cleaning_duration": f"{settings.API_PREFIX}/predict/cleaning-duration"
+            },
+            "forecasts": {
+                "occupancy": f"{settings.API_PREFIX}/forecast/occupancy",
+                "capacity_risk": f"{settings.API_PREFIX}/forecast/capacity-risk",
+                "threshold_crossing": f"{settings.API_PREFIX}/forecast/threshold-crossing",
+                "demand": f"{settings.API_PREFIX}/forecast/demand"
+            },
+            "events": {
+                "ingest": f"{settings.API_PREFIX}/events",
+                "wards": f"{settings.API_PREFIX}/events/wards"
             }
         }
     }
@@ -158,24 +346,43 @@ async def health_check():
         "models_loaded": models_loaded
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once models are loaded and warmed up, 503 before"""
+    body = {
+        "service": settings.SERVICE_NAME,
+        "timestamp": datetime.utcnow().isoformat(),
+        **readiness
+    }
+    if not readiness["ready"]:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
 @app.get("/models/status")
 async def models_status():
     """Check which models are loaded and ready"""
-    import os
-    
-    model_files = {
-        "discharge": os.path.exists(settings.DISCHARGE_MODEL_PATH),
-        "bed_availability": os.path.exists(settings.BED_AVAILABILITY_MODEL_PATH),
-        "cleaning_duration": os.path.exists(settings.CLEANING_DURATION_MODEL_PATH)
-    }
+    model_files = {name: os.path.exists(path) for name, path in model_paths().items()}
     
     return {
         "models_directory": settings.MODELS_DIR,
         "models_exist": model_files,
         "models_loaded": models_loaded,
+        "compiled_forests": {
+            name: model_package.get('compiled_info') if model_package else None
+            for name, model_package in loaded_models.items()
+        },
         "ready_for_predictions": any(models_loaded.values())
     }
 
+@app.get("/metrics")
+async def service_metrics():
+    """In-process service metrics (connection pool, caches, executors)"""
+    return {
+        "service": settings.SERVICE_NAME,
+        "timestamp": datetime.utcnow().isoformat(),
+        "metrics": metrics.snapshot()
+    }
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler"""
@@ -193,7 +400,21 @@ async def global_exception_handler(request, exc):
 from routes.predictions import router as predictions_router
 app.include_router(predictions_router, prefix=settings.API_PREFIX)
 
+# Import and include forecast routes
+from routes.forecast import router as forecast_router
+app.include_router(forecast_router, prefix=settings.API_PREFIX)
+
+# Import and include event ingestion routes (live bed state)
+from routes.events import router as events_router
+app.include_router(events_router, prefix=settings.API_PREFIX)
+
+# Import and include admin routes (model reload/rollback)
+from routes.admin import router as admin_router
+app.include_router(admin_router, prefix=settings.API_PREFIX)
+
 if __name__ == "__main__":
+    import uvicorn
+    
     logger.info(f"Starting server on {settings.HOST}:{settings.PORT}")
     uvicorn.run(
         "main:app",
@@ -0,0 +1,78 @@
+"""
+Admin routes for model lifecycle (hot reload and rollback)
+
+Disabled unless ADMIN_TOKEN is set; callers send it in the X-Admin-Token
+header. With several workers (serve.py) each worker reloads on its own:
+prefer the model file watcher, which every worker runs.
+"""
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from typing import Optional
+import hmac
+import logging
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+# Model reloader (set from main.py lifespan)
+reloader = None
+
+
+def set_reloader(model_reloader):
+    """Set the model reloader (called from main.py)"""
+    global reloader
+    reloader = model_reloader
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Reject requests without the configured admin token"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if not hmac.compare_digest(x_admin_token or "", settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+def get_reloader():
+    if reloader is None:
+        raise HTTPException(status_code=503, detail="Model reloader not initialised")
+    return reloader
+
+
+@router.get("/models", dependencies=[Depends(require_admin)])
+async def model_versions():
+    """Served and rollback versions per model, pin state and recent reloads"""
+    return get_reloader().status()
+
+
+@router.post("/models/{model_name}/reload", dependencies=[Depends(require_admin)])
+async def reload_model(model_name: str):
+    """
+    Load the model's artifact from disk, warm it up and swap it in
+    
+    In-flight requests finish on the old version, which stays available for
+    rollback. An explicit reload also unpins a rolled-back model.
+    """
+    try:
+        event = await get_reloader().reload(model_name, reason="manual")
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {model_name}")
+    
+    if event["status"] == "failed":
+        raise HTTPException(status_code=409, detail=event)
+    return {"success": True, "event": event}
+
+
+@router.post("/models/{model_name}/rollback", dependencies=[Depends(require_admin)])
+async def rollback_model(model_name: str):
+    """Swap the previously served version back in and pin it"""
+    try:
+        event = await get_reloader().rollback(model_name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {model_name}")
+    
+    if event["status"] == "failed":
+        raise HTTPException(status_code=409, detail=event)
+    return {"success": True, "event": event}
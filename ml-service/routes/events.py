@@ -0,0 +1,98 @@
+"""
+Event ingestion routes: bed state kept up to date from backend events
+
+The backend posts every OccupancyLog and CleaningLog it writes here
+(backend/services/mlService.js). With more than one worker process the
+store is disabled and both routes answer 503.
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional, Union
+import logging
+
+from schemas import BedEvent, CleaningEvent, EventBatchRequest
+from services.bed_state import BedStateStore
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+# Bed state store (replaced from main.py lifespan; an unstarted store
+# without a database is empty and applies events right away)
+bed_state = BedStateStore()
+
+DISABLED_DETAIL = (
+    "Bed state events need a single worker process (ML_SERVICE_WORKERS=1); "
+    "ward features are served from MongoDB aggregations instead"
+)
+
+
+def set_bed_state(store: BedStateStore):
+    """Set the bed state store (called from main.py lifespan)"""
+    global bed_state
+    bed_state = store
+
+
+def event_arguments(event: BedEvent):
+    """(kind, keyword arguments) for BedStateStore.apply"""
+    if isinstance(event, CleaningEvent):
+        return "cleaning", {
+            "bed_id": event.bed_id,
+            "ward": event.ward,
+            "status": event.status,
+            "start_time": event.start_time,
+            "end_time": event.end_time,
+            "actual_duration": event.actual_duration
+        }
+    return "occupancy", {
+        "bed_id": event.bed_id,
+        "status_change": event.status_change,
+        "timestamp": event.timestamp,
+        "ward": event.ward
+    }
+
+
+@router.post("")
+async def ingest_events(request: Union[EventBatchRequest, BedEvent]):
+    """
+    Apply one event, or {"events": [...]} in order, to the bed state
+
+    Each event is O(1) and applied on the event loop, no database access.
+    Duplicates and events older than the bed's last one are ignored, so
+    the backend can retry freely. Events received before the startup
+    replay completes are queued and applied after it.
+    """
+    if not bed_state.enabled:
+        raise HTTPException(status_code=503, detail=DISABLED_DETAIL)
+    try:
+        events = request.events if isinstance(request, EventBatchRequest) else [request]
+        result = bed_state.ingest(event_arguments(event) for event in events)
+        return {
+            "success": True,
+            "received": len(events),
+            **result,
+            "state": bed_state.status()
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Event ingestion error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/wards")
+async def ward_state(ward: Optional[str] = Query(None, description="Single ward (default: all wards)")):
+    """Live bed counts, occupancy rate and running stay/cleaning statistics per ward"""
+    if not bed_state.enabled:
+        raise HTTPException(status_code=503, detail=DISABLED_DETAIL)
+    if not bed_state.ready:
+        raise HTTPException(status_code=503, detail="Bed state replay in progress")
+    wards = bed_state.describe_wards(ward)
+    if ward and not wards:
+        raise HTTPException(status_code=404, detail=f"No beds found for ward {ward}")
+    return {
+        "success": True,
+        "wards": wards,
+        "state": bed_state.status()
+    }
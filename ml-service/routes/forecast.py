@@ -0,0 +1,427 @@
+"""
+Forecast routes: ward-level outlooks built from batch-scored predictions
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pymongo.database import Database
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from config import settings
+from routes import predictions
+from services.capacity_simulator import simulate_capacity, stay_samples
+from services.demand_forecast import DEMAND_SOURCES, DemandForecaster
+from services.forest_outputs import supports_tree_outputs
+from services.mongo import get_database
+from services.occupancy_forecast import fetch_ward_beds, hours_between, hours_since, occupancy_curves, remaining_stay_hours
+from services.occupancy_warning import threshold_warnings
+from utils import format_prediction_response
+from utils.features import build_discharge_features
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/forecast", tags=["forecast"])
+
+# Demand forecaster, set from the app lifespan
+demand_forecaster: Optional[DemandForecaster] = None
+
+
+def set_demand_forecaster(forecaster: DemandForecaster):
+    """Set the demand forecaster (called from main.py lifespan)"""
+    global demand_forecaster
+    demand_forecaster = forecaster
+
+
+async def predict_stays(model_package: Dict[str, Any], wards: List[str], admission_times: List[datetime]) -> np.ndarray:
+    """
+    Predicted total stay in hours, one model call for all rows
+    
+    Returns:
+        (n_rows, n_trees) per-tree stays where the model supports it,
+        else (n_rows, 1) point predictions
+    """
+    X = build_discharge_features(
+        wards, admission_times, predictions.duration_stats, model_package['feature_columns']
+    )
+    method = 'predict_per_tree' if supports_tree_outputs(model_package['model']) else 'predict'
+    stays = await predictions.run_prediction('discharge', model_package, method, X)
+    return np.asarray(stays).reshape(len(wards), -1)
+
+
+async def load_ward_beds(db: Database, ward: Optional[str]) -> Tuple[Dict[str, int], List[dict], List[str]]:
+    """Capacity, occupied beds and sorted ward names (404 for an unknown ward)"""
+    beds = await predictions.executor.run_io(fetch_ward_beds, db, ward)
+    capacity, occupied = beds['capacity'], beds['occupied']
+    if ward and not capacity:
+        raise HTTPException(status_code=404, detail=f"No beds found for ward {ward}")
+    wards = sorted(set(capacity) | {bed['ward'] for bed in occupied})
+    return capacity, occupied, wards
+
+
+async def load_ward_outlook(db: Database, ward: Optional[str], horizon: int) -> Dict[str, Any]:
+    """
+    Inputs of the occupancy outlooks (capacity risk, threshold crossing)
+    
+    Scores the occupied beds and a fresh admission per ward with the
+    discharge model (two model calls) and looks up the admission rates.
+    
+    Returns:
+        Dict with 'wards', 'capacity' and 'occupied' (aligned with wards),
+        'bed_ward' (ward position per occupied bed), 'bed_remaining'
+        (remaining hours per bed and tree), 'stay_hours' (stay samples for
+        new arrivals per ward), 'arrival_rates' (per ward and hour),
+        'includes_new_admissions', 'beds_scored', 'model_version' and 'now'
+    """
+    model_package = require_discharge_model()
+    capacity, occupied, wards = await load_ward_beds(db, ward)
+    if not wards:
+        raise HTTPException(status_code=404, detail="No beds found")
+    
+    now = datetime.utcnow()
+    ward_positions = {name: position for position, name in enumerate(wards)}
+    
+    bed_wards = [bed['ward'] for bed in occupied]
+    bed_remaining = np.zeros((0, 1))
+    if occupied:
+        admission_times = [bed.get('admission_time') or now for bed in occupied]
+        bed_remaining = remaining_stay_hours(
+            await predict_stays(model_package, bed_wards, admission_times),
+            hours_since(admission_times, now),
+            hours_between([bed.get('estimatedDischargeTime') for bed in occupied], now)
+        )
+    
+    # Stay distribution of a patient admitted now, per ward (one model call)
+    new_stays = await predict_stays(model_package, wards, [now] * len(wards))
+    
+    # Admissions by hour of the week from the demand tables (none until they are built)
+    tables = demand_forecaster.tables if demand_forecaster is not None else None
+    if tables is not None:
+        arrival_rates = tables.forecast(wards, now, horizon)[:, DEMAND_SOURCES.index('admissions')]
+    else:
+        arrival_rates = np.zeros((len(wards), horizon))
+    
+    bed_ward = np.array([ward_positions[name] for name in bed_wards], dtype=np.int64)
+    return {
+        "wards": wards,
+        "capacity": np.array([capacity.get(name, 0) for name in wards], dtype=np.int64),
+        "occupied": np.bincount(bed_ward, minlength=len(wards)),
+        "bed_ward": bed_ward,
+        "bed_remaining": bed_remaining,
+        "stay_hours": stay_samples(list(new_stays)),
+        "arrival_rates": arrival_rates,
+        "includes_new_admissions": tables is not None,
+        "beds_scored": len(occupied),
+        "model_version": model_package.get('version', '1.0.0'),
+        "now": now
+    }
+
+
+def require_discharge_model() -> Dict[str, Any]:
+    """Loaded discharge model package (503 if not loaded)"""
+    model_package = predictions.models['discharge']
+    if model_package is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Discharge prediction model not loaded"
+        )
+    return model_package
+
+
+@router.get("/occupancy")
+async def forecast_occupancy(
+    ward: Optional[str] = Query(None, description="Ward name (all wards if omitted)"),
+    horizon: int = Query(
+        settings.MAX_PREDICTION_HORIZON_HOURS,
+        ge=1,
+        le=settings.MAX_PREDICTION_HORIZON_HOURS,
+        description="Hours ahead to forecast"
+    ),
+    db: Database = Depends(get_database)
+):
+    """
+    Forecast hourly expected occupancy per ward
+    
+    Reads the currently occupied beds and their admission times, scores
+    all of them with the discharge model in one call and returns, per ward,
+    the expected number of occupied beds for every hour from now (hour 0)
+    to the horizon, assuming no new admissions.
+    """
+    try:
+        model_package = require_discharge_model()
+        capacity, occupied, wards = await load_ward_beds(db, ward)
+        
+        now = datetime.utcnow()
+        ward_positions = {name: position for position, name in enumerate(wards)}
+        
+        if occupied:
+            bed_wards = [bed['ward'] for bed in occupied]
+            admission_times = [bed.get('admission_time') or now for bed in occupied]
+            
+            # One model call for every occupied bed; per-tree stays where available
+            tree_hours = await predict_stays(model_package, bed_wards, admission_times)
+            
+            curves = occupancy_curves(
+                ward_index=np.array([ward_positions[name] for name in bed_wards]),
+                n_wards=len(wards),
+                tree_hours=tree_hours,
+                elapsed_hours=hours_since(admission_times, now),
+                horizon_hours=horizon,
+                manual_remaining_hours=hours_between([bed.get('estimatedDischargeTime') for bed in occupied], now)
+            )
+        else:
+            curves = {
+                "occupied": np.zeros(len(wards)),
+                "discharges": np.zeros((len(wards), horizon)),
+                "expected_occupied": np.zeros((len(wards), horizon + 1))
+            }
+        
+        forecast = {}
+        for position, name in enumerate(wards):
+            beds_in_ward = capacity.get(name, 0)
+            expected = curves['expected_occupied'][position]
+            forecast[name] = {
+                "capacity": beds_in_ward,
+                "occupied": int(curves['occupied'][position]),
+                "expected_occupied": np.round(expected, 2).tolist(),
+                "expected_discharges": np.round(curves['discharges'][position], 3).tolist(),
+                "expected_occupancy_rate": (
+                    np.round(expected / beds_in_ward, 4).tolist() if beds_in_ward else None
+                )
+            }
+        
+        return format_prediction_response(
+            prediction=forecast,
+            metadata={
+                "ward": ward,
+                "horizon_hours": horizon,
+                "hours": list(range(horizon + 1)),
+                "generated_at": now.isoformat(),
+                "beds_scored": len(occupied),
+                "model_version": model_package.get('version', '1.0.0'),
+                "includes_new_admissions": False
+            }
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Occupancy forecast error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/capacity-risk")
+async def forecast_capacity_risk(
+    ward: Optional[str] = Query(None, description="Ward name (all wards if omitted)"),
+    horizon: int = Query(
+        settings.MAX_PREDICTION_HORIZON_HOURS,
+        ge=1,
+        le=settings.MAX_PREDICTION_HORIZON_HOURS,
+        description="Hours ahead to simulate"
+    ),
+    simulations: int = Query(
+        settings.SIMULATION_DEFAULT_RUNS,
+        ge=100,
+        le=settings.SIMULATION_MAX_RUNS,
+        description="Number of simulated occupancy trajectories"
+    ),
+    seed: Optional[int] = Query(None, description="Random seed for reproducible results"),
+    db: Database = Depends(get_database)
+):
+    """
+    Probability that each ward is full, hour by hour, by Monte Carlo simulation
+    
+    Current patients leave according to the discharge model's per-tree stay
+    predictions (conditional on the stay so far, or the manager-set
+    discharge time); new patients arrive at the ward's admission rates from
+    the demand tables and stay as the discharge model predicts for an
+    admission now.
+    """
+    try:
+        outlook = await load_ward_outlook(db, ward, horizon)
+        wards, arrival_rates = outlook['wards'], outlook['arrival_rates']
+        
+        result = await predictions.executor.run_model(
+            'capacity_simulation',
+            simulate_capacity,
+            outlook['bed_ward'],
+            outlook['bed_remaining'],
+            outlook['capacity'],
+            arrival_rates,
+            outlook['stay_hours'],
+            simulations,
+            seed
+        )
+        
+        forecast = {}
+        for position, name in enumerate(wards):
+            forecast[name] = {
+                "capacity": int(outlook['capacity'][position]),
+                "occupied": int(outlook['occupied'][position]),
+                "expected_arrivals": round(float(arrival_rates[position].sum()), 2),
+                "p_full": np.round(result['p_full'][position], 4).tolist(),
+                "p_full_by": np.round(result['p_full_by'][position], 4).tolist(),
+                "expected_occupied": np.round(result['expected_occupied'][position], 2).tolist(),
+                "peak_occupied_p90": float(result['peak_p90'][position])
+            }
+        
+        return format_prediction_response(
+            prediction=forecast,
+            metadata={
+                "ward": ward,
+                "horizon_hours": horizon,
+                "hours": list(range(horizon + 1)),
+                "generated_at": outlook['now'].isoformat(),
+                "beds_scored": outlook['beds_scored'],
+                "model_version": outlook['model_version'],
+                "simulations": result['simulations'],
+                "simulation_seconds": result['seconds'],
+                "includes_new_admissions": outlook['includes_new_admissions']
+            }
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Capacity risk simulation error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/threshold-crossing")
+async def forecast_threshold_crossing(
+    ward: Optional[str] = Query(None, description="Ward name (all wards if omitted)"),
+    threshold: float = Query(
+        settings.OCCUPANCY_ALERT_THRESHOLD,
+        gt=0,
+        le=1,
+        description="Occupancy rate limit (alert when occupancy goes above it)"
+    ),
+    horizon: int = Query(
+        settings.MAX_PREDICTION_HORIZON_HOURS,
+        ge=1,
+        le=settings.MAX_PREDICTION_HORIZON_HOURS,
+        description="Hours ahead to look"
+    ),
+    db: Database = Depends(get_database)
+):
+    """
+    Early warning: when each ward is predicted to go above an occupancy threshold
+    
+    Uses the same inputs as the capacity risk forecast (batch-scored
+    discharge predictions and demand-table admission rates) but computes
+    P(occupancy above threshold) for every ward and hour in closed form, so
+    the whole hospital takes one vectorized pass. The crossing hour is the
+    first hour at which being above the threshold is more likely than not;
+    confidence is the probability of the predicted outcome.
+    """
+    try:
+        outlook = await load_ward_outlook(db, ward, horizon)
+        wards, now = outlook['wards'], outlook['now']
+        
+        warnings = await predictions.executor.run_model(
+            'threshold_warning',
+            threshold_warnings,
+            outlook['bed_ward'],
+            outlook['capacity'],
+            outlook['bed_remaining'],
+            outlook['arrival_rates'],
+            outlook['stay_hours'],
+            threshold
+        )
+        
+        forecast = {}
+        for position, name in enumerate(wards):
+            hour = int(warnings['hour'][position])
+            capacity = int(outlook['capacity'][position])
+            forecast[name] = {
+                "capacity": capacity,
+                "occupied": int(outlook['occupied'][position]),
+                "limit_beds": int(warnings['limit'][position]) if capacity else None,
+                "above_now": hour == 0,
+                "crossing_hour": hour if hour >= 0 else None,
+                "crossing_time": (now + timedelta(hours=hour)).isoformat() if hour >= 0 else None,
+                "confidence": round(float(warnings['confidence'][position]), 4),
+                "peak_probability": round(float(warnings['peak_probability'][position]), 4),
+                "peak_hour": int(warnings['peak_hour'][position]),
+                "probability_above": np.round(warnings['probability_above'][position], 4).tolist(),
+                "expected_occupied": np.round(warnings['expected_occupied'][position], 2).tolist()
+            }
+        
+        return format_prediction_response(
+            prediction=forecast,
+            metadata={
+                "ward": ward,
+                "threshold": threshold,
+                "horizon_hours": horizon,
+                "hours": list(range(horizon + 1)),
+                "generated_at": now.isoformat(),
+                "beds_scored": outlook['beds_scored'],
+                "model_version": outlook['model_version'],
+                "includes_new_admissions": outlook['includes_new_admissions']
+            }
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Threshold crossing forecast error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/demand")
+async def forecast_demand(
+    ward: Optional[str] = Query(None, description="Ward name (all wards if omitted)"),
+    horizon: int = Query(
+        settings.DEFAULT_PREDICTION_HORIZON_HOURS,
+        ge=1,
+        le=settings.MAX_PREDICTION_HORIZON_HOURS,
+        description="Hours ahead to forecast"
+    )
+):
+    """
+    Forecast hourly arrivals per ward: bed admissions and emergency requests
+    
+    Served from precomputed, smoothed hour-of-week arrival tables that are
+    updated incrementally in the background; no database access per request.
+    """
+    try:
+        tables = demand_forecaster.tables if demand_forecaster is not None else None
+        if tables is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Demand tables not available yet"
+            )
+        if ward and ward not in tables.ward_positions:
+            raise HTTPException(status_code=404, detail=f"No arrivals recorded for ward {ward}")
+        
+        now = datetime.utcnow()
+        wards = [ward] if ward else tables.wards
+        expected = tables.forecast(wards, now, horizon)
+        
+        forecast = {}
+        for position, name in enumerate(wards):
+            forecast[name] = {}
+            for source_position, source in enumerate(DEMAND_SOURCES):
+                hourly = expected[position, source_position]
+                forecast[name][source] = np.round(hourly, 3).tolist()
+                forecast[name][f"expected_{source}"] = round(float(hourly.sum()), 2)
+        
+        return format_prediction_response(
+            prediction=forecast,
+            metadata={
+                "ward": ward,
+                "horizon_hours": horizon,
+                "hours": list(range(1, horizon + 1)),
+                "start": now.replace(minute=0, second=0, microsecond=0).isoformat(),
+                "generated_at": now.isoformat(),
+                **demand_forecaster.status()
+            }
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Demand forecast error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
@@ -3,52 +3,261 @@ Prediction routes for ML models
 """
 
 from fastapi import APIRouter, HTTPException
+from pydantic import ValidationError
 from datetime import datetime
 import numpy as np
 import logging
 
+from config import settings
 from schemas import (
     DischargeRequest,
+    DischargeBatchRequest,
     BedAvailabilityRequest,
     CleaningDurationRequest,
+    BedAvailabilityBatchRequest,
+    BedAvailabilityCurveRequest,
+    CleaningDurationBatchRequest,
     PredictionResponse,
     ErrorResponse
 )
-from utils import (
-    extract_time_features,
-    ward_to_numeric,
-    format_prediction_response
+from utils import format_prediction_response
+from utils.features import (
+    build_discharge_features,
+    build_bed_availability_features,
+    build_cleaning_features
 )
+from services.availability_curve import hourly_curve
+from services.duration_stats import DurationStatsEngine
+from services.executor import InferenceExecutor
+from services.forest_outputs import (
+    calibrate_probability, model_method, split_proba_spread, split_quantiles, supports_tree_outputs
+)
+from services.micro_batcher import MicroBatcher
+from services.prediction_cache import PredictionCache
+from services.ward_snapshot import WardSnapshotEngine
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/predict", tags=["predictions"])
 
-# Helper function for time of day classification
-def get_time_of_day(hour):
-    """Convert hour (0-23) to time of day category (0-3)"""
-    if 6 <= hour < 12:
-        return 0  # morning
-    elif 12 <= hour < 18:
-        return 1  # afternoon
-    elif 18 <= hour < 22:
-        return 2  # evening
-    else:
-        return 3  # night
-
 # Global model storage (will be loaded from main.py)
 models = {
     'discharge': None,
     'bed_availability': None,
-    'cleaning_duration': None
+    'cleaning_duration': None,
+    'bed_availability_curve': None
 }
 
 
-def set_models(discharge_model, bed_availability_model, cleaning_duration_model):
+def set_models(discharge_model, bed_availability_model, cleaning_duration_model, bed_availability_curve_model=None):
     """Set loaded models (called from main.py)"""
     models['discharge'] = discharge_model
     models['bed_availability'] = bed_availability_model
     models['cleaning_duration'] = cleaning_duration_model
+    models['bed_availability_curve'] = bed_availability_curve_model
+    prediction_cache.invalidate()
+
+
+# Historical duration statistics engine (replaced from main.py lifespan;
+# an unstarted engine serves per-ward defaults)
+duration_stats = DurationStatsEngine()
+
+
+def set_duration_stats(engine):
+    """Set the duration statistics engine (called from main.py)"""
+    global duration_stats
+    duration_stats = engine
+
+
+# Live ward bed counts for bed availability features (replaced from main.py
+# lifespan; an unstarted engine leaves the defaults in place)
+ward_snapshot = WardSnapshotEngine()
+
+
+def set_ward_snapshot(engine):
+    """Set the ward snapshot engine (called from main.py)"""
+    global ward_snapshot
+    ward_snapshot = engine
+
+
+# Bounded pools for model calls (replaced from main.py lifespan)
+executor = InferenceExecutor()
+
+
+def set_executor(inference_executor):
+    """Set the inference executor (called from main.py)"""
+    global executor
+    executor = inference_executor
+
+
+# Per-row prediction cache shared by all routes
+prediction_cache = PredictionCache()
+
+
+# Merges concurrent single-row requests into shared model calls (optional)
+micro_batcher = MicroBatcher()
+
+
+async def run_prediction(model_name, model_package, method, X):
+    """
+    Run a model method on X through the prediction cache and executor
+    
+    Single rows may first be merged with concurrent single-row requests by
+    the micro-batcher. Rows covered by a lookup table are read from it; of
+    the rest, only rows that are neither cached nor already in flight reach
+    the model, and they reach it in a single call.
+    """
+    if len(X) == 1 and micro_batcher.enabled:
+        return await micro_batcher.submit(
+            (model_name, method, id(model_package)),
+            X,
+            lambda rows: predict_rows(model_name, model_package, method, rows)
+        )
+    return await predict_rows(model_name, model_package, method, X)
+
+
+async def predict_rows(model_name, model_package, method, X):
+    """Lookup table, then prediction cache, then the model (see run_prediction)"""
+    namespace = f"{model_name}:{method}"
+    compiled = model_package.get('compiled')
+    
+    async def compute(rows):
+        # Compiled forests avoid sklearn's per-call overhead on small inputs
+        if compiled is not None and len(rows) <= settings.COMPILED_FOREST_MAX_ROWS:
+            fn = model_method(compiled, method)
+        else:
+            fn = model_method(model_package['model'], method)
+        return await executor.run_model(model_name, fn, rows)
+    
+    # Rows on a precomputed table are an array index away
+    table = lookup_tables.get(namespace, model_package) if lookup_tables is not None else None
+    if table is not None:
+        values, covered = table.lookup(X)
+        if covered.all():
+            return values
+        if covered.any():
+            missing = ~covered
+            values[missing] = await prediction_cache.predict(
+                namespace, model_package.get('version', '1.0.0'), X[missing], compute
+            )
+            return values
+    
+    return await prediction_cache.predict(
+        namespace,
+        model_package.get('version', '1.0.0'),
+        X,
+        compute
+    )
+
+
+# Precomputed prediction tables (set from main.py lifespan when enabled)
+lookup_tables = None
+
+
+def set_lookup_tables(manager):
+    """Set the lookup table manager (called from main.py)"""
+    global lookup_tables
+    lookup_tables = manager
+
+
+def check_quantiles_supported(model_package, include_quantiles):
+    """Reject quantile requests for models without per-tree predictions"""
+    if include_quantiles and not supports_tree_outputs(model_package['model']):
+        raise HTTPException(
+            status_code=400,
+            detail="Quantiles are only available for random forest models"
+        )
+
+
+def discharge_quantiles(admission_time, quantiles):
+    """Quantile hours and discharge times for one bed ({'p10': hours, ...})"""
+    return {
+        "hours_until_discharge_quantiles": {
+            label: round(hours, 2) for label, hours in quantiles.items()
+        },
+        "estimated_discharge_time_quantiles": {
+            label: datetime.fromtimestamp(admission_time.timestamp() + hours * 3600).isoformat()
+            for label, hours in quantiles.items()
+        }
+    }
+
+
+def validate_batch_items(raw_items, schema):
+    """
+    Validate batch items one at a time
+    
+    Returns:
+        Tuple of (list of (index, parsed request), results list with an
+        error entry for every invalid item and None elsewhere)
+    """
+    valid = []
+    results = [None] * len(raw_items)
+    for index, raw in enumerate(raw_items):
+        try:
+            valid.append((index, schema.model_validate(raw)))
+        except ValidationError as e:
+            results[index] = {
+                "index": index,
+                "success": False,
+                "error": "; ".join(
+                    f"{'.'.join(str(part) for part in err['loc']) or 'item'}: {err['msg']}"
+                    for err in e.errors()
+                )
+            }
+    return valid, results
+
+
+def availability_model_name(horizon_hours):
+    """
+    Model answering "available within horizon_hours": the classifier for
+    the horizon it was trained on, the curve model for any other (None if
+    neither loaded model can answer)
+    """
+    if horizon_hours == settings.AVAILABILITY_CLASSIFIER_HORIZON_HOURS and models['bed_availability'] is not None:
+        return 'bed_availability'
+    if models['bed_availability_curve'] is not None:
+        return 'bed_availability_curve'
+    return None
+
+
+def unavailable_horizon_detail(horizon_hours):
+    """Error for a horizon that no loaded model answers"""
+    if horizon_hours == settings.AVAILABILITY_CLASSIFIER_HORIZON_HOURS:
+        return "Bed availability prediction model not loaded"
+    return (
+        f"prediction_horizon_hours={horizon_hours} needs the bed availability curve model, "
+        f"which is not loaded (the classifier only predicts "
+        f"{settings.AVAILABILITY_CLASSIFIER_HORIZON_HOURS} hours)"
+    )
+
+
+def bed_availability_matrix(model_package, wards, current_times):
+    """
+    Bed availability feature matrix for a classifier or curve package
+
+    The live ward occupancy rate is only fed to packages trained on the
+    point-in-time rate ('ward_features'); others get their trained
+    per-ward rates, or the defaults for packages that predate them.
+    """
+    live = model_package.get('ward_features') == 'point_in_time'
+    return build_bed_availability_features(
+        wards, current_times, model_package['feature_columns'],
+        ward_snapshot.snapshot if live else None,
+        model_package.get('hour_availability_rates'),
+        model_package.get('ward_occupancy_rates')
+    )
+
+
+async def curve_probabilities(model_package, wards, current_times, horizon_hours):
+    """
+    Probability of release within each row's horizon from the curve model
+    (one model call for all rows)
+    """
+    X = bed_availability_matrix(model_package, wards, current_times)
+    knot_probabilities = await run_prediction('bed_availability_curve', model_package, 'predict', X)
+    hours = np.asarray(horizon_hours, dtype=np.int64)
+    curve = hourly_curve(knot_probabilities, model_package['horizons'], int(hours.max()))
+    return curve[np.arange(len(hours)), hours - 1]
 
 
 @router.post("/discharge", response_model=PredictionResponse)
@@ -60,6 +269,9 @@ async def predict_discharge(request: DischargeRequest):
     - Ward type
     - Admission time (hour, day of week)
     - Historical patterns
+    
+    With include_quantiles, P10/P50/P90 of the per-tree predictions are
+    returned too, computed in the same forest pass.
     """
     try:
         if models['discharge'] is None:
@@ -69,157 +281,44 @@ async def predict_discharge(request: DischargeRequest):
             )
         
         model_package = models['discharge']
-        model = model_package['model']
         feature_columns = model_package['feature_columns']
+        check_quantiles_supported(model_package, request.include_quantiles)
         
         # Use provided time or current time
         admission_time = request.admission_time or datetime.utcnow()
         
-        # Extract time features
-        time_features = extract_time_features(admission_time)
-        
-        # Build feature vector (matching ward-focused training model)
-        ward_encoded = ward_to_numeric(request.ward)
-        features = {
-            'ward_encoded': ward_encoded,
-            'hour': time_features['hour'],
-            'day_of_week': time_features['day_of_week'],
-            'month': admission_time.month,
-            'day_of_month': admission_time.day,
-            'is_weekend': time_features['is_weekend'],
-            'is_business_hours': time_features['is_business_hours'],
-            'time_of_day': time_features['time_of_day'],
-        }
-        
-        # Calculate actual historical averages from database
-        try:
-            from pymongo import MongoClient
-            from datetime import timedelta
-            
-            # Connect to MongoDB
-            mongo_client = MongoClient('mongodb://localhost:27017/')
-            db = mongo_client['bedmanager']
-            
-            # Get occupancy logs from last 30 days
-            thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-            logs = list(db.occupancylogs.find({
-                'timestamp': {'$gte': thirty_days_ago}
-            }).sort([('bedId', 1), ('timestamp', 1)]))
-            
-            # Populate bed info to get ward
-            bed_ids = list(set([log['bedId'] for log in logs]))
-            beds_info = {
-                bed['_id']: bed['ward'] 
-                for bed in db.beds.find({'_id': {'$in': bed_ids}}, {'ward': 1})
-            }
-            
-            # Group logs by bedId and calculate durations
-            bed_groups = {}
-            for log in logs:
-                bed_id = str(log['bedId'])
-                if bed_id not in bed_groups:
-                    bed_groups[bed_id] = []
-                bed_groups[bed_id].append(log)
-            
-            # Calculate durations by ward
-            ward_durations = {}
-            time_of_day_durations = {0: [], 1: [], 2: [], 3: []}  # morning, afternoon, evening, night
-            
-            for bed_id_str, bed_logs in bed_groups.items():
-                bed_obj_id = bed_logs[0]['bedId']
-                ward = beds_info.get(bed_obj_id, 'General')
-                
-                for i in range(len(bed_logs) - 1):
-                    if bed_logs[i]['statusChange'] == 'assigned' and bed_logs[i+1]['statusChange'] == 'released':
-                        duration_hours = (bed_logs[i+1]['timestamp'] - bed_logs[i]['timestamp']).total_seconds() / 3600
-                        if 0 < duration_hours < 8760:  # Valid range (less than 1 year)
-                            # Ward average
-                            if ward not in ward_durations:
-                                ward_durations[ward] = []
-                            ward_durations[ward].append(duration_hours)
-                            
-                            # Time of day average
-                            admission_hour = bed_logs[i]['timestamp'].hour
-                            tod = get_time_of_day(admission_hour)
-                            time_of_day_durations[tod].append(duration_hours)
-            
-            # Calculate ward average
-            if request.ward in ward_durations and len(ward_durations[request.ward]) > 0:
-                ward_avg = sum(ward_durations[request.ward]) / len(ward_durations[request.ward])
-            else:
-                # Fallback to overall average if ward has no data
-                all_durations = [d for durations in ward_durations.values() for d in durations]
-                ward_avg = sum(all_durations) / len(all_durations) if all_durations else 48.0
-            
-            # Calculate time of day average
-            tod = get_time_of_day(time_features['hour'])
-            if len(time_of_day_durations[tod]) > 0:
-                time_avg = sum(time_of_day_durations[tod]) / len(time_of_day_durations[tod])
-            else:
-                time_avg = ward_avg
-            
-            # Calculate combined ward+time average
-            ward_time_key = f"{request.ward}_{tod}"
-            ward_time_durations = []
-            for bed_id_str, bed_logs in bed_groups.items():
-                bed_obj_id = bed_logs[0]['bedId']
-                ward = beds_info.get(bed_obj_id, 'General')
-                if ward == request.ward:
-                    for i in range(len(bed_logs) - 1):
-                        if bed_logs[i]['statusChange'] == 'assigned' and bed_logs[i+1]['statusChange'] == 'released':
-                            admission_hour = bed_logs[i]['timestamp'].hour
-                            if get_time_of_day(admission_hour) == tod:
-                                duration_hours = (bed_logs[i+1]['timestamp'] - bed_logs[i]['timestamp']).total_seconds() / 3600
-                                if 0 < duration_hours < 8760:
-                                    ward_time_durations.append(duration_hours)
-            
-            ward_time_avg = sum(ward_time_durations) / len(ward_time_durations) if ward_time_durations else ward_avg
-            
-            # Set features for ward-focused model
-            features['ward_avg_duration'] = ward_avg
-            features['time_avg_duration'] = time_avg
-            features['ward_time_avg_duration'] = ward_time_avg
-            
-            logger.info(f"Ward-focused features: ward_avg={ward_avg:.2f}h, time_avg={time_avg:.2f}h, ward_time_avg={ward_time_avg:.2f}h, ward_encoded={ward_encoded}")
-            
-            mongo_client.close()
-            
-        except Exception as e:
-            logger.error(f"Failed to calculate historical averages from database: {e}", exc_info=True)
-            # Fallback to reasonable defaults based on ward
-            ward_defaults = {
-                'ICU': 48.0,
-                'Emergency': 24.0,
-                'General': 36.0,
-                'Pediatrics': 30.0,
-                'Maternity': 48.0,
-                'Surgery': 36.0,
-                'Cardiology': 40.0
-            }
-            default_duration = ward_defaults.get(request.ward, 36.0)
-            features['ward_avg_duration'] = default_duration
-            features['time_avg_duration'] = default_duration  # Fallback to ward avg
-            features['ward_time_avg_duration'] = default_duration  # Fallback to ward avg
-        
-        # Create input array in correct order
-        X = np.array([[features[col] for col in feature_columns]])
+        # Build feature vector (historical averages come from the in-memory
+        # duration statistics engine)
+        X = build_discharge_features(
+            [request.ward], [admission_time], duration_stats, feature_columns
+        )
         
         # Predict
-        prediction_hours = float(model.predict(X)[0])
+        if request.include_quantiles:
+            outputs = await run_prediction('discharge', model_package, 'predict_quantiles', X)
+            quantiles = {label: float(values[0]) for label, values in split_quantiles(outputs).items()}
+            prediction_hours = quantiles.pop('mean')
+        else:
+            prediction_hours = float((await run_prediction('discharge', model_package, 'predict', X))[0])
         
         # Calculate estimated discharge time
         estimated_discharge = admission_time.timestamp() + (prediction_hours * 3600)
         estimated_discharge_dt = datetime.fromtimestamp(estimated_discharge)
         
+        prediction = {
+            "hours_until_discharge": round(prediction_hours, 2),
+            "estimated_discharge_time": estimated_discharge_dt.isoformat()
+        }
+        if request.include_quantiles:
+            prediction.update(discharge_quantiles(admission_time, quantiles))
+        
         return format_prediction_response(
-            prediction={
-                "hours_until_discharge": round(prediction_hours, 2),
-                "estimated_discharge_time": estimated_discharge_dt.isoformat()
-            },
+            prediction=prediction,
             metadata={
                 "ward": request.ward,
                 "admission_time": admission_time.isoformat(),
-                "model_version": model_package.get('version', '1.0.0')
+                "model_version": model_package.get('version', '1.0.0'),
+                "duration_stats": duration_stats.status()
             }
         )
         
@@ -230,62 +329,191 @@ async def predict_discharge(request: DischargeRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/discharge/batch", response_model=PredictionResponse)
+async def predict_discharge_batch(request: DischargeBatchRequest):
+    """
+    Predict discharge times for many beds in one call
+    
+    Builds a single feature matrix for all items and runs the model once
+    (also with include_quantiles). Results are returned in request order.
+    """
+    try:
+        if models['discharge'] is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Discharge prediction model not loaded"
+            )
+        
+        model_package = models['discharge']
+        feature_columns = model_package['feature_columns']
+        check_quantiles_supported(model_package, request.include_quantiles)
+        
+        now = datetime.utcnow()
+        wards = [item.ward for item in request.items]
+        admission_times = [item.admission_time or now for item in request.items]
+        
+        X = build_discharge_features(wards, admission_times, duration_stats, feature_columns)
+        if request.include_quantiles:
+            outputs = await run_prediction('discharge', model_package, 'predict_quantiles', X)
+            columns = {label: values.tolist() for label, values in split_quantiles(outputs).items()}
+            prediction_hours = columns.pop('mean')
+            row_quantiles = [dict(zip(columns, values)) for values in zip(*columns.values())]
+        else:
+            prediction_hours = (await run_prediction('discharge', model_package, 'predict', X)).tolist()
+            row_quantiles = [None] * len(prediction_hours)
+        
+        predictions = []
+        for item, admission_time, hours, quantiles in zip(
+            request.items, admission_times, prediction_hours, row_quantiles
+        ):
+            estimated_discharge = admission_time.timestamp() + (hours * 3600)
+            prediction = {
+                "bed_id": item.bed_id,
+                "ward": item.ward,
+                "admission_time": admission_time.isoformat(),
+                "hours_until_discharge": round(hours, 2),
+                "estimated_discharge_time": datetime.fromtimestamp(estimated_discharge).isoformat()
+            }
+            if quantiles is not None:
+                prediction.update(discharge_quantiles(admission_time, quantiles))
+            predictions.append(prediction)
+        
+        return format_prediction_response(
+            prediction=predictions,
+            metadata={
+                "count": len(predictions),
+                "model_version": model_package.get('version', '1.0.0'),
+                "duration_stats": duration_stats.status()
+            }
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch discharge prediction error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/bed-availability", response_model=PredictionResponse)
 async def predict_bed_availability(request: BedAvailabilityRequest):
     """
     Predict if a bed will become available in the next N hours
     
     Returns probability that a bed in the specified ward will become available
+    within prediction_horizon_hours. The classifier answers the horizon it
+    was trained on: the forest's probability through the calibration fitted
+    at training time, with the spread of the raw tree votes; confidence is
+    the share of trees that agree with the predicted class.
+    Any other horizon is read from the availability curve model at that hour.
     """
     try:
-        if models['bed_availability'] is None:
+        horizon_hours = request.prediction_horizon_hours or settings.AVAILABILITY_CLASSIFIER_HORIZON_HOURS
+        model_name = availability_model_name(horizon_hours)
+        if model_name is None:
             raise HTTPException(
-                status_code=503,
-                detail="Bed availability prediction model not loaded"
+                status_code=503 if horizon_hours == settings.AVAILABILITY_CLASSIFIER_HORIZON_HOURS else 422,
+                detail=unavailable_horizon_detail(horizon_hours)
             )
         
-        model_package = models['bed_availability']
-        model = model_package['model']
-        feature_columns = model_package['feature_columns']
+        model_package = models[model_name]
         
         # Use provided time or current time
         current_time = request.current_time or datetime.utcnow()
+        metadata = {
+            "ward": request.ward,
+            "current_time": current_time.isoformat(),
+            "model": model_name,
+            "ward_snapshot": ward_snapshot.status(),
+            "model_version": model_package.get('version', '1.0.0')
+        }
         
-        # Extract time features
-        time_features = extract_time_features(current_time)
+        if model_name == 'bed_availability_curve':
+            probability = float((await curve_probabilities(
+                model_package, [request.ward], [current_time], [horizon_hours]
+            ))[0])
+            return format_prediction_response(
+                prediction={
+                    "will_be_available": probability >= 0.5,
+                    "probability": round(probability, 4),
+                    "probability_spread": None,
+                    "tree_agreement": None,
+                    "prediction_horizon_hours": horizon_hours
+                },
+                metadata=metadata
+            )
         
         # Build feature vector
-        features = {
-            'hour': time_features['hour'],
-            'day_of_week': time_features['day_of_week'],
-            'month': current_time.month,
-            'is_weekend': time_features['is_weekend'],
-            'is_business_hours': time_features['is_business_hours'],
-            'time_of_day': time_features['time_of_day'],
-            'ward_encoded': ward_to_numeric(request.ward),
-            'is_occupied': 1,  # Assume bed is currently occupied
-            'is_cleaning': 0,
-            'ward_occupancy_rate': 0.75,  # Default occupancy rate
-            'hour_availability_rate': 0.15  # Default availability rate
-        }
+        X = bed_availability_matrix(model_package, [request.ward], [current_time])
         
-        # Create input array
-        X = np.array([[features[col] for col in feature_columns]])
-        
-        # Predict probability
-        will_be_available = int(model.predict(X)[0])
-        probability = float(model.predict_proba(X)[0][1])
+        # Class, probability and tree agreement from one forest pass
+        outputs = await run_prediction('bed_availability', model_package, 'predict_proba_spread', X)
+        votes = split_proba_spread(outputs, model_package['model'].classes_)
+        will_be_available = int(votes['label'][0])
+        probability = float(calibrate_probability(votes['proba'][0, 1], model_package.get('probability_calibration')))
+        agreement = float(votes['agreement'][0])
         
         return format_prediction_response(
             prediction={
                 "will_be_available": bool(will_be_available),
                 "probability": round(probability, 4),
-                "prediction_horizon_hours": request.prediction_horizon_hours
+                "probability_spread": round(float(votes['spread'][0]), 4),
+                "tree_agreement": round(agreement, 4),
+                "prediction_horizon_hours": horizon_hours
+            },
+            confidence=round(agreement, 4),
+            metadata=metadata
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Bed availability prediction error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/bed-availability/curve", response_model=PredictionResponse)
+async def predict_bed_availability_curve(request: BedAvailabilityCurveRequest):
+    """
+    Predict the probability of a bed becoming available within each hour
+    
+    Returns one probability per hour from 1 to horizon_hours, all from a
+    single model call: the curve model predicts the cumulative probability
+    of release at its trained horizons, hours in between are interpolated.
+    """
+    try:
+        if models['bed_availability_curve'] is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Bed availability curve model not loaded"
+            )
+        
+        model_package = models['bed_availability_curve']
+        horizons = model_package['horizons']
+        
+        # Use provided time or current time
+        current_time = request.current_time or datetime.utcnow()
+        
+        X = bed_availability_matrix(model_package, [request.ward], [current_time])
+        
+        knot_probabilities = await run_prediction('bed_availability_curve', model_package, 'predict', X)
+        curve = hourly_curve(knot_probabilities, horizons, request.horizon_hours)[0]
+        
+        # First hour by which release is more likely than not
+        likely = (curve >= 0.5).nonzero()[0]
+        
+        return format_prediction_response(
+            prediction={
+                "probabilities": [round(float(p), 4) for p in curve],
+                "hours": list(range(1, request.horizon_hours + 1)),
+                "median_hours_until_available": int(likely[0]) + 1 if len(likely) else None,
+                "probability_within_horizon": round(float(curve[-1]), 4)
             },
-            confidence=probability,
             metadata={
                 "ward": request.ward,
                 "current_time": current_time.isoformat(),
+                "horizon_hours": request.horizon_hours,
+                "trained_horizons": list(horizons),
+                "ward_snapshot": ward_snapshot.status(),
                 "model_version": model_package.get('version', '1.0.0')
             }
         )
@@ -293,7 +521,7 @@ async def predict_bed_availability(request: BedAvailabilityRequest):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Bed availability prediction error: {e}", exc_info=True)
+        logger.error(f"Bed availability curve prediction error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -316,48 +544,18 @@ async def predict_cleaning_duration(request: CleaningDurationRequest):
             )
         
         model_package = models['cleaning_duration']
-        model = model_package['model']
         feature_columns = model_package['feature_columns']
         
         # Use provided time or current time
         start_time = request.start_time or datetime.utcnow()
         
-        # Extract time features
-        time_features = extract_time_features(start_time)
-        
-        # Build feature vector
-        features = {
-            'hour': time_features['hour'],
-            'day_of_week': time_features['day_of_week'],
-            'month': start_time.month,
-            'day_of_month': start_time.day,
-            'is_weekend': time_features['is_weekend'],
-            'is_business_hours': time_features['is_business_hours'],
-            'time_of_day': time_features['time_of_day'],
-            'ward_encoded': ward_to_numeric(request.ward),
-            'estimated_duration': request.estimated_duration or 30,
-        }
-        
-        # Add historical averages (defaults based on ward)
-        ward_avg_durations = {
-            'ICU': 35.0,
-            'Emergency': 28.0,
-            'General': 30.0,
-            'Pediatrics': 32.0,
-            'Maternity': 33.0
-        }
-        avg_duration = ward_avg_durations.get(request.ward, 30.0)
-        
-        features['ward_avg_duration'] = avg_duration
-        features['time_avg_duration'] = avg_duration
-        features['ward_time_avg_duration'] = avg_duration
-        features['ward_std_duration'] = 10.0  # Default std deviation
-        
-        # Create input array
-        X = np.array([[features[col] for col in feature_columns]])
+        # Build feature vector (historical averages are per-ward defaults)
+        X = build_cleaning_features(
+            [request.ward], [start_time], [request.estimated_duration or 30], feature_columns
+        )
         
         # Predict
-        predicted_duration = float(model.predict(X)[0])
+        predicted_duration = float((await run_prediction('cleaning_duration', model_package, 'predict', X))[0])
         
         # Calculate estimated end time
         estimated_end = start_time.timestamp() + (predicted_duration * 60)
@@ -382,3 +580,163 @@ async def predict_cleaning_duration(request: CleaningDurationRequest):
     except Exception as e:
         logger.error(f"Cleaning duration prediction error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/bed-availability/batch", response_model=PredictionResponse)
+async def predict_bed_availability_batch(request: BedAvailabilityBatchRequest):
+    """
+    Predict bed availability for many wards/times in one call
+    
+    Items at the classifier's horizon share one feature matrix and one
+    classifier pass, items at other horizons one curve model pass; invalid
+    items, and items at a horizon no loaded model answers, are returned
+    with success=false in their position.
+    """
+    try:
+        if models['bed_availability'] is None and models['bed_availability_curve'] is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Bed availability prediction model not loaded"
+            )
+        
+        valid, results = validate_batch_items(request.items, BedAvailabilityRequest)
+        
+        packages = {name: models[name] for name in ('bed_availability', 'bed_availability_curve')}
+        now = datetime.utcnow()
+        by_model = {'bed_availability': [], 'bed_availability_curve': []}
+        for index, item in valid:
+            horizon_hours = item.prediction_horizon_hours or settings.AVAILABILITY_CLASSIFIER_HORIZON_HOURS
+            model_name = availability_model_name(horizon_hours)
+            if model_name is None:
+                results[index] = {"index": index, "success": False, "error": unavailable_horizon_detail(horizon_hours)}
+            else:
+                by_model[model_name].append((index, item, item.current_time or now, horizon_hours))
+        
+        classified = by_model['bed_availability']
+        if classified:
+            model_package = packages['bed_availability']
+            X = bed_availability_matrix(
+                model_package,
+                [item.ward for _, item, _, _ in classified], [current_time for _, _, current_time, _ in classified]
+            )
+            # One forest pass: class, probability and tree agreement per row
+            outputs = await run_prediction('bed_availability', model_package, 'predict_proba_spread', X)
+            votes = split_proba_spread(outputs, model_package['model'].classes_)
+            probabilities = calibrate_probability(votes['proba'][:, 1], model_package.get('probability_calibration'))
+            
+            for (index, item, current_time, horizon_hours), available, probability, spread, agreement in zip(
+                classified, votes['label'].tolist(), probabilities.tolist(),
+                votes['spread'].tolist(), votes['agreement'].tolist()
+            ):
+                results[index] = {
+                    "index": index,
+                    "success": True,
+                    "ward": item.ward,
+                    "current_time": current_time.isoformat(),
+                    "will_be_available": bool(int(available)),
+                    "probability": round(probability, 4),
+                    "probability_spread": round(spread, 4),
+                    "tree_agreement": round(agreement, 4),
+                    "prediction_horizon_hours": horizon_hours,
+                    "model": 'bed_availability'
+                }
+        
+        curved = by_model['bed_availability_curve']
+        if curved:
+            probabilities = await curve_probabilities(
+                packages['bed_availability_curve'], [item.ward for _, item, _, _ in curved], [current_time for _, _, current_time, _ in curved],
+                [horizon_hours for _, _, _, horizon_hours in curved]
+            )
+            for (index, item, current_time, horizon_hours), probability in zip(curved, probabilities.tolist()):
+                results[index] = {
+                    "index": index,
+                    "success": True,
+                    "ward": item.ward,
+                    "current_time": current_time.isoformat(),
+                    "will_be_available": probability >= 0.5,
+                    "probability": round(probability, 4),
+                    "probability_spread": None,
+                    "tree_agreement": None,
+                    "prediction_horizon_hours": horizon_hours,
+                    "model": 'bed_availability_curve'
+                }
+        
+        succeeded = len(classified) + len(curved)
+        return format_prediction_response(
+            prediction=results,
+            metadata={
+                "count": len(results),
+                "succeeded": succeeded,
+                "failed": len(results) - succeeded,
+                "ward_snapshot": ward_snapshot.status(),
+                "model_version": packages['bed_availability'].get('version', '1.0.0') if classified else None,
+                "curve_model_version": packages['bed_availability_curve'].get('version', '1.0.0') if curved else None
+            }
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch bed availability prediction error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/cleaning-duration/batch", response_model=PredictionResponse)
+async def predict_cleaning_duration_batch(request: CleaningDurationBatchRequest):
+    """
+    Predict cleaning durations for many beds in one call
+    
+    Valid items share one feature matrix and one model pass; invalid items
+    are returned with success=false in their position.
+    """
+    try:
+        if models['cleaning_duration'] is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Cleaning duration prediction model not loaded"
+            )
+        
+        model_package = models['cleaning_duration']
+        feature_columns = model_package['feature_columns']
+        
+        valid, results = validate_batch_items(request.items, CleaningDurationRequest)
+        
+        if valid:
+            now = datetime.utcnow()
+            wards = [item.ward for _, item in valid]
+            start_times = [item.start_time or now for _, item in valid]
+            estimated_durations = [item.estimated_duration or 30 for _, item in valid]
+            
+            X = build_cleaning_features(wards, start_times, estimated_durations, feature_columns)
+            predicted_durations = (await run_prediction('cleaning_duration', model_package, 'predict', X)).tolist()
+            
+            for (index, item), start_time, estimated, predicted in zip(
+                valid, start_times, estimated_durations, predicted_durations
+            ):
+                estimated_end = start_time.timestamp() + (predicted * 60)
+                results[index] = {
+                    "index": index,
+                    "success": True,
+                    "ward": item.ward,
+                    "start_time": start_time.isoformat(),
+                    "estimated_duration": estimated,
+                    "predicted_duration_minutes": round(predicted, 2),
+                    "estimated_end_time": datetime.fromtimestamp(estimated_end).isoformat(),
+                    "variance_from_estimate": round(predicted - estimated, 2)
+                }
+        
+        return format_prediction_response(
+            prediction=results,
+            metadata={
+                "count": len(results),
+                "succeeded": len(valid),
+                "failed": len(results) - len(valid),
+                "model_version": model_package.get('version', '1.0.0')
+            }
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch cleaning duration prediction error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
@@ -3,20 +3,53 @@ Pydantic schemas for ML prediction requests and responses
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Annotated, Literal, Optional, Dict, Any, List, Union
 from datetime import datetime
 
+from config import settings
+
 
 class DischargeRequest(BaseModel):
     """Request schema for discharge prediction"""
     ward: str = Field(..., description="Ward name (ICU, Emergency, General, etc.)")
     admission_time: Optional[datetime] = Field(None, description="Patient admission time (defaults to now)")
+    include_quantiles: bool = Field(False, description="Also return P10/P50/P90 discharge times")
     
     class Config:
         json_schema_extra = {
             "example": {
                 "ward": "ICU",
-                "admission_time": "2025-12-01T10:00:00Z"
+                "admission_time": "2025-12-01T10:00:00Z",
+                "include_quantiles": True
+            }
+        }
+
+
+class DischargeBatchItem(BaseModel):
+    """Single item of a batch discharge prediction"""
+    ward: str = Field(..., description="Ward name (ICU, Emergency, General, etc.)")
+    admission_time: Optional[datetime] = Field(None, description="Patient admission time (defaults to now)")
+    bed_id: Optional[str] = Field(None, description="Bed identifier echoed back in the result")
+
+
+class DischargeBatchRequest(BaseModel):
+    """Request schema for batch discharge prediction"""
+    items: List[DischargeBatchItem] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.MAX_BATCH_SIZE,
+        description="Beds to predict, results are returned in the same order"
+    )
+    include_quantiles: bool = Field(False, description="Also return P10/P50/P90 discharge times per bed")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"ward": "ICU", "admission_time": "2025-12-01T10:00:00Z", "bed_id": "ICU-01"},
+                    {"ward": "General", "admission_time": "2025-12-01T12:30:00Z", "bed_id": "GEN-07"}
+                ],
+                "include_quantiles": False
             }
         }
 
@@ -25,14 +58,43 @@ class BedAvailabilityRequest(BaseModel):
     """Request schema for bed availability prediction"""
     ward: str = Field(..., description="Ward name")
     current_time: Optional[datetime] = Field(None, description="Current time (defaults to now)")
-    prediction_horizon_hours: Optional[int] = Field(6, description="Hours ahead to predict (default 6)")
+    prediction_horizon_hours: Optional[int] = Field(
+        settings.AVAILABILITY_CLASSIFIER_HORIZON_HOURS,
+        ge=1,
+        le=settings.MAX_PREDICTION_HORIZON_HOURS,
+        description=(
+            f"Hours ahead to predict (default {settings.AVAILABILITY_CLASSIFIER_HORIZON_HOURS}, "
+            "the classifier's horizon; other horizons are answered by the availability curve model)"
+        )
+    )
     
     class Config:
         json_schema_extra = {
             "example": {
                 "ward": "General",
                 "current_time": "2025-12-01T14:00:00Z",
-                "prediction_horizon_hours": 6
+                "prediction_horizon_hours": settings.AVAILABILITY_CLASSIFIER_HORIZON_HOURS
+            }
+        }
+
+
+class BedAvailabilityCurveRequest(BaseModel):
+    """Request schema for the hourly bed availability curve"""
+    ward: str = Field(..., description="Ward name")
+    current_time: Optional[datetime] = Field(None, description="Current time (defaults to now)")
+    horizon_hours: int = Field(
+        settings.MAX_PREDICTION_HORIZON_HOURS,
+        ge=1,
+        le=settings.MAX_PREDICTION_HORIZON_HOURS,
+        description="Last hour of the curve (default: maximum horizon)"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "ward": "ICU",
+                "current_time": "2025-12-01T14:00:00Z",
+                "horizon_hours": 24
             }
         }
 
@@ -41,7 +103,7 @@ class CleaningDurationRequest(BaseModel):
     """Request schema for cleaning duration prediction"""
     ward: str = Field(..., description="Ward name")
     start_time: Optional[datetime] = Field(None, description="Cleaning start time (defaults to now)")
-    estimated_duration: Optional[int] = Field(30, description="Initial estimated duration in minutes")
+    estimated_duration: Optional[int] = Field(30, ge=0, description="Initial estimated duration in minutes")
     
     class Config:
         json_schema_extra = {
@@ -53,6 +115,117 @@ class CleaningDurationRequest(BaseModel):
         }
 
 
+class BedAvailabilityBatchRequest(BaseModel):
+    """
+    Request schema for batch bed availability prediction
+    
+    Each item is validated as a BedAvailabilityRequest on its own so that
+    one invalid item is reported in its result instead of failing the batch.
+    """
+    items: List[Dict[str, Any]] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.MAX_BATCH_SIZE,
+        description="BedAvailabilityRequest objects, results are returned in the same order"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"ward": "ICU", "prediction_horizon_hours": 6},
+                    {"ward": "General", "current_time": "2025-12-01T14:00:00Z"}
+                ]
+            }
+        }
+
+
+class CleaningDurationBatchRequest(BaseModel):
+    """
+    Request schema for batch cleaning duration prediction
+    
+    Each item is validated as a CleaningDurationRequest on its own so that
+    one invalid item is reported in its result instead of failing the batch.
+    """
+    items: List[Dict[str, Any]] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.MAX_BATCH_SIZE,
+        description="CleaningDurationRequest objects, results are returned in the same order"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"ward": "ICU", "start_time": "2025-12-01T15:00:00Z", "estimated_duration": 35},
+                    {"ward": "Emergency", "estimated_duration": 25}
+                ]
+            }
+        }
+
+
+class OccupancyEvent(BaseModel):
+    """OccupancyLog event as written by the backend"""
+    type: Literal["occupancy"]
+    bed_id: str = Field(..., alias="bedId", description="Bed identifier")
+    status_change: Literal[
+        "assigned", "released", "maintenance_start", "maintenance_end", "reserved", "reservation_cancelled"
+    ] = Field(..., alias="statusChange")
+    timestamp: datetime = Field(..., description="When the status changed")
+    ward: Optional[str] = Field(None, description="Ward name (needed only for beds created after startup)")
+    
+    class Config:
+        populate_by_name = True
+        json_schema_extra = {
+            "example": {
+                "type": "occupancy",
+                "bedId": "674d2c1f9e1b2a0012345678",
+                "statusChange": "assigned",
+                "timestamp": "2025-12-01T10:00:00Z"
+            }
+        }
+
+
+class CleaningEvent(BaseModel):
+    """CleaningLog event as written by the backend"""
+    type: Literal["cleaning"]
+    bed_id: str = Field(..., alias="bedId", description="Bed identifier")
+    ward: str = Field(..., description="Ward name")
+    status: Literal["in_progress", "completed", "overdue"]
+    start_time: datetime = Field(..., alias="startTime")
+    end_time: Optional[datetime] = Field(None, alias="endTime")
+    actual_duration: Optional[float] = Field(None, alias="actualDuration", ge=0, description="Minutes")
+    
+    class Config:
+        populate_by_name = True
+        json_schema_extra = {
+            "example": {
+                "type": "cleaning",
+                "bedId": "674d2c1f9e1b2a0012345678",
+                "ward": "ICU",
+                "status": "completed",
+                "startTime": "2025-12-01T15:00:00Z",
+                "endTime": "2025-12-01T15:32:00Z",
+                "actualDuration": 32
+            }
+        }
+
+
+# Occupancy or cleaning event, told apart by 'type'
+BedEvent = Annotated[Union[OccupancyEvent, CleaningEvent], Field(discriminator="type")]
+
+
+class EventBatchRequest(BaseModel):
+    """Bulk form of POST /events: events are applied in the given order"""
+    events: List[BedEvent] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.MAX_EVENT_BATCH,
+        description="OccupancyEvent and CleaningEvent objects"
+    )
+
+
 class PredictionResponse(BaseModel):
     """Standard response schema for predictions"""
     success: bool
@@ -0,0 +1,144 @@
+"""
+Production launcher for the ML Service (pre-fork, shared models)
+
+`uvicorn --workers N` starts every worker from scratch, so each one unpickles
+and compiles all forests again: memory grows linearly with N. This launcher
+instead:
+1. Loads, compiles and warms up the models once, in the parent process
+2. Freezes the garbage collector so collections in the workers do not write
+   to (and thereby copy) the inherited object pages
+3. Binds the listening socket once and forks N workers that share it
+
+Workers inherit the models copy-on-write. The tree arrays are never written
+after loading, so their pages stay shared and total memory stays close to
+that of a single worker. Each worker runs its own event loop, thread pools
+and MongoDB client (created after the fork). Workers that exit unexpectedly
+are re-forked from the parent.
+
+The event-fed bed state (services/bed_state.py) lives in one process, so it
+is disabled when more than one worker runs: settings.WORKERS is set from
+--workers before the app is imported and inherited by the workers. With
+`uvicorn --workers N`, set ML_SERVICE_WORKERS=N for the same effect.
+
+Usage:
+    python serve.py [--workers 4] [--host 0.0.0.0] [--port 8000]
+
+Linux/macOS only (requires os.fork).
+"""
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+from config import settings
+
+logger = logging.getLogger("serve")
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Create the listening socket shared by all workers"""
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket):
+    """Serve requests on the inherited socket (runs in the forked child)"""
+    import uvicorn
+
+    # The parent's handlers must not run in the worker; uvicorn installs its own
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    config = uvicorn.Config(
+        app,
+        log_level=settings.LOG_LEVEL.lower(),
+        lifespan="on"
+    )
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+def spawn_worker(app, sock: socket.socket) -> int:
+    """Fork one worker and return its pid"""
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            run_worker(app, sock)
+        except BaseException:
+            logger.exception("Worker crashed")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the ML Service with pre-forked workers")
+    parser.add_argument('--workers', type=int, default=settings.WORKERS, help='Worker processes (more than 1 disables the event-fed bed state)')
+    parser.add_argument('--host', default=settings.HOST)
+    parser.add_argument('--port', type=int, default=settings.PORT)
+    args = parser.parse_args()
+
+    if not hasattr(os, 'fork'):
+        sys.exit("serve.py needs os.fork; use `uvicorn main:app` on this platform")
+
+    # Read by the app's lifespan in every worker (bed state needs a single process)
+    settings.WORKERS = max(1, args.workers)
+    import main as service
+
+    started = time.perf_counter()
+    service.preload_models()
+    logger.info(f"Models preloaded in {time.perf_counter() - started:.2f}s, forking {args.workers} workers")
+
+    # Objects created so far are never collected: workers leave their pages untouched
+    gc.collect()
+    gc.freeze()
+
+    sock = bind_socket(args.host, args.port)
+    logger.info(f"Listening on {args.host}:{args.port}")
+
+    workers = {spawn_worker(service.app, sock) for _ in range(settings.WORKERS)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            logger.warning(f"Worker {pid} exited with status {status}; restarting")
+            time.sleep(1)  # Avoid a tight restart loop if workers fail at start-up
+            workers.add(spawn_worker(service.app, sock))
+
+    sock.close()
+    logger.info("All workers stopped")
+
+
+if __name__ == "__main__":
+    main()
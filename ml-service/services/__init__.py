@@ -0,0 +1,4 @@
+"""
+Long-lived services owned by the FastAPI lifespan
+(statistics caches, database clients, executors)
+"""
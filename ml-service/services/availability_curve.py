@@ -0,0 +1,74 @@
+"""
+Bed availability over a horizon, as a curve from one inference
+
+The curve model is a multi-output random forest regressor. Output k is the
+probability that the bed is released within horizons[k] hours, learned from
+0/1 targets "released within horizons[k]". The targets of a sample are
+cumulative in k, so every leaf mean, and hence every prediction, is
+non-decreasing over the horizons: the model predicts the cumulative
+distribution of the time until release (a discrete-time survival curve),
+and a single traversal yields all of it.
+
+Hourly points between the trained horizons are interpolated linearly, with
+P(released within 0h) = 0.
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+
+def release_labels(hours_until_release: np.ndarray, horizons: Sequence[float]) -> np.ndarray:
+    """
+    Cumulative targets for the curve model
+
+    Args:
+        hours_until_release: Hours from the sample time to the bed's next
+            release per sample (inf if no release was observed)
+        horizons: Trained horizons in hours (ascending)
+
+    Returns:
+        (n_samples, len(horizons)) 0/1 matrix, 1 where released within the horizon
+    """
+    hours = np.asarray(hours_until_release, dtype=np.float64)
+    return (hours[:, None] <= np.asarray(horizons, dtype=np.float64)[None, :]).astype(np.int8)
+
+
+def censored_mask(
+    hours_until_release: np.ndarray,
+    hours_observed: np.ndarray,
+    horizons: Sequence[float]
+) -> np.ndarray:
+    """
+    Samples whose label at the longest horizon is unknown
+
+    A sample without an observed release is only a known negative if the
+    data covers the full horizon after it.
+    """
+    hours = np.asarray(hours_until_release, dtype=np.float64)
+    return np.isinf(hours) & (np.asarray(hours_observed, dtype=np.float64) < max(horizons))
+
+
+def hourly_curve(knot_probabilities: np.ndarray, horizons: Sequence[float], horizon_hours: int) -> np.ndarray:
+    """
+    Probability of release within 1..horizon_hours hours
+
+    Args:
+        knot_probabilities: (n_rows, len(horizons)) curve model outputs
+        horizons: Trained horizons in hours
+        horizon_hours: Last hour of the curve
+
+    Returns:
+        (n_rows, horizon_hours) probabilities, non-decreasing along each row
+    """
+    knot_probabilities = np.atleast_2d(knot_probabilities)
+    knots = np.concatenate([[0.0], np.asarray(horizons, dtype=np.float64)])
+    values = np.column_stack([np.zeros(len(knot_probabilities)), knot_probabilities])
+    hours = np.arange(1, horizon_hours + 1, dtype=np.float64)
+
+    # Per row interpolation as one gather: segment index and weight per hour
+    segment = np.clip(np.searchsorted(knots, hours, side='left'), 1, len(knots) - 1)
+    weight = np.clip((hours - knots[segment - 1]) / (knots[segment] - knots[segment - 1]), 0.0, 1.0)
+    curve = values[:, segment - 1] * (1 - weight) + values[:, segment] * weight
+    # Guard against float noise (the model itself is monotone)
+    return np.clip(np.maximum.accumulate(curve, axis=1), 0.0, 1.0)
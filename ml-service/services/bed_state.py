@@ -0,0 +1,610 @@
+"""
+Event-sourced bed state with running ward aggregates
+
+The backend posts every OccupancyLog and CleaningLog it writes to
+POST /api/ml/events (backend/services/mlService.js, sendBedEvents). Each
+event updates, in O(1):
+- the bed's state (ward, status, last status change)
+- its ward's bed counts per status, hence the live occupancy rate
+- its ward's stay and cleaning durations, as Welford running mean and
+  variance (no per-request scans)
+
+Stays are paired as the duration statistics aggregation pairs them
+(services.duration_stats): an 'assigned' log directly followed by a
+'released' log of the same bed, by ward and time of day of the admission,
+over the last DURATION_STATS_WINDOW_DAYS. Samples leave the window by
+admission time; a heap of admission times finds them, and removing one is
+Welford's update reversed.
+
+On startup the store is replayed from MongoDB once: beds for the ward and
+status of every bed, then the occupancy and cleaning logs of the window in
+time order. Afterwards bed statuses are re-read from `beds` every
+EVENT_RECONCILE_SECONDS, so an event the backend failed to deliver is
+corrected at the next reconciliation.
+
+Once ready, the store feeds the ward snapshot (ward_occupancy_rate) and the
+duration statistics (ward_avg_duration and the other stay averages) without
+queries; until then they run their own aggregations.
+
+The state lives in the process that receives the events. Under
+`serve.py --workers N` each worker would only see the events it happens to
+receive, so with more than one worker (settings.WORKERS) the store is
+disabled: POST /events answers 503 and features come from the aggregations.
+
+Statuses follow the Bed model (available, occupied, cleaning) and the
+backend's status changes: 'assigned' occupies a bed, 'released' and
+'maintenance_start' send it to cleaning, 'maintenance_end' frees it.
+Reservations do not change the bed status.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo.database import Database
+
+from config import settings
+from services.bed_timeline import BED_STATUSES, STATUS_AFTER_CHANGE
+from services.ward_snapshot import WardSnapshot
+from utils import get_time_of_day
+
+logger = logging.getLogger(__name__)
+
+# Valid stay length in hours (same range as the duration statistics)
+MAX_STAY_HOURS = 8760
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timezone-aware datetimes as naive UTC (the form MongoDB returns)"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class RunningStats:
+    """Welford running mean and variance, with removal for sliding windows"""
+
+    __slots__ = ('count', 'total', 'mean', 'm2')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float):
+        """Add one observation"""
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def remove(self, value: float):
+        """Remove one observation added earlier"""
+        if self.count <= 1:
+            self.count, self.total, self.mean, self.m2 = 0, 0.0, 0.0, 0.0
+            return
+        self.count -= 1
+        self.total -= value
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        self.m2 = max(self.m2 - delta * (value - self.mean), 0.0)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (0 below two observations, like pandas std().fillna(0))"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": round(self.mean, 3) if self.count else None,
+            "std": round(self.std, 3) if self.count else None
+        }
+
+
+class BedState:
+    """Current state of one bed"""
+
+    __slots__ = ('ward', 'status', 'since', 'last_event', 'last_change', 'cleaning_started', 'last_cleaning', 'seq')
+
+    def __init__(self, ward: str, status: str = 'available', since: Optional[datetime] = None):
+        self.ward = ward
+        self.status = status
+        # Start of the current status
+        self.since = since
+        # Latest occupancy event applied, to pair stays and drop duplicates and stale events
+        self.last_event: Optional[datetime] = None
+        self.last_change: Optional[str] = None
+        self.cleaning_started: Optional[datetime] = None
+        # Start of the latest completed cleaning counted
+        self.last_cleaning: Optional[datetime] = None
+        # Store sequence number of the latest event applied (see reconcile)
+        self.seq = 0
+
+
+class WardState:
+    """Bed counts and running durations of one ward"""
+
+    __slots__ = ('counts', 'stay_hours', 'stay_hours_by_time', 'cleaning_minutes')
+
+    def __init__(self):
+        self.counts = dict.fromkeys(BED_STATUSES, 0)
+        self.stay_hours = RunningStats()
+        # Per time of day of the admission (utils.get_time_of_day)
+        self.stay_hours_by_time = tuple(RunningStats() for _ in range(4))
+        self.cleaning_minutes = RunningStats()
+
+    @property
+    def beds(self) -> int:
+        return sum(self.counts.values())
+
+    @property
+    def occupancy_rate(self) -> float:
+        beds = self.beds
+        return self.counts['occupied'] / beds if beds else 0.0
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "beds": self.beds,
+            **self.counts,
+            "occupancy_rate": round(self.occupancy_rate, 4),
+            "stay_hours": self.stay_hours.describe(),
+            "cleaning_minutes": self.cleaning_minutes.describe()
+        }
+
+
+class BedStateStore:
+    """
+    Per-bed state and ward aggregates, updated one event at a time
+
+    Events are applied on the event loop. Until the startup replay has been
+    swapped in they are queued, then applied on top of it; events the replay
+    already covered are recognised per bed and dropped.
+    """
+
+    def __init__(
+        self,
+        db: Optional[Database] = None,
+        executor=None,
+        enabled: bool = True,
+        window_days: int = settings.DURATION_STATS_WINDOW_DAYS,
+        retry_seconds: int = settings.EVENT_REPLAY_RETRY_SECONDS,
+        reconcile_seconds: int = settings.EVENT_RECONCILE_SECONDS
+    ):
+        """
+        Args:
+            db: Database on the shared client (None starts empty and ready)
+            executor: InferenceExecutor whose I/O pool runs the replay and
+                reconciliation reads (defaults to asyncio.to_thread)
+            enabled: False keeps the store empty and never ready (several
+                worker processes, see module docstring)
+            window_days: Days of stays and cleanings kept in the aggregates
+            retry_seconds: Seconds between replay attempts while MongoDB fails
+            reconcile_seconds: Seconds between reconciliations with the
+                beds collection (0 disables them)
+        """
+        self.db = db
+        self.executor = executor
+        self.enabled = enabled
+        self.window_days = window_days
+        self.retry_seconds = retry_seconds
+        self.reconcile_seconds = reconcile_seconds
+
+        self.beds: Dict[str, BedState] = {}
+        self.wards: Dict[str, WardState] = {}
+        self.ready = enabled and db is None
+        self._pending: List[Tuple[str, dict]] = []
+        self._task: Optional[asyncio.Task] = None
+
+        # (start time, sample id, stats holding it, value) of every windowed sample
+        self._window: List[Tuple[datetime, int, Tuple[RunningStats, ...], float]] = []
+        self._sample_ids = itertools.count()
+        # Events applied so far; bumped whenever bed counts change
+        self.seq = 0
+        self._counts_version = 0
+        self._ward_snapshot: Optional[Tuple[int, WardSnapshot]] = None
+
+        self.applied = 0
+        self.ignored = 0
+        self.replayed_events = 0
+        self.replayed_at: Optional[datetime] = None
+        self.reconciled_at: Optional[datetime] = None
+        self.corrections = 0
+        self.last_event_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    # Event application (O(1) per event)
+
+    def _ward(self, ward: str) -> WardState:
+        state = self.wards.get(ward)
+        if state is None:
+            state = self.wards[ward] = WardState()
+        return state
+
+    def _bed(self, bed_id: str, ward: Optional[str]) -> Optional[BedState]:
+        """Known bed, or a new available bed when the event names its ward"""
+        bed = self.beds.get(bed_id)
+        if bed is None and ward:
+            bed = self.beds[bed_id] = BedState(ward)
+            self._ward(ward).counts['available'] += 1
+            self._counts_version += 1
+        return bed
+
+    def _set_status(self, bed: BedState, status: str, at: Optional[datetime]):
+        if status != bed.status:
+            counts = self._ward(bed.ward).counts
+            counts[bed.status] -= 1
+            counts[status] += 1
+            bed.status = status
+            self._counts_version += 1
+        bed.since = at
+
+    def _set_ward(self, bed: BedState, ward: str):
+        self._ward(bed.ward).counts[bed.status] -= 1
+        self._ward(ward).counts[bed.status] += 1
+        bed.ward = ward
+        self._counts_version += 1
+
+    def _remove_bed(self, bed_id: str):
+        bed = self.beds.pop(bed_id)
+        self._ward(bed.ward).counts[bed.status] -= 1
+        self._counts_version += 1
+
+    def _touch(self, bed: BedState):
+        self.seq += 1
+        bed.seq = self.seq
+
+    def _window_start(self) -> datetime:
+        return datetime.utcnow() - timedelta(days=self.window_days)
+
+    def _add_sample(self, start: datetime, stats: Tuple[RunningStats, ...], value: float):
+        """Count a stay or cleaning in the given aggregates until it leaves the window"""
+        if start < self._window_start():
+            return
+        for running in stats:
+            running.add(value)
+        heapq.heappush(self._window, (start, next(self._sample_ids), stats, value))
+
+    def _expire(self):
+        """Remove samples that started before the window"""
+        window_start = self._window_start()
+        while self._window and self._window[0][0] < window_start:
+            _, _, stats, value = heapq.heappop(self._window)
+            for running in stats:
+                running.remove(value)
+
+    def apply_occupancy(self, bed_id: str, status_change: str, timestamp: datetime, ward: Optional[str] = None) -> bool:
+        """
+        Apply one OccupancyLog event
+
+        Returns:
+            False if the event was dropped: unknown bed without a ward,
+            unknown status change, or not newer than the bed's last event
+        """
+        timestamp = naive_utc(timestamp)
+        bed = self._bed(bed_id, ward)
+        if bed is None or status_change not in STATUS_AFTER_CHANGE:
+            return False
+        if bed.last_event is not None and (
+            timestamp < bed.last_event or (timestamp == bed.last_event and status_change == bed.last_change)
+        ):
+            return False
+
+        if status_change == 'released' and bed.last_change == 'assigned':
+            # A stay as the duration statistics count it: assigned directly followed by released
+            stay = (timestamp - bed.last_event).total_seconds() / 3600
+            if 0 < stay < MAX_STAY_HOURS:
+                ward_state = self._ward(bed.ward)
+                by_time = ward_state.stay_hours_by_time[get_time_of_day(bed.last_event.hour)]
+                self._add_sample(bed.last_event, (ward_state.stay_hours, by_time), stay)
+
+        status = STATUS_AFTER_CHANGE[status_change]
+        if status is not None:
+            self._set_status(bed, status, timestamp)
+            if status == 'cleaning':
+                bed.cleaning_started = timestamp
+        bed.last_event = timestamp
+        bed.last_change = status_change
+        self._touch(bed)
+        return True
+
+    def apply_cleaning(
+        self,
+        bed_id: str,
+        ward: str,
+        status: str,
+        start_time: datetime,
+        end_time: Optional[datetime] = None,
+        actual_duration: Optional[float] = None
+    ) -> bool:
+        """
+        Apply one CleaningLog event
+
+        A completed cleaning adds its duration (actualDuration, else end -
+        start, in minutes) to the ward's cleaning statistics once; an
+        in-progress one marks the bed as being cleaned. The bed itself is
+        freed by the 'maintenance_end' occupancy event the backend writes
+        alongside.
+        """
+        start_time = naive_utc(start_time)
+        bed = self._bed(bed_id, ward)
+        if bed is None:
+            return False
+
+        if status == 'completed':
+            if bed.last_cleaning is not None and start_time <= bed.last_cleaning:
+                return False
+            if actual_duration is None and end_time is not None:
+                actual_duration = (naive_utc(end_time) - start_time).total_seconds() / 60
+            if actual_duration is None or actual_duration <= 0:
+                return False
+            self._add_sample(start_time, (self._ward(bed.ward).cleaning_minutes,), float(actual_duration))
+            bed.cleaning_started = None
+            bed.last_cleaning = start_time
+        elif status == 'in_progress':
+            bed.cleaning_started = start_time
+            if bed.status != 'cleaning':
+                self._set_status(bed, 'cleaning', start_time)
+        self._touch(bed)
+        return True
+
+    def apply(self, kind: str, event: dict) -> bool:
+        """Apply an 'occupancy' or 'cleaning' event given as keyword arguments"""
+        if kind == 'occupancy':
+            return self.apply_occupancy(**event)
+        return self.apply_cleaning(**event)
+
+    def ingest(self, events: Iterable[Tuple[str, dict]]) -> Dict[str, int]:
+        """
+        Apply events in order (queued until the startup replay is in)
+
+        Returns:
+            Counts of applied, ignored and queued events
+        """
+        applied = ignored = queued = 0
+        for kind, event in events:
+            if not self.ready:
+                self._pending.append((kind, event))
+                queued += 1
+            elif self.apply(kind, event):
+                applied += 1
+            else:
+                ignored += 1
+        self.applied += applied
+        self.ignored += ignored
+        if applied:
+            self.last_event_at = datetime.utcnow()
+            self._expire()
+        return {"applied": applied, "ignored": ignored, "queued": queued}
+
+    # Live features
+
+    def ward_snapshot(self) -> Optional[WardSnapshot]:
+        """
+        Bed counts per ward as a WardSnapshot (None before the replay)
+
+        Rebuilt only after bed counts changed, so reads between status
+        changes share one snapshot.
+        """
+        if not self.ready:
+            return None
+        cached = self._ward_snapshot
+        if cached is None or cached[0] != self._counts_version:
+            groups = [
+                {'_id': ward, 'beds': state.beds, 'occupied': state.counts['occupied'], 'cleaning': state.counts['cleaning']}
+                for ward, state in self.wards.items()
+            ]
+            cached = self._ward_snapshot = (self._counts_version, WardSnapshot(groups, datetime.utcnow()))
+        return cached[1]
+
+    def duration_groups(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Stays of the window summed by (ward, time of day), in the output
+        format of services.duration_stats.build_duration_pipeline (None
+        before the replay)
+        """
+        if not self.ready:
+            return None
+        self._expire()
+        return [
+            {'_id': {'ward': ward, 'time_of_day': time_of_day}, 'total_hours': running.total, 'count': running.count}
+            for ward, state in self.wards.items()
+            for time_of_day, running in enumerate(state.stay_hours_by_time)
+            if running.count
+        ]
+
+    def describe_wards(self, ward: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Ward aggregates, all wards or one"""
+        self._expire()
+        names = [ward] if ward else sorted(self.wards)
+        return {name: self.wards[name].describe() for name in names if name in self.wards}
+
+    # Replay and reconciliation
+
+    def read_beds(self) -> List[Dict[str, Any]]:
+        """Ward, status and last update of every bed (blocking)"""
+        return list(self.db.beds.find({}, {'ward': 1, 'status': 1, 'updatedAt': 1}))
+
+    def reconcile(self, beds: List[Dict[str, Any]], since_seq: int) -> int:
+        """
+        Align bed wards and statuses with documents of the beds collection
+
+        Beds with an event applied after since_seq (the sequence number when
+        the documents were read) are left alone, their event is newer than
+        the document. Beds missing from the documents are dropped.
+
+        Returns:
+            Number of beds added, corrected or dropped
+        """
+        corrected = 0
+        seen = set()
+        for document in beds:
+            bed_id = str(document['_id'])
+            seen.add(bed_id)
+            ward = document.get('ward') or 'General'
+            status = document.get('status') if document.get('status') in BED_STATUSES else 'available'
+
+            bed = self.beds.get(bed_id)
+            if bed is None:
+                bed = self._bed(bed_id, ward)
+                corrected += 1
+            elif bed.seq > since_seq:
+                continue
+            elif bed.ward != ward or bed.status != status:
+                corrected += 1
+
+            if bed.ward != ward:
+                self._set_ward(bed, ward)
+            if bed.status != status:
+                # The bed's last update is the best start time the document has
+                self._set_status(bed, status, naive_utc(document.get('updatedAt')))
+
+        for bed_id in [bed_id for bed_id, bed in self.beds.items() if bed_id not in seen and bed.seq <= since_seq]:
+            self._remove_bed(bed_id)
+            corrected += 1
+        return corrected
+
+    def replay(self) -> 'BedStateStore':
+        """
+        Rebuild the state from MongoDB into a new store (blocking)
+
+        Logs of the window are replayed for the duration aggregates and the
+        last status change of each bed; bed statuses are then set from the
+        beds collection, which is authoritative for beds whose logs predate
+        the window.
+        """
+        if self.db is None:
+            raise RuntimeError("Bed state store has no database")
+
+        started = time.perf_counter()
+        since = self._window_start()
+        store = BedStateStore(window_days=self.window_days)
+
+        beds = self.read_beds()
+        for bed in beds:
+            store._bed(str(bed['_id']), bed.get('ward') or 'General')
+
+        events = 0
+        logs = self.db.occupancylogs.find(
+            {'timestamp': {'$gte': since}}, {'bedId': 1, 'statusChange': 1, 'timestamp': 1}
+        ).sort('timestamp', 1)
+        for log in logs:
+            events += store.apply_occupancy(str(log['bedId']), log.get('statusChange'), log['timestamp'])
+
+        cleanings = self.db.cleaninglogs.find(
+            {'status': 'completed', 'startTime': {'$gte': since}},
+            {'bedId': 1, 'ward': 1, 'status': 1, 'startTime': 1, 'endTime': 1, 'actualDuration': 1}
+        )
+        for log in cleanings:
+            events += store.apply_cleaning(
+                str(log['bedId']), log.get('ward'), log['status'], log['startTime'],
+                log.get('endTime'), log.get('actualDuration')
+            )
+
+        store.reconcile(beds, store.seq)
+
+        store.replayed_events = events
+        store.replayed_at = datetime.utcnow()
+        logger.info(
+            f"Bed state replayed: {len(store.beds)} beds, {len(store.wards)} wards, "
+            f"{events} events in {(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+        return store
+
+    def _swap_in(self, store: 'BedStateStore'):
+        """Take over a replayed store's state, then apply the queued events (event loop)"""
+        self.beds = store.beds
+        self.wards = store.wards
+        self._window = store._window
+        self.seq = store.seq
+        self._counts_version += 1
+        self.replayed_events = store.replayed_events
+        self.replayed_at = store.replayed_at
+        self.ready = True
+        self.last_error = None
+
+        pending, self._pending = self._pending, []
+        result = self.ingest(pending)
+        if pending:
+            logger.info(f"Applied {result['applied']} of {len(pending)} events queued during the replay")
+
+    async def _run_io(self, fn):
+        if self.executor is not None:
+            return await self.executor.run_io(fn)
+        return await asyncio.to_thread(fn)
+
+    async def _reconcile_once(self):
+        since_seq = self.seq
+        beds = await self._run_io(self.read_beds)
+        corrected = self.reconcile(beds, since_seq)
+        self.corrections += corrected
+        self.reconciled_at = datetime.utcnow()
+        if corrected:
+            logger.warning(f"Bed state reconciled with the beds collection: {corrected} beds corrected")
+
+    async def _run(self):
+        """Replay once (retrying every retry_seconds until MongoDB answers), then reconcile periodically"""
+        while not self.ready:
+            try:
+                self._swap_in(await self._run_io(self.replay))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Failed to replay bed state: {e}")
+                await asyncio.sleep(self.retry_seconds)
+
+        while self.reconcile_seconds > 0:
+            await asyncio.sleep(self.reconcile_seconds)
+            try:
+                await self._reconcile_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Failed to reconcile bed state: {e}")
+
+    def start(self):
+        """Start the startup replay and reconciliation (called from the app lifespan)"""
+        if self.enabled and self.db is not None and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the replay or reconciliation"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        """Replay and ingestion metadata for responses and health checks"""
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "beds": len(self.beds),
+            "wards": len(self.wards),
+            "window_days": self.window_days,
+            "replayed_events": self.replayed_events,
+            "replayed_at": self.replayed_at.isoformat() if self.replayed_at else None,
+            "events_applied": self.applied,
+            "events_ignored": self.ignored,
+            "events_queued": len(self._pending),
+            "last_event_at": self.last_event_at.isoformat() if self.last_event_at else None,
+            "reconciled_at": self.reconciled_at.isoformat() if self.reconciled_at else None,
+            "corrections": self.corrections,
+            "last_error": self.last_error
+        }
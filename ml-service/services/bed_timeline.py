@@ -0,0 +1,302 @@
+"""
+Point-in-time bed state index over occupancy logs
+
+Answers "what was the state at time t" for beds and wards without scanning
+log lists. Every bed's status changes are kept as one columnar event table
+sorted by (bed, timestamp); each event carries the bed status it leads to
+(STATUS_AFTER_CHANGE, reservations keep the previous status). Queries are
+vectorized over any number of (bed, time) points:
+- status_at: status of each bed at each time
+- count_at: beds per ward in a status (e.g. occupied) at each time
+- next_change_after / hours_until: next 'released' (or other change) after t
+- event_hours_until: the same for every logged event at once (training labels)
+- changes_between: number of changes of a kind in (start, end]
+
+Beds and times are packed into one sortable int64 key (bed position x key
+width + milliseconds since the first event), so a batch of queries is a
+single np.searchsorted over the whole table.
+
+Before its first logged change a bed is assumed to be in the status that
+change leaves (available before 'assigned', occupied before 'released',
+cleaning before 'maintenance_end'), so indexes built from a recent window
+of logs still count beds that were already occupied when it starts.
+"""
+
+from typing import Dict, Sequence
+
+import numpy as np
+
+BED_STATUSES = ('available', 'occupied', 'cleaning')
+
+# Bed status after each OccupancyLog status change (None = unchanged)
+STATUS_AFTER_CHANGE = {
+    'assigned': 'occupied',
+    'released': 'cleaning',
+    'maintenance_start': 'cleaning',
+    'maintenance_end': 'available',
+    'reserved': None,
+    'reservation_cancelled': None
+}
+
+STATUS_CODES = {status: code for code, status in enumerate(BED_STATUSES)}
+UNKNOWN = -1
+
+# statusChange values in code order
+CHANGES = tuple(STATUS_AFTER_CHANGE)
+CHANGE_CODES = {change: code for code, change in enumerate(CHANGES)}
+
+# Status after / before each change code (UNKNOWN = unchanged / not implied)
+_STATUS_AFTER = np.array(
+    [STATUS_CODES[STATUS_AFTER_CHANGE[change]] if STATUS_AFTER_CHANGE[change] else UNKNOWN for change in CHANGES],
+    dtype=np.int8
+)
+_STATUS_BEFORE = np.array(
+    [
+        {'assigned': STATUS_CODES['available'],
+         'released': STATUS_CODES['occupied'],
+         'maintenance_end': STATUS_CODES['cleaning']}.get(change, UNKNOWN)
+        for change in CHANGES
+    ],
+    dtype=np.int8
+)
+
+TIME_UNIT = 'datetime64[ms]'
+MS_PER_HOUR = 3_600_000
+
+
+def as_times(values) -> np.ndarray:
+    """datetime / datetime64 values as a datetime64[ms] array"""
+    return np.asarray(values, dtype=TIME_UNIT)
+
+
+class BedTimeline:
+    """
+    Sorted per-bed status changes with vectorized point-in-time queries
+
+    Attributes:
+        bed_ids: Bed id per bed position
+        wards: Ward name per ward position
+        bed_ward: Ward position per bed position
+        offsets: (n_beds + 1,) start of each bed's events
+        times: Event timestamps (datetime64[ms]), sorted within each bed
+        changes: Change code per event (CHANGES)
+        status: Bed status code after each event (BED_STATUSES order)
+        initial_status: Status of each bed before its first event
+    """
+
+    def __init__(
+        self,
+        event_beds: Sequence[str],
+        timestamps,
+        status_changes: Sequence[str],
+        bed_wards: Dict[str, str],
+        default_ward: str = 'General'
+    ):
+        """
+        Args:
+            event_beds: bedId per log (any order)
+            timestamps: Timestamp per log
+            status_changes: statusChange per log; unknown values are dropped
+            bed_wards: Ward per bed id (beds collection); beds of the logs
+                that are missing get default_ward
+            default_ward: Ward of beds without an entry in bed_wards
+        """
+        change_names, change_index = np.unique(np.asarray(status_changes, dtype=str), return_inverse=True)
+        changes = np.array([CHANGE_CODES.get(name, UNKNOWN) for name in change_names.tolist()], dtype=np.int8)[change_index]
+        keep = changes != UNKNOWN
+        bed_ids, bed_index = np.unique(np.asarray(event_beds, dtype=str)[keep], return_inverse=True)
+        times = as_times(timestamps)[keep]
+        changes = changes[keep]
+
+        # Stable sort by (bed, time): ties keep log order
+        order = np.lexsort((times, bed_index))
+        bed_index = bed_index[order].astype(np.int64)
+        self.bed_ids = bed_ids.tolist()
+        self.times = times[order]
+        self.changes = changes[order]
+        self.offsets = np.searchsorted(bed_index, np.arange(len(bed_ids) + 1))
+        self._bed_position = {bed_id: position for position, bed_id in enumerate(self.bed_ids)}
+
+        wards, bed_ward = np.unique(
+            np.asarray([bed_wards.get(bed_id) or default_ward for bed_id in self.bed_ids], dtype=str),
+            return_inverse=True
+        )
+        self.wards = wards.tolist()
+        self.bed_ward = bed_ward.astype(np.int64)
+
+        # Status after each event: forward fill of the statuses changes lead to
+        n_events = len(self.times)
+        starts = self.offsets[:-1]
+        self.initial_status = _STATUS_BEFORE[self.changes[starts]]
+        value = _STATUS_AFTER[self.changes]
+        value[starts] = np.where(value[starts] != UNKNOWN, value[starts], self.initial_status)
+        filled = value != UNKNOWN
+        filled[starts] = True
+        source = np.where(filled, np.arange(n_events), 0)
+        np.maximum.accumulate(source, out=source)
+        self.status = value[source]
+        self.previous_status = np.empty_like(self.status)
+        if n_events:
+            self.previous_status[1:] = self.status[:-1]
+            self.previous_status[starts] = self.initial_status
+
+        # Packed (bed, time) keys; query times are clipped to one step outside the data
+        self._t0 = self.times.min() if n_events else np.datetime64(0, 'ms')
+        self._span = int((self.times.max() - self._t0).astype(np.int64)) + 1 if n_events else 1
+        self._width = self._span + 2
+        self._event_bed = bed_index
+        self.keys = bed_index * self._width + self._relative(self.times)
+
+        self._change_keys: Dict[int, np.ndarray] = {}
+        self._ward_counts: Dict[int, tuple] = {}
+
+    @property
+    def n_beds(self) -> int:
+        return len(self.bed_ids)
+
+    @property
+    def n_events(self) -> int:
+        return len(self.times)
+
+    def _relative(self, times: np.ndarray) -> np.ndarray:
+        """Milliseconds since the first event + 1, clipped to [0, span + 1]"""
+        relative = (as_times(times) - self._t0).astype(np.int64)
+        return np.clip(relative, -1, self._span) + 1
+
+    def bed_positions(self, bed_ids: Sequence[str]) -> np.ndarray:
+        """Bed position per id (-1 for beds without logs)"""
+        return np.fromiter((self._bed_position.get(str(b), -1) for b in bed_ids), dtype=np.int64, count=len(bed_ids))
+
+    def _query_keys(self, beds: np.ndarray, times) -> np.ndarray:
+        beds, relative = np.broadcast_arrays(np.asarray(beds, dtype=np.int64), self._relative(times))
+        return np.maximum(beds, 0) * self._width + relative
+
+    def status_at(self, beds: np.ndarray, times) -> np.ndarray:
+        """
+        Status code of each bed at each time (after changes at exactly t)
+
+        Args:
+            beds: Bed positions (bed_positions()), broadcast against times
+            times: Query times
+
+        Returns:
+            int8 codes into BED_STATUSES, UNKNOWN for beds without logs or
+            before a first change that implies no prior status
+        """
+        query = self._query_keys(beds, times)
+        beds = np.broadcast_to(np.asarray(beds, dtype=np.int64), query.shape)
+        if not self.n_beds:
+            return np.full(query.shape, UNKNOWN, dtype=np.int8)
+        index = np.searchsorted(self.keys, query, side='right') - 1
+        safe_beds = np.maximum(beds, 0)
+        started = index >= self.offsets[safe_beds]
+        status = np.where(started, self.status[np.maximum(index, 0)], self.initial_status[safe_beds])
+        return np.where(beds >= 0, status, UNKNOWN).astype(np.int8)
+
+    def _changes_of(self, change: str) -> np.ndarray:
+        """Packed keys of one change kind (sorted)"""
+        code = CHANGE_CODES[change]
+        keys = self._change_keys.get(code)
+        if keys is None:
+            keys = self._change_keys[code] = self.keys[self.changes == code]
+        return keys
+
+    def next_change_after(self, beds: np.ndarray, times, change: str = 'released') -> np.ndarray:
+        """Time of each bed's first `change` strictly after t (NaT if none)"""
+        keys = self._changes_of(change)
+        query = self._query_keys(beds, times)
+        beds = np.broadcast_to(np.asarray(beds, dtype=np.int64), query.shape)
+        if not len(keys):
+            return np.full(query.shape, np.datetime64('NaT'), dtype=TIME_UNIT)
+        index = np.searchsorted(keys, query, side='right')
+        candidate = keys[np.minimum(index, len(keys) - 1)]
+        # The candidate must exist and belong to the same bed
+        found = (beds >= 0) & (index < len(keys)) & (candidate < (beds + 1) * self._width)
+        following = self._t0 + (candidate % self._width - 1).astype('timedelta64[ms]')
+        return np.where(found, following, np.datetime64('NaT'))
+
+    def hours_until(self, beds: np.ndarray, times, change: str = 'released') -> np.ndarray:
+        """Hours from t to each bed's next `change` (inf if none)"""
+        following = self.next_change_after(beds, times, change)
+        hours = (following - as_times(times)).astype(np.int64) / MS_PER_HOUR
+        return np.where(np.isnat(following), np.inf, hours)
+
+    def event_hours_until(self, change: str = 'released') -> np.ndarray:
+        """
+        Hours from every event to the bed's next `change` event (inf if none)
+
+        "Next" is by position in the bed's events, so a change logged at the
+        same instant but after the event counts (0 hours).
+
+        Returns:
+            (n_events,) hours, aligned with self.times
+        """
+        positions = np.flatnonzero(self.changes == CHANGE_CODES[change])
+        if not len(positions):
+            return np.full(self.n_events, np.inf)
+        following = np.searchsorted(positions, np.arange(self.n_events), side='right')
+        candidate = positions[np.minimum(following, len(positions) - 1)]
+        found = (following < len(positions)) & (self._event_bed[candidate] == self._event_bed)
+        hours = (self.times[candidate] - self.times).astype(np.int64) / MS_PER_HOUR
+        return np.where(found, hours, np.inf)
+
+    def changes_between(self, beds: np.ndarray, start, end, change: str = 'released') -> np.ndarray:
+        """Number of `change` events of each bed in (start, end]"""
+        beds = np.asarray(beds, dtype=np.int64)
+        keys = self._changes_of(change)
+        first = np.searchsorted(keys, self._query_keys(beds, start), side='right')
+        last = np.searchsorted(keys, self._query_keys(beds, end), side='right')
+        return np.where(beds >= 0, last - first, 0)
+
+    def _ward_deltas(self, status: int) -> tuple:
+        """Packed (ward, time) keys of count changes for a status and running counts"""
+        cached = self._ward_counts.get(status)
+        if cached is not None:
+            return cached
+
+        delta = (self.status == status).astype(np.int64) - (self.previous_status == status)
+        changed = delta != 0
+        event_ward = self.bed_ward[self._event_bed[changed]]
+        # Beds in the status before their first event count from the start
+        initial = np.flatnonzero(self.initial_status == status)
+        keys = np.concatenate([
+            event_ward * self._width + self.keys[changed] % self._width,
+            self.bed_ward[initial] * self._width
+        ])
+        deltas = np.concatenate([delta[changed], np.ones(len(initial), dtype=np.int64)])
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        running = np.cumsum(deltas[order])
+        # Running count at the start of each ward's keys
+        starts = np.searchsorted(keys, np.arange(len(self.wards)) * self._width)
+        base = np.where(starts > 0, running[np.maximum(starts - 1, 0)], 0) if len(running) else np.zeros(len(self.wards), np.int64)
+        cached = self._ward_counts[status] = (keys, running, starts, base)
+        return cached
+
+    def count_at(self, times, status: str = 'occupied') -> np.ndarray:
+        """
+        Beds per ward in a status at each time
+
+        Returns:
+            (n_wards, n_times) counts, wards in self.wards order
+        """
+        keys, running, starts, base = self._ward_deltas(STATUS_CODES[status])
+        relative = self._relative(np.atleast_1d(as_times(times)))
+        ward = np.arange(len(self.wards), dtype=np.int64)[:, None]
+        index = np.searchsorted(keys, ward * self._width + relative[None, :], side='right') - 1
+        if not len(running):
+            return np.zeros(index.shape, dtype=np.int64)
+        return np.where(index >= starts[:, None], running[np.maximum(index, 0)] - base[:, None], 0)
+
+    def describe(self) -> Dict[str, object]:
+        return {
+            "beds": self.n_beds,
+            "wards": len(self.wards),
+            "events": self.n_events,
+            "first_event": str(self._t0) if self.n_events else None,
+            "memory_bytes": int(
+                self.keys.nbytes + self.times.nbytes + self.changes.nbytes + self.status.nbytes
+                + self.previous_status.nbytes + self._event_bed.nbytes
+            )
+        }
+
@@ -0,0 +1,258 @@
+"""
+Monte Carlo simulation of ward occupancy for capacity risk
+
+Expected-occupancy curves (services.occupancy_forecast) hide how likely a
+ward is to fill up. This engine samples thousands of occupancy trajectories
+and reports, per ward and hour, the probability that the ward is full.
+
+Every trajectory is simulated at once, as array operations over
+(simulation, ward, hour) with no per-trajectory Python loops:
+1. Current patients: each bed's discharge hour is drawn from the discharge
+   forest's per-tree stay predictions, conditional on the stay so far
+   (one uniform draw and one gather per bed and simulation)
+2. Arrivals: the number of arrivals per (simulation, ward) is Poisson with
+   the summed hourly rates; each arrival's hour is drawn from the ward's
+   hourly rate profile and its stay from the ward's stay samples, each
+   through an inverse-CDF lookup table (one random integer and one gather). Poisson splitting gives the same law as hourly
+   Poisson draws, at a cost that scales with arrivals instead of cells
+3. Every admission (+1) and discharge (-1) lands in one np.bincount over
+   (simulation, ward, hour); np.cumsum over hours gives the occupancy of
+   every trajectory
+
+Simulations run in chunks to bound memory (SIMULATION_CHUNK_SIZE). Chunks
+can be spread over a process pool for large sweeps; each chunk draws from
+its own child seed, so results do not depend on how chunks are scheduled.
+"""
+
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Resolution of the arrival lookup tables (probability error <= 2**-16 per entry)
+INVERSE_CDF_STEPS = 1 << 16
+
+
+def _hour_table(samples: np.ndarray, horizon_hours: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per row, sample hours as integers 1..horizon_hours + 1, valid ones first
+
+    Returns:
+        (table, counts): ceil of the non-NaN samples sorted first in each
+        row (horizon_hours + 1 = after the horizon), and how many there are
+        (at least 1; a row without samples draws 'after the horizon')
+    """
+    samples = np.atleast_2d(np.asarray(samples, dtype=np.float64))
+    counts = np.maximum((~np.isnan(samples)).sum(axis=1), 1)
+    ordered = np.sort(np.where(np.isnan(samples), np.inf, samples), axis=1)
+    table = np.clip(np.ceil(ordered), 1, horizon_hours + 1).astype(np.int64)
+    return table, counts
+
+
+def _draw(rng: np.random.Generator, table: np.ndarray, counts: np.ndarray, rows: np.ndarray, size) -> np.ndarray:
+    """Draw uniformly among each row's valid entries (rows broadcast to size)"""
+    pick = (rng.random(size, dtype=np.float32) * counts[rows]).astype(np.int64)
+    return table.ravel()[rows * table.shape[1] + pick]
+
+
+def _lookup_table(table: np.ndarray, cumulative: np.ndarray) -> np.ndarray:
+    """
+    Inverse-CDF lookup table of each row's values
+
+    Args:
+        table: (n_rows, n_values) values
+        cumulative: (n_rows, n_values) cumulative probability up to each value
+
+    Returns:
+        (n_rows, INVERSE_CDF_STEPS) uint16 table whose entry j is the value
+        at quantile (j + 0.5) / INVERSE_CDF_STEPS; drawing is then one
+        random integer and one gather
+    """
+    steps = (np.arange(INVERSE_CDF_STEPS) + 0.5) / INVERSE_CDF_STEPS
+    index = np.stack([np.searchsorted(row, steps, side='right') for row in cumulative])
+    index = np.minimum(index, table.shape[1] - 1)
+    return np.take_along_axis(table, index, axis=1).astype(np.uint16)
+
+
+def _sampling_tables(bed_remaining: np.ndarray, arrival_rates: np.ndarray, stay_hours: np.ndarray) -> Dict[str, np.ndarray]:
+    """Draw tables shared by every chunk (built once per simulation)"""
+    n_wards, horizon_hours = arrival_rates.shape
+    bed_table, bed_counts = _hour_table(bed_remaining, horizon_hours)
+
+    # Arrival hour 1..horizon from the ward's hourly profile, stay from its samples
+    totals = arrival_rates.sum(axis=1)
+    hours = np.broadcast_to(np.arange(1, horizon_hours + 1), arrival_rates.shape)
+    profile = np.cumsum(arrival_rates, axis=1) / np.where(totals > 0, totals, 1.0)[:, None]
+    stay_table, stay_counts = _hour_table(stay_hours, horizon_hours)
+    stay_cumulative = np.arange(1, stay_table.shape[1] + 1)[None, :] / stay_counts[:, None]
+    return {
+        "bed_table": bed_table,
+        "bed_counts": bed_counts,
+        "arrival_totals": totals,
+        "hour_lookup": _lookup_table(hours, profile).ravel(),
+        "stay_lookup": _lookup_table(stay_table, stay_cumulative).ravel()
+    }
+
+
+def _simulate_chunk(
+    seed: np.random.SeedSequence,
+    n_simulations: int,
+    bed_ward: np.ndarray,
+    capacity: np.ndarray,
+    horizon_hours: int,
+    tables: Dict[str, np.ndarray]
+) -> Dict[str, np.ndarray]:
+    """Simulate one chunk of trajectories; returns per (ward, hour) sums over them"""
+    rng = np.random.default_rng(seed)
+    n_wards = len(capacity)
+    n_bins = horizon_hours + 2  # hour 0..horizon, horizon + 1 = after the horizon
+    size = n_simulations * n_wards * n_bins
+    # Offset of (simulation, ward) in the flattened (simulation, ward, hour) grid
+    cell_offset = (
+        np.arange(n_simulations, dtype=np.int64)[:, None] * (n_wards * n_bins)
+        + np.arange(n_wards, dtype=np.int64)[None, :] * n_bins
+    )
+
+    admitted = []
+    discharged = []
+
+    # 1. Current patients: discharge hour per (simulation, bed)
+    n_beds = len(bed_ward)
+    if n_beds:
+        hours = _draw(rng, tables["bed_table"], tables["bed_counts"], np.arange(n_beds), (n_simulations, n_beds))
+        discharged.append((cell_offset[:, bed_ward] + hours).ravel())
+
+    # 2. Arrivals: count per (simulation, ward), then hour and stay per arrival
+    totals = tables["arrival_totals"]
+    if totals.any():
+        arrivals = rng.poisson(totals, size=(n_simulations, n_wards)).ravel()
+        base = np.repeat(cell_offset.ravel(), arrivals)
+        # Start of the arrival's ward row in the lookup tables
+        row = np.repeat(np.tile(np.arange(n_wards, dtype=np.int64) * INVERSE_CDF_STEPS, n_simulations), arrivals)
+
+        arrival_hour = tables["hour_lookup"][row + rng.integers(0, INVERSE_CDF_STEPS, len(row), dtype=np.uint16)]
+        stay = tables["stay_lookup"][row + rng.integers(0, INVERSE_CDF_STEPS, len(row), dtype=np.uint16)]
+
+        admitted.append(base + arrival_hour)
+        discharged.append(base + np.minimum(arrival_hour + stay, horizon_hours + 1))
+
+    # 3. Occupancy of every trajectory: start count + admissions - discharges, accumulated
+    delta = np.zeros(size, dtype=np.int64)
+    for positions in admitted:
+        delta += np.bincount(positions, minlength=size)
+    for positions in discharged:
+        delta -= np.bincount(positions, minlength=size)
+    delta = delta.reshape(n_simulations, n_wards, n_bins)[:, :, :horizon_hours + 1]
+    delta[:, :, 0] += np.bincount(bed_ward, minlength=n_wards)
+    occupancy = np.cumsum(delta, axis=2)
+
+    full = occupancy >= capacity[None, :, None]
+    return {
+        "full": full.sum(axis=0),
+        "full_by": np.logical_or.accumulate(full, axis=2).sum(axis=0),
+        "occupancy": occupancy.sum(axis=0),
+        "peak": occupancy.max(axis=2)
+    }
+
+
+# Lazily created pool for SIMULATION_PROCESSES > 0
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool(processes: int) -> ProcessPoolExecutor:
+    """Shared process pool ('spawn' start method: safe with threads in the parent)"""
+    global _process_pool
+    if _process_pool is None:
+        context = multiprocessing.get_context('spawn')
+        _process_pool = ProcessPoolExecutor(max_workers=processes, mp_context=context)
+    return _process_pool
+
+
+def shutdown_process_pool():
+    """Stop the simulation process pool (called on shutdown)"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def simulate_capacity(
+    bed_ward: Sequence[int],
+    bed_remaining: np.ndarray,
+    capacity: Sequence[int],
+    arrival_rates: np.ndarray,
+    stay_hours: np.ndarray,
+    n_simulations: int = settings.SIMULATION_DEFAULT_RUNS,
+    seed: Optional[int] = None,
+    chunk_size: int = settings.SIMULATION_CHUNK_SIZE,
+    processes: int = settings.SIMULATION_PROCESSES
+) -> Dict[str, Any]:
+    """
+    Simulate occupancy trajectories and summarise capacity risk
+
+    Args:
+        bed_ward: Ward position per occupied bed
+        bed_remaining: (n_beds, n_samples) hours until discharge per bed
+            (NaN for samples to ignore), e.g. remaining_stay_hours()
+        capacity: Beds per ward
+        arrival_rates: (n_wards, horizon_hours) expected arrivals in each
+            hour of the horizon
+        stay_hours: (n_wards, n_samples) length-of-stay samples for new
+            arrivals per ward (NaN padded)
+        n_simulations: Number of trajectories
+        seed: Seed for reproducible results
+        chunk_size: Trajectories simulated per array pass
+        processes: Worker processes for the chunks (0 = this process)
+
+    Returns:
+        Dict with, per ward and hour 0..horizon: 'p_full' (probability the
+        ward is full at that hour), 'p_full_by' (full at least once up to
+        that hour) and 'expected_occupied'; per ward 'peak_p90' (90th
+        percentile of the peak occupancy); plus run statistics
+    """
+    started = time.perf_counter()
+    bed_ward = np.asarray(bed_ward, dtype=np.int64)
+    capacity = np.asarray(capacity, dtype=np.int64)
+    arrival_rates = np.atleast_2d(np.asarray(arrival_rates, dtype=np.float64))
+    stay_hours = np.atleast_2d(np.asarray(stay_hours, dtype=np.float64))
+    bed_remaining = np.asarray(bed_remaining, dtype=np.float64)
+    if bed_remaining.ndim == 1:
+        bed_remaining = bed_remaining[:, None]
+
+    sizes = [min(chunk_size, n_simulations - start) for start in range(0, n_simulations, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = (bed_ward, capacity, arrival_rates.shape[1], _sampling_tables(bed_remaining, arrival_rates, stay_hours))
+
+    if processes > 0 and len(sizes) > 1:
+        pool = get_process_pool(processes)
+        results = list(pool.map(_simulate_chunk, seeds, sizes, *[[arg] * len(sizes) for arg in args]))
+    else:
+        results = [_simulate_chunk(chunk_seed, size, *args) for chunk_seed, size in zip(seeds, sizes)]
+
+    peaks = np.concatenate([result["peak"] for result in results])
+    return {
+        "p_full": sum(result["full"] for result in results) / n_simulations,
+        "p_full_by": sum(result["full_by"] for result in results) / n_simulations,
+        "expected_occupied": sum(result["occupancy"] for result in results) / n_simulations,
+        "peak_p90": np.quantile(peaks, 0.9, axis=0),
+        "simulations": n_simulations,
+        "chunks": len(sizes),
+        "processes": processes if processes > 0 and len(sizes) > 1 else 0,
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+def stay_samples(tree_hours_by_ward: List[np.ndarray]) -> np.ndarray:
+    """Stack per-ward stay samples of different lengths, NaN padded"""
+    width = max((len(samples) for samples in tree_hours_by_ward), default=1)
+    stacked = np.full((len(tree_hours_by_ward), max(width, 1)), np.nan)
+    for position, samples in enumerate(tree_hours_by_ward):
+        stacked[position, :len(samples)] = samples
+    return stacked
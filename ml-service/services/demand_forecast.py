@@ -0,0 +1,440 @@
+"""
+Demand forecast from precomputed hour-of-week arrival tables
+
+Arrivals per ward come from two sources: bed assignments ('assigned'
+occupancy logs) and emergency bed requests (`emergencyrequests`). For each
+(ward, source) the forecaster keeps a 168-slot table, indexed
+weekday * 24 + hour with Monday = 0, of
+- counts: arrivals seen in that hour of the week
+- exposure: hours of that slot covered by the data
+so the arrival rate of a slot is counts / exposure. Forecasts are table
+lookups (see horizon_rates), with no database access per request.
+
+Rates are smoothed before serving:
+1. Each slot is shrunk towards the ward's rate at the same hour of day over
+   all weekdays, with DEMAND_SMOOTHING_WEEKS weeks of prior weight, so
+   sparse slots borrow strength from the daily profile
+2. A [0.25, 0.5, 0.25] kernel over neighbouring hours (circular over the
+   week) removes hour-to-hour noise
+
+Updates are incremental: every DEMAND_UPDATE_SECONDS the two collections are
+aggregated only from the last update's watermark onwards, old counts and
+exposure decay with a half-life of DEMAND_HALF_LIFE_WEEKS, and the tables
+are saved to a small .npz artifact so a restart continues from there. The
+only full scan is the initial build (train/train_demand_forecaster.py, or
+the first update when no artifact exists), done week by week with the
+same update step.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+from pymongo.database import Database
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_WEEK = 168
+DEMAND_SOURCES = ('admissions', 'emergency_requests')
+ARTIFACT_FORMAT_VERSION = 1
+
+
+def _group_stages(ward: Any, timestamp: str) -> list:
+    """Count documents per (ward, $dayOfWeek, $hour)"""
+    return [
+        {'$group': {
+            '_id': {
+                'ward': ward,
+                'day': {'$dayOfWeek': timestamp},
+                'hour': {'$hour': timestamp}
+            },
+            'count': {'$sum': 1}
+        }}
+    ]
+
+
+def build_admissions_pipeline(since: datetime, until: datetime) -> list:
+    """
+    Aggregation counting bed assignments per (ward, day of week, hour)
+
+    Args:
+        since: First timestamp counted (inclusive)
+        until: Last timestamp counted (exclusive)
+
+    Returns:
+        MongoDB aggregation pipeline over `occupancylogs`
+    """
+    return [
+        {'$match': {'statusChange': 'assigned', 'timestamp': {'$gte': since, '$lt': until}}},
+        {'$lookup': {
+            'from': 'beds',
+            'localField': 'bedId',
+            'foreignField': '_id',
+            'as': 'bed'
+        }},
+        *_group_stages({'$ifNull': [{'$first': '$bed.ward'}, 'General']}, '$timestamp')
+    ]
+
+
+def build_emergency_requests_pipeline(since: datetime, until: datetime) -> list:
+    """
+    Aggregation counting emergency bed requests per (ward, day of week, hour)
+
+    Returns:
+        MongoDB aggregation pipeline over `emergencyrequests`
+    """
+    return [
+        {'$match': {'createdAt': {'$gte': since, '$lt': until}}},
+        *_group_stages('$ward', '$createdAt')
+    ]
+
+
+def fetch_arrival_counts(db: Database, since: datetime, until: datetime) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Arrivals in [since, until) per source and ward (blocking)
+
+    Returns:
+        Source -> ward -> (168,) counts per hour of the week
+    """
+    pipelines = {
+        'admissions': (db.occupancylogs, build_admissions_pipeline(since, until)),
+        'emergency_requests': (db.emergencyrequests, build_emergency_requests_pipeline(since, until))
+    }
+    counts: Dict[str, Dict[str, np.ndarray]] = {}
+    for source, (collection, pipeline) in pipelines.items():
+        by_ward = counts.setdefault(source, {})
+        for group in collection.aggregate(pipeline, allowDiskUse=True):
+            key = group['_id']
+            # $dayOfWeek: 1 = Sunday ... 7 = Saturday
+            slot = ((key['day'] + 5) % 7) * 24 + key['hour']
+            by_ward.setdefault(key['ward'], np.zeros(HOURS_PER_WEEK))[slot] += group['count']
+    return counts
+
+
+def slot_exposure(since: datetime, until: datetime) -> np.ndarray:
+    """Hours of each hour-of-week slot within [since, until)"""
+    if until <= since:
+        return np.zeros(HOURS_PER_WEEK)
+    first_hour = since.replace(minute=0, second=0, microsecond=0)
+    n_hours = int(np.ceil((until - first_hour).total_seconds() / 3600))
+    starts = np.arange(n_hours, dtype=np.float64)  # hours after first_hour
+    offset = (since - first_hour).total_seconds() / 3600
+    span = (until - first_hour).total_seconds() / 3600
+    covered = np.clip(np.minimum(starts + 1, span) - np.maximum(starts, offset), 0.0, 1.0)
+    slots = (first_hour.weekday() * 24 + first_hour.hour + np.arange(n_hours)) % HOURS_PER_WEEK
+    return np.bincount(slots, weights=covered, minlength=HOURS_PER_WEEK)
+
+
+def smooth_rates(counts: np.ndarray, exposure: np.ndarray, smoothing_weeks: float) -> np.ndarray:
+    """
+    Smoothed arrivals per hour for every slot
+
+    Args:
+        counts: (..., 168) arrivals per hour-of-week slot
+        exposure: (168,) hours covered per slot
+        smoothing_weeks: Prior weight of the hour-of-day profile, in weeks
+
+    Returns:
+        (..., 168) expected arrivals in one hour of each slot
+    """
+    by_hour = counts.reshape(*counts.shape[:-1], 7, 24).sum(axis=-2)
+    hour_exposure = exposure.reshape(7, 24).sum(axis=0)
+    daily = by_hour / np.maximum(hour_exposure, 1e-9)
+    prior = np.tile(daily, 7)
+
+    shrunk = (counts + smoothing_weeks * prior) / np.maximum(exposure + smoothing_weeks, 1e-9)
+    return 0.25 * np.roll(shrunk, 1, axis=-1) + 0.5 * shrunk + 0.25 * np.roll(shrunk, -1, axis=-1)
+
+
+def horizon_rates(hour_of_week_rates: np.ndarray, start: datetime, horizon_hours: int) -> np.ndarray:
+    """
+    Rates for the horizon_hours hours from start, from hour-of-week tables
+
+    Args:
+        hour_of_week_rates: (..., 168) rates indexed weekday * 24 + hour
+        start: Time in the first hour
+        horizon_hours: Number of hours
+
+    Returns:
+        (..., horizon_hours) rate for each hour of the horizon
+    """
+    first = start.weekday() * 24 + start.hour
+    return np.take(hour_of_week_rates, (first + np.arange(horizon_hours)) % HOURS_PER_WEEK, axis=-1)
+
+
+class DemandTables:
+    """Immutable arrival tables produced by one update"""
+
+    def __init__(
+        self,
+        wards: Sequence[str],
+        counts: np.ndarray,
+        exposure: np.ndarray,
+        since: datetime,
+        watermark: datetime,
+        smoothing_weeks: float = settings.DEMAND_SMOOTHING_WEEKS
+    ):
+        """
+        Args:
+            wards: Ward names (sorted), first axis of counts
+            counts: (n_wards, n_sources, 168) decayed arrivals per slot
+            exposure: (168,) decayed hours covered per slot
+            since: Start of the data
+            watermark: End of the data (next update starts here)
+            smoothing_weeks: Prior weight of the hour-of-day profile
+        """
+        self.wards = list(wards)
+        self.ward_positions = {ward: position for position, ward in enumerate(self.wards)}
+        self.counts = counts
+        self.exposure = exposure
+        self.since = since
+        self.watermark = watermark
+        self.rates = smooth_rates(counts, exposure, smoothing_weeks)
+        self.updated_at = datetime.utcnow()
+
+    @classmethod
+    def empty(cls, since: datetime, smoothing_weeks: float = settings.DEMAND_SMOOTHING_WEEKS) -> 'DemandTables':
+        return cls([], np.zeros((0, len(DEMAND_SOURCES), HOURS_PER_WEEK)), np.zeros(HOURS_PER_WEEK), since, since, smoothing_weeks)
+
+    def fold(
+        self,
+        counts_by_source: Dict[str, Dict[str, np.ndarray]],
+        until: datetime,
+        half_life_weeks: float = settings.DEMAND_HALF_LIFE_WEEKS,
+        smoothing_weeks: float = settings.DEMAND_SMOOTHING_WEEKS
+    ) -> 'DemandTables':
+        """
+        New tables with the arrivals of [watermark, until) added
+
+        Existing counts and exposure decay by the time elapsed since the
+        watermark first, so recent weeks weigh more than old ones.
+        """
+        elapsed_weeks = (until - self.watermark).total_seconds() / (3600 * HOURS_PER_WEEK)
+        decay = 0.5 ** (elapsed_weeks / half_life_weeks) if half_life_weeks > 0 else 1.0
+
+        new_wards = {ward for by_ward in counts_by_source.values() for ward in by_ward}
+        wards = sorted(set(self.wards) | new_wards)
+        counts = np.zeros((len(wards), len(DEMAND_SOURCES), HOURS_PER_WEEK))
+        if self.wards:
+            counts[[wards.index(ward) for ward in self.wards]] = self.counts * decay
+        for source_position, source in enumerate(DEMAND_SOURCES):
+            for ward, ward_counts in counts_by_source.get(source, {}).items():
+                counts[wards.index(ward), source_position] += ward_counts
+
+        exposure = self.exposure * decay + slot_exposure(self.watermark, until)
+        return DemandTables(wards, counts, exposure, self.since, until, smoothing_weeks)
+
+    def forecast(self, wards: Sequence[str], start: datetime, horizon_hours: int) -> np.ndarray:
+        """
+        Expected arrivals per hour
+
+        Returns:
+            (len(wards), n_sources, horizon_hours); wards without history get zeros
+        """
+        rates = np.zeros((len(wards), len(DEMAND_SOURCES), HOURS_PER_WEEK))
+        known = [position for position, ward in enumerate(wards) if ward in self.ward_positions]
+        rates[known] = self.rates[[self.ward_positions[wards[position]] for position in known]]
+        return horizon_rates(rates, start, horizon_hours)
+
+    def save(self, path: str):
+        """Write the tables to an .npz artifact (atomically)"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temporary_path = f"{path}.tmp-{os.getpid()}.npz"
+        np.savez(
+            temporary_path,
+            format_version=ARTIFACT_FORMAT_VERSION,
+            wards=np.array(self.wards, dtype=str),
+            sources=np.array(DEMAND_SOURCES, dtype=str),
+            counts=self.counts,
+            exposure=self.exposure,
+            since=self.since.isoformat(),
+            watermark=self.watermark.isoformat()
+        )
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str, smoothing_weeks: float = settings.DEMAND_SMOOTHING_WEEKS) -> 'DemandTables':
+        """Read tables saved by save()"""
+        with np.load(path) as artifact:
+            if int(artifact['format_version']) != ARTIFACT_FORMAT_VERSION:
+                raise ValueError(f"Unsupported demand artifact version {int(artifact['format_version'])}")
+            if tuple(artifact['sources'].tolist()) != DEMAND_SOURCES:
+                raise ValueError(f"Demand artifact sources {artifact['sources'].tolist()} do not match {DEMAND_SOURCES}")
+            return cls(
+                artifact['wards'].tolist(),
+                artifact['counts'],
+                artifact['exposure'],
+                datetime.fromisoformat(str(artifact['since'])),
+                datetime.fromisoformat(str(artifact['watermark'])),
+                smoothing_weeks
+            )
+
+
+def build_tables(
+    db: Database,
+    since: datetime,
+    until: datetime,
+    tables: Optional[DemandTables] = None,
+    step: timedelta = timedelta(weeks=1),
+    half_life_weeks: float = settings.DEMAND_HALF_LIFE_WEEKS,
+    smoothing_weeks: float = settings.DEMAND_SMOOTHING_WEEKS
+) -> DemandTables:
+    """
+    Fold arrivals of [since, until) into tables, one step at a time (blocking)
+
+    Folding week by week gives the same decay as if the service had been
+    updating all along, and keeps each aggregation small.
+    """
+    tables = tables or DemandTables.empty(since, smoothing_weeks)
+    start = tables.watermark
+    while start < until:
+        end = min(start + step, until)
+        tables = tables.fold(fetch_arrival_counts(db, start, end), end, half_life_weeks, smoothing_weeks)
+        start = end
+    return tables
+
+
+class DemandForecaster:
+    """
+    Serves demand forecasts from in-memory arrival tables and folds in new
+    arrivals in the background every `update_seconds`
+    """
+
+    def __init__(
+        self,
+        db: Optional[Database] = None,
+        executor=None,
+        path: str = settings.DEMAND_FORECAST_PATH,
+        update_seconds: int = settings.DEMAND_UPDATE_SECONDS,
+        history_weeks: int = settings.DEMAND_HISTORY_WEEKS,
+        half_life_weeks: float = settings.DEMAND_HALF_LIFE_WEEKS,
+        smoothing_weeks: float = settings.DEMAND_SMOOTHING_WEEKS
+    ):
+        """
+        Args:
+            db: Database on the shared client (None serves the artifact only)
+            executor: InferenceExecutor whose I/O pool runs updates
+                (defaults to asyncio.to_thread)
+            path: .npz artifact loaded at start and saved after updates
+            update_seconds: Seconds between incremental updates
+            history_weeks: History scanned when there is no artifact
+            half_life_weeks: Half-life of old arrivals
+            smoothing_weeks: Prior weight of the hour-of-day profile
+        """
+        self.db = db
+        self.executor = executor
+        self.path = path
+        self.update_seconds = update_seconds
+        self.history_weeks = history_weeks
+        self.half_life_weeks = half_life_weeks
+        self.smoothing_weeks = smoothing_weeks
+
+        self._tables: Optional[DemandTables] = None
+        self._task: Optional[asyncio.Task] = None
+        self.last_error: Optional[str] = None
+        self.last_update_ms: Optional[float] = None
+
+    @property
+    def tables(self) -> Optional[DemandTables]:
+        """Current tables (None until loaded or built)"""
+        return self._tables
+
+    def load(self) -> Optional[DemandTables]:
+        """Load the artifact if there is one (blocking)"""
+        if os.path.exists(self.path):
+            self._tables = DemandTables.load(self.path, self.smoothing_weeks)
+            logger.info(
+                f"Demand tables loaded from {self.path}: {len(self._tables.wards)} wards, "
+                f"data until {self._tables.watermark.isoformat()}"
+            )
+        return self._tables
+
+    def update(self) -> DemandTables:
+        """Fold in arrivals since the last update and save the artifact (blocking)"""
+        if self.db is None:
+            raise RuntimeError("Demand forecaster has no database")
+
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        tables = self._tables
+        if tables is None:
+            # First build: the one full scan, week by week
+            tables = build_tables(
+                self.db, now - timedelta(weeks=self.history_weeks), now,
+                half_life_weeks=self.half_life_weeks, smoothing_weeks=self.smoothing_weeks
+            )
+        else:
+            tables = tables.fold(
+                fetch_arrival_counts(self.db, tables.watermark, now), now,
+                self.half_life_weeks, self.smoothing_weeks
+            )
+
+        self._tables = tables
+        self.last_error = None
+        self.last_update_ms = round((time.perf_counter() - started) * 1000, 1)
+        tables.save(self.path)
+        logger.debug(f"Demand tables updated to {now.isoformat()} in {self.last_update_ms}ms")
+        return tables
+
+    async def _run_io(self, fn):
+        if self.executor is not None:
+            return await self.executor.run_io(fn)
+        return await asyncio.to_thread(fn)
+
+    async def _update_loop(self):
+        """Load the artifact, then update immediately and every update_seconds"""
+        try:
+            await self._run_io(self.load)
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Failed to load demand tables: {e}")
+        while True:
+            try:
+                await self._run_io(self.update)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Failed to update demand tables: {e}")
+            await asyncio.sleep(self.update_seconds)
+
+    def start(self):
+        """Start background updates (called from the app lifespan)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._update_loop())
+
+    async def stop(self):
+        """Stop background updates"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        """Freshness metadata for responses and /metrics"""
+        tables = self._tables
+        if tables is None:
+            return {"source": None, "stale": True, "last_error": self.last_error}
+
+        lag = (datetime.utcnow() - tables.watermark).total_seconds()
+        return {
+            "source": "tables",
+            "wards": tables.wards,
+            "since": tables.since.isoformat(),
+            "watermark": tables.watermark.isoformat(),
+            "lag_seconds": round(lag, 1),
+            # One missed update is tolerated before flagging as stale
+            "stale": lag > 2 * self.update_seconds + 60,
+            "last_update_ms": self.last_update_ms,
+            "half_life_weeks": self.half_life_weeks,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,299 @@
+"""
+In-memory occupancy duration statistics for discharge prediction
+
+The discharge model needs three historical aggregates per request:
+- ward_avg_duration: mean stay length for the ward
+- time_avg_duration: mean stay length for the admission time of day
+- ward_time_avg_duration: mean stay length for the ward + time of day
+
+Instead of scanning `occupancylogs` on every request, the engine runs a single
+server-side aggregation on a TTL and keeps the results in memory, so each
+request is served with a dictionary lookup.
+
+When the event-fed bed state (services.bed_state) is ready, each refresh
+reads its running per-(ward, time of day) stay sums instead, which the
+backend's status change events keep current, and no query runs.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo.database import Database
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Fallback durations (hours) used until the first refresh succeeds
+WARD_DEFAULT_DURATIONS = {
+    'ICU': 48.0,
+    'Emergency': 24.0,
+    'General': 36.0,
+    'Pediatrics': 30.0,
+    'Maternity': 48.0,
+    'Surgery': 36.0,
+    'Cardiology': 40.0
+}
+DEFAULT_DURATION = 36.0
+
+# Used when the database has sessions but none for the requested ward
+EMPTY_HISTORY_DURATION = 48.0
+
+
+def build_duration_pipeline(since: datetime) -> list:
+    """
+    Build the aggregation that pairs consecutive assigned -> released events
+    per bed and sums stay durations by (ward, time_of_day)
+
+    Args:
+        since: Only logs at or after this time are considered
+
+    Returns:
+        MongoDB aggregation pipeline
+    """
+    hour = '$hour'
+    return [
+        {'$match': {'timestamp': {'$gte': since}}},
+        {'$setWindowFields': {
+            'partitionBy': '$bedId',
+            'sortBy': {'timestamp': 1},
+            'output': {
+                'next_status': {'$shift': {'output': '$statusChange', 'by': 1}},
+                'next_timestamp': {'$shift': {'output': '$timestamp', 'by': 1}}
+            }
+        }},
+        {'$match': {'statusChange': 'assigned', 'next_status': 'released'}},
+        {'$project': {
+            'bedId': 1,
+            'hour': {'$hour': '$timestamp'},
+            'duration_hours': {
+                '$divide': [{'$subtract': ['$next_timestamp', '$timestamp']}, 3600000]
+            }
+        }},
+        # Valid range (less than 1 year)
+        {'$match': {'duration_hours': {'$gt': 0, '$lt': 8760}}},
+        {'$lookup': {
+            'from': 'beds',
+            'localField': 'bedId',
+            'foreignField': '_id',
+            'as': 'bed'
+        }},
+        {'$project': {
+            'duration_hours': 1,
+            'ward': {'$ifNull': [{'$arrayElemAt': ['$bed.ward', 0]}, 'General']},
+            # Same buckets as utils.get_time_of_day
+            'time_of_day': {'$switch': {
+                'branches': [
+                    {'case': {'$and': [{'$gte': [hour, 6]}, {'$lt': [hour, 12]}]}, 'then': 0},
+                    {'case': {'$and': [{'$gte': [hour, 12]}, {'$lt': [hour, 18]}]}, 'then': 1},
+                    {'case': {'$and': [{'$gte': [hour, 18]}, {'$lt': [hour, 22]}]}, 'then': 2}
+                ],
+                'default': 3
+            }}
+        }},
+        {'$group': {
+            '_id': {'ward': '$ward', 'time_of_day': '$time_of_day'},
+            'total_hours': {'$sum': '$duration_hours'},
+            'count': {'$sum': 1}
+        }}
+    ]
+
+
+class DurationStatsSnapshot:
+    """Immutable set of averages produced by one refresh"""
+
+    def __init__(self, groups: list, refreshed_at: datetime, source: str = "aggregate"):
+        """
+        Args:
+            groups: Aggregation output rows with _id.ward, _id.time_of_day,
+                total_hours and count
+            refreshed_at: When the aggregation completed
+            source: "aggregate" or "events" (rows from the bed state store)
+        """
+        ward_totals: Dict[str, list] = {}
+        time_totals: Dict[int, list] = {}
+        ward_time_avg: Dict[Tuple[str, int], float] = {}
+        total_hours = 0.0
+        total_count = 0
+
+        for row in groups:
+            ward = row['_id']['ward']
+            tod = int(row['_id']['time_of_day'])
+            hours = float(row['total_hours'])
+            count = int(row['count'])
+            if count <= 0:
+                continue
+
+            ward_time_avg[(ward, tod)] = hours / count
+            ward_totals.setdefault(ward, [0.0, 0])
+            ward_totals[ward][0] += hours
+            ward_totals[ward][1] += count
+            time_totals.setdefault(tod, [0.0, 0])
+            time_totals[tod][0] += hours
+            time_totals[tod][1] += count
+            total_hours += hours
+            total_count += count
+
+        self.ward_avg = {ward: h / c for ward, (h, c) in ward_totals.items()}
+        self.time_avg = {tod: h / c for tod, (h, c) in time_totals.items()}
+        self.ward_time_avg = ward_time_avg
+        self.overall_avg = total_hours / total_count if total_count else EMPTY_HISTORY_DURATION
+        self.sessions = total_count
+        self.source = source
+        self.refreshed_at = refreshed_at
+        self.refreshed_monotonic = time.monotonic()
+
+    def lookup(self, ward: str, time_of_day: int) -> Tuple[float, float, float]:
+        """
+        Get (ward_avg, time_avg, ward_time_avg) for a ward and time of day
+
+        Missing groups fall back the same way the per-request scan did:
+        ward -> overall average, time and ward+time -> ward average.
+        """
+        ward_avg = self.ward_avg.get(ward, self.overall_avg)
+        time_avg = self.time_avg.get(time_of_day, ward_avg)
+        ward_time_avg = self.ward_time_avg.get((ward, time_of_day), ward_avg)
+        return ward_avg, time_avg, ward_time_avg
+
+
+class DurationStatsEngine:
+    """
+    Keeps occupancy duration aggregates in memory and refreshes them
+    in the background every `ttl_seconds`
+    """
+
+    def __init__(
+        self,
+        db: Optional[Database] = None,
+        executor=None,
+        ttl_seconds: int = settings.DURATION_STATS_TTL_SECONDS,
+        window_days: int = settings.DURATION_STATS_WINDOW_DAYS,
+        bed_state=None
+    ):
+        """
+        Args:
+            db: Database on the shared client (None serves defaults only)
+            executor: InferenceExecutor whose I/O pool runs the refresh
+                (defaults to asyncio.to_thread)
+            ttl_seconds: Seconds between background refreshes
+            window_days: Days of occupancy history to aggregate
+            bed_state: BedStateStore whose stay sums replace the aggregation
+                once it is ready
+        """
+        self.db = db
+        self.executor = executor
+        self.ttl_seconds = ttl_seconds
+        self.window_days = window_days
+        self.bed_state = bed_state
+
+        self._snapshot: Optional[DurationStatsSnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+        self.last_error: Optional[str] = None
+
+    def refresh(self) -> DurationStatsSnapshot:
+        """Run the aggregation and swap in a new snapshot (blocking)"""
+        if self.db is None:
+            raise RuntimeError("Duration statistics engine has no database")
+
+        since = datetime.utcnow() - timedelta(days=self.window_days)
+        started = time.perf_counter()
+        groups = list(self.db.occupancylogs.aggregate(build_duration_pipeline(since), allowDiskUse=True))
+
+        snapshot = DurationStatsSnapshot(groups, datetime.utcnow())
+        self._snapshot = snapshot
+        self.last_error = None
+
+        logger.info(
+            f"Duration stats refreshed: {snapshot.sessions} sessions, "
+            f"{len(snapshot.ward_avg)} wards in {(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+        return snapshot
+
+    def refresh_from_events(self) -> Optional[DurationStatsSnapshot]:
+        """Swap in a snapshot of the bed state's stay sums (None if it is not ready)"""
+        groups = self.bed_state.duration_groups() if self.bed_state is not None else None
+        if groups is None:
+            return None
+
+        snapshot = DurationStatsSnapshot(groups, datetime.utcnow(), source="events")
+        self._snapshot = snapshot
+        self.last_error = None
+        return snapshot
+
+    async def _refresh_loop(self):
+        """Refresh immediately, then every ttl_seconds"""
+        while True:
+            try:
+                if self.refresh_from_events() is None:
+                    # No event-fed stay sums yet: aggregate
+                    if self.executor is not None:
+                        await self.executor.run_io(self.refresh)
+                    else:
+                        await asyncio.to_thread(self.refresh)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Failed to refresh duration statistics: {e}")
+            await asyncio.sleep(self.ttl_seconds)
+
+    def start(self):
+        """Start background refreshing (called from the app lifespan)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """Stop background refreshing"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def snapshot_token(self) -> Optional[datetime]:
+        """Changes whenever a new snapshot is swapped in"""
+        snapshot = self._snapshot
+        return snapshot.refreshed_at if snapshot is not None else None
+
+    def lookup(self, ward: str, time_of_day: int) -> Tuple[float, float, float]:
+        """
+        Get (ward_avg, time_avg, ward_time_avg) in hours
+
+        Uses per-ward defaults until the first refresh succeeds.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            default_duration = WARD_DEFAULT_DURATIONS.get(ward, DEFAULT_DURATION)
+            return default_duration, default_duration, default_duration
+        return snapshot.lookup(ward, time_of_day)
+
+    def status(self) -> Dict[str, Any]:
+        """Staleness metadata for responses and health checks"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {
+                "source": "defaults",
+                "refreshed_at": None,
+                "age_seconds": None,
+                "ttl_seconds": self.ttl_seconds,
+                "stale": True,
+                "last_error": self.last_error
+            }
+
+        age = time.monotonic() - snapshot.refreshed_monotonic
+        return {
+            "source": snapshot.source,
+            "refreshed_at": snapshot.refreshed_at.isoformat(),
+            "age_seconds": round(age, 1),
+            "ttl_seconds": self.ttl_seconds,
+            # One missed refresh is tolerated before flagging as stale
+            "stale": age > 2 * self.ttl_seconds,
+            "sessions": snapshot.sessions,
+            "last_error": self.last_error
+        }
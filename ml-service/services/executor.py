@@ -0,0 +1,130 @@
+"""
+Execution layer for blocking work
+
+Prediction handlers are async, but model.predict and pymongo calls block.
+They run here instead, in bounded thread pools:
+- inference pool: model calls, with a per-model concurrency limit
+- I/O pool: blocking database work
+
+Tree traversal in sklearn releases the GIL, so threads give real parallelism
+without copying models into worker processes. Time spent waiting for a slot
+(semaphore + pool queue) is recorded per model as queue-wait.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from config import settings
+from services.metrics import Histogram, LATENCY_BUCKETS_MS
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceExecutor:
+    """Bounded thread pools for model inference and blocking I/O"""
+
+    def __init__(
+        self,
+        inference_workers: int = settings.INFERENCE_MAX_WORKERS,
+        io_workers: int = settings.IO_MAX_WORKERS,
+        model_concurrency: Optional[Dict[str, int]] = None
+    ):
+        """
+        Args:
+            inference_workers: Threads available to model calls
+            io_workers: Threads available to blocking I/O
+            model_concurrency: Maximum concurrent calls per model name
+        """
+        self.inference_workers = inference_workers
+        self.io_workers = io_workers
+        self.model_concurrency = dict(model_concurrency or settings.MODEL_MAX_CONCURRENCY)
+
+        self._inference_pool = ThreadPoolExecutor(
+            max_workers=inference_workers, thread_name_prefix="inference"
+        )
+        self._io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="io")
+
+        self._limiters: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._queue_wait: Dict[str, Histogram] = {}
+        self._run_time: Dict[str, Histogram] = {}
+        self._io_queue_wait = Histogram(LATENCY_BUCKETS_MS)
+
+    def _limiter(self, model_name: str) -> asyncio.Semaphore:
+        limiter = self._limiters.get(model_name)
+        if limiter is None:
+            limit = self.model_concurrency.get(model_name, self.inference_workers)
+            limiter = self._limiters[model_name] = asyncio.Semaphore(limit)
+            self._in_flight[model_name] = 0
+            self._queue_wait[model_name] = Histogram(LATENCY_BUCKETS_MS)
+            self._run_time[model_name] = Histogram(LATENCY_BUCKETS_MS)
+        return limiter
+
+    async def run_model(self, model_name: str, fn: Callable, *args) -> Any:
+        """
+        Run a model call in the inference pool
+
+        Args:
+            model_name: Model key used for the concurrency limit and metrics
+            fn: Blocking callable (e.g. model.predict)
+            *args: Arguments for fn
+
+        Returns:
+            Return value of fn
+        """
+        limiter = self._limiter(model_name)
+        queue_wait = self._queue_wait[model_name]
+        run_time = self._run_time[model_name]
+        enqueued = time.perf_counter()
+
+        def call():
+            started = time.perf_counter()
+            queue_wait.observe((started - enqueued) * 1000)
+            try:
+                return fn(*args)
+            finally:
+                run_time.observe((time.perf_counter() - started) * 1000)
+
+        async with limiter:
+            self._in_flight[model_name] += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._inference_pool, call)
+            finally:
+                self._in_flight[model_name] -= 1
+
+    async def run_io(self, fn: Callable, *args) -> Any:
+        """Run blocking I/O (e.g. a pymongo query) in the I/O pool"""
+        enqueued = time.perf_counter()
+
+        def call():
+            self._io_queue_wait.observe((time.perf_counter() - enqueued) * 1000)
+            return fn(*args)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_pool, call)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Queue-wait and run-time histograms (milliseconds) per model"""
+        return {
+            "inference_workers": self.inference_workers,
+            "io_workers": self.io_workers,
+            "models": {
+                name: {
+                    "max_concurrency": self.model_concurrency.get(name, self.inference_workers),
+                    "in_flight": self._in_flight[name],
+                    "queue_wait_ms": self._queue_wait[name].snapshot(),
+                    "run_time_ms": self._run_time[name].snapshot()
+                }
+                for name in list(self._limiters)
+            },
+            "io_queue_wait_ms": self._io_queue_wait.snapshot()
+        }
+
+    def shutdown(self):
+        """Stop accepting work and release pool threads"""
+        self._inference_pool.shutdown(wait=False, cancel_futures=True)
+        self._io_pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,162 @@
+"""
+Per-tree outputs of forest models and summaries computed from them
+
+A random forest's prediction is the mean over its trees, so the individual
+tree outputs come for free with every prediction. Keeping them, instead of
+only their mean, yields uncertainty estimates in the same traversal.
+
+Both compiled forests (services.compiled_forest) and fitted sklearn forests
+are supported. Derived methods are looked up by name with model_method(),
+so they can be served through routes.predictions.run_prediction (executor,
+prediction cache, micro-batching) like predict and predict_proba.
+"""
+
+import functools
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+from config import settings
+from services.compiled_forest import CompiledForest
+
+
+def per_tree_outputs(model, X) -> np.ndarray:
+    """
+    Output of every tree for every row
+
+    Args:
+        model: CompiledForest or fitted sklearn random forest
+        X: Feature matrix (n_rows, n_features)
+
+    Returns:
+        (n_rows, n_trees) for regressors,
+        (n_rows, n_trees, n_classes) class probabilities for classifiers
+    """
+    if isinstance(model, CompiledForest):
+        if model.aggregation != "mean":
+            raise ValueError("Per-tree outputs of a boosted model are not an ensemble of predictions")
+        return model.tree_outputs(X)
+
+    estimators = getattr(model, 'estimators_', None)
+    if estimators is None or np.ndim(estimators) != 1:
+        raise ValueError(f"{type(model).__name__} is not a random forest")
+
+    # Validate once, as sklearn's forest predict does, then skip per-tree checks
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    if getattr(model, 'classes_', None) is not None:
+        return np.stack([tree.predict_proba(X, check_input=False) for tree in estimators], axis=1)
+    return np.stack([tree.predict(X, check_input=False) for tree in estimators], axis=1)
+
+
+def predict_proba_spread(model, X) -> np.ndarray:
+    """
+    Class probabilities plus tree disagreement, from one forest traversal
+
+    Returns:
+        (n_rows, n_classes + 2): mean class probabilities (as predict_proba),
+        then the standard deviation across trees of the last class's
+        probability, then the share of trees whose own most probable class
+        is the forest's predicted class. Use split_proba_spread() to unpack.
+    """
+    votes = per_tree_outputs(model, X)
+    proba = votes.mean(axis=1, dtype=np.float64)
+    spread = votes[:, :, -1].std(axis=1, dtype=np.float64)
+    agreement = (votes.argmax(axis=2) == proba.argmax(axis=1)[:, None]).mean(axis=1)
+    return np.column_stack([proba, spread, agreement])
+
+
+def calibrate_probability(probability, calibration: Optional[Dict[str, Sequence[float]]]) -> np.ndarray:
+    """
+    Map forest probabilities through a model's probability calibration
+
+    Args:
+        probability: Forest probabilities (mean of the tree votes)
+        calibration: Model package 'probability_calibration', the knots of
+            the isotonic map fitted at training time ('x' increasing, 'y');
+            None for models trained without one
+
+    Returns:
+        Calibrated probabilities, linear between knots and clipped at the
+        ends as sklearn's IsotonicRegression predicts; the input unchanged
+        without a calibration
+    """
+    probability = np.asarray(probability, dtype=np.float64)
+    if not calibration:
+        return probability
+    return np.interp(probability, calibration['x'], calibration['y'])
+
+
+def supports_tree_outputs(model) -> bool:
+    """Whether per_tree_outputs() works for a model (random forests only)"""
+    if isinstance(model, CompiledForest):
+        return model.aggregation == "mean"
+    estimators = getattr(model, 'estimators_', None)
+    return estimators is not None and np.ndim(estimators) == 1
+
+
+def predict_quantiles(model, X, quantiles: Sequence[float] = settings.DISCHARGE_QUANTILES) -> np.ndarray:
+    """
+    Mean prediction plus quantiles of the per-tree predictions, in one traversal
+
+    The quantiles describe how far the trees disagree (a regression
+    forest's spread of plausible outcomes), not a calibrated interval.
+
+    Returns:
+        (n_rows, 1 + len(quantiles)): the mean (as predict), then one
+        column per quantile. Use split_quantiles() to unpack.
+    """
+    outputs = per_tree_outputs(model, X)
+    mean = outputs.mean(axis=1, dtype=np.float64)
+    levels = np.quantile(outputs.astype(np.float64), quantiles, axis=1)
+    return np.column_stack([mean, levels.T])
+
+
+def quantile_label(quantile: float) -> str:
+    """Response key for a quantile level (0.1 -> 'p10')"""
+    return f"p{round(quantile * 100):g}"
+
+
+def split_quantiles(outputs: np.ndarray, quantiles: Sequence[float] = settings.DISCHARGE_QUANTILES) -> Dict[str, np.ndarray]:
+    """
+    Unpack predict_quantiles outputs
+
+    Returns:
+        Dict with 'mean' and one entry per quantile label ('p10', ...)
+    """
+    outputs = np.atleast_2d(outputs)
+    result = {"mean": outputs[:, 0]}
+    for column, quantile in enumerate(quantiles, start=1):
+        result[quantile_label(quantile)] = outputs[:, column]
+    return result
+
+
+def split_proba_spread(outputs: np.ndarray, classes: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Unpack predict_proba_spread outputs
+
+    Returns:
+        Dict with 'label', 'proba' (n_rows, n_classes), 'spread' and 'agreement'
+    """
+    outputs = np.atleast_2d(outputs)
+    proba = outputs[:, :-2]
+    return {
+        "label": np.asarray(classes).take(proba.argmax(axis=1)),
+        "proba": proba,
+        "spread": outputs[:, -2],
+        "agreement": outputs[:, -1]
+    }
+
+
+# Methods computed from per-tree outputs, by the name used in run_prediction
+FOREST_METHODS: Dict[str, Callable[[Any, np.ndarray], np.ndarray]] = {
+    'predict_per_tree': per_tree_outputs,
+    'predict_proba_spread': predict_proba_spread,
+    'predict_quantiles': predict_quantiles
+}
+
+
+def model_method(model, method: str) -> Callable[[np.ndarray], np.ndarray]:
+    """Bound predictor for a model method or a derived forest method"""
+    if method in FOREST_METHODS:
+        return functools.partial(FOREST_METHODS[method], model)
+    return getattr(model, method)
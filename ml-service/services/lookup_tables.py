@@ -0,0 +1,371 @@
+"""
+Precomputed full-domain prediction tables
+
+The discharge and cleaning models only see small discrete inputs (ward,
+hour, weekday, month, day of month, and for cleaning a handful of common
+estimates) plus aggregates that are fixed per (ward, time of day). When
+enabled, the whole input grid is predicted in one vectorized pass per model
+and stored as a compact array, so serving a row is an array index instead
+of a forest traversal.
+
+A row is served from a table only if every discrete feature is on the grid
+and its aggregate features equal the values the table was built with.
+Anything else (unknown ward spellings, refreshed aggregates, unusual
+estimates) falls through to the live model, so a table can never return a
+prediction for inputs it was not built from.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import settings
+from utils import ward_to_numeric
+from utils.features import (
+    assemble_matrix,
+    calendar_columns,
+    cleaning_columns,
+    discharge_columns
+)
+
+logger = logging.getLogger(__name__)
+
+# Calendar features derived from the grid axes (never stored as context)
+DERIVED_COLUMNS = ('is_weekend', 'is_business_hours', 'time_of_day')
+
+# Defaults for calendar axes a model does not use
+CALENDAR_DEFAULTS = {'hour': 0, 'day_of_week': 0, 'month': 1, 'day_of_month': 1}
+
+
+class PredictionTable:
+    """Predictions for every point of a discrete input grid"""
+
+    def __init__(
+        self,
+        namespace: str,
+        model_package: dict,
+        axes: List[Tuple[str, np.ndarray]],
+        feature_columns: Sequence[str],
+        values: np.ndarray,
+        context: np.ndarray,
+        context_columns: List[str],
+        token: Any
+    ):
+        self.namespace = namespace
+        self.model_package = model_package
+        self.model_version = model_package.get('version', '1.0.0')
+        self.axes = axes
+        self.values = values
+        self.context = context
+        self.token = token
+
+        column_index = {name: j for j, name in enumerate(feature_columns)}
+        self._axis_cols = [column_index[name] for name, _ in axes]
+        self._ward_axis = [name for name, _ in axes].index('ward_encoded')
+        self._tod_col = column_index.get('time_of_day')
+        self._context_cols = [column_index[name] for name in context_columns]
+        self.context_columns = context_columns
+
+        self.build_seconds: Optional[float] = None
+        self.verification: Optional[Dict[str, Any]] = None
+        self.rows_served = 0
+        self.rows_missed = 0
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.values.nbytes + self.context.nbytes)
+
+    def lookup(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Read predictions for the rows of X
+
+        Returns:
+            Tuple of (values as float64, boolean mask of rows found in the
+            table); values of rows outside the table are meaningless
+        """
+        covered = np.ones(len(X), dtype=bool)
+        index = []
+        for (name, axis_values), col in zip(self.axes, self._axis_cols):
+            column = X[:, col]
+            position = np.searchsorted(axis_values, column).clip(0, len(axis_values) - 1)
+            covered &= axis_values[position] == column
+            index.append(position)
+
+        if self._tod_col is not None:
+            tod = X[:, self._tod_col].astype(np.int64).clip(0, self.context.shape[1] - 1)
+        else:
+            tod = np.zeros(len(X), dtype=np.int64)
+        expected = self.context[index[self._ward_axis], tod]
+        # NaN context (never built) compares unequal
+        covered &= np.all(X[:, self._context_cols] == expected, axis=1)
+
+        values = self.values[tuple(index)].astype(np.float64)
+        served = int(covered.sum())
+        self.rows_served += served
+        self.rows_missed += len(X) - served
+        return values, covered
+
+    def describe(self) -> Dict[str, Any]:
+        """Shape, memory usage and verification result"""
+        return {
+            "model_version": self.model_version,
+            "axes": {name: len(values) for name, values in self.axes},
+            "rows": int(self.values.size),
+            "dtype": str(self.values.dtype),
+            "memory_bytes": self.nbytes,
+            "memory_mb": round(self.nbytes / (1024 * 1024), 3),
+            "build_seconds": self.build_seconds,
+            "verification": self.verification,
+            "rows_served": self.rows_served,
+            "rows_missed": self.rows_missed
+        }
+
+
+def build_table(
+    namespace: str,
+    model_package: dict,
+    ward_names: Sequence[str],
+    extra_axes: List[Tuple[str, Sequence[float]]],
+    columns_fn: Callable[[Sequence[str], Dict[str, np.ndarray]], Dict[str, np.ndarray]],
+    token: Any = None,
+    chunk_rows: int = settings.LOOKUP_TABLE_CHUNK_ROWS,
+    verify_samples: int = settings.LOOKUP_TABLE_VERIFY_SAMPLES,
+    tolerance: float = settings.LOOKUP_TABLE_TOLERANCE,
+    dtype=np.float32
+) -> PredictionTable:
+    """
+    Predict the full input grid of a model and check it against the model
+
+    Args:
+        namespace: Table name ('<model>:<method>')
+        model_package: Loaded model package (model + feature_columns)
+        ward_names: Wards to enumerate (one per distinct ward code)
+        extra_axes: Additional enumerated features, e.g. estimated_duration
+        columns_fn: Builds feature columns from (ward names, calendar columns)
+        token: Identifies the aggregate inputs the table was built from
+        chunk_rows: Rows predicted per model call
+        verify_samples: Grid points re-predicted by the live model
+        tolerance: Maximum relative error accepted by verification
+
+    Raises:
+        ValueError: If the model's inputs are not a function of the grid,
+            or verification fails
+    """
+    started = time.perf_counter()
+    model = model_package['model']
+    feature_columns = list(model_package['feature_columns'])
+
+    # One canonical ward name per ward code
+    names_by_code: Dict[int, str] = {}
+    for ward in ward_names:
+        names_by_code.setdefault(ward_to_numeric(ward), ward)
+    codes = np.array(sorted(names_by_code), dtype=np.float64)
+    ward_lookup = np.array([names_by_code[int(c)] for c in codes], dtype=object)
+
+    candidate_axes = [
+        ('ward_encoded', codes),
+        ('hour', np.arange(24, dtype=np.float64)),
+        ('day_of_week', np.arange(7, dtype=np.float64)),
+        ('month', np.arange(1, 13, dtype=np.float64)),
+        ('day_of_month', np.arange(1, 32, dtype=np.float64)),
+    ] + [(name, np.unique(np.asarray(values, dtype=np.float64))) for name, values in extra_axes]
+    axes = [(name, values) for name, values in candidate_axes if name in feature_columns]
+    if not axes or axes[0][0] != 'ward_encoded':
+        raise ValueError(f"{namespace}: model does not use ward_encoded")
+
+    axis_names = [name for name, _ in axes]
+    shape = tuple(len(values) for _, values in axes)
+    total = int(np.prod(shape))
+
+    context_columns = [
+        col for col in feature_columns
+        if col not in axis_names and col not in DERIVED_COLUMNS
+    ]
+    context_cols = [feature_columns.index(col) for col in context_columns]
+    tod_col = feature_columns.index('time_of_day') if 'time_of_day' in feature_columns else None
+
+    def grid_matrix(flat_index: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        positions = np.unravel_index(flat_index, shape)
+        grid = {name: values[pos] for (name, values), pos in zip(axes, positions)}
+        n = len(flat_index)
+        calendar = calendar_columns(*(
+            grid.get(name, np.full(n, CALENDAR_DEFAULTS[name]))
+            for name in ('hour', 'day_of_week', 'month', 'day_of_month')
+        ))
+        wards = ward_lookup[positions[0]].tolist()
+        columns = columns_fn(wards, calendar)
+        for name in axis_names:
+            columns[name] = grid[name]
+        return assemble_matrix(columns, feature_columns, n), positions[0]
+
+    values = np.empty(total, dtype=dtype)
+    context = np.full((len(codes), 4, len(context_columns)), np.nan)
+    for start in range(0, total, chunk_rows):
+        flat_index = np.arange(start, min(start + chunk_rows, total))
+        X, ward_pos = grid_matrix(flat_index)
+        values[start:start + len(flat_index)] = model.predict(X)
+
+        tod = X[:, tod_col].astype(np.int64) if tod_col is not None else np.zeros(len(X), dtype=np.int64)
+        context[ward_pos, tod] = X[:, context_cols]
+        if not np.array_equal(context[ward_pos, tod], X[:, context_cols]):
+            raise ValueError(f"{namespace}: aggregate features vary within a (ward, time of day) cell")
+
+    table = PredictionTable(
+        namespace, model_package, axes, feature_columns,
+        values.reshape(shape), context, context_columns, token
+    )
+
+    # Consistency check: random grid points against the live model
+    rng = np.random.default_rng(settings.RANDOM_STATE)
+    sample = rng.choice(total, size=min(verify_samples, total), replace=False)
+    X_sample, _ = grid_matrix(np.sort(sample))
+    live = model.predict(X_sample).astype(np.float64)
+    looked_up, covered = table.lookup(X_sample)
+    table.rows_served = table.rows_missed = 0
+
+    abs_error = np.abs(looked_up - live)
+    rel_error = abs_error / np.maximum(np.abs(live), 1.0)
+    table.verification = {
+        "samples": int(len(sample)),
+        "all_covered": bool(covered.all()),
+        "max_abs_error": float(abs_error.max()),
+        "max_rel_error": float(rel_error.max()),
+        "tolerance": tolerance,
+        "passed": bool(covered.all() and rel_error.max() <= tolerance)
+    }
+    if not table.verification["passed"]:
+        raise ValueError(f"{namespace}: table verification failed {table.verification}")
+
+    table.build_seconds = round(time.perf_counter() - started, 3)
+    logger.info(
+        f"Lookup table {namespace} built: {total} rows, "
+        f"{table.nbytes / (1024 * 1024):.2f} MB in {table.build_seconds:.1f}s "
+        f"(max error {table.verification['max_abs_error']:.2e})"
+    )
+    return table
+
+
+class LookupTableManager:
+    """
+    Builds tables for the loaded models in the background and rebuilds them
+    when a model or its aggregate inputs change
+    """
+
+    def __init__(
+        self,
+        models: Dict[str, Any],
+        duration_stats,
+        executor,
+        enabled: bool = settings.LOOKUP_TABLES_ENABLED,
+        ward_names: Sequence[str] = settings.LOOKUP_TABLE_WARDS,
+        cleaning_estimates: Sequence[float] = settings.LOOKUP_TABLE_CLEANING_ESTIMATES,
+        check_seconds: int = settings.LOOKUP_TABLE_CHECK_SECONDS
+    ):
+        """
+        Args:
+            models: Shared model registry (routes.predictions.models)
+            duration_stats: DurationStatsEngine providing discharge aggregates
+            executor: InferenceExecutor whose I/O pool runs the builds
+            enabled: Whether tables are built and served at all
+            ward_names: Wards to enumerate
+            cleaning_estimates: estimated_duration values to enumerate
+            check_seconds: Interval between staleness checks
+        """
+        self.models = models
+        self.duration_stats = duration_stats
+        self.executor = executor
+        self.enabled = enabled
+        self.ward_names = list(ward_names)
+        self.cleaning_estimates = list(cleaning_estimates)
+        self.check_seconds = check_seconds
+
+        self.tables: Dict[str, PredictionTable] = {}
+        self.last_error: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _specs(self) -> List[Tuple[str, str, Any, Callable, list]]:
+        """(model name, namespace, token, columns_fn, extra axes) per table"""
+        stats = self.duration_stats
+        return [
+            (
+                'discharge', 'discharge:predict', stats.snapshot_token,
+                lambda wards, calendar: discharge_columns(wards, calendar, stats),
+                []
+            ),
+            (
+                'cleaning_duration', 'cleaning_duration:predict', None,
+                lambda wards, calendar: cleaning_columns(
+                    wards, calendar, np.zeros(len(wards))
+                ),
+                [('estimated_duration', self.cleaning_estimates)]
+            ),
+        ]
+
+    def get(self, namespace: str, model_package: dict) -> Optional[PredictionTable]:
+        """Table for a model package, or None if there is none for it"""
+        table = self.tables.get(namespace)
+        if table is None or table.model_package is not model_package:
+            return None
+        return table
+
+    async def refresh(self):
+        """Build every table whose model or aggregate inputs changed"""
+        for model_name, namespace, token, columns_fn, extra_axes in self._specs():
+            model_package = self.models.get(model_name)
+            if model_package is None:
+                self.tables.pop(namespace, None)
+                continue
+
+            current = self.tables.get(namespace)
+            if current is not None and current.model_package is model_package and current.token == token:
+                continue
+
+            try:
+                table = await self.executor.run_io(
+                    build_table, namespace, model_package, self.ward_names,
+                    extra_axes, columns_fn, token
+                )
+            except Exception as e:
+                self.last_error[namespace] = str(e)
+                logger.error(f"Failed to build lookup table {namespace}: {e}")
+                continue
+
+            self.tables[namespace] = table
+            self.last_error.pop(namespace, None)
+
+    async def _maintain_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Lookup table maintenance failed: {e}")
+            await asyncio.sleep(self.check_seconds)
+
+    def start(self):
+        """Start building tables in the background (no-op when disabled)"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._maintain_loop())
+
+    async def stop(self):
+        """Stop background maintenance"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Per-table shape, memory usage and verification result"""
+        return {
+            "enabled": self.enabled,
+            "total_memory_mb": round(sum(t.nbytes for t in self.tables.values()) / (1024 * 1024), 3),
+            "tables": {name: table.describe() for name, table in self.tables.items()},
+            "errors": dict(self.last_error)
+        }
@@ -0,0 +1,95 @@
+"""
+In-process service metrics
+
+Components register a provider (a callable returning a JSON-serialisable
+value) and GET /metrics returns the current value of every provider.
+"""
+
+import bisect
+import logging
+import threading
+from typing import Any, Callable, Dict, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsRegistry:
+    """Named metric providers collected on demand"""
+
+    def __init__(self):
+        self._providers: Dict[str, Callable[[], Any]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, provider: Callable[[], Any]):
+        """Register (or replace) a metric provider"""
+        with self._lock:
+            self._providers[name] = provider
+
+    def unregister(self, name: str):
+        """Remove a metric provider if present"""
+        with self._lock:
+            self._providers.pop(name, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Collect the current value of every provider"""
+        with self._lock:
+            providers = dict(self._providers)
+
+        values = {}
+        for name, provider in providers.items():
+            try:
+                values[name] = provider()
+            except Exception as e:
+                logger.error(f"Metric provider '{name}' failed: {e}")
+                values[name] = None
+        return values
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds (thread-safe)"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        """Record one observation"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Count, sum, mean, max and cumulative bucket counts"""
+        with self._lock:
+            counts = list(self._counts)
+            count, total, maximum = self.count, self.total, self.max
+
+        cumulative = {}
+        running = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            running += bucket_count
+            cumulative[f"le_{bound:g}"] = running
+        cumulative["le_inf"] = count
+
+        return {
+            "count": count,
+            "sum": round(total, 4),
+            "mean": round(total / count, 4) if count else None,
+            "max": round(maximum, 4),
+            "buckets": cumulative
+        }
+
+
+# Millisecond buckets for latency histograms
+LATENCY_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,164 @@
+"""
+Adaptive micro-batching for single-row predictions
+
+Concurrent single-item requests for the same model are merged into one
+vectorized model call. Batching is adaptive: when no batch for a model is
+running, a request is dispatched on the next event loop iteration, so it
+only waits for requests that arrived in the same tick. While a batch is
+running, new requests accumulate and are dispatched together once the
+model frees up, after max_wait_ms, or as soon as max_batch rows are
+waiting, whichever comes first. Light traffic therefore sees no added
+latency, and bursts turn into larger, cheaper batches.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from services.metrics import Histogram, LATENCY_BUCKETS_MS
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class _Queue:
+    """Pending rows and dispatch state for one batching key"""
+
+    def __init__(self):
+        self.rows: List[np.ndarray] = []
+        self.waiters: List[Tuple[asyncio.Future, float]] = []
+        self.compute: Optional[Callable[[np.ndarray], Awaitable[np.ndarray]]] = None
+        self.running = 0
+        self.timer: Optional[asyncio.Handle] = None
+
+
+class MicroBatcher:
+    """Merges concurrent single-row predictions into shared model calls"""
+
+    def __init__(
+        self,
+        max_wait_ms: float = settings.MICRO_BATCH_MAX_WAIT_MS,
+        max_batch: int = settings.MICRO_BATCH_MAX_SIZE,
+        enabled: bool = settings.MICRO_BATCH_ENABLED
+    ):
+        """
+        Args:
+            max_wait_ms: Longest a request waits for a running batch to finish
+            max_batch: Rows that trigger an immediate dispatch
+            enabled: When False, submit() calls compute directly
+        """
+        self.max_wait_ms = max_wait_ms
+        self.max_batch = max_batch
+        self.enabled = enabled
+
+        self._queues: Dict[Hashable, _Queue] = {}
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait = Histogram(LATENCY_BUCKETS_MS)
+        self.batches = 0
+        self.rows = 0
+
+    async def submit(
+        self,
+        key: Hashable,
+        X: np.ndarray,
+        compute: Callable[[np.ndarray], Awaitable[np.ndarray]]
+    ) -> np.ndarray:
+        """
+        Predict one row, sharing the model call with concurrent requests
+
+        Args:
+            key: Requests with equal keys may be batched together (model,
+                method and package identity)
+            X: Feature matrix with a single row
+            compute: Async callable returning outputs for a feature matrix;
+                the first queued request's callable runs the batch
+
+        Returns:
+            Outputs for X (leading dimension 1)
+        """
+        if not self.enabled:
+            return await compute(X)
+
+        loop = asyncio.get_running_loop()
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = _Queue()
+
+        future = loop.create_future()
+        queue.rows.append(X[0])
+        queue.waiters.append((future, time.perf_counter()))
+        if queue.compute is None:
+            queue.compute = compute
+
+        if len(queue.rows) >= self.max_batch:
+            self._dispatch(key, queue)
+        elif queue.timer is None:
+            # Idle model: go on the next tick; busy model: wait for it (bounded)
+            delay = 0 if queue.running == 0 else self.max_wait_ms / 1000
+            queue.timer = loop.call_later(delay, self._dispatch, key, queue)
+
+        return await future
+
+    def _dispatch(self, key: Hashable, queue: _Queue):
+        """Start one model call for everything queued under key"""
+        if queue.timer is not None:
+            queue.timer.cancel()
+            queue.timer = None
+        if not queue.rows:
+            return
+
+        rows, waiters, compute = queue.rows, queue.waiters, queue.compute
+        queue.rows, queue.waiters, queue.compute = [], [], None
+        queue.running += 1
+
+        now = time.perf_counter()
+        for _, enqueued in waiters:
+            self.queue_wait.observe((now - enqueued) * 1000)
+        self.batch_size.observe(len(rows))
+        self.batches += 1
+        self.rows += len(rows)
+
+        task = asyncio.ensure_future(compute(np.vstack(rows)))
+        task.add_done_callback(lambda t: self._complete(key, queue, waiters, t))
+
+    def _complete(self, key: Hashable, queue: _Queue, waiters, task: asyncio.Task):
+        """Hand each caller its row and release queued requests"""
+        queue.running -= 1
+
+        cancelled = task.cancelled()
+        error = None if cancelled else task.exception()
+        outputs = task.result() if not cancelled and error is None else None
+
+        for position, (future, _) in enumerate(waiters):
+            if future.done():
+                continue  # Caller went away
+            if cancelled:
+                future.cancel()
+            elif error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(outputs[position:position + 1])
+
+        if queue.rows:
+            # Requests queued behind this batch have waited for the model already
+            self._dispatch(key, queue)
+        elif queue.running == 0 and self._queues.get(key) is queue:
+            del self._queues[key]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Batch-size and queue-wait histograms"""
+        return {
+            "enabled": self.enabled,
+            "max_wait_ms": self.max_wait_ms,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": round(self.rows / self.batches, 3) if self.batches else None,
+            "batch_size": self.batch_size.snapshot(),
+            "queue_wait_ms": self.queue_wait.snapshot()
+        }
@@ -0,0 +1,251 @@
+"""
+Compact, versioned model artifact format
+
+A model artifact is a directory (e.g. models/discharge_model.forest/) with:
+- metadata.json: format version, model kind, feature columns, metrics,
+  version, classes, block index and a content hash
+- one raw .npy block per node array of the compiled forest: feature,
+  left, right, roots (int32), threshold and value (float32), optionally
+  missing_left (bool)
+
+Blocks are memory-mapped on load, so loading reads only the metadata and
+workers forked by serve.py (or separate processes) share the pages through
+the OS page cache. Reading an artifact needs NumPy only, not sklearn.
+
+The content hash is the SHA-256 of every block's bytes plus the metadata
+(without the hash itself); it is checked on load and doubles as the
+artifact identity for hot reload. Artifacts are written to a temporary
+directory and renamed into place, so readers never see a partial artifact.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from services.compiled_forest import CompiledForest, check_parity, parity_samples
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT = "bedmanager-forest"
+ARTIFACT_FORMAT_VERSION = 1
+ARTIFACT_SUFFIX = ".forest"
+METADATA_FILE = "metadata.json"
+
+# Package keys stored in metadata (everything but the model itself)
+PACKAGE_KEYS = (
+    'feature_columns', 'metrics', 'trained_at', 'version', 'model_type', 'horizons', 'hour_availability_rates',
+    'ward_occupancy_rates', 'ward_features', 'probability_calibration'
+)
+
+
+def artifact_path_for(model_path: str) -> str:
+    """Artifact directory next to a .pkl path (models/x_model.pkl -> models/x_model.forest)"""
+    return os.path.splitext(model_path)[0] + ARTIFACT_SUFFIX
+
+
+def is_artifact(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, METADATA_FILE))
+
+
+def _jsonable(value):
+    """Convert NumPy scalars/arrays in metrics and labels to JSON types"""
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _content_hash(metadata: Dict[str, Any], blocks: Dict[str, np.ndarray]) -> str:
+    digest = hashlib.sha256()
+    unhashed = {key: value for key, value in metadata.items() if key != 'content_sha256'}
+    digest.update(json.dumps(unhashed, sort_keys=True, default=str).encode())
+    for name in sorted(blocks):
+        digest.update(name.encode())
+        digest.update(np.ascontiguousarray(blocks[name]).tobytes())
+    return digest.hexdigest()
+
+
+def read_metadata(path: str) -> Dict[str, Any]:
+    with open(os.path.join(path, METADATA_FILE)) as metadata_file:
+        return json.load(metadata_file)
+
+
+def artifact_digest(path: str) -> str:
+    """Content hash recorded in an artifact's metadata"""
+    return read_metadata(path)['content_sha256']
+
+
+def save_artifact(model_package: Dict[str, Any], path: str, value_dtype=np.float32) -> Dict[str, Any]:
+    """
+    Write a model package as a compact artifact
+
+    The forest is compiled and checked against the sklearn model first; an
+    artifact that does not reproduce the model's outputs is never written.
+
+    Args:
+        model_package: Package dict as written by the training scripts
+        path: Artifact directory to create (replaced if it exists)
+        value_dtype: dtype of stored node outputs
+
+    Returns:
+        The artifact metadata
+    """
+    model = model_package['model']
+    compiled = CompiledForest.from_sklearn(model, value_dtype=value_dtype)
+    parity = check_parity(model, compiled, parity_samples(compiled))
+    if not parity['passed']:
+        raise ValueError(f"Compiled forest does not match the model: {parity}")
+
+    blocks = {
+        'feature': compiled.feature.astype(np.int32),
+        'threshold': compiled.threshold.astype(np.float32),
+        'left': compiled.left.astype(np.int32),
+        'right': compiled.right.astype(np.int32),
+        'roots': compiled.roots.astype(np.int32),
+        'value': compiled.value.astype(value_dtype)
+    }
+    if compiled.missing_left is not None and compiled.missing_left.any():
+        blocks['missing_left'] = compiled.missing_left.astype(bool)
+
+    metadata = {
+        "format": ARTIFACT_FORMAT,
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "created_at": datetime.utcnow().isoformat(),
+        "estimator": type(model).__name__,
+        "n_features": compiled.n_features,
+        "n_trees": compiled.n_trees,
+        "max_depth": compiled.max_depth,
+        "aggregation": compiled.aggregation,
+        "scale": compiled.scale,
+        "bias": compiled.bias,
+        "classes": _jsonable(compiled.classes_) if compiled.classes_ is not None else None,
+        "parity": parity,
+        "package": {key: _jsonable(model_package[key]) for key in PACKAGE_KEYS if key in model_package},
+        "blocks": {
+            name: {"file": f"{name}.npy", "dtype": str(array.dtype), "shape": list(array.shape)}
+            for name, array in blocks.items()
+        }
+    }
+    metadata["content_sha256"] = _content_hash(metadata, blocks)
+
+    # Write next to the target, then swap directories
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    staging = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for name, array in blocks.items():
+        np.save(os.path.join(staging, f"{name}.npy"), array, allow_pickle=False)
+    with open(os.path.join(staging, METADATA_FILE), 'w') as metadata_file:
+        json.dump(metadata, metadata_file, indent=2, default=str)
+
+    retired = None
+    if os.path.exists(path):
+        retired = f"{path}.old-{os.getpid()}"
+        os.rename(path, retired)
+    os.rename(staging, path)
+    if retired is not None:
+        shutil.rmtree(retired, ignore_errors=True)
+
+    return metadata
+
+
+def load_artifact(path: str, mmap_mode: Optional[str] = 'r', verify: bool = True) -> Dict[str, Any]:
+    """
+    Load an artifact as a model package
+
+    The returned package has the usual keys ('model', 'feature_columns',
+    'version', ...). 'model' is the CompiledForest itself, which offers
+    predict/predict_proba/classes_ like the sklearn model.
+
+    Args:
+        path: Artifact directory
+        mmap_mode: NumPy mmap_mode for the blocks ('r' shares pages, None reads)
+        verify: Check the content hash
+
+    Returns:
+        Model package dict
+    """
+    metadata = read_metadata(path)
+    if metadata.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"{path} is not a {ARTIFACT_FORMAT} artifact")
+    if metadata.get('format_version', 0) > ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version {metadata['format_version']}")
+
+    blocks = {
+        name: np.load(os.path.join(path, block['file']), mmap_mode=mmap_mode, allow_pickle=False)
+        for name, block in metadata['blocks'].items()
+    }
+    if verify and _content_hash(metadata, blocks) != metadata['content_sha256']:
+        raise ValueError(f"Content hash mismatch for {path}")
+
+    classes = metadata.get('classes')
+    forest = CompiledForest(
+        feature=blocks['feature'],
+        threshold=blocks['threshold'],
+        left=blocks['left'],
+        right=blocks['right'],
+        value=blocks['value'],
+        roots=blocks['roots'],
+        max_depth=metadata['max_depth'],
+        n_features=metadata['n_features'],
+        classes=np.asarray(classes) if classes is not None else None,
+        missing_left=blocks.get('missing_left'),
+        aggregation=metadata.get('aggregation', 'mean'),
+        scale=metadata.get('scale', 1.0),
+        bias=metadata.get('bias', 0.0)
+    )
+
+    model_package = dict(metadata['package'])
+    model_package['model'] = forest
+    model_package['artifact_sha256'] = metadata['content_sha256']
+    model_package['artifact'] = {
+        "path": path,
+        "format_version": metadata['format_version'],
+        "estimator": metadata['estimator'],
+        "created_at": metadata['created_at'],
+        "parity": metadata['parity']
+    }
+    return model_package
+
+
+def artifact_size_bytes(path: str) -> int:
+    """Total size of an artifact directory on disk"""
+    return sum(
+        os.path.getsize(os.path.join(path, name))
+        for name in os.listdir(path)
+        if os.path.isfile(os.path.join(path, name))
+    )
+
+
+def convert_pickle(model_path: str, artifact_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Write the artifact for an existing joblib .pkl package
+
+    Returns:
+        Dict with both paths, sizes and conversion time
+    """
+    import joblib
+
+    started = time.perf_counter()
+    artifact_path = artifact_path or artifact_path_for(model_path)
+    save_artifact(joblib.load(model_path), artifact_path)
+    return {
+        "pickle": model_path,
+        "artifact": artifact_path,
+        "pickle_mb": round(os.path.getsize(model_path) / 1024 ** 2, 3),
+        "artifact_mb": round(artifact_size_bytes(artifact_path) / 1024 ** 2, 3),
+        "convert_seconds": round(time.perf_counter() - started, 3)
+    }
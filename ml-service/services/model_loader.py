@@ -0,0 +1,167 @@
+"""
+Model loading and warm-up
+
+Model packages are loaded concurrently, one thread per file: compact
+artifacts (services.model_artifact) are memory-mapped, legacy .pkl packages
+go through joblib (optionally memory-mapping their NumPy arrays). joblib,
+and the sklearn modules it unpickles, are only imported for .pkl packages.
+Each model is warmed up with a prediction through every code path it will
+serve before the service reports ready.
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from services.compiled_forest import CompiledForest
+from services.forest_outputs import model_method
+from services.model_artifact import artifact_size_bytes, is_artifact, load_artifact
+
+logger = logging.getLogger(__name__)
+
+
+def resident_memory_bytes() -> Optional[int]:
+    """Current resident set size of this process (None if unavailable)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # Peak rather than current RSS, in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+    except Exception:
+        return None
+
+
+def model_nbytes(model_package: Dict[str, Any]) -> int:
+    """Bytes held by the tree arrays of a loaded package (sklearn + compiled)"""
+    total = 0
+    model = model_package.get('model')
+    estimators = getattr(model, 'estimators_', None)
+    for estimator in np.ravel(estimators) if estimators is not None else []:
+        state = estimator.tree_.__getstate__()
+        total += state['nodes'].nbytes + state['values'].nbytes
+    compiled = model_package.get('compiled')
+    if compiled is not None:
+        total += compiled.nbytes
+    elif isinstance(model, CompiledForest):
+        total += model.nbytes
+    return total
+
+
+def file_size_bytes(path: str) -> int:
+    """Size on disk of a .pkl file or an artifact directory"""
+    return artifact_size_bytes(path) if os.path.isdir(path) else os.path.getsize(path)
+
+
+def load_model_package(path: str, mmap_mode: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Load one model package (compact artifact directory or joblib .pkl)
+
+    Args:
+        path: Artifact directory or path to the .pkl file
+        mmap_mode: joblib mmap_mode for NumPy arrays in .pkl files
+            ('r', 'c' or None); artifacts are always memory-mapped
+
+    Returns:
+        The package dict
+    """
+    if is_artifact(path):
+        return load_artifact(path, mmap_mode='r', verify=settings.MODEL_ARTIFACT_VERIFY)
+    
+    import joblib  # Deferred: pulls in NumPy pickling support and sklearn on load
+    return joblib.load(path, mmap_mode=mmap_mode)
+
+
+def load_models_parallel(
+    paths: Dict[str, str],
+    max_workers: int = settings.MODEL_LOAD_WORKERS,
+    mmap_mode: Optional[str] = settings.MODEL_MMAP_MODE,
+    post_load: Optional[Callable[[Dict[str, Any]], Any]] = None
+) -> Tuple[Dict[str, Optional[Dict[str, Any]]], Dict[str, Dict[str, Any]]]:
+    """
+    Load several model packages concurrently
+
+    Args:
+        paths: Model name -> file path
+        max_workers: Loader threads
+        mmap_mode: joblib mmap_mode passed to every load
+        post_load: Optional per-package step run in the same thread
+            (e.g. compiling the forest)
+
+    Returns:
+        (packages, report): package per model (None if missing or failed)
+        and per-model load time, size and error
+    """
+    def load(name: str, path: str):
+        started = time.perf_counter()
+        if not os.path.exists(path):
+            return None, {"status": "missing", "path": path}
+        try:
+            model_package = load_model_package(path, mmap_mode)
+            load_seconds = time.perf_counter() - started
+            if post_load is not None:
+                post_load(model_package)
+        except Exception as e:
+            return None, {"status": "failed", "path": path, "error": str(e)}
+        return model_package, {
+            "status": "loaded",
+            "path": path,
+            "format": "artifact" if is_artifact(path) else "pickle",
+            "file_mb": round(file_size_bytes(path) / 1024 ** 2, 3),
+            "load_seconds": round(load_seconds, 3),
+            "total_seconds": round(time.perf_counter() - started, 3),
+            "resident_mb": round(model_nbytes(model_package) / 1024 ** 2, 3),
+            "mmap_mode": mmap_mode
+        }
+
+    started = time.perf_counter()
+    rss_before = resident_memory_bytes()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="model-load") as pool:
+        futures = {name: pool.submit(load, name, path) for name, path in paths.items()}
+        results = {name: future.result() for name, future in futures.items()}
+
+    packages = {name: model_package for name, (model_package, _) in results.items()}
+    report = {name: info for name, (_, info) in results.items()}
+
+    rss_after = resident_memory_bytes()
+    report_summary = {
+        "wall_seconds": round(time.perf_counter() - started, 3),
+        "rss_mb": round(rss_after / 1024 ** 2, 1) if rss_after else None,
+        "rss_delta_mb": round((rss_after - rss_before) / 1024 ** 2, 1) if rss_after and rss_before else None
+    }
+    return packages, {"models": report, **report_summary}
+
+
+def warm_up(model_package: Dict[str, Any], batch_rows: int = 0) -> float:
+    """
+    Run throwaway predictions through every predictor of a package
+
+    Touches the compiled evaluator with one row and sklearn with a batch
+    above COMPILED_FOREST_MAX_ROWS, so first requests do not pay for lazy
+    imports, thread pool start-up or cold pages.
+
+    Returns:
+        Warm-up time in milliseconds
+    """
+    started = time.perf_counter()
+    model = model_package['model']
+    n_features = len(model_package['feature_columns'])
+    batch_rows = batch_rows or settings.COMPILED_FOREST_MAX_ROWS + 1
+    # Classifiers are served through their per-tree votes (predict_proba_spread)
+    method = 'predict_proba_spread' if getattr(model, 'classes_', None) is not None else 'predict'
+
+    compiled = model_package.get('compiled')
+    if compiled is not None:
+        model_method(compiled, method)(np.zeros((1, n_features)))
+    model_method(model, method)(np.zeros((batch_rows, n_features)))
+
+    return (time.perf_counter() - started) * 1000
@@ -0,0 +1,270 @@
+"""
+Zero-downtime model reload
+
+A new artifact is loaded, compiled and warmed up in the background, then
+swapped into the shared models dict with a single assignment. Requests that
+already hold the old package finish on it; new requests get the new one.
+The package it replaced is kept so it can be swapped back instantly.
+
+Reloads are triggered by the admin endpoints or by a watcher that polls the
+model files (size + mtime) and reloads a file once it has stopped changing.
+A rollback pins the model: the watcher leaves it alone until an explicit
+reload, so a bad artifact on disk is not picked up again.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import settings
+from services.compiled_forest import compile_model_package
+from services.model_artifact import METADATA_FILE, artifact_digest, is_artifact
+from services.model_loader import load_model_package, warm_up
+
+logger = logging.getLogger(__name__)
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """(size, mtime_ns) of a file, or None if it does not exist"""
+    if os.path.isdir(path):
+        # Artifacts are renamed into place whole; metadata.json is their identity
+        path = os.path.join(path, METADATA_FILE)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def file_sha256(path: str) -> str:
+    """Hex SHA-256 of a file's contents (content hash for artifacts)"""
+    if is_artifact(path):
+        return artifact_digest(path)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as artifact:
+        for block in iter(lambda: artifact.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelReloader:
+    """Background reload, atomic swap and rollback of served models"""
+
+    def __init__(
+        self,
+        models: Dict[str, Any],
+        paths: Dict[str, str],
+        executor=None,
+        on_swap: Optional[Callable[[str, Optional[Dict[str, Any]]], None]] = None,
+        poll_seconds: float = settings.MODEL_RELOAD_POLL_SECONDS
+    ):
+        """
+        Args:
+            models: Shared model registry (routes.predictions.models)
+            paths: Model name -> artifact path
+            executor: InferenceExecutor whose I/O pool runs loads (optional)
+            on_swap: Called with (name, package) after every swap
+            poll_seconds: Watcher interval; 0 disables the watcher
+        """
+        self.models = models
+        self.paths = dict(paths)
+        self.executor = executor
+        self.on_swap = on_swap
+        self.poll_seconds = poll_seconds
+
+        self.previous: Dict[str, Optional[Dict[str, Any]]] = {}
+        self.pinned: Dict[str, bool] = {name: False for name in paths}
+        self.history = deque(maxlen=50)
+
+        # Signature of the file currently served, and of the last poll
+        self._served_signature: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._last_seen: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._locks = {name: asyncio.Lock() for name in paths}
+        self._task: Optional[asyncio.Task] = None
+
+    def track_loaded(self):
+        """Record the files behind the models loaded at startup"""
+        for name, path in self.paths.items():
+            model_package = self.models.get(name)
+            signature = file_signature(path)
+            self._served_signature[name] = signature
+            self._last_seen[name] = signature
+            if model_package is not None and 'artifact_sha256' not in model_package and signature:
+                model_package['artifact_sha256'] = file_sha256(path)
+
+    async def _run_blocking(self, fn, *args):
+        if self.executor is not None:
+            return await self.executor.run_io(fn, *args)
+        return await asyncio.to_thread(fn, *args)
+
+    def _prepare(self, name: str, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Load, validate, compile and warm up an artifact (blocking)
+
+        Returns:
+            The new package, or None if the file is identical to the served one
+        """
+        artifact_sha256 = file_sha256(path)
+        current = self.models.get(name)
+        if current is not None and current.get('artifact_sha256') == artifact_sha256:
+            return None
+
+        model_package = load_model_package(path, settings.MODEL_MMAP_MODE)
+        if not isinstance(model_package, dict) or 'model' not in model_package:
+            raise ValueError("Artifact is not a model package")
+        if 'feature_columns' not in model_package:
+            raise ValueError("Model package has no feature_columns")
+        model_package['artifact_sha256'] = artifact_sha256
+
+        # Retrains often keep the same declared version; the content hash makes
+        # every reloaded version name the artifact that serves it (responses
+        # and prediction cache keys never mix two models under one version)
+        version = model_package.get('version', '1.0.0')
+        model_package['version'] = f"{version}+{artifact_sha256[:8]}"
+
+        if settings.COMPILED_FORESTS_ENABLED:
+            compile_model_package(model_package)
+        warm_up(model_package)
+        return model_package
+
+    def _swap(self, name: str, model_package: Optional[Dict[str, Any]]):
+        """Install a package; in-flight requests keep the one they hold"""
+        self.previous[name] = self.models.get(name)
+        self.models[name] = model_package
+        if self.on_swap is not None:
+            self.on_swap(name, model_package)
+
+    def _record(self, name: str, action: str, status: str, version: Optional[str] = None, error: Optional[str] = None):
+        event = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "model": name,
+            "action": action,
+            "status": status,
+            "version": version,
+            "error": error
+        }
+        self.history.append(event)
+        return event
+
+    async def reload(self, name: str, reason: str = "manual") -> Dict[str, Any]:
+        """
+        Load the model's artifact in the background and swap it in
+
+        Args:
+            name: Model name
+            reason: 'manual' (admin call, also unpins) or 'watcher'
+
+        Returns:
+            History event describing the outcome
+        """
+        if name not in self.paths:
+            raise KeyError(name)
+
+        async with self._locks[name]:
+            path = self.paths[name]
+            signature = file_signature(path)
+            if signature is None:
+                return self._record(name, f"reload:{reason}", "failed", error=f"Model file not found at {path}")
+
+            try:
+                model_package = await self._run_blocking(self._prepare, name, path)
+            except Exception as e:
+                logger.error(f"Reload of {name} model failed, keeping current version: {e}")
+                # Do not retry the same bad file on every poll
+                self._served_signature[name] = signature
+                return self._record(name, f"reload:{reason}", "failed", error=str(e))
+
+            self._served_signature[name] = signature
+            if reason == "manual":
+                self.pinned[name] = False
+            if model_package is None:
+                version = self.models[name].get('version', '1.0.0')
+                return self._record(name, f"reload:{reason}", "unchanged", version=version)
+
+            old_version = (self.models.get(name) or {}).get('version')
+            self._swap(name, model_package)
+
+            version = model_package.get('version', '1.0.0')
+            logger.info(f"✓ {name} model swapped: {old_version} -> {version} ({reason})")
+            return self._record(name, f"reload:{reason}", "swapped", version=version)
+
+    async def rollback(self, name: str) -> Dict[str, Any]:
+        """Swap the previously served package back in and pin it"""
+        if name not in self.paths:
+            raise KeyError(name)
+
+        async with self._locks[name]:
+            previous = self.previous.get(name)
+            if previous is None:
+                return self._record(name, "rollback", "failed", error="No previous version to roll back to")
+
+            self._swap(name, previous)
+            self.pinned[name] = True
+            version = previous.get('version', '1.0.0')
+            logger.info(f"✓ {name} model rolled back to {version} (pinned)")
+            return self._record(name, "rollback", "swapped", version=version)
+
+    async def check_files(self):
+        """Reload models whose file changed and has been stable for one poll"""
+        for name, path in self.paths.items():
+            signature = file_signature(path)
+            stable = signature is not None and signature == self._last_seen.get(name)
+            self._last_seen[name] = signature
+
+            if self.pinned[name] or not stable or signature == self._served_signature.get(name):
+                continue
+            await self.reload(name, reason="watcher")
+
+    async def _watch_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                await self.check_files()
+            except Exception as e:
+                logger.error(f"Model file watcher failed: {e}")
+
+    def start(self):
+        """Start the file watcher (no-op when poll_seconds is 0)"""
+        if self.poll_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._watch_loop())
+            logger.info(f"Watching model files every {self.poll_seconds}s for hot reload")
+
+    async def stop(self):
+        """Stop the file watcher"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        """Served and rollback versions per model, plus recent events"""
+        def describe(model_package):
+            if model_package is None:
+                return None
+            return {
+                "version": model_package.get('version', '1.0.0'),
+                "artifact_sha256": model_package.get('artifact_sha256'),
+                "compiled": 'compiled' in model_package
+            }
+
+        return {
+            "watching": self._task is not None,
+            "poll_seconds": self.poll_seconds,
+            "models": {
+                name: {
+                    "path": path,
+                    "served": describe(self.models.get(name)),
+                    "previous": describe(self.previous.get(name)),
+                    "pinned": self.pinned[name]
+                }
+                for name, path in self.paths.items()
+            },
+            "history": list(self.history)
+        }
@@ -0,0 +1,137 @@
+"""
+Shared MongoDB client
+
+One pooled MongoClient is created in the app lifespan, configured from
+config.Settings, handed to the background engines and, through the
+get_database dependency, to the forecast routes, and closed on shutdown.
+Connection pool events feed utilisation gauges.
+"""
+
+import logging
+import threading
+from typing import Any, Dict
+
+from fastapi import HTTPException, Request
+from pymongo import MongoClient, monitoring
+from pymongo.database import Database
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Tracks connection pool gauges from pymongo pool events"""
+
+    def __init__(self, max_pool_size: int):
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self.open = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.checkouts_total = 0
+        self.checkout_failures_total = 0
+        self.pool_cleared_total = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_cleared_total += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open = max(0, self.open - 1)
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self.waiting += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting = max(0, self.waiting - 1)
+            self.checkout_failures_total += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.waiting = max(0, self.waiting - 1)
+            self.in_use += 1
+            self.checkouts_total += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current pool gauges and counters"""
+        with self._lock:
+            return {
+                "open_connections": self.open,
+                "in_use": self.in_use,
+                "available": max(0, self.open - self.in_use),
+                "waiting": self.waiting,
+                "max_pool_size": self.max_pool_size,
+                "utilisation": round(self.in_use / self.max_pool_size, 4) if self.max_pool_size else None,
+                "checkouts_total": self.checkouts_total,
+                "checkout_failures_total": self.checkout_failures_total,
+                "pool_cleared_total": self.pool_cleared_total
+            }
+
+
+def create_mongo_client(pool_monitor: PoolMonitor = None) -> MongoClient:
+    """
+    Create the shared pooled client from settings
+
+    The client connects lazily in the background, so this does not block
+    startup when MongoDB is unavailable.
+    """
+    listeners = [pool_monitor] if pool_monitor is not None else []
+    client = MongoClient(
+        settings.MONGO_URI,
+        maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=settings.MONGO_SOCKET_TIMEOUT_MS,
+        readPreference=settings.MONGO_READ_PREFERENCE,
+        event_listeners=listeners,
+        appname=settings.SERVICE_NAME
+    )
+    logger.info(
+        f"MongoDB client created (maxPoolSize={settings.MONGO_MAX_POOL_SIZE}, "
+        f"readPreference={settings.MONGO_READ_PREFERENCE})"
+    )
+    return client
+
+
+def default_database(client: MongoClient) -> Database:
+    """Database named in MONGO_URI (MONGO_DEFAULT_DB if the URI has none)"""
+    return client.get_default_database(settings.MONGO_DEFAULT_DB)
+
+
+def get_database(request: Request) -> Database:
+    """
+    FastAPI dependency returning the configured database on the shared
+    client (used by the routes that query MongoDB per request, the
+    forecasts; predictions read in-memory engines instead)
+    """
+    client = getattr(request.app.state, 'mongo_client', None)
+    if client is None:
+        raise HTTPException(status_code=503, detail="Database client not initialised")
+    return default_database(client)
@@ -0,0 +1,189 @@
+"""
+Ward occupancy forecast from batch-scored discharge predictions
+
+Currently occupied beds are read with one aggregation (capacity per ward
+plus each occupied bed's admission time), scored by the discharge model in a
+single call, and turned into hourly expected-occupancy curves without
+per-bed Python loops:
+
+1. The discharge forest's per-tree predictions of total stay length give
+   each bed a distribution of discharge times; trees predicting a stay
+   shorter than the time already spent are dropped (the patient is still
+   there), so the distribution is conditional on the elapsed stay
+2. Each bed's probability mass is binned by discharge hour and summed per
+   ward with one np.bincount
+3. np.cumsum over hours gives expected discharges so far; expected
+   occupancy is the current count minus that
+
+A manager-set estimatedDischargeTime on a bed overrides the model. New
+admissions are not included: the curve is how today's patients leave.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from pymongo.database import Database
+
+logger = logging.getLogger(__name__)
+
+
+def build_ward_beds_pipeline(ward: Optional[str] = None) -> list:
+    """
+    Aggregation returning bed capacity per ward and every occupied bed
+
+    Each occupied bed gets its admission time from its latest 'assigned'
+    occupancy log (bed updatedAt if there is none).
+
+    Args:
+        ward: Restrict to one ward (all wards if None)
+
+    Returns:
+        MongoDB aggregation pipeline over `beds`
+    """
+    match = {'ward': ward} if ward else {}
+    return [
+        {'$match': match},
+        {'$facet': {
+            'capacity': [
+                {'$group': {'_id': '$ward', 'beds': {'$sum': 1}}}
+            ],
+            'occupied': [
+                {'$match': {'status': 'occupied'}},
+                {'$lookup': {
+                    'from': 'occupancylogs',
+                    'let': {'bed': '$_id'},
+                    'pipeline': [
+                        {'$match': {'$expr': {'$eq': ['$bedId', '$$bed']}, 'statusChange': 'assigned'}},
+                        {'$sort': {'timestamp': -1}},
+                        {'$limit': 1},
+                        {'$project': {'_id': 0, 'timestamp': 1}}
+                    ],
+                    'as': 'admission'
+                }},
+                {'$project': {
+                    '_id': 0,
+                    'bedId': 1,
+                    'ward': 1,
+                    'estimatedDischargeTime': 1,
+                    'admission_time': {'$ifNull': [{'$first': '$admission.timestamp'}, '$updatedAt']}
+                }}
+            ]
+        }}
+    ]
+
+
+def fetch_ward_beds(db: Database, ward: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run the ward beds aggregation (blocking)
+
+    Returns:
+        Dict with 'capacity' (ward -> bed count) and 'occupied' (list of
+        bedId/ward/admission_time/estimatedDischargeTime dicts)
+    """
+    result = next(db.beds.aggregate(build_ward_beds_pipeline(ward)), None) or {}
+    return {
+        "capacity": {group['_id']: group['beds'] for group in result.get('capacity', [])},
+        "occupied": result.get('occupied', [])
+    }
+
+
+def remaining_stay_hours(
+    tree_hours: np.ndarray,
+    elapsed_hours: np.ndarray,
+    manual_remaining_hours: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Hours until discharge per bed and tree, given the stay so far
+
+    Trees predicting a stay shorter than the elapsed one are inconsistent
+    with the bed still being occupied and are marked NaN; beds where every
+    tree is (overdue beds) are expected to leave right away (0). A
+    manager-set discharge time replaces all trees of its bed.
+
+    Args:
+        tree_hours: (n_beds, n_trees) predicted total stay in hours per tree
+            (a single column for point predictions)
+        elapsed_hours: Hours since admission per bed
+        manual_remaining_hours: Hours until a manager-set discharge time per
+            bed (NaN where not set)
+
+    Returns:
+        (n_beds, n_trees) remaining hours, NaN for dropped trees
+    """
+    remaining = np.atleast_2d(tree_hours).astype(np.float64) - np.asarray(elapsed_hours, dtype=np.float64)[:, None]
+
+    if manual_remaining_hours is not None:
+        manual = np.asarray(manual_remaining_hours, dtype=np.float64)
+        has_manual = ~np.isnan(manual)
+        remaining[has_manual] = np.maximum(manual[has_manual], 0.0)[:, None]
+
+    still_there = remaining > 0
+    overdue = ~still_there.any(axis=1)
+    remaining[~still_there] = np.nan
+    remaining[overdue] = 0.0
+    return remaining
+
+
+def occupancy_curves(
+    ward_index: np.ndarray,
+    n_wards: int,
+    tree_hours: np.ndarray,
+    elapsed_hours: np.ndarray,
+    horizon_hours: int,
+    manual_remaining_hours: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Expected discharges and occupancy per ward for hours 0..horizon_hours
+
+    Args:
+        ward_index: Ward position (0..n_wards-1) per occupied bed
+        n_wards: Number of wards
+        tree_hours: (n_beds, n_trees) predicted total stay in hours per tree
+            (a single column for point predictions)
+        elapsed_hours: Hours since admission per bed
+        horizon_hours: Last hour of the curves
+        manual_remaining_hours: Hours until a manager-set discharge time per
+            bed (NaN where not set)
+
+    Returns:
+        Dict with 'occupied' (n_wards,) current counts,
+        'discharges' (n_wards, horizon_hours) expected discharges per hour
+        and 'expected_occupied' (n_wards, horizon_hours + 1) from hour 0
+    """
+    ward_index = np.asarray(ward_index, dtype=np.intp)
+
+    # Condition on the patient still being there; overdue beds leave in the next hour
+    remaining = remaining_stay_hours(tree_hours, elapsed_hours, manual_remaining_hours)
+    kept = ~np.isnan(remaining)
+    weights = kept / kept.sum(axis=1, keepdims=True)
+
+    # Discharge hour 1..horizon, horizon + 1 = after the horizon
+    hour = np.clip(np.ceil(np.nan_to_num(remaining, nan=0.0)), 1, horizon_hours + 1).astype(np.intp)
+    n_bins = horizon_hours + 2
+    flat = (ward_index[:, None] * n_bins + hour).ravel()
+    discharges = np.bincount(flat, weights=weights.ravel(), minlength=n_wards * n_bins).reshape(n_wards, n_bins)
+    discharges = discharges[:, 1:horizon_hours + 1]
+
+    occupied = np.bincount(ward_index, minlength=n_wards).astype(np.float64)
+    cumulative = np.cumsum(discharges, axis=1)
+    expected_occupied = np.column_stack([occupied, occupied[:, None] - cumulative])
+    return {
+        "occupied": occupied,
+        "discharges": discharges,
+        "expected_occupied": np.maximum(expected_occupied, 0.0)
+    }
+
+
+def hours_between(later: List[Optional[datetime]], earlier: datetime) -> np.ndarray:
+    """Hours from earlier to each datetime (NaN for None)"""
+    return np.array(
+        [(value - earlier).total_seconds() / 3600 if value is not None else np.nan for value in later],
+        dtype=np.float64
+    )
+
+
+def hours_since(earlier: List[Optional[datetime]], now: datetime) -> np.ndarray:
+    """Hours from each datetime to now, e.g. the stay so far (NaN for None)"""
+    return -hours_between(earlier, now)
@@ -0,0 +1,120 @@
+"""
+Occupancy sessions: 'assigned' and 'released' logs paired into stays
+
+Discharge training pairs each release with the bed's most recent unclosed
+admission; releases with no open admission are ignored. Per bed that is
+bracket matching, done here on log columns instead of a per-log loop:
+
+1. Stable sort of the assigned/released logs by (bed, timestamp)
+2. Per-bed cumsum of +1 (assigned) / -1 (released) gives the number of
+   open admissions; clamping it at 0 (running minimum of the walk) marks
+   the releases with nothing open
+3. A release closes the admission opened at its depth most recently:
+   within (bed, depth) admissions and releases alternate, so after a
+   stable sort by (bed, depth) each release follows its admission
+
+Everything is a sort or a cumulative pass, O(n log n), and the sessions
+come out in the loop's order (beds by first admission, then admission).
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from pymongo.database import Database
+
+from services.bed_timeline import TIME_UNIT
+
+
+def as_times(timestamps) -> np.ndarray:
+    """Timestamps as datetime64[ms] (via pandas, much faster than NumPy for datetime lists)"""
+    return pd.to_datetime(timestamps).to_numpy().astype(TIME_UNIT)
+
+
+def pair_sessions(event_beds: Sequence[str], timestamps, status_changes: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pair admissions with releases
+
+    Args:
+        event_beds: bedId per log
+        timestamps: Timestamp per log, logs in timestamp order (ties are
+            processed in log order)
+        status_changes: statusChange per log; other changes are skipped
+
+    Returns:
+        (assigned, released): log indices of each complete session
+    """
+    beds, _ = pd.factorize(np.asarray(event_beds, dtype=object))
+    changes, change_names = pd.factorize(np.asarray(status_changes, dtype=object), use_na_sentinel=False)
+    step = ((change_names == 'assigned').astype(np.int64) - (change_names == 'released'))[changes]
+    logs = np.flatnonzero(step)
+    if not len(logs):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    # Stable sort by (bed, time): ties keep log order
+    times = as_times(timestamps)[logs].astype(np.int64)
+    logs = logs[np.lexsort((times, beds[logs]))]
+    bed = beds[logs]
+    step = step[logs]
+    starts = np.r_[True, bed[1:] != bed[:-1]]
+    segment = np.cumsum(starts) - 1
+
+    # Open admissions before each log, relative to the bed's first log
+    walk = np.cumsum(step) - step
+    before = walk - walk[np.flatnonzero(starts)][segment]
+
+    # Clamped at 0: subtract the bed's running minimum (segments shifted
+    # down so the minimum never reaches back into the previous bed)
+    shift = segment * (2 * len(logs) + 2)
+    depth = before - (np.minimum.accumulate(before - shift) + shift)
+
+    admission = step > 0
+    paired = admission | (depth > 0)
+    level = np.where(admission, depth + 1, depth)[paired]
+    logs, admission = logs[paired], admission[paired]
+    order = np.lexsort((level, segment[paired]))
+    closes = np.flatnonzero(~admission[order])
+    released = logs[order[closes]]
+    assigned = logs[order[closes - 1]]
+
+    # The loop's order: beds by their first admission, then by admission
+    first_admission = np.full(beds.max() + 1, len(beds), dtype=np.int64)
+    np.minimum.at(first_admission, beds[logs[admission]], logs[admission])
+    session_order = np.lexsort((assigned, first_admission[beds[assigned]]))
+    return assigned[session_order], released[session_order]
+
+
+def occupancy_sessions(
+    event_beds: Sequence[str],
+    timestamps,
+    status_changes: Sequence[str],
+    user_ids: Optional[Sequence[str]] = None
+) -> pd.DataFrame:
+    """
+    Complete sessions as a DataFrame: bed_id, assigned_time, released_time
+    and user_id (of the admission)
+    """
+    times = as_times(timestamps)
+    assigned, released = pair_sessions(event_beds, times, status_changes)
+    event_beds = np.asarray(event_beds, dtype=object)
+    return pd.DataFrame({
+        'bed_id': event_beds[assigned],
+        'assigned_time': times[assigned],
+        'released_time': times[released],
+        'user_id': np.asarray(user_ids, dtype=object)[assigned] if user_ids is not None else ''
+    })
+
+
+def fetch_occupancy_logs(db: Database) -> Dict[str, list]:
+    """
+    All occupancy logs in timestamp order as columns: bedId, timestamp,
+    statusChange and userId (as strings, '' if missing)
+    """
+    columns = {'bedId': [], 'timestamp': [], 'statusChange': [], 'userId': []}
+    projection = {'bedId': 1, 'timestamp': 1, 'statusChange': 1, 'userId': 1, '_id': 0}
+    for log in db['occupancylogs'].find({}, projection).sort('timestamp', 1):
+        columns['bedId'].append(str(log['bedId']))
+        columns['timestamp'].append(log['timestamp'])
+        columns['statusChange'].append(log.get('statusChange'))
+        columns['userId'].append(str(log.get('userId', '')))
+    return columns
@@ -0,0 +1,199 @@
+"""
+Early warning of wards passing an occupancy threshold
+
+For every ward and hour the probability that occupancy is above the
+threshold is computed in closed form, for all wards at once and without
+simulation:
+1. Current patients: each bed is still occupied at hour h with the share of
+   its per-tree remaining stays that end after h; the ward's count is a sum
+   of independent Bernoulli variables (mean sum(p), variance sum(p(1 - p)))
+2. Arrivals: with Poisson arrivals at the demand rates, the patients admitted
+   from now on and still present at hour h are Poisson distributed (thinning)
+   with mean sum over t of rate(t) * P(stay > h - t), a causal convolution
+   done as one einsum
+3. A normal approximation with continuity correction turns the mean and
+   variance into P(occupied beds > threshold x capacity)
+
+Hours follow the capacity simulator: hour 0 is now, a patient discharged at
+hour d is counted up to hour d - 1, an arrival in hour t from hour t on.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+# Probability at which a crossing is predicted (more likely than not)
+CROSSING_PROBABILITY = 0.5
+
+
+def _hours(samples: np.ndarray, horizon_hours: int) -> np.ndarray:
+    """Whole hours 1..horizon_hours + 1 of each sample (NaN stays NaN)"""
+    return np.where(np.isnan(samples), np.nan, np.clip(np.ceil(samples), 1, horizon_hours + 1))
+
+
+def bed_presence(bed_remaining: np.ndarray, horizon_hours: int) -> np.ndarray:
+    """
+    Probability that each bed is still occupied
+
+    Args:
+        bed_remaining: (n_beds, n_samples) hours until discharge per bed
+            (NaN for dropped samples), see remaining_stay_hours()
+        horizon_hours: Last hour
+
+    Returns:
+        (n_beds, horizon_hours + 1) for hours 0..horizon_hours
+    """
+    hours = _hours(np.atleast_2d(bed_remaining), horizon_hours)
+    kept = ~np.isnan(hours)
+    weights = kept / np.maximum(kept.sum(axis=1, keepdims=True), 1)
+    n_beds, n_bins = len(hours), horizon_hours + 2
+    flat = (np.arange(n_beds)[:, None] * n_bins + np.nan_to_num(hours, nan=0).astype(np.intp)).ravel()
+    discharges = np.bincount(flat, weights=weights.ravel(), minlength=n_beds * n_bins).reshape(n_beds, n_bins)
+    discharged = np.cumsum(discharges[:, :horizon_hours + 1], axis=1)
+    return np.clip(1.0 - discharged, 0.0, 1.0)
+
+
+def stay_survival(stay_hours: np.ndarray, horizon_hours: int) -> np.ndarray:
+    """
+    P(a new patient is still there k hours after arriving) per ward
+
+    Args:
+        stay_hours: (n_wards, n_samples) length-of-stay samples (NaN padded)
+
+    Returns:
+        (n_wards, horizon_hours) for k = 0..horizon_hours - 1
+    """
+    hours = _hours(np.atleast_2d(stay_hours), horizon_hours)
+    kept = ~np.isnan(hours)
+    lags = np.arange(horizon_hours)
+    staying = (np.nan_to_num(hours, nan=0)[:, :, None] > lags[None, None, :]) & kept[:, :, None]
+    return staying.sum(axis=1) / np.maximum(kept.sum(axis=1), 1)[:, None]
+
+
+def arrivals_present(arrival_rates: np.ndarray, survival: np.ndarray) -> np.ndarray:
+    """
+    Expected patients admitted from now on and still present
+
+    Args:
+        arrival_rates: (n_wards, horizon_hours) expected arrivals in hours 1..horizon
+        survival: (n_wards, horizon_hours) stay_survival()
+
+    Returns:
+        (n_wards, horizon_hours + 1) for hours 0..horizon_hours (also the
+        variance: the count is Poisson)
+    """
+    horizon_hours = arrival_rates.shape[1]
+    lag = np.arange(horizon_hours + 1)[:, None] - np.arange(1, horizon_hours + 1)[None, :]
+    after_arrival = lag >= 0
+    kernel = survival[:, np.clip(lag, 0, horizon_hours - 1)] * after_arrival
+    return np.einsum('wht,wt->wh', kernel, arrival_rates)
+
+
+def occupancy_moments(
+    ward_index: np.ndarray,
+    n_wards: int,
+    bed_remaining: np.ndarray,
+    arrival_rates: np.ndarray,
+    stay_hours: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    Mean and variance of each ward's occupancy
+
+    Returns:
+        Dict with 'mean' and 'variance', (n_wards, horizon_hours + 1) each
+    """
+    horizon_hours = arrival_rates.shape[1]
+    ward_index = np.asarray(ward_index, dtype=np.intp)
+    presence = bed_presence(bed_remaining, horizon_hours) if len(ward_index) else np.zeros((0, horizon_hours + 1))
+    in_ward = (ward_index[None, :] == np.arange(n_wards)[:, None]).astype(np.float64)
+    arrivals = arrivals_present(arrival_rates, stay_survival(stay_hours, horizon_hours))
+    return {
+        "mean": in_ward @ presence + arrivals,
+        "variance": in_ward @ (presence * (1.0 - presence)) + arrivals
+    }
+
+
+def threshold_limits(capacity: np.ndarray, threshold: float) -> np.ndarray:
+    """Fewest occupied beds that are above threshold x capacity"""
+    return np.floor(np.asarray(capacity, dtype=np.float64) * threshold + 1e-9).astype(np.int64) + 1
+
+
+def probability_above(mean: np.ndarray, variance: np.ndarray, limit: np.ndarray) -> np.ndarray:
+    """P(occupancy >= limit) per ward and hour (normal approximation, continuity corrected)"""
+    # Imported on first use: scipy stays out of service startup
+    from scipy.special import ndtr
+
+    limit = np.asarray(limit, dtype=np.float64)[:, None]
+    deviation = np.sqrt(variance)
+    z = (mean - (limit - 0.5)) / np.where(deviation > 0, deviation, 1.0)
+    return np.where(deviation > 0, ndtr(z), (mean >= limit - 0.5).astype(np.float64))
+
+
+def first_crossing(
+    probability: np.ndarray,
+    min_probability: float = CROSSING_PROBABILITY
+) -> Dict[str, np.ndarray]:
+    """
+    Predicted crossing per ward from P(above) per hour
+
+    Args:
+        probability: (n_wards, horizon_hours + 1) probability_above(), hour 0 = now
+        min_probability: Probability at which the crossing is predicted
+
+    Returns:
+        Dict with per ward 'hour' (first hour with P(above) >=
+        min_probability, -1 if none within the horizon), 'confidence'
+        (P(above) at that hour, or P(staying at or below) = 1 - the peak
+        probability if no crossing is predicted), 'peak_probability' and
+        'peak_hour'
+    """
+    likely = probability >= min_probability
+    crosses = likely.any(axis=1)
+    hour = np.where(crosses, likely.argmax(axis=1), -1)
+    peak_hour = probability.argmax(axis=1)
+    peak = probability.max(axis=1)
+    at_crossing = np.take_along_axis(probability, np.maximum(hour, 0)[:, None], axis=1)[:, 0]
+    return {
+        "hour": hour,
+        "confidence": np.where(crosses, at_crossing, 1.0 - peak),
+        "peak_probability": peak,
+        "peak_hour": peak_hour
+    }
+
+
+def threshold_warnings(
+    ward_index: np.ndarray,
+    capacity: np.ndarray,
+    bed_remaining: np.ndarray,
+    arrival_rates: np.ndarray,
+    stay_hours: np.ndarray,
+    threshold: float,
+    min_probability: Optional[float] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Threshold crossing outlook for every ward in one pass
+
+    Args:
+        ward_index: Ward position per occupied bed
+        capacity: Beds per ward
+        bed_remaining: (n_beds, n_samples) remaining hours per bed
+        arrival_rates: (n_wards, horizon_hours) expected arrivals per hour
+        stay_hours: (n_wards, n_samples) stay samples for new arrivals
+        threshold: Occupancy rate to stay at or below (e.g. 0.9)
+        min_probability: Probability at which a crossing is predicted
+
+    Returns:
+        first_crossing() outputs plus 'limit' (beds), 'probability_above'
+        and 'expected_occupied' per ward and hour
+    """
+    capacity = np.asarray(capacity, dtype=np.int64)
+    moments = occupancy_moments(ward_index, len(capacity), bed_remaining, arrival_rates, stay_hours)
+    limit = threshold_limits(capacity, threshold)
+    probability = probability_above(moments["mean"], moments["variance"], limit)
+    crossing = first_crossing(probability, CROSSING_PROBABILITY if min_probability is None else min_probability)
+    return {
+        **crossing,
+        "limit": limit,
+        "probability_above": probability,
+        "expected_occupied": moments["mean"]
+    }
@@ -0,0 +1,195 @@
+"""
+Prediction cache with in-flight request coalescing
+
+Model outputs are cached per feature row, keyed on the model, its version,
+the model method and the exact float64 feature vector. Entries expire after
+a TTL and the least recently used entries are evicted beyond max_entries.
+
+Identical rows that are already being computed are not computed again:
+callers wait on the same in-flight task ("singleflight"). The task runs
+independently of the request that started it, so a disconnected client
+does not fail the other waiters.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionCache:
+    """Bounded TTL/LRU cache of per-row model outputs"""
+
+    def __init__(
+        self,
+        max_entries: int = settings.PREDICTION_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = settings.PREDICTION_CACHE_TTL_SECONDS,
+        enabled: bool = settings.PREDICTION_CACHE_ENABLED
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+
+        # key -> (expires_at, value), most recently used last
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        # key -> (task computing a block of rows, row position in its output)
+        self._in_flight: Dict[Tuple, Tuple[asyncio.Task, int]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _get(self, key: Tuple, now: float) -> Optional[Tuple[Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= now:
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return (value,)
+
+    def _put(self, key: Tuple, value: Any, now: float):
+        self._entries[key] = (now + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _on_computed(self, keys: list, task: asyncio.Task):
+        """Store a finished block of rows and release its in-flight keys"""
+        for key in keys:
+            if self._in_flight.get(key, (None,))[0] is task:
+                del self._in_flight[key]
+
+        if task.cancelled() or task.exception() is not None:
+            return
+
+        outputs = task.result()
+        now = time.monotonic()
+        for position, key in enumerate(keys):
+            # Keys of a model version invalidated meanwhile are still stored;
+            # they can never be hit again and age out through TTL/LRU.
+            self._put(key, outputs[position], now)
+
+    async def predict(
+        self,
+        namespace: str,
+        model_version: str,
+        X: np.ndarray,
+        compute: Callable[[np.ndarray], Awaitable[np.ndarray]]
+    ) -> np.ndarray:
+        """
+        Get model outputs for every row of X, computing only uncached rows
+
+        Args:
+            namespace: Model name and method (e.g. 'discharge:predict')
+            model_version: Version of the loaded model
+            X: Feature matrix (one row per request)
+            compute: Async callable returning outputs for a sub-matrix
+
+        Returns:
+            Array of outputs aligned with the rows of X
+        """
+        if not self.enabled:
+            return await compute(X)
+
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        now = time.monotonic()
+        keys = [(namespace, model_version, row.tobytes()) for row in X]
+
+        # Per row: ('value', v) or ('task', task, position)
+        sources = [None] * len(keys)
+        pending: Dict[Tuple, int] = {}
+
+        for i, key in enumerate(keys):
+            cached = self._get(key, now)
+            if cached is not None:
+                self.hits += 1
+                sources[i] = ('value', cached[0])
+                continue
+
+            in_flight = self._in_flight.get(key)
+            if in_flight is not None:
+                self.coalesced += 1
+                sources[i] = ('task',) + in_flight
+            elif key in pending:
+                # Duplicate row within this batch
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                pending[key] = i
+
+        if pending:
+            rows = list(pending.values())
+            block_keys = list(pending.keys())
+            task = asyncio.ensure_future(compute(X[rows]))
+            for position, key in enumerate(block_keys):
+                self._in_flight[key] = (task, position)
+            task.add_done_callback(lambda t, block_keys=block_keys: self._on_computed(block_keys, t))
+
+            # The task cannot finish before we yield, so its keys are in flight
+            for i, key in enumerate(keys):
+                if sources[i] is None:
+                    sources[i] = ('task',) + self._in_flight[key]
+
+        outputs = []
+        for source in sources:
+            if source[0] == 'value':
+                outputs.append(source[1])
+            else:
+                _, task, position = source
+                block = await asyncio.shield(task)
+                outputs.append(block[position])
+
+        return np.asarray(outputs)
+
+    def invalidate(self, model_name: Optional[str] = None):
+        """
+        Drop cached entries for one model (or all models)
+
+        Called whenever a model is (re)loaded.
+        """
+        if model_name is None:
+            removed = len(self._entries)
+            self._entries.clear()
+        else:
+            prefix = f"{model_name}:"
+            stale = [key for key in self._entries if key[0].startswith(prefix)]
+            for key in stale:
+                del self._entries[key]
+            removed = len(stale)
+
+        self.invalidations += 1
+        if removed:
+            logger.info(f"Prediction cache invalidated ({model_name or 'all models'}): {removed} entries")
+
+    def snapshot(self):
+        """Cache size and hit/miss counters"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
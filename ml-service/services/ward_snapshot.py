@@ -0,0 +1,228 @@
+"""
+In-memory ward occupancy snapshot for bed availability features
+
+The bed availability model is trained with the ward's occupancy rate at
+each sample's time (occupied beds over the ward's beds). Instead of feeding
+it constants, the engine runs one aggregation over `beds` on a TTL and keeps
+bed counts per ward in arrays indexed by ward code (utils.WARD_CODES), so a
+request's ward features are an array gather.
+
+When the event-fed bed state (services.bed_state) is ready, its counts are
+served instead: they change with every status change the backend posts, so
+the aggregation is skipped until the store stops being ready.
+
+The hour-of-day availability rates are learned at training time and read
+from the model package (`hour_availability_rates`), see
+utils.features.build_bed_availability_features.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+from pymongo.database import Database
+
+from config import settings
+from utils import WARD_CODES
+
+logger = logging.getLogger(__name__)
+
+# Size of the arrays indexed by ward code
+N_WARD_CODES = max(WARD_CODES.values()) + 1
+
+
+def build_ward_counts_pipeline() -> list:
+    """Aggregation counting beds, occupied beds and beds in cleaning per ward"""
+    def count_status(status):
+        return {'$sum': {'$cond': [{'$eq': ['$status', status]}, 1, 0]}}
+
+    return [
+        {'$group': {
+            '_id': '$ward',
+            'beds': {'$sum': 1},
+            'occupied': count_status('occupied'),
+            'cleaning': count_status('cleaning')
+        }}
+    ]
+
+
+class WardSnapshot:
+    """Immutable per-ward-code bed counts produced by one refresh"""
+
+    def __init__(self, groups: list, refreshed_at: datetime):
+        """
+        Args:
+            groups: Aggregation output rows with _id (ward), beds, occupied
+                and cleaning
+            refreshed_at: When the aggregation completed
+
+        Wards outside WARD_CODES are left out: the models encode them as
+        General, so they are served General's counts.
+        """
+        beds = np.zeros(N_WARD_CODES, dtype=np.int64)
+        occupied = np.zeros(N_WARD_CODES, dtype=np.int64)
+        cleaning = np.zeros(N_WARD_CODES, dtype=np.int64)
+        for row in groups:
+            code = WARD_CODES.get(row['_id'])
+            if code is None:
+                continue
+            beds[code] += int(row['beds'])
+            occupied[code] += int(row['occupied'])
+            cleaning[code] += int(row['cleaning'])
+
+        self.beds = beds
+        self.occupied = occupied
+        self.cleaning = cleaning
+        self.known = beds > 0
+        self.occupancy_rate = occupied / np.maximum(beds, 1)
+        self.refreshed_at = refreshed_at
+        self.refreshed_monotonic = time.monotonic()
+
+    def describe(self) -> Dict[str, Dict[str, Any]]:
+        """Counts per ward name (first name of each code)"""
+        names = {}
+        for ward, code in WARD_CODES.items():
+            names.setdefault(code, ward)
+        return {
+            names[code]: {
+                "beds": int(self.beds[code]),
+                "occupied": int(self.occupied[code]),
+                "cleaning": int(self.cleaning[code]),
+                "occupancy_rate": round(float(self.occupancy_rate[code]), 4)
+            }
+            for code in np.flatnonzero(self.known).tolist()
+        }
+
+
+class WardSnapshotEngine:
+    """
+    Keeps the ward snapshot in memory and refreshes it in the background
+    every `ttl_seconds`
+    """
+
+    def __init__(
+        self,
+        db: Optional[Database] = None,
+        executor=None,
+        ttl_seconds: int = settings.WARD_SNAPSHOT_TTL_SECONDS,
+        bed_state=None
+    ):
+        """
+        Args:
+            db: Database on the shared client (None serves defaults only)
+            executor: InferenceExecutor whose I/O pool runs the refresh
+                (defaults to asyncio.to_thread)
+            ttl_seconds: Seconds between background refreshes
+            bed_state: BedStateStore whose counts are served once it is ready
+        """
+        self.db = db
+        self.executor = executor
+        self.ttl_seconds = ttl_seconds
+        self.bed_state = bed_state
+
+        self._snapshot: Optional[WardSnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def live(self) -> bool:
+        """Whether counts come from the event-fed bed state"""
+        return self.bed_state is not None and self.bed_state.ready
+
+    @property
+    def snapshot(self) -> Optional[WardSnapshot]:
+        """Event-fed counts when live, else the latest aggregation (None until the first refresh succeeds)"""
+        if self.live:
+            return self.bed_state.ward_snapshot()
+        return self._snapshot
+
+    def refresh(self) -> WardSnapshot:
+        """Run the aggregation and swap in a new snapshot (blocking)"""
+        if self.db is None:
+            raise RuntimeError("Ward snapshot engine has no database")
+
+        started = time.perf_counter()
+        groups = list(self.db.beds.aggregate(build_ward_counts_pipeline()))
+
+        snapshot = WardSnapshot(groups, datetime.utcnow())
+        self._snapshot = snapshot
+        self.last_error = None
+
+        logger.debug(
+            f"Ward snapshot refreshed: {int(snapshot.beds.sum())} beds in "
+            f"{int(snapshot.known.sum())} wards in {(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+        return snapshot
+
+    async def _refresh_loop(self):
+        """Refresh immediately, then every ttl_seconds while the counts are not live"""
+        while True:
+            if self.live:
+                await asyncio.sleep(self.ttl_seconds)
+                continue
+            try:
+                if self.executor is not None:
+                    await self.executor.run_io(self.refresh)
+                else:
+                    await asyncio.to_thread(self.refresh)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Failed to refresh ward snapshot: {e}")
+            await asyncio.sleep(self.ttl_seconds)
+
+    def start(self):
+        """Start background refreshing (called from the app lifespan)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """Stop background refreshing"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        """Staleness metadata for responses and health checks"""
+        if self.live:
+            snapshot = self.bed_state.ward_snapshot()
+            return {
+                "source": "events",
+                "refreshed_at": snapshot.refreshed_at.isoformat(),
+                "age_seconds": 0.0,
+                "ttl_seconds": self.ttl_seconds,
+                "stale": False,
+                "wards": int(snapshot.known.sum()),
+                "last_error": self.last_error
+            }
+
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {
+                "source": "defaults",
+                "refreshed_at": None,
+                "age_seconds": None,
+                "ttl_seconds": self.ttl_seconds,
+                "stale": True,
+                "last_error": self.last_error
+            }
+
+        age = time.monotonic() - snapshot.refreshed_monotonic
+        return {
+            "source": "aggregate",
+            "refreshed_at": snapshot.refreshed_at.isoformat(),
+            "age_seconds": round(age, 1),
+            "ttl_seconds": self.ttl_seconds,
+            # One missed refresh is tolerated before flagging as stale
+            "stale": age > 2 * self.ttl_seconds,
+            "wards": int(snapshot.known.sum()),
+            "last_error": self.last_error
+        }
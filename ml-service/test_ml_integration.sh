@@ -38,6 +38,75 @@ echo "6. Testing Models Status..."
 curl -s http://localhost:8000/models/status | python3 -m json.tool
 echo ""
 
+echo "7. Testing Readiness..."
+curl -s http://localhost:8000/ready | python3 -m json.tool
+echo ""
+
+echo "8. Testing Discharge Prediction with Quantiles..."
+curl -s -X POST http://localhost:8000/api/ml/predict/discharge \
+  -H "Content-Type: application/json" \
+  -d '{"ward": "ICU", "include_quantiles": true}' | python3 -m json.tool
+echo ""
+
+echo "9. Testing Batch Discharge Prediction..."
+curl -s -X POST http://localhost:8000/api/ml/predict/discharge/batch \
+  -H "Content-Type: application/json" \
+  -d '{"items": [{"ward": "ICU", "bed_id": "ICU-01"}, {"ward": "General", "bed_id": "GEN-07"}], "include_quantiles": true}' | python3 -m json.tool
+echo ""
+
+echo "10. Testing Bed Availability Prediction (24h, curve model)..."
+curl -s -X POST http://localhost:8000/api/ml/predict/bed-availability \
+  -H "Content-Type: application/json" \
+  -d '{"ward": "ICU", "prediction_horizon_hours": 24}' | python3 -m json.tool
+echo ""
+
+echo "11. Testing Batch Bed Availability Prediction..."
+curl -s -X POST http://localhost:8000/api/ml/predict/bed-availability/batch \
+  -H "Content-Type: application/json" \
+  -d '{"items": [{"ward": "ICU", "prediction_horizon_hours": 6}, {"ward": "Emergency", "prediction_horizon_hours": 12}]}' | python3 -m json.tool
+echo ""
+
+echo "12. Testing Bed Availability Curve..."
+curl -s -X POST http://localhost:8000/api/ml/predict/bed-availability/curve \
+  -H "Content-Type: application/json" \
+  -d '{"ward": "General", "horizon_hours": 24}' | python3 -m json.tool
+echo ""
+
+echo "13. Testing Batch Cleaning Duration Prediction..."
+curl -s -X POST http://localhost:8000/api/ml/predict/cleaning-duration/batch \
+  -H "Content-Type: application/json" \
+  -d '{"items": [{"ward": "ICU", "estimated_duration": 35}, {"ward": "General"}]}' | python3 -m json.tool
+echo ""
+
+echo "14. Testing Occupancy Forecast..."
+curl -s "http://localhost:8000/api/ml/forecast/occupancy?ward=ICU&horizon=24" | python3 -m json.tool
+echo ""
+
+echo "15. Testing Capacity Risk Simulation..."
+curl -s "http://localhost:8000/api/ml/forecast/capacity-risk?ward=ICU&horizon=24&simulations=500&seed=1" | python3 -m json.tool
+echo ""
+
+echo "16. Testing Threshold Crossing Forecast..."
+curl -s "http://localhost:8000/api/ml/forecast/threshold-crossing?threshold=0.9&horizon=72" | python3 -m json.tool
+echo ""
+
+echo "17. Testing Demand Forecast..."
+curl -s "http://localhost:8000/api/ml/forecast/demand?ward=ICU&horizon=24" | python3 -m json.tool
+echo ""
+
+echo "18. Testing Metrics..."
+curl -s http://localhost:8000/metrics | python3 -m json.tool | head -40
+echo ""
+
+echo "19. Testing Admin Model Versions..."
+if [ -n "$ADMIN_TOKEN" ]; then
+  curl -s http://localhost:8000/api/ml/admin/models \
+    -H "X-Admin-Token: $ADMIN_TOKEN" | python3 -m json.tool
+else
+  echo "Skipped (set ADMIN_TOKEN to the service's admin token)"
+fi
+echo ""
+
 echo "============================================"
 echo "ML SERVICE INTEGRATION TEST COMPLETE"
 echo "============================================"
@@ -0,0 +1,54 @@
+"""
+Shared pytest setup: tests import service modules the way the service and
+the training scripts do (config, services.*, utils.*)
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeBeds:
+    """`beds` collection whose aggregation returns one fixed result document"""
+
+    def __init__(self, result):
+        self.result = result
+
+    def aggregate(self, pipeline):
+        return iter([self.result])
+
+
+class FakeDatabase:
+    def __init__(self, result):
+        self.beds = FakeBeds(result)
+
+
+@pytest.fixture
+def ward_beds_db():
+    """Factory: database whose ward beds aggregation returns the given capacity and occupied beds"""
+    def build(capacity, occupied):
+        return FakeDatabase({
+            'capacity': [{'_id': ward, 'beds': beds} for ward, beds in capacity.items()],
+            'occupied': occupied
+        })
+    return build
+
+
+@pytest.fixture
+def constant_stay_discharge(monkeypatch):
+    """Factory: serve a discharge package whose every tree predicts a total stay of `hours`"""
+    from sklearn.ensemble import RandomForestRegressor
+    from routes import predictions
+
+    def install(hours):
+        feature_columns = ['hour', 'day_of_week']
+        X = np.random.default_rng(0).random((20, len(feature_columns)))
+        model = RandomForestRegressor(n_estimators=4, random_state=0, n_jobs=1).fit(X, np.full(20, float(hours)))
+        package = {'model': model, 'feature_columns': feature_columns, 'version': f'constant-{hours:g}h'}
+        monkeypatch.setitem(predictions.models, 'discharge', package)
+        return package
+    return install
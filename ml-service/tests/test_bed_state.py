@@ -0,0 +1,261 @@
+"""
+BedStateStore: event application, stays paired as the duration statistics
+pair them, the sliding window, the startup replay and queued events,
+reconciliation with `beds`, single-worker mode and the engines fed from it
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from routes import events
+from schemas import EventBatchRequest
+from services.bed_state import BedStateStore, RunningStats
+from services.duration_stats import DurationStatsEngine, DurationStatsSnapshot
+from services.ward_snapshot import WardSnapshotEngine
+from utils import WARD_CODES
+from test_duration_stats import assert_matches_loop, random_logs
+
+
+class FakeCursor(list):
+    def sort(self, key, direction):
+        return FakeCursor(sorted(self, key=lambda document: document[key], reverse=direction < 0))
+
+
+class FakeCollection:
+    """find() over a list of documents, honouring $gte filters only"""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def find(self, query=None, projection=None):
+        def matches(document):
+            for field, condition in (query or {}).items():
+                value = document.get(field)
+                if isinstance(condition, dict):
+                    if value is None or value < condition['$gte']:
+                        return False
+                elif value != condition:
+                    return False
+            return True
+        return FakeCursor(document for document in self.documents if matches(document))
+
+
+class FakeDatabase:
+    def __init__(self, beds=(), occupancylogs=(), cleaninglogs=()):
+        self.beds = FakeCollection(list(beds))
+        self.occupancylogs = FakeCollection(list(occupancylogs))
+        self.cleaninglogs = FakeCollection(list(cleaninglogs))
+
+
+NOW = datetime.utcnow().replace(microsecond=0)
+
+
+def hours_ago(hours):
+    return NOW - timedelta(hours=hours)
+
+
+def occupancy(bed_id, status_change, timestamp, ward='ICU'):
+    return 'occupancy', {'bed_id': bed_id, 'status_change': status_change, 'timestamp': timestamp, 'ward': ward}
+
+
+def test_events_update_ward_counts():
+    store = BedStateStore()
+    store.ingest([
+        occupancy('a', 'assigned', hours_ago(5)),
+        occupancy('b', 'assigned', hours_ago(4)),
+        occupancy('c', 'reserved', hours_ago(3)),
+        occupancy('a', 'released', hours_ago(2))
+    ])
+
+    assert store.wards['ICU'].counts == {'available': 1, 'occupied': 1, 'cleaning': 1}
+    snapshot = store.ward_snapshot()
+    assert snapshot.occupancy_rate[WARD_CODES['ICU']] == pytest.approx(1 / 3)
+
+    store.ingest([occupancy('a', 'maintenance_end', hours_ago(1))])
+    assert store.wards['ICU'].counts == {'available': 2, 'occupied': 1, 'cleaning': 0}
+    assert store.ward_snapshot() is not snapshot
+
+
+def test_duplicate_and_stale_events_are_ignored():
+    store = BedStateStore()
+    assigned, released = occupancy('a', 'assigned', hours_ago(10)), occupancy('a', 'released', hours_ago(4))
+
+    assert store.ingest([assigned, released, released, assigned]) == {'applied': 2, 'ignored': 2, 'queued': 0}
+    assert store.wards['ICU'].stay_hours.count == 1
+    assert store.beds['a'].status == 'cleaning'
+    # Unknown bed without a ward
+    assert not store.apply_occupancy('z', 'assigned', hours_ago(1))
+
+
+def test_stays_match_duration_statistics_loop():
+    logs, bed_wards = random_logs(3)
+    store = BedStateStore(window_days=30)
+    store.ingest(
+        occupancy(str(log['bedId']), log['statusChange'], log['timestamp'], bed_wards.get(log['bedId'], 'General'))
+        for log in sorted(logs, key=lambda log: log['timestamp'])
+    )
+
+    since = datetime.utcnow() - timedelta(days=30)
+    snapshot = DurationStatsSnapshot(store.duration_groups(), datetime.utcnow())
+    assert snapshot.sessions > 0
+    assert_matches_loop(snapshot.lookup, logs, bed_wards, since)
+
+
+def test_stay_needs_assigned_directly_before_released():
+    store = BedStateStore()
+    store.ingest([
+        occupancy('a', 'assigned', hours_ago(10)),
+        occupancy('a', 'reserved', hours_ago(8)),
+        occupancy('a', 'released', hours_ago(6))
+    ])
+    assert store.duration_groups() == []
+
+
+def test_running_stats_remove_matches_numpy():
+    values = np.random.default_rng(0).gamma(2.0, 20.0, 50)
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+    for value in values[:20]:
+        stats.remove(value)
+
+    assert stats.count == 30
+    assert stats.mean == pytest.approx(values[20:].mean())
+    assert stats.variance == pytest.approx(values[20:].var(ddof=1))
+    assert stats.total == pytest.approx(values[20:].sum())
+
+
+def test_stays_leave_the_window():
+    store = BedStateStore(window_days=30)
+    store.ingest([
+        occupancy('old', 'assigned', hours_ago(29 * 24 + 8)),
+        occupancy('old', 'released', hours_ago(29 * 24)),
+        occupancy('new', 'assigned', hours_ago(30)),
+        occupancy('new', 'released', hours_ago(10)),
+        # Admitted before the window: never counted
+        occupancy('older', 'assigned', hours_ago(31 * 24)),
+        occupancy('older', 'released', hours_ago(29 * 24))
+    ])
+    assert store.wards['ICU'].stay_hours.count == 2
+    assert store.wards['ICU'].stay_hours.mean == pytest.approx(14.0)
+
+    store.window_days = 2
+    groups = store.duration_groups()
+    assert [(group['count'], group['total_hours']) for group in groups] == [(1, pytest.approx(20.0))]
+    assert store.wards['ICU'].stay_hours.mean == pytest.approx(20.0)
+
+
+def test_cleaning_durations():
+    store = BedStateStore()
+    start = hours_ago(2)
+    assert store.apply_cleaning('a', 'ICU', 'in_progress', start)
+    assert store.beds['a'].status == 'cleaning'
+    assert store.apply_cleaning('a', 'ICU', 'completed', start, start + timedelta(minutes=40))
+    # Same cleaning posted again
+    assert not store.apply_cleaning('a', 'ICU', 'completed', start, start + timedelta(minutes=40))
+    assert store.apply_cleaning('b', 'ICU', 'completed', start, actual_duration=20)
+
+    cleaning = store.wards['ICU'].cleaning_minutes
+    assert (cleaning.count, cleaning.mean) == (2, pytest.approx(30.0))
+
+
+def replay_database():
+    icu, general = ObjectId(), ObjectId()
+    database = FakeDatabase(
+        beds=[{'_id': icu, 'ward': 'ICU', 'status': 'available'}, {'_id': general, 'ward': 'General', 'status': 'occupied'}],
+        occupancylogs=[
+            {'bedId': icu, 'statusChange': 'assigned', 'timestamp': hours_ago(30)},
+            {'bedId': icu, 'statusChange': 'released', 'timestamp': hours_ago(20)},
+            {'bedId': icu, 'statusChange': 'maintenance_end', 'timestamp': hours_ago(19)},
+            {'bedId': general, 'statusChange': 'assigned', 'timestamp': hours_ago(40 * 24)}
+        ],
+        cleaninglogs=[{'bedId': icu, 'ward': 'ICU', 'status': 'completed', 'startTime': hours_ago(20), 'actualDuration': 45}]
+    )
+    return database, str(icu), str(general)
+
+
+def test_replay_then_queued_events():
+    database, icu, general = replay_database()
+    store = BedStateStore(database)
+    assert not store.ready and store.ward_snapshot() is None
+
+    # Arrives during the replay; the replay already holds the first one
+    queued = [occupancy(icu, 'maintenance_end', hours_ago(19)), occupancy(icu, 'assigned', hours_ago(1))]
+    assert store.ingest(queued)['queued'] == 2
+    store._swap_in(store.replay())
+
+    assert store.ready and store.applied == 1 and store.ignored == 1
+    assert store.beds[icu].status == 'occupied'
+    # General's assignment predates the window: status from `beds`
+    assert store.beds[general].status == 'occupied'
+    assert store.wards['ICU'].stay_hours.mean == pytest.approx(10.0)
+    assert store.wards['ICU'].cleaning_minutes.mean == pytest.approx(45.0)
+
+
+def test_reconcile_skips_beds_with_newer_events():
+    store = BedStateStore()
+    store.ingest([occupancy('a', 'assigned', hours_ago(3)), occupancy('b', 'assigned', hours_ago(3)), occupancy('gone', 'assigned', hours_ago(3))])
+    since_seq = store.seq
+    # 'b' is released after `beds` was read
+    store.ingest([occupancy('b', 'released', hours_ago(1))])
+
+    beds = [
+        {'_id': 'a', 'ward': 'ICU', 'status': 'available'},
+        {'_id': 'b', 'ward': 'ICU', 'status': 'occupied'},
+        {'_id': 'new', 'ward': 'General', 'status': 'cleaning'}
+    ]
+    assert store.reconcile(beds, since_seq) == 3
+
+    assert store.beds['a'].status == 'available'
+    assert store.beds['b'].status == 'cleaning'
+    assert 'gone' not in store.beds
+    assert store.beds['new'].status == 'cleaning'
+    assert store.wards['ICU'].counts == {'available': 1, 'occupied': 0, 'cleaning': 1}
+    assert store.wards['General'].counts == {'available': 0, 'occupied': 0, 'cleaning': 1}
+
+
+def test_disabled_store_rejects_events(monkeypatch):
+    store = BedStateStore(FakeDatabase(), enabled=False)
+    monkeypatch.setattr(events, 'bed_state', store)
+
+    async def scenario():
+        store.start()
+        return store._task
+
+    assert asyncio.run(scenario()) is None
+    assert not store.ready and store.status()['enabled'] is False
+
+    request = EventBatchRequest(events=[{'type': 'occupancy', 'bedId': 'a', 'statusChange': 'assigned', 'timestamp': datetime.utcnow(), 'ward': 'ICU'}])
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(events.ingest_events(request))
+    assert error.value.status_code == 503
+    assert store.beds == {} and store._pending == []
+
+
+def test_engines_read_the_store_once_ready():
+    database, icu, general = replay_database()
+    store = BedStateStore(database)
+    ward_snapshot = WardSnapshotEngine(bed_state=store)
+    duration_stats = DurationStatsEngine(bed_state=store)
+
+    assert ward_snapshot.snapshot is None
+    assert duration_stats.refresh_from_events() is None
+
+    store._swap_in(store.replay())
+
+    occupancy_rate = ward_snapshot.snapshot.occupancy_rate
+    assert occupancy_rate[WARD_CODES['General']] == 1.0
+    assert occupancy_rate[WARD_CODES['ICU']] == 0.0
+    assert ward_snapshot.status()['source'] == 'events'
+
+    assert duration_stats.refresh_from_events() is not None
+    assert duration_stats.lookup('ICU', 0)[0] == pytest.approx(10.0)
+    assert duration_stats.status()['source'] == 'events'
+
+    store.ingest([occupancy(general, 'released', hours_ago(0.5))])
+    assert ward_snapshot.snapshot.occupancy_rate[WARD_CODES['General']] == 0.0
@@ -0,0 +1,102 @@
+"""
+Monte Carlo capacity risk (services.capacity_simulator) on wards with known
+remaining stays and arrival rates, and the /forecast/capacity-risk route
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from routes import forecast
+from services.capacity_simulator import simulate_capacity, stay_samples
+
+
+def no_arrivals(n_wards, horizon_hours):
+    return np.zeros((n_wards, horizon_hours)), np.full((n_wards, 1), np.nan)
+
+
+def test_deterministic_discharges():
+    # Ward 0 (3 beds): beds leave in hours 2 and 5, one stays; ward 1 (2 beds): one bed leaving in hour 3
+    arrival_rates, stay_hours = no_arrivals(2, 8)
+    result = simulate_capacity(
+        bed_ward=[0, 0, 0, 1],
+        bed_remaining=np.array([[1.5], [5.0], [100.0], [2.2]]),
+        capacity=[3, 2],
+        arrival_rates=arrival_rates,
+        stay_hours=stay_hours,
+        n_simulations=200,
+        seed=0,
+        processes=0
+    )
+    np.testing.assert_array_equal(result['p_full'][0], [1, 1, 0, 0, 0, 0, 0, 0, 0])
+    np.testing.assert_array_equal(result['p_full_by'][0], np.ones(9))
+    np.testing.assert_array_equal(result['expected_occupied'][0], [3, 3, 2, 2, 2, 1, 1, 1, 1])
+    np.testing.assert_array_equal(result['p_full'][1], np.zeros(9))
+    np.testing.assert_array_equal(result['expected_occupied'][1], [1, 1, 1, 0, 0, 0, 0, 0, 0])
+
+
+def test_overflow_probability_from_tree_spread():
+    # One bed of a one-bed ward; half the trees say it leaves in hour 2, half in hour 10
+    arrival_rates, stay_hours = no_arrivals(1, 12)
+    result = simulate_capacity(
+        bed_ward=[0],
+        bed_remaining=np.array([[2.0, 10.0, 2.0, 10.0, np.nan]]),
+        capacity=[1],
+        arrival_rates=arrival_rates,
+        stay_hours=stay_hours,
+        n_simulations=20000,
+        seed=1,
+        processes=0
+    )
+    p_full = result['p_full'][0]
+    np.testing.assert_array_equal(p_full[:2], [1, 1])
+    np.testing.assert_allclose(p_full[2:10], 0.5, atol=0.02)
+    np.testing.assert_array_equal(p_full[10:], [0, 0, 0])
+
+
+def test_overflow_probability_with_arrivals():
+    # Two beds, one taken for the whole horizon: the ward is full by hour h
+    # once at least one patient has arrived, P = 1 - exp(-arrivals so far)
+    horizon_hours = 6
+    arrival_rates = np.full((1, horizon_hours), 0.2)
+    result = simulate_capacity(
+        bed_ward=[0],
+        bed_remaining=np.array([[1000.0]]),
+        capacity=[2],
+        arrival_rates=arrival_rates,
+        stay_hours=stay_samples([np.array([1000.0])]),
+        n_simulations=40000,
+        seed=2,
+        processes=0
+    )
+    expected = 1 - np.exp(-0.2 * np.arange(horizon_hours + 1))
+    np.testing.assert_allclose(result['p_full'][0], expected, atol=0.01)
+    np.testing.assert_allclose(result['p_full_by'][0], expected, atol=0.01)
+
+
+def test_seeded_runs_are_reproducible():
+    arrival_rates = np.full((1, 10), 0.5)
+    args = ([0, 0], np.array([[3.0, 7.0], [5.0, np.nan]]), [3], arrival_rates, stay_samples([np.array([4.0, 9.0])]))
+    first = simulate_capacity(*args, n_simulations=1000, seed=3, chunk_size=300, processes=0)
+    second = simulate_capacity(*args, n_simulations=1000, seed=3, chunk_size=300, processes=0)
+    np.testing.assert_array_equal(first['p_full'], second['p_full'])
+
+
+def test_outlook_uses_elapsed_stay(ward_beds_db, constant_stay_discharge):
+    # Admitted 40h ago, 48h predicted stay: 8h left in the simulation inputs
+    now = datetime.utcnow()
+    database = ward_beds_db({'ICU': 1}, [{'bedId': 'b1', 'ward': 'ICU', 'admission_time': now - timedelta(hours=40)}])
+    constant_stay_discharge(48)
+    outlook = asyncio.run(forecast.load_ward_outlook(database, None, 24))
+    np.testing.assert_allclose(outlook['bed_remaining'], 8.0, atol=0.01)
+
+
+def test_capacity_risk_route(ward_beds_db, constant_stay_discharge):
+    # The only bed of the ward is freed in hour 8 and nobody arrives (no demand tables)
+    now = datetime.utcnow()
+    database = ward_beds_db({'ICU': 1}, [{'bedId': 'b1', 'ward': 'ICU', 'admission_time': now - timedelta(hours=40)}])
+    constant_stay_discharge(48)
+    response = asyncio.run(forecast.forecast_capacity_risk(ward=None, horizon=12, simulations=200, seed=0, db=database))
+    ward = response['prediction']['ICU']
+    assert ward['p_full'] == [1.0] * 8 + [0.0] * 5
@@ -0,0 +1,120 @@
+"""
+Parity of services.compiled_forest with sklearn on small fitted forests
+
+The service answers small calls with CompiledForest instead of sklearn, so
+both must agree to floating point on every model kind it compiles: inputs
+are drawn around (and exactly onto) the split thresholds, where a wrong
+comparison or a threshold rounded the wrong way would show.
+"""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestClassifier, RandomForestRegressor
+
+from services.compiled_forest import CompiledForest, check_parity, compile_model_package, parity_samples
+from services.model_artifact import load_artifact, save_artifact
+
+
+def training_data(n_samples=400, n_features=6, seed=0):
+    """Features with repeated and fractional values, plus three targets"""
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.integers(0, 24, n_samples),   # hour-like
+        rng.integers(0, 7, n_samples),    # day-like
+        rng.random((n_samples, n_features - 2)) * 10
+    ]).astype(np.float64)
+    y_regression = X[:, 0] * 0.5 + np.sin(X[:, 2]) * 3 + rng.normal(size=n_samples)
+    y_class = (X[:, 0] + X[:, 3] > 16).astype(int)
+    y_curve = np.cumsum(rng.random((n_samples, 3)) < 0.3, axis=1).clip(0, 1).astype(np.float64)
+    return X, y_regression, y_class, y_curve
+
+
+def fitted_models():
+    X, y_regression, y_class, y_curve = training_data()
+    common = dict(n_estimators=8, max_depth=6, random_state=0, n_jobs=1)
+    return {
+        'regressor': RandomForestRegressor(**common).fit(X, y_regression),
+        'classifier': RandomForestClassifier(**common, class_weight='balanced').fit(X, y_class),
+        'multi_output': RandomForestRegressor(**common, min_samples_leaf=5).fit(X, y_curve),
+        'gradient_boosting': GradientBoostingRegressor(n_estimators=20, max_depth=3, random_state=0).fit(X, y_regression)
+    }
+
+
+MODELS = fitted_models()
+
+
+def assert_same_outputs(model, compiled, X, rtol=1e-9):
+    if hasattr(model, 'classes_'):
+        np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+        np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), rtol=rtol, atol=1e-12)
+    else:
+        np.testing.assert_allclose(compiled.predict(X), model.predict(X), rtol=rtol, atol=1e-12)
+
+
+@pytest.mark.parametrize('name', list(MODELS))
+def test_matches_sklearn_around_thresholds(name):
+    model = MODELS[name]
+    compiled = CompiledForest.from_sklearn(model)
+    X = parity_samples(compiled, n_samples=1024, seed=1)
+    assert_same_outputs(model, compiled, X)
+    assert check_parity(model, compiled, X)['passed']
+
+
+@pytest.mark.parametrize('name', list(MODELS))
+def test_matches_sklearn_on_exact_thresholds(name):
+    # Inputs equal to a split value must go left, as in sklearn
+    model = MODELS[name]
+    compiled = CompiledForest.from_sklearn(model)
+    is_split = compiled.left != np.arange(len(compiled.left))
+    X = training_data(n_samples=64, seed=2)[0]
+    for column in range(compiled.n_features):
+        thresholds = compiled.threshold[is_split & (compiled.feature == column)].astype(np.float64)
+        if len(thresholds):
+            X[:, column] = np.resize(thresholds, len(X))
+    assert_same_outputs(model, compiled, X)
+
+
+@pytest.mark.parametrize('n_rows', [1, 2, 7])
+def test_single_and_small_calls(n_rows):
+    # The row counts the service routes to the compiled evaluator
+    X = training_data(n_samples=n_rows, seed=3)[0]
+    for model in MODELS.values():
+        assert_same_outputs(model, CompiledForest.from_sklearn(model), X)
+
+
+def test_tree_outputs_match_estimators():
+    model = MODELS['regressor']
+    X = training_data(n_samples=32, seed=4)[0]
+    expected = np.column_stack([tree.predict(X.astype(np.float32)) for tree in model.estimators_])
+    np.testing.assert_allclose(CompiledForest.from_sklearn(model).tree_outputs(X), expected, rtol=1e-12)
+
+
+def test_missing_values_follow_sklearn():
+    X, y_regression, _, _ = training_data(seed=5)
+    X[::7, 2] = np.nan
+    model = RandomForestRegressor(n_estimators=8, max_depth=6, random_state=0, n_jobs=1).fit(X, y_regression)
+    X_test = training_data(n_samples=50, seed=6)[0]
+    X_test[::3, 2] = np.nan
+    assert_same_outputs(model, CompiledForest.from_sklearn(model), X_test)
+
+
+def test_float32_values_within_tolerance():
+    model = MODELS['multi_output']
+    compiled = CompiledForest.from_sklearn(model, value_dtype=np.float32)
+    X = parity_samples(compiled, n_samples=512, seed=7)
+    assert_same_outputs(model, compiled, X, rtol=1e-6)
+
+
+def test_compile_model_package_attaches_checked_forest():
+    package = compile_model_package({'model': MODELS['classifier']}, n_samples=256)
+    assert isinstance(package['compiled'], CompiledForest)
+    assert package['compiled_info']['parity']['passed']
+
+
+def test_artifact_round_trip(tmp_path):
+    model = MODELS['classifier']
+    path = str(tmp_path / 'model.forest')
+    save_artifact({'model': model, 'feature_columns': [f'f{i}' for i in range(6)], 'version': '1.0.0'}, path)
+    package = load_artifact(path)
+    X = parity_samples(package['model'], n_samples=512, seed=8)
+    assert_same_outputs(model, package['model'], X, rtol=1e-6)
@@ -0,0 +1,199 @@
+"""
+Duration statistics: the $setWindowFields aggregation and the snapshot built
+from it, against the per-log loop predict_discharge used to run per request
+
+The loop is kept here as the reference. The aggregation itself needs a
+MongoDB server (5.0+ for $setWindowFields) at MONGO_URI; that test runs in
+a throwaway database and is skipped when no server is reachable.
+"""
+
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from config import settings
+from services.duration_stats import (
+    EMPTY_HISTORY_DURATION, DurationStatsEngine, DurationStatsSnapshot, build_duration_pipeline
+)
+from utils import get_time_of_day
+
+WARDS = ('ICU', 'General', 'Emergency', 'Pediatrics')
+
+
+def loop_averages(logs, bed_wards, ward, tod, since):
+    """
+    (ward_avg, time_avg, ward_time_avg) as the per-request loop computed them
+
+    Args:
+        logs: Dicts with bedId, timestamp and statusChange
+        bed_wards: Ward per bedId (beds missing from it count as General)
+    """
+    bed_groups = {}
+    for log in sorted((log for log in logs if log['timestamp'] >= since), key=lambda log: (str(log['bedId']), log['timestamp'])):
+        bed_groups.setdefault(str(log['bedId']), []).append(log)
+
+    ward_durations = {}
+    time_of_day_durations = {0: [], 1: [], 2: [], 3: []}
+    ward_time_durations = []
+    for bed_logs in bed_groups.values():
+        bed_ward = bed_wards.get(bed_logs[0]['bedId'], 'General')
+        for i in range(len(bed_logs) - 1):
+            if bed_logs[i]['statusChange'] == 'assigned' and bed_logs[i + 1]['statusChange'] == 'released':
+                duration_hours = (bed_logs[i + 1]['timestamp'] - bed_logs[i]['timestamp']).total_seconds() / 3600
+                if 0 < duration_hours < 8760:
+                    ward_durations.setdefault(bed_ward, []).append(duration_hours)
+                    admission_tod = get_time_of_day(bed_logs[i]['timestamp'].hour)
+                    time_of_day_durations[admission_tod].append(duration_hours)
+                    if bed_ward == ward and admission_tod == tod:
+                        ward_time_durations.append(duration_hours)
+
+    if ward_durations.get(ward):
+        ward_avg = sum(ward_durations[ward]) / len(ward_durations[ward])
+    else:
+        all_durations = [d for durations in ward_durations.values() for d in durations]
+        ward_avg = sum(all_durations) / len(all_durations) if all_durations else 48.0
+    time_avg = sum(time_of_day_durations[tod]) / len(time_of_day_durations[tod]) if time_of_day_durations[tod] else ward_avg
+    ward_time_avg = sum(ward_time_durations) / len(ward_time_durations) if ward_time_durations else ward_avg
+    return ward_avg, time_avg, ward_time_avg
+
+
+def random_logs(seed, n_beds=12, n_logs=400, now=None):
+    """Status changes over the last 25 days plus a few older than the 30-day window"""
+    rng = random.Random(seed)
+    now = now or datetime.utcnow()
+    beds = [ObjectId() for _ in range(n_beds)]
+    # Some beds missing from the beds collection count as General
+    bed_wards = {bed: rng.choice(WARDS[:3]) for bed in beds[:-2]}
+    changes = ['assigned', 'released', 'assigned', 'released', 'maintenance_start', 'maintenance_end', 'reserved']
+
+    logs = []
+    for _ in range(n_logs):
+        age = timedelta(seconds=rng.randrange(0, 25 * 86400)) if rng.random() < 0.95 else timedelta(days=40)
+        logs.append({
+            'bedId': rng.choice(beds),
+            # Millisecond precision, as MongoDB stores dates
+            'timestamp': (now - age).replace(microsecond=rng.randrange(1000) * 1000),
+            'statusChange': rng.choice(changes)
+        })
+    return logs, bed_wards
+
+
+def snapshot_from_loop(logs, bed_wards, since):
+    """DurationStatsSnapshot fed with the loop's sessions summed per (ward, time_of_day)"""
+    sums = {}
+    bed_groups = {}
+    for log in sorted((log for log in logs if log['timestamp'] >= since), key=lambda log: (str(log['bedId']), log['timestamp'])):
+        bed_groups.setdefault(log['bedId'], []).append(log)
+    for bed, bed_logs in bed_groups.items():
+        for current, following in zip(bed_logs, bed_logs[1:]):
+            if current['statusChange'] == 'assigned' and following['statusChange'] == 'released':
+                hours = (following['timestamp'] - current['timestamp']).total_seconds() / 3600
+                if 0 < hours < 8760:
+                    key = (bed_wards.get(bed, 'General'), get_time_of_day(current['timestamp'].hour))
+                    total = sums.setdefault(key, [0.0, 0])
+                    total[0] += hours
+                    total[1] += 1
+    groups = [
+        {'_id': {'ward': ward, 'time_of_day': tod}, 'total_hours': hours, 'count': count}
+        for (ward, tod), (hours, count) in sums.items()
+    ]
+    return DurationStatsSnapshot(groups, datetime.utcnow())
+
+
+def assert_matches_loop(lookup, logs, bed_wards, since):
+    for ward in WARDS:
+        for tod in range(4):
+            assert lookup(ward, tod) == pytest.approx(loop_averages(logs, bed_wards, ward, tod, since), rel=1e-9), (ward, tod)
+
+
+def test_pipeline_time_of_day_buckets_match_utils():
+    project = next(stage['$project'] for stage in build_duration_pipeline(datetime.utcnow()) if 'time_of_day' in stage.get('$project', {}))
+    switch = project['time_of_day']['$switch']
+
+    def evaluate(expression, hour):
+        operator, operands = next(iter(expression.items()))
+        if operator == '$and':
+            return all(evaluate(operand, hour) for operand in operands)
+        left, right = (hour if operand == '$hour' else operand for operand in operands)
+        return {'$gte': left >= right, '$lt': left < right}[operator]
+
+    for hour in range(24):
+        bucket = next((branch['then'] for branch in switch['branches'] if evaluate(branch['case'], hour)), switch['default'])
+        assert bucket == get_time_of_day(hour), hour
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_snapshot_lookup_matches_loop(seed):
+    logs, bed_wards = random_logs(seed)
+    since = datetime.utcnow() - timedelta(days=30)
+    assert_matches_loop(snapshot_from_loop(logs, bed_wards, since).lookup, logs, bed_wards, since)
+
+
+def test_snapshot_fallbacks_match_loop():
+    # Two morning stays (ICU 12h, General 4h; General's afternoon assignment
+    # ends in maintenance): the other groups fall back
+    day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=2)
+    icu, general = ObjectId(), ObjectId()
+    logs = [
+        {'bedId': icu, 'timestamp': day + timedelta(hours=8), 'statusChange': 'assigned'},
+        {'bedId': icu, 'timestamp': day + timedelta(hours=20), 'statusChange': 'released'},
+        {'bedId': general, 'timestamp': day + timedelta(hours=13), 'statusChange': 'assigned'},
+        {'bedId': general, 'timestamp': day + timedelta(hours=19), 'statusChange': 'maintenance_start'},
+        {'bedId': general, 'timestamp': day + timedelta(hours=30), 'statusChange': 'assigned'},
+        {'bedId': general, 'timestamp': day + timedelta(hours=34), 'statusChange': 'released'}
+    ]
+    bed_wards = {icu: 'ICU', general: 'General'}
+    since = datetime.utcnow() - timedelta(days=30)
+
+    snapshot = snapshot_from_loop(logs, bed_wards, since)
+    assert snapshot.lookup('General', 0) == (4.0, 8.0, 4.0)
+    assert snapshot.lookup('ICU', 3) == (12.0, 12.0, 12.0)
+    assert snapshot.lookup('Pediatrics', 1) == (8.0, 8.0, 8.0)
+    assert_matches_loop(snapshot.lookup, logs, bed_wards, since)
+
+
+def test_snapshot_without_history_matches_loop():
+    since = datetime.utcnow() - timedelta(days=30)
+    snapshot = DurationStatsSnapshot([], datetime.utcnow())
+    assert snapshot.lookup('ICU', 0) == (EMPTY_HISTORY_DURATION,) * 3
+    assert_matches_loop(snapshot.lookup, [], {}, since)
+
+
+@pytest.fixture
+def mongo_database():
+    """Throwaway database on the MongoDB server at MONGO_URI (skipped if unreachable)"""
+    client = MongoClient(settings.MONGO_URI, serverSelectionTimeoutMS=500)
+    try:
+        version = tuple(client.server_info()['versionArray'][:2])
+    except PyMongoError:
+        client.close()
+        pytest.skip(f"No MongoDB server at {settings.MONGO_URI}")
+    if version < (5, 0):
+        client.close()
+        pytest.skip("$setWindowFields needs MongoDB 5.0 or later")
+
+    name = f"duration_stats_test_{uuid.uuid4().hex[:8]}"
+    try:
+        yield client[name]
+    finally:
+        client.drop_database(name)
+        client.close()
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_aggregation_matches_loop(mongo_database, seed):
+    logs, bed_wards = random_logs(seed)
+    mongo_database.beds.insert_many([{'_id': bed, 'ward': ward} for bed, ward in bed_wards.items()])
+    mongo_database.occupancylogs.insert_many([dict(log) for log in logs])
+
+    engine = DurationStatsEngine(mongo_database, window_days=30)
+    since = datetime.utcnow() - timedelta(days=30)
+    snapshot = engine.refresh()
+
+    assert snapshot.sessions > 0
+    assert_matches_loop(engine.lookup, logs, bed_wards, since)
@@ -0,0 +1,161 @@
+"""
+MicroBatcher: same-tick merging, dispatch on batch size and on max wait
+while the model is busy, and results/errors handed to every waiter
+"""
+
+import asyncio
+
+import numpy as np
+
+from services.micro_batcher import MicroBatcher
+
+
+class RowSum:
+    """compute callable returning each row's sum, recording the batches it ran"""
+
+    def __init__(self, error: Exception = None):
+        self.batches = []
+        self.gates = []
+        self.error = error
+        self.hold = False
+
+    async def __call__(self, X):
+        self.batches.append(X.copy())
+        if self.hold:
+            gate = asyncio.Event()
+            self.gates.append(gate)
+            await gate.wait()
+        if self.error is not None:
+            raise self.error
+        return X.sum(axis=1)
+
+    def release(self):
+        for gate in self.gates:
+            gate.set()
+
+
+def row(value):
+    return np.array([[value, 1.0]])
+
+
+async def settle():
+    """Let dispatch timers and started batches run"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def submit_all(batcher, compute, values, key='discharge:predict'):
+    return [asyncio.ensure_future(batcher.submit(key, row(value), compute)) for value in values]
+
+
+def test_same_tick_requests_share_one_call():
+    async def scenario():
+        batcher, compute = MicroBatcher(max_wait_ms=50, max_batch=16, enabled=True), RowSum()
+        results = await asyncio.gather(*await submit_all(batcher, compute, [1, 2, 3]))
+        return batcher, compute, results
+
+    batcher, compute, results = asyncio.run(scenario())
+
+    assert len(compute.batches) == 1
+    np.testing.assert_array_equal(compute.batches[0], np.vstack([row(1), row(2), row(3)]))
+    assert [result.tolist() for result in results] == [[2.0], [3.0], [4.0]]
+    assert (batcher.batches, batcher.rows) == (1, 3)
+
+
+def test_keys_are_batched_separately():
+    async def scenario():
+        batcher, compute = MicroBatcher(max_wait_ms=50, max_batch=16, enabled=True), RowSum()
+        waiters = await submit_all(batcher, compute, [1, 2]) + await submit_all(batcher, compute, [3], key='other')
+        await asyncio.gather(*waiters)
+        return compute
+
+    compute = asyncio.run(scenario())
+    assert sorted(len(batch) for batch in compute.batches) == [1, 2]
+
+
+def test_full_batch_dispatches_without_waiting_for_busy_model():
+    async def scenario():
+        batcher, compute = MicroBatcher(max_wait_ms=10_000, max_batch=3, enabled=True), RowSum()
+        compute.hold = True
+        first = await submit_all(batcher, compute, [1])
+        await settle()
+        assert len(compute.batches) == 1
+
+        # Model busy: two rows wait for it, the third fills the batch
+        queued = await submit_all(batcher, compute, [2, 3])
+        await asyncio.sleep(0.01)
+        assert len(compute.batches) == 1
+        queued += await submit_all(batcher, compute, [4])
+        await settle()
+        assert len(compute.batches) == 2
+        np.testing.assert_array_equal(compute.batches[1], np.vstack([row(2), row(3), row(4)]))
+
+        compute.release()
+        return await asyncio.gather(*first, *queued)
+
+    results = asyncio.run(scenario())
+    assert [result.tolist() for result in results] == [[2.0], [3.0], [4.0], [5.0]]
+
+
+def test_busy_model_dispatches_after_max_wait():
+    async def scenario():
+        batcher, compute = MicroBatcher(max_wait_ms=20, max_batch=16, enabled=True), RowSum()
+        compute.hold = True
+        first = await submit_all(batcher, compute, [1])
+        await settle()
+
+        queued = await submit_all(batcher, compute, [2, 3])
+        await asyncio.sleep(0.005)
+        assert len(compute.batches) == 1
+        await asyncio.sleep(0.05)
+        assert len(compute.batches) == 2
+
+        compute.release()
+        return compute, await asyncio.gather(*first, *queued)
+
+    compute, results = asyncio.run(scenario())
+    np.testing.assert_array_equal(compute.batches[1], np.vstack([row(2), row(3)]))
+    assert [result.tolist() for result in results] == [[2.0], [3.0], [4.0]]
+
+
+def test_queued_rows_dispatch_when_running_batch_completes():
+    async def scenario():
+        batcher, compute = MicroBatcher(max_wait_ms=10_000, max_batch=16, enabled=True), RowSum()
+        compute.hold = True
+        first = await submit_all(batcher, compute, [1])
+        await settle()
+        queued = await submit_all(batcher, compute, [2, 3])
+
+        compute.hold = False
+        compute.release()
+        return compute, await asyncio.wait_for(asyncio.gather(*first, *queued), timeout=1)
+
+    compute, results = asyncio.run(scenario())
+    assert [len(batch) for batch in compute.batches] == [1, 2]
+    assert [result.tolist() for result in results] == [[2.0], [3.0], [4.0]]
+
+
+def test_error_reaches_every_waiter_in_the_batch():
+    async def scenario():
+        batcher, compute = MicroBatcher(max_wait_ms=50, max_batch=16, enabled=True), RowSum(error=ValueError("bad batch"))
+        results = await asyncio.gather(*await submit_all(batcher, compute, [1, 2, 3]), return_exceptions=True)
+
+        compute.error = None
+        retried = await batcher.submit('discharge:predict', row(4), compute)
+        return compute, results, retried
+
+    compute, results, retried = asyncio.run(scenario())
+
+    assert len(compute.batches) == 2
+    assert all(isinstance(result, ValueError) and str(result) == "bad batch" for result in results)
+    assert retried.tolist() == [5.0]
+
+
+def test_disabled_batcher_calls_compute_directly():
+    async def scenario():
+        batcher, compute = MicroBatcher(max_wait_ms=50, max_batch=16, enabled=False), RowSum()
+        await asyncio.gather(*await submit_all(batcher, compute, [1, 2]))
+        return compute
+
+    compute = asyncio.run(scenario())
+    assert [len(batch) for batch in compute.batches] == [1, 1]
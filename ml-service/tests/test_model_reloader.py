@@ -0,0 +1,163 @@
+"""
+ModelReloader: content-hash versions on hot swap, bad artifacts rejected
+while the served model stays, rollback pinning and the file watcher
+"""
+
+import asyncio
+import itertools
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from services.model_artifact import save_artifact
+from services.model_reloader import ModelReloader, file_sha256
+
+FEATURES = ['hour', 'day_of_week']
+MTIMES = itertools.count(1)
+
+
+def package(target, version='1.0.0'):
+    """Discharge-style package whose trees all predict `target`"""
+    X = np.random.default_rng(0).random((20, len(FEATURES)))
+    model = RandomForestRegressor(n_estimators=3, random_state=0, n_jobs=1).fit(X, np.full(20, float(target)))
+    return {'model': model, 'feature_columns': FEATURES, 'version': version}
+
+
+def write(path, content):
+    """Write a .pkl and give it a new mtime, so every write is a new signature"""
+    joblib.dump(content, path)
+    mtime_ns = next(MTIMES) * 10**9
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def served_value(models):
+    return float(models['discharge']['model'].predict(np.zeros((1, len(FEATURES))))[0])
+
+
+@pytest.fixture
+def reloader(tmp_path):
+    path = str(tmp_path / 'discharge_model.pkl')
+    write(path, package(24))
+    models = {'discharge': package(24)}
+    swaps = []
+    reloader = ModelReloader(models, {'discharge': path}, on_swap=lambda name, p: swaps.append((name, p)), poll_seconds=0)
+    reloader.track_loaded()
+    reloader.swaps = swaps
+    return reloader
+
+
+def test_swap_gets_hash_suffixed_version(reloader):
+    path = reloader.paths['discharge']
+    write(path, package(48))
+
+    event = asyncio.run(reloader.reload('discharge'))
+
+    expected = f"1.0.0+{file_sha256(path)[:8]}"
+    assert (event['status'], event['version']) == ('swapped', expected)
+    assert reloader.models['discharge']['version'] == expected
+    assert served_value(reloader.models) == 48.0
+    assert [name for name, _ in reloader.swaps] == ['discharge']
+    assert served_value({'discharge': reloader.previous['discharge']}) == 24.0
+
+
+def test_same_declared_version_gets_distinct_versions(reloader):
+    path = reloader.paths['discharge']
+    write(path, package(48))
+    first = asyncio.run(reloader.reload('discharge'))['version']
+    write(path, package(72))
+    second = asyncio.run(reloader.reload('discharge'))['version']
+
+    assert first != second and first.startswith('1.0.0+') and second.startswith('1.0.0+')
+
+
+def test_artifact_version_uses_content_hash(reloader, tmp_path):
+    path = str(tmp_path / 'discharge_model.forest')
+    artifact = save_artifact(package(48), path)
+    reloader.paths['discharge'] = path
+
+    event = asyncio.run(reloader.reload('discharge'))
+
+    assert event['version'] == f"1.0.0+{artifact['content_sha256'][:8]}"
+    assert served_value(reloader.models) == 48.0
+
+
+def test_identical_file_is_not_swapped(reloader):
+    write(reloader.paths['discharge'], package(48))
+    asyncio.run(reloader.reload('discharge'))
+
+    event = asyncio.run(reloader.reload('discharge'))
+
+    assert event['status'] == 'unchanged'
+    assert len(reloader.swaps) == 1
+
+
+@pytest.mark.parametrize("bad", [
+    {'model': None},
+    {'feature_columns': FEATURES},
+    b'not a pickle'
+])
+def test_bad_artifact_keeps_served_model(reloader, bad):
+    path = reloader.paths['discharge']
+    served = reloader.models['discharge']
+    if isinstance(bad, bytes):
+        with open(path, 'wb') as artifact:
+            artifact.write(bad)
+    else:
+        write(path, bad)
+
+    event = asyncio.run(reloader.reload('discharge'))
+
+    assert event['status'] == 'failed' and event['error']
+    assert reloader.models['discharge'] is served
+    assert reloader.swaps == []
+
+
+def test_watcher_does_not_retry_a_rejected_file(reloader):
+    write(reloader.paths['discharge'], {'model': None})
+    # First poll sees the change, second reloads the stable file, third must not retry
+    for _ in range(3):
+        asyncio.run(reloader.check_files())
+
+    assert [event['status'] for event in reloader.history] == ['failed']
+
+
+def test_rollback_restores_previous_and_pins(reloader):
+    path = reloader.paths['discharge']
+    original = reloader.models['discharge']
+    write(path, package(48))
+    asyncio.run(reloader.reload('discharge'))
+
+    event = asyncio.run(reloader.rollback('discharge'))
+
+    assert event['status'] == 'swapped'
+    assert reloader.models['discharge'] is original
+    assert reloader.pinned['discharge']
+
+    # Pinned: the watcher ignores new files until a manual reload
+    write(path, package(72))
+    asyncio.run(reloader.check_files())
+    asyncio.run(reloader.check_files())
+    assert reloader.models['discharge'] is original
+
+    asyncio.run(reloader.reload('discharge'))
+    assert not reloader.pinned['discharge']
+    assert served_value(reloader.models) == 72.0
+
+
+def test_rollback_without_previous_fails(reloader):
+    event = asyncio.run(reloader.rollback('discharge'))
+    assert event['status'] == 'failed'
+
+
+def test_watcher_reloads_once_file_is_stable(reloader):
+    write(reloader.paths['discharge'], package(48))
+
+    asyncio.run(reloader.check_files())
+    assert served_value(reloader.models) == 24.0
+
+    asyncio.run(reloader.check_files())
+    assert served_value(reloader.models) == 48.0
+    assert reloader.history[-1]['action'] == 'reload:watcher'
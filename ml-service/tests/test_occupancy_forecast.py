@@ -0,0 +1,86 @@
+"""
+Remaining stays and expected-occupancy curves (services.occupancy_forecast)
+and the /forecast/occupancy route that wires them to the discharge model
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from routes import forecast
+from services.occupancy_forecast import hours_between, hours_since, occupancy_curves, remaining_stay_hours
+
+NOW = datetime(2025, 12, 1, 12)
+
+
+def test_hours_since_and_between():
+    times = [NOW - timedelta(hours=40), None, NOW + timedelta(hours=3, minutes=30)]
+    np.testing.assert_allclose(hours_since(times, NOW), [40.0, np.nan, -3.5])
+    np.testing.assert_allclose(hours_between(times, NOW), [-40.0, np.nan, 3.5])
+
+
+def test_remaining_stay_subtracts_elapsed():
+    # Admitted 40h ago with a 48h predicted stay: 8h left
+    remaining = remaining_stay_hours(np.array([[48.0]]), hours_since([NOW - timedelta(hours=40)], NOW))
+    np.testing.assert_allclose(remaining, [[8.0]])
+
+
+def test_remaining_stay_drops_trees_and_marks_overdue():
+    tree_hours = np.array([
+        [48.0, 30.0, 60.0],   # 40h in: the 30h tree is already wrong
+        [10.0, 20.0, 30.0],   # 40h in: every tree is, the bed is overdue
+        [10.0, 20.0, 30.0]    # 5h in
+    ])
+    remaining = remaining_stay_hours(tree_hours, np.array([40.0, 40.0, 5.0]))
+    np.testing.assert_allclose(remaining, [[8.0, np.nan, 20.0], [0.0, 0.0, 0.0], [5.0, 15.0, 25.0]])
+
+
+def test_manual_discharge_time_replaces_trees():
+    manual = hours_between([None, NOW + timedelta(hours=3, minutes=30), NOW - timedelta(hours=1)], NOW)
+    remaining = remaining_stay_hours(np.array([[48.0, 50.0]] * 3), np.array([40.0, 40.0, 40.0]), manual)
+    np.testing.assert_allclose(remaining, [[8.0, 10.0], [3.5, 3.5], [0.0, 0.0]])
+
+
+def test_occupancy_curves():
+    # Ward 0: one bed leaving in 8h, one with a manual discharge in 3.5h
+    # Ward 1: one bed whose trees split between 2h and 6h left
+    curves = occupancy_curves(
+        ward_index=np.array([0, 0, 1]),
+        n_wards=2,
+        tree_hours=np.array([[48.0, 48.0], [100.0, 100.0], [12.0, 16.0]]),
+        elapsed_hours=np.array([40.0, 10.0, 10.0]),
+        horizon_hours=10,
+        manual_remaining_hours=np.array([np.nan, 3.5, np.nan])
+    )
+    np.testing.assert_array_equal(curves['occupied'], [2.0, 1.0])
+
+    discharges = np.zeros((2, 10))
+    discharges[0, [3, 7]] = 1.0      # hours 4 and 8
+    discharges[1, [1, 5]] = 0.5      # hours 2 and 6
+    np.testing.assert_allclose(curves['discharges'], discharges)
+
+    expected = np.array([
+        [2, 2, 2, 2, 1, 1, 1, 1, 0, 0, 0],
+        [1, 1, 0.5, 0.5, 0.5, 0.5, 0, 0, 0, 0, 0]
+    ])
+    np.testing.assert_allclose(curves['expected_occupied'], expected)
+
+
+def test_occupancy_curves_keep_beds_past_the_horizon():
+    curves = occupancy_curves(np.array([0]), 1, np.array([[100.0]]), np.array([1.0]), horizon_hours=24)
+    np.testing.assert_allclose(curves['expected_occupied'], np.ones((1, 25)))
+
+
+def test_occupancy_route_uses_elapsed_stay(ward_beds_db, constant_stay_discharge):
+    # Admitted 40h ago, 48h predicted stay: discharged in hour 8, not hour 88
+    now = datetime.utcnow()
+    database = ward_beds_db({'ICU': 4}, [{'bedId': 'b1', 'ward': 'ICU', 'admission_time': now - timedelta(hours=40)}])
+    constant_stay_discharge(48)
+    response = asyncio.run(forecast.forecast_occupancy(ward=None, horizon=12, db=database))
+
+    ward = response['prediction']['ICU']
+    assert ward['occupied'] == 1
+    assert ward['expected_occupied'][:8] == [1.0] * 8
+    assert ward['expected_occupied'][8:] == [0.0] * 5
+    assert sum(ward['expected_discharges']) == 1.0
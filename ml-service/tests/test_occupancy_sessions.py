@@ -0,0 +1,103 @@
+"""
+services.occupancy_sessions.pair_sessions against the per-log loop the
+discharge training scripts used before
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from services.occupancy_sessions import occupancy_sessions, pair_sessions
+
+CHANGES = ['assigned', 'released', 'maintenance_start', 'maintenance_end', 'reserved', None]
+
+
+def loop_sessions(event_beds, timestamps, status_changes):
+    """(assigned, released) log indices from the old extract_occupancy_data loop"""
+    bed_sessions = {}
+    for i, (bed_id, timestamp, status_change) in enumerate(zip(event_beds, timestamps, status_changes)):
+        if status_change == 'assigned':
+            if bed_id not in bed_sessions:
+                bed_sessions[bed_id] = []
+            bed_sessions[bed_id].append({'assigned': i, 'released': None, 'released_time': None})
+
+        elif status_change == 'released' and bed_id in bed_sessions:
+            for session in reversed(bed_sessions[bed_id]):
+                if session['released_time'] is None:
+                    session['released_time'] = timestamp
+                    session['released'] = i
+                    break
+
+    pairs = [
+        (session['assigned'], session['released'])
+        for sessions in bed_sessions.values() for session in sessions
+        if session['released_time'] is not None
+    ]
+    return np.array(pairs, dtype=np.int64).reshape(-1, 2)
+
+
+def random_logs(n_logs, n_beds, seed, p_changes=(0.4, 0.4, 0.06, 0.06, 0.04, 0.04)):
+    """
+    Logs in timestamp order with many tied timestamps (whole hours over a
+    few days), nested admissions and releases with nothing open
+    """
+    rng = np.random.default_rng(seed)
+    start = datetime(2025, 1, 1)
+    hours = np.sort(rng.integers(0, 72, n_logs))
+    event_beds = [f'bed-{code}' for code in rng.integers(0, n_beds, n_logs)]
+    timestamps = [start + timedelta(hours=int(hour)) for hour in hours]
+    status_changes = [CHANGES[code] for code in rng.choice(len(CHANGES), n_logs, p=p_changes)]
+    return event_beds, timestamps, status_changes
+
+
+def paired(event_beds, timestamps, status_changes):
+    assigned, released = pair_sessions(event_beds, timestamps, status_changes)
+    return np.column_stack([assigned, released]).astype(np.int64).reshape(-1, 2)
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('n_logs,n_beds', [(50, 3), (500, 20), (3000, 200)])
+def test_matches_loop_on_random_logs(seed, n_logs, n_beds):
+    logs = random_logs(n_logs, n_beds, seed)
+    np.testing.assert_array_equal(paired(*logs), loop_sessions(*logs))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_loop_with_unbalanced_changes(seed):
+    # Mostly releases (most close nothing), then mostly admissions (most stay open)
+    releases = random_logs(300, 5, seed, p_changes=(0.2, 0.7, 0.0, 0.0, 0.1, 0.0))
+    admissions = random_logs(300, 5, seed + 100, p_changes=(0.7, 0.2, 0.0, 0.0, 0.1, 0.0))
+    for logs in (releases, admissions):
+        np.testing.assert_array_equal(paired(*logs), loop_sessions(*logs))
+
+
+def test_ties_keep_log_order():
+    t = datetime(2025, 1, 1, 8)
+    # Release logged before the admission at the same time closes the earlier stay
+    logs = (
+        ['a', 'a', 'a', 'a', 'b', 'b'],
+        [t, t + timedelta(hours=1), t + timedelta(hours=1), t + timedelta(hours=2), t, t],
+        ['assigned', 'released', 'assigned', 'released', 'released', 'assigned']
+    )
+    np.testing.assert_array_equal(paired(*logs), [[0, 1], [2, 3]])
+    np.testing.assert_array_equal(paired(*logs), loop_sessions(*logs))
+
+
+def test_no_sessions():
+    t = datetime(2025, 1, 1)
+    assert paired([], [], []).shape == (0, 2)
+    assert paired(['a', 'b'], [t, t], ['released', 'maintenance_start']).shape == (0, 2)
+    assert paired(['a'], [t], ['assigned']).shape == (0, 2)
+
+
+def test_occupancy_sessions_frame():
+    event_beds, timestamps, status_changes = random_logs(400, 10, seed=7)
+    user_ids = [f'user-{i}' for i in range(len(event_beds))]
+    sessions = occupancy_sessions(event_beds, timestamps, status_changes, user_ids)
+    expected = loop_sessions(event_beds, timestamps, status_changes)
+
+    assert sessions['bed_id'].tolist() == [event_beds[i] for i in expected[:, 0]]
+    assert sessions['user_id'].tolist() == [user_ids[i] for i in expected[:, 0]]
+    assert sessions['assigned_time'].tolist() == [timestamps[i] for i in expected[:, 0]]
+    assert sessions['released_time'].tolist() == [timestamps[i] for i in expected[:, 1]]
@@ -0,0 +1,117 @@
+"""
+Closed-form threshold crossing (services.occupancy_warning) against a
+brute-force enumeration of every outcome on a small hand-built ward, and
+the /forecast/threshold-crossing route
+"""
+
+import asyncio
+import itertools
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from routes import forecast
+from services.occupancy_warning import (
+    CROSSING_PROBABILITY, occupancy_moments, probability_above, threshold_limits, threshold_warnings
+)
+
+HORIZON = 8
+
+# Per-tree remaining hours of 10 occupied beds (NaN = dropped tree)
+BED_REMAINING = np.array([
+    [0.5, 1.5, 2.5, np.nan],
+    [3.0, 3.0, 7.0, 9.0],
+    [1.0, 6.2, 6.8, 20.0],
+    [20.0, 30.0, 40.0, 50.0],
+    [2.0, np.nan, np.nan, np.nan],
+    [4.5, 5.5, 5.5, 12.0],
+    [0.2, 0.2, 8.0, 8.0],
+    [5.0, 6.0, 7.0, 8.0],
+    [1.0, 2.0, 3.0, 4.0],
+    [9.0, 10.0, 2.0, 3.0]
+])
+ARRIVAL_RATES = np.array([[0.4, 0.1, 0.0, 0.7, 0.3, 0.2, 0.5, 0.1]])
+STAY_HOURS = np.array([[1.5, 3.0, 6.0, 30.0, np.nan]])
+CAPACITY = np.array([10])
+
+
+def presence_by_enumeration(remaining):
+    """P(bed still there at hour h): share of its trees whose discharge hour ceil(r) is after h"""
+    kept = remaining[~np.isnan(remaining)]
+    return np.array([(np.ceil(kept) > h).mean() for h in range(HORIZON + 1)])
+
+
+def arrivals_by_enumeration(rates, stays):
+    """Expected arrivals still present at each hour, summed over arrival hours and stay samples"""
+    kept = stays[~np.isnan(stays)]
+    return np.array([
+        sum(rates[t - 1] * (np.ceil(kept) > h - t).mean() for t in range(1, h + 1))
+        for h in range(HORIZON + 1)
+    ])
+
+
+def exact_probability_above(limit):
+    """P(occupancy >= limit) per hour by enumerating every subset of beds still there"""
+    presence = np.array([presence_by_enumeration(row) for row in BED_REMAINING])
+    arrivals = arrivals_by_enumeration(ARRIVAL_RATES[0], STAY_HOURS[0])
+    exact = np.zeros(HORIZON + 1)
+    for h in range(HORIZON + 1):
+        for outcome in itertools.product([0, 1], repeat=len(BED_REMAINING)):
+            staying = np.array(outcome, dtype=bool)
+            p = np.prod(np.where(staying, presence[:, h], 1.0 - presence[:, h]))
+            needed = limit - staying.sum()
+            # Poisson arrivals still present: P(A >= needed)
+            below = sum(math.exp(-arrivals[h]) * arrivals[h] ** k / math.factorial(k) for k in range(max(needed, 0)))
+            exact[h] += p * (1.0 - below)
+    return exact, presence, arrivals
+
+
+@pytest.mark.parametrize('threshold', [0.5, 0.7])
+def test_matches_enumeration(threshold):
+    limit = threshold_limits(CAPACITY, threshold)
+    exact, presence, arrivals = exact_probability_above(int(limit[0]))
+    moments = occupancy_moments(np.zeros(len(BED_REMAINING)), 1, BED_REMAINING, ARRIVAL_RATES, STAY_HOURS)
+
+    # Mean and variance are exact
+    np.testing.assert_allclose(moments['mean'][0], presence.sum(axis=0) + arrivals, rtol=1e-12)
+    np.testing.assert_allclose(
+        moments['variance'][0], (presence * (1 - presence)).sum(axis=0) + arrivals, rtol=1e-12
+    )
+
+    # The normal approximation stays close to the exact probability
+    approximate = probability_above(moments['mean'], moments['variance'], limit)[0]
+    np.testing.assert_allclose(approximate, exact, atol=0.05)
+
+    # ... and is on the same side of the crossing probability at every hour
+    np.testing.assert_array_equal(approximate >= CROSSING_PROBABILITY, exact >= CROSSING_PROBABILITY)
+
+
+def test_threshold_limits():
+    np.testing.assert_array_equal(threshold_limits([10, 20, 7, 1], 0.9), [10, 19, 7, 1])
+
+
+def test_deterministic_ward():
+    # Zero variance: probability is 0 or 1 from the mean alone
+    warnings = threshold_warnings(
+        ward_index=np.array([0, 0]),
+        capacity=np.array([2]),
+        bed_remaining=np.array([[3.0], [100.0]]),
+        arrival_rates=np.zeros((1, 6)),
+        stay_hours=np.full((1, 1), np.nan),
+        threshold=0.5
+    )
+    np.testing.assert_array_equal(warnings['probability_above'][0], [1, 1, 1, 0, 0, 0, 0])
+    assert warnings['hour'][0] == 0
+
+
+def test_threshold_route_uses_elapsed_stay(ward_beds_db, constant_stay_discharge):
+    # One-bed ward, bed admitted 40h ago with a 48h stay: above 50% until hour 8
+    now = datetime.utcnow()
+    database = ward_beds_db({'ICU': 1}, [{'bedId': 'b1', 'ward': 'ICU', 'admission_time': now - timedelta(hours=40)}])
+    constant_stay_discharge(48)
+    response = asyncio.run(forecast.forecast_threshold_crossing(ward=None, threshold=0.5, horizon=12, db=database))
+    ward = response['prediction']['ICU']
+    assert ward['probability_above'] == [1.0] * 8 + [0.0] * 5
+    assert ward['above_now']
@@ -0,0 +1,160 @@
+"""
+PredictionCache: per-row hits, TTL expiry, LRU eviction, invalidation and
+in-flight coalescing of identical rows
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from services import prediction_cache
+from services.prediction_cache import PredictionCache
+
+
+class Clock:
+    """Stand-in for time.monotonic in services.prediction_cache"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prediction_cache.time, 'monotonic', clock)
+    return clock
+
+
+class RowSum:
+    """compute callable returning each row's sum, recording the rows it was given"""
+
+    def __init__(self, gate: asyncio.Event = None, error: Exception = None):
+        self.calls = []
+        self.gate = gate
+        self.error = error
+
+    async def __call__(self, X):
+        self.calls.append(X.copy())
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.error is not None:
+            raise self.error
+        return X.sum(axis=1)
+
+
+def rows(*values):
+    return np.array([[value, 1.0] for value in values])
+
+
+def test_computes_only_uncached_rows(clock):
+    cache, compute = PredictionCache(max_entries=10, ttl_seconds=60, enabled=True), RowSum()
+
+    first = asyncio.run(cache.predict('discharge:predict', 'v1', rows(1, 2), compute))
+    second = asyncio.run(cache.predict('discharge:predict', 'v1', rows(2, 3, 1), compute))
+
+    np.testing.assert_array_equal(first, [2, 3])
+    np.testing.assert_array_equal(second, [3, 4, 2])
+    np.testing.assert_array_equal(compute.calls[1], rows(3))
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_entries_expire_after_ttl(clock):
+    cache, compute = PredictionCache(max_entries=10, ttl_seconds=60, enabled=True), RowSum()
+
+    asyncio.run(cache.predict('discharge:predict', 'v1', rows(1), compute))
+    clock.now += 59.9
+    asyncio.run(cache.predict('discharge:predict', 'v1', rows(1), compute))
+    assert len(compute.calls) == 1
+
+    clock.now += 0.1
+    asyncio.run(cache.predict('discharge:predict', 'v1', rows(1), compute))
+    assert len(compute.calls) == 2
+    assert cache.expirations == 1
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache, compute = PredictionCache(max_entries=2, ttl_seconds=60, enabled=True), RowSum()
+
+    asyncio.run(cache.predict('discharge:predict', 'v1', rows(1, 2), compute))
+    # Using row 1 makes row 2 the least recently used
+    asyncio.run(cache.predict('discharge:predict', 'v1', rows(1), compute))
+    asyncio.run(cache.predict('discharge:predict', 'v1', rows(3), compute))
+    assert cache.evictions == 1
+
+    compute.calls.clear()
+    asyncio.run(cache.predict('discharge:predict', 'v1', rows(1, 2, 3), compute))
+    assert len(compute.calls) == 1
+    np.testing.assert_array_equal(compute.calls[0], rows(2))
+
+
+def test_keys_include_model_version_and_invalidation_is_per_model(clock):
+    cache, compute = PredictionCache(max_entries=10, ttl_seconds=60, enabled=True), RowSum()
+
+    asyncio.run(cache.predict('discharge:predict', 'v1', rows(1), compute))
+    asyncio.run(cache.predict('discharge:predict', 'v2', rows(1), compute))
+    asyncio.run(cache.predict('cleaning_duration:predict', 'v1', rows(1), compute))
+    assert len(compute.calls) == 3
+
+    cache.invalidate('discharge')
+    asyncio.run(cache.predict('cleaning_duration:predict', 'v1', rows(1), compute))
+    asyncio.run(cache.predict('discharge:predict', 'v1', rows(1), compute))
+    assert len(compute.calls) == 4
+
+
+def test_concurrent_identical_rows_compute_once():
+    async def scenario():
+        cache = PredictionCache(max_entries=10, ttl_seconds=60, enabled=True)
+        compute = RowSum(gate=asyncio.Event())
+        waiters = [
+            asyncio.ensure_future(cache.predict('discharge:predict', 'v1', X, compute))
+            for X in (rows(1, 2), rows(2, 1), rows(1, 1, 2))
+        ]
+        await asyncio.sleep(0)
+        assert cache.snapshot()['in_flight'] == 2
+        compute.gate.set()
+        return compute, cache, await asyncio.gather(*waiters)
+
+    compute, cache, results = asyncio.run(scenario())
+
+    assert len(compute.calls) == 1
+    np.testing.assert_array_equal(compute.calls[0], rows(1, 2))
+    for result, expected in zip(results, ([2, 3], [3, 2], [2, 2, 3])):
+        np.testing.assert_array_equal(result, expected)
+    assert (cache.misses, cache.coalesced) == (2, 5)
+    assert cache.snapshot()['in_flight'] == 0
+
+
+def test_failed_computation_reaches_every_waiter_and_is_not_cached():
+    async def scenario():
+        cache = PredictionCache(max_entries=10, ttl_seconds=60, enabled=True)
+        compute = RowSum(gate=asyncio.Event(), error=RuntimeError("model failed"))
+        waiters = [
+            asyncio.ensure_future(cache.predict('discharge:predict', 'v1', rows(1), compute))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        compute.gate.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+
+        compute.error = None
+        retried = await cache.predict('discharge:predict', 'v1', rows(1), compute)
+        return compute, results, retried
+
+    compute, results, retried = asyncio.run(scenario())
+
+    assert [str(result) for result in results] == ["model failed"] * 3
+    assert len(compute.calls) == 2
+    np.testing.assert_array_equal(retried, [2])
+
+
+def test_disabled_cache_always_computes():
+    cache, compute = PredictionCache(max_entries=10, ttl_seconds=60, enabled=False), RowSum()
+
+    asyncio.run(cache.predict('discharge:predict', 'v1', rows(1), compute))
+    asyncio.run(cache.predict('discharge:predict', 'v1', rows(1), compute))
+    assert len(compute.calls) == 2
+    assert cache.snapshot()['size'] == 0
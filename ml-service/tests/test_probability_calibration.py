@@ -0,0 +1,91 @@
+"""
+Probability calibration of the bed availability classifier: the isotonic map
+fitted in training, its serving-side interpolation and the routes using it
+"""
+
+import asyncio
+from datetime import datetime
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.isotonic import IsotonicRegression
+from sklearn.metrics import brier_score_loss
+
+from routes import predictions
+from schemas import BedAvailabilityBatchRequest, BedAvailabilityRequest
+from services.forest_outputs import calibrate_probability
+from train.train_bed_availability import fit_probability_calibration
+
+FEATURES = ['hour', 'day_of_week']
+
+
+def overconfident_samples(n, seed):
+    """Rows whose true availability rate is 0.3 + 0.4 * x, and the label drawn from it"""
+    rng = np.random.default_rng(seed)
+    X = rng.random((n, 2))
+    y = (rng.random(n) < 0.3 + 0.4 * X[:, 0]).astype(int)
+    return X, y
+
+
+@pytest.fixture
+def classifier():
+    X, y = overconfident_samples(600, seed=0)
+    # Deep trees on noisy labels: vote means pushed towards 0 and 1
+    return RandomForestClassifier(n_estimators=20, random_state=0, n_jobs=1).fit(X, y)
+
+
+def test_serving_matches_isotonic_regression(classifier):
+    X_calibration, y_calibration = overconfident_samples(600, seed=1)
+    calibration = fit_probability_calibration(classifier, X_calibration, y_calibration)
+    reference = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip').fit(
+        classifier.predict_proba(X_calibration)[:, 1], y_calibration
+    )
+
+    raw = np.concatenate([np.linspace(-0.5, 1.5, 101), classifier.predict_proba(overconfident_samples(200, seed=2)[0])[:, 1]])
+    np.testing.assert_allclose(calibrate_probability(raw, calibration), reference.predict(raw), atol=1e-5)
+
+
+def test_calibration_improves_held_out_brier(classifier):
+    calibration = fit_probability_calibration(classifier, *overconfident_samples(600, seed=1))
+    X_test, y_test = overconfident_samples(2000, seed=3)
+
+    raw = classifier.predict_proba(X_test)[:, 1]
+    calibrated = calibrate_probability(raw, calibration)
+    assert np.all(np.diff(calibrated[np.argsort(raw)]) >= 0)
+    assert brier_score_loss(y_test, calibrated) < brier_score_loss(y_test, raw)
+
+
+def test_without_calibration_returns_vote_mean():
+    raw = np.array([0.0, 0.25, 1.0])
+    np.testing.assert_array_equal(calibrate_probability(raw, None), raw)
+
+
+def install_classifier(monkeypatch, classifier, calibration):
+    package = {
+        'model': classifier, 'feature_columns': FEATURES,
+        'version': f'calibration-test-{calibration is not None}',
+        'probability_calibration': calibration
+    }
+    monkeypatch.setitem(predictions.models, 'bed_availability', package)
+
+
+def test_routes_serve_calibrated_probability(monkeypatch, classifier):
+    current_time = datetime(2026, 3, 2, 14)
+    X = np.array([[14, 0]], dtype=np.float64)
+    raw = float(classifier.predict_proba(X)[0, 1])
+    # Constant map: every forest probability is served as 0.2
+    install_classifier(monkeypatch, classifier, {'x': [0.0, 1.0], 'y': [0.2, 0.2]})
+
+    single = asyncio.run(predictions.predict_bed_availability(BedAvailabilityRequest(ward='ICU', current_time=current_time)))
+    assert single['prediction']['probability'] == 0.2
+    assert single['prediction']['will_be_available'] == bool(classifier.predict(X)[0])
+
+    batch = asyncio.run(predictions.predict_bed_availability_batch(BedAvailabilityBatchRequest(
+        items=[{'ward': 'ICU', 'current_time': current_time.isoformat()}, {'ward': 'General', 'current_time': current_time.isoformat()}]
+    )))
+    assert [item['probability'] for item in batch['prediction']] == [0.2, 0.2]
+
+    install_classifier(monkeypatch, classifier, None)
+    single = asyncio.run(predictions.predict_bed_availability(BedAvailabilityRequest(ward='ICU', current_time=current_time)))
+    assert single['prediction']['probability'] == round(raw, 4)
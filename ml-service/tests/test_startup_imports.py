@@ -0,0 +1,18 @@
+"""
+Service startup stays lean: heavy libraries are imported when first used
+(model loading, forecasts, training), not by `import main`
+"""
+
+import os
+import subprocess
+import sys
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_main_defers_heavy_libraries():
+    # A fresh interpreter: this test process has already imported sklearn
+    code = "import sys, main; print(' '.join(sorted({m.split('.')[0] for m in sys.modules})))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=SERVICE_DIR, capture_output=True, text=True, check=True)
+    loaded = set(result.stdout.split())
+    assert not loaded & {"scipy", "sklearn", "pandas"}
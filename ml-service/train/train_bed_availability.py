@@ -2,28 +2,38 @@
 Training script for Bed Availability Prediction Model
 
 This script:
-1. Connects to MongoDB and extracts Bed and CleaningLog data
-2. Builds features from current bed states and cleaning patterns
-3. Trains a Random Forest Classifier to predict bed availability
+1. Connects to MongoDB and extracts Bed and OccupancyLog data
+2. Labels a sample at every occupancy log with the time to the bed's next
+   release (vectorized, see label_availability_samples)
+3. Trains a Random Forest Classifier to predict bed availability and
+   calibrates its probabilities (isotonic, on held-out training samples)
 4. Evaluates model performance
 5. Saves the trained model to models/bed_availability_model.pkl
+6. Trains the availability curve model (probability of release within each
+   of settings.AVAILABILITY_CURVE_HORIZONS hours, one multi-output forest)
+   and saves it to models/bed_availability_curve_model.pkl
 """
 
 import sys
 import os
-from datetime import datetime, timedelta
+from collections import Counter
+from datetime import datetime
 import pandas as pd
 import numpy as np
 from pymongo import MongoClient
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.isotonic import IsotonicRegression
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report, brier_score_loss
 import joblib
 import logging
 
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import settings
+from services.availability_curve import censored_mask, release_labels
+from services.bed_timeline import CHANGE_CODES, MS_PER_HOUR, BedTimeline, as_times
+from services.model_artifact import artifact_path_for, artifact_size_bytes, save_artifact
 
 # Configure logging
 logging.basicConfig(
@@ -32,15 +42,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Label horizon of the classifier (will_be_available)
+AVAILABILITY_HORIZON_HOURS = settings.AVAILABILITY_CLASSIFIER_HORIZON_HOURS
+
 
 def connect_to_mongodb():
     """Connect to MongoDB and return database instance"""
     try:
         client = MongoClient(settings.MONGO_URI)
-        db_name = settings.MONGO_URI.split('/')[-1].split('?')[0]
-        if not db_name or db_name == '':
-            db_name = 'bedmanager'
-        db = client[db_name]
+        # Database named in the URI, bedmanager if it has none
+        db = client.get_default_database(settings.MONGO_DEFAULT_DB)
+        db_name = db.name
         
         db.command('ping')
         logger.info(f"Successfully connected to MongoDB: {db_name}")
@@ -50,112 +62,124 @@ def connect_to_mongodb():
         raise
 
 
+def label_availability_samples(event_beds, timestamps, status_changes, bed_wards, horizons=(AVAILABILITY_HORIZON_HOURS,)):
+    """
+    Training samples at every occupancy log, labelled by looking ahead to
+    the bed's next release
+    
+    Logs are sorted by (bed, timestamp) once (services.bed_timeline); each
+    log's next release is then a searchsorted over the positions of
+    'released' logs, so labelling is O(n log n) with no per-bed loops.
+    Every log except each bed's last is a sample.
+    
+    ward_occupancy_rate is taken at the sample's timestamp: occupied beds of
+    the ward at that time (BedTimeline.count_at) over the ward's beds, as
+    the ML service computes it from the beds collection at request time.
+    
+    Args:
+        event_beds: bedId per log
+        timestamps: Timestamp per log
+        status_changes: statusChange per log
+        bed_wards: Ward per bed id; logs of other beds are skipped
+        horizons: Hours for the released_within_{h}h label columns
+    
+    Returns:
+        DataFrame of samples in (bed, timestamp) order
+    """
+    timestamps = as_times(timestamps)
+    if not len(timestamps):
+        return pd.DataFrame()
+    data_end = timestamps.max()
+    
+    # Logs of beds in bed_wards only, so ward counts match the ward bed counts
+    event_beds = np.asarray(event_beds, dtype=object)
+    known = pd.Index(list(bed_wards)).get_indexer(event_beds) >= 0
+    timeline = BedTimeline(event_beds[known], timestamps[known], np.asarray(status_changes, dtype=object)[known], bed_wards)
+    
+    # Every log but each bed's last
+    event_bed = np.repeat(np.arange(timeline.n_beds), np.diff(timeline.offsets))
+    sampled = np.ones(timeline.n_events, dtype=bool)
+    sampled[timeline.offsets[1:] - 1] = False
+    event_bed = event_bed[sampled]
+    sample_ward = timeline.bed_ward[event_bed]
+    times = timeline.times[sampled]
+    changes = timeline.changes[sampled]
+    hours_until_release = timeline.event_hours_until('released')[sampled]
+    
+    ward_beds = Counter(ward or 'General' for ward in bed_wards.values())
+    ward_bed_counts = np.array([ward_beds[ward] for ward in timeline.wards], dtype=np.float64)
+    occupied = timeline.count_at(times, 'occupied')[sample_ward, np.arange(len(times))]
+    
+    current_times = pd.DatetimeIndex(times)
+    hour = current_times.hour.to_numpy()
+    day_of_week = current_times.dayofweek.to_numpy()
+    
+    df = pd.DataFrame({
+        'bed_id': np.asarray(timeline.bed_ids, dtype=object)[event_bed],
+        'ward': np.asarray(timeline.wards, dtype=object)[sample_ward],
+        'timestamp': current_times,
+        'hour': hour,
+        'day_of_week': day_of_week,
+        'is_weekend': (day_of_week >= 5).astype(int),
+        'is_business_hours': ((hour >= 8) & (hour <= 17)).astype(int),
+        # Current status
+        'is_occupied': np.isin(changes, [CHANGE_CODES['assigned'], CHANGE_CODES['reserved']]).astype(int),
+        'is_cleaning': (changes == CHANGE_CODES['maintenance_start']).astype(int),
+        'ward_occupancy_rate': occupied / ward_bed_counts[sample_ward],
+        'hours_until_release': hours_until_release,
+        'hours_observed': (data_end - times).astype(np.int64) / MS_PER_HOUR
+    })
+    
+    labels = release_labels(hours_until_release, horizons)
+    for k, horizon in enumerate(horizons):
+        df[f'released_within_{horizon:g}h'] = labels[:, k].astype(int)
+    
+    return df
+
+
 def extract_bed_availability_data(db):
     """
-    Extract bed and cleaning log data to predict future availability
+    Extract occupancy log data to predict future availability
     
     We'll create training samples by:
-    - Taking snapshots of bed states at different times
-    - Looking ahead to see if bed became available within prediction horizon
+    - Taking a snapshot of the bed's state at each of its occupancy logs
+    - Looking ahead to when the bed was next released (hours_until_release,
+      inf if never), which gives the 6-hour label and the curve targets
     """
     logger.info("Extracting bed availability data from MongoDB...")
     
     beds_collection = db['beds']
-    cleaning_logs = db['cleaninglogs']
     occupancy_logs = db['occupancylogs']
     
     # Get all occupancy logs to build timeline
-    occupancy_data = list(occupancy_logs.find().sort('timestamp', 1))
-    logger.info(f"Found {len(occupancy_data)} occupancy log entries")
-    
-    if len(occupancy_data) < 50:
+    event_beds, timestamps, status_changes = [], [], []
+    projection = {'bedId': 1, 'timestamp': 1, 'statusChange': 1, '_id': 0}
+    for log in occupancy_logs.find({}, projection).sort('timestamp', 1):
+        event_beds.append(str(log['bedId']))
+        timestamps.append(log['timestamp'])
+        status_changes.append(log.get('statusChange'))
+    logger.info(f"Found {len(timestamps)} occupancy log entries")
+    
+    if len(timestamps) < 50:
         logger.warning("Insufficient occupancy data for training")
         return pd.DataFrame()
     
     # Get bed information
-    beds_data = list(beds_collection.find())
-    beds_df = pd.DataFrame(beds_data)
+    bed_wards = {str(bed['_id']): bed.get('ward', 'General') for bed in beds_collection.find({}, {'ward': 1})}
     
-    if len(beds_df) == 0:
+    if len(bed_wards) == 0:
         logger.error("No beds found in database")
         return pd.DataFrame()
     
-    # Create bed lookup
-    bed_lookup = {str(bed['_id']): bed for bed in beds_data}
-    
-    # Get cleaning logs
-    cleaning_data = list(cleaning_logs.find().sort('startTime', 1))
-    logger.info(f"Found {len(cleaning_data)} cleaning log entries")
-    
     # Build training samples
-    samples = []
-    
-    # Group occupancy logs by bed
-    bed_timelines = {}
-    for log in occupancy_data:
-        bed_id = str(log['bedId'])
-        if bed_id not in bed_timelines:
-            bed_timelines[bed_id] = []
-        bed_timelines[bed_id].append(log)
-    
-    # For each bed, create samples at various points in time
-    for bed_id, timeline in bed_timelines.items():
-        if bed_id not in bed_lookup:
-            continue
-        
-        bed_info = bed_lookup[bed_id]
-        ward = bed_info.get('ward', 'General')
-        
-        # Sample at various points in the timeline
-        for i in range(0, len(timeline) - 1, max(1, len(timeline) // 20)):
-            log = timeline[i]
-            current_time = log['timestamp']
-            status_change = log['statusChange']
-            
-            # Look ahead to see when bed becomes available
-            future_time = current_time + timedelta(hours=6)
-            
-            # Check if bed became available within next 6 hours
-            became_available = False
-            for future_log in timeline[i+1:]:
-                if future_log['timestamp'] > future_time:
-                    break
-                if future_log['statusChange'] == 'released':
-                    became_available = True
-                    break
-            
-            # Extract features
-            hour = current_time.hour
-            day_of_week = current_time.weekday()
-            is_weekend = day_of_week >= 5
-            is_business_hours = 8 <= hour <= 17
-            
-            # Current status
-            is_occupied = status_change in ['assigned', 'reserved']
-            is_cleaning = status_change in ['maintenance_start']
-            
-            samples.append({
-                'bed_id': bed_id,
-                'ward': ward,
-                'timestamp': current_time,
-                'hour': hour,
-                'day_of_week': day_of_week,
-                'is_weekend': int(is_weekend),
-                'is_business_hours': int(is_business_hours),
-                'is_occupied': int(is_occupied),
-                'is_cleaning': int(is_cleaning),
-                'will_be_available': int(became_available)
-            })
-    
-    df = pd.DataFrame(samples)
+    df = label_availability_samples(event_beds, timestamps, status_changes, bed_wards)
     logger.info(f"Created {len(df)} training samples")
     
     if len(df) == 0:
         return df
     
-    # Add ward-level features
-    ward_occupancy = df.groupby('ward')['is_occupied'].transform('mean')
-    df['ward_occupancy_rate'] = ward_occupancy
+    # Check if bed became available within next 6 hours
+    df = df.rename(columns={f'released_within_{AVAILABILITY_HORIZON_HOURS:g}h': 'will_be_available'})
     
     # Time-based availability patterns
     time_availability = df.groupby('hour')['will_be_available'].transform('mean')
@@ -168,6 +192,23 @@ def extract_bed_availability_data(db):
     return df
 
 
+def hour_availability_table(df):
+    """
+    Availability rate per hour of day (24 values), as in the
+    hour_availability_rate feature; hours without samples get the overall rate
+    """
+    rates = df.groupby('hour')['will_be_available'].mean()
+    return rates.reindex(range(24)).fillna(df['will_be_available'].mean()).round(6).tolist()
+
+
+def ward_occupancy_table(df):
+    """
+    Mean point-in-time occupancy rate per ward, served in place of the live
+    rate when the ward snapshot is unavailable
+    """
+    return {ward: round(float(rate), 6) for ward, rate in df.groupby('ward')['ward_occupancy_rate'].mean().items()}
+
+
 def engineer_features(df):
     """Create additional features for bed availability prediction"""
     logger.info("Engineering features...")
@@ -202,6 +243,25 @@ def engineer_features(df):
     return df
 
 
+def fit_probability_calibration(model, X_calibration, y_calibration):
+    """
+    Isotonic map from the forest's probability of availability to the
+    observed availability rate, fitted on samples the forest was not trained on
+    
+    The class weights and the averaging of tree votes both distort the
+    forest's probabilities; the map corrects them without changing their
+    order. It is stored with the model as its knots ('x' increasing, 'y')
+    and applied at serving time by linear interpolation, clipped at the ends
+    (services.forest_outputs.calibrate_probability).
+    """
+    calibrator = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip')
+    calibrator.fit(model.predict_proba(X_calibration)[:, 1], y_calibration)
+    return {
+        'x': calibrator.X_thresholds_.round(6).tolist(),
+        'y': calibrator.y_thresholds_.round(6).tolist()
+    }
+
+
 def train_model(df):
     """Train Random Forest Classifier for bed availability prediction"""
     logger.info("Training bed availability prediction model...")
@@ -229,7 +289,15 @@ def train_model(df):
         stratify=y
     )
     
-    logger.info(f"Train set: {len(X_train)}, Test set: {len(X_test)}")
+    # Hold out part of the training split to calibrate the probabilities
+    X_train, X_calibration, y_train, y_calibration = train_test_split(
+        X_train, y_train,
+        test_size=settings.CALIBRATION_SIZE,
+        random_state=settings.RANDOM_STATE,
+        stratify=y_train
+    )
+    
+    logger.info(f"Train set: {len(X_train)}, Calibration set: {len(X_calibration)}, Test set: {len(X_test)}")
     
     # Train Random Forest Classifier with STRONG EMPHASIS ON WARD-BASED FEATURES
     # Bed availability patterns differ significantly by ward (ICU vs General vs Emergency)
@@ -249,6 +317,8 @@ def train_model(df):
     logger.info("  - ICU has longer stays → lower turnover than Emergency")
     model.fit(X_train, y_train)
     
+    calibration = fit_probability_calibration(model, X_calibration, y_calibration)
+    
     # Evaluate
     train_pred = model.predict(X_train)
     test_pred = model.predict(X_test)
@@ -261,6 +331,9 @@ def train_model(df):
     test_recall = recall_score(y_test, test_pred)
     train_f1 = f1_score(y_train, train_pred)
     test_f1 = f1_score(y_test, test_pred)
+    raw_proba = model.predict_proba(X_test)[:, 1]
+    test_brier_raw = brier_score_loss(y_test, raw_proba)
+    test_brier = brier_score_loss(y_test, np.interp(raw_proba, calibration['x'], calibration['y']))
     
     logger.info("\n" + "="*60)
     logger.info("MODEL EVALUATION - BED AVAILABILITY PREDICTION")
@@ -273,6 +346,8 @@ def train_model(df):
     logger.info(f"Test Recall:     {test_recall:.4f}")
     logger.info(f"Train F1:        {train_f1:.4f}")
     logger.info(f"Test F1:         {test_f1:.4f}")
+    logger.info(f"Test Brier (raw forest): {test_brier_raw:.4f}")
+    logger.info(f"Test Brier (calibrated): {test_brier:.4f}")
     logger.info("="*60)
     
     # Classification report
@@ -289,7 +364,7 @@ def train_model(df):
     for idx, row in feature_importance.head().iterrows():
         logger.info(f"  {row['feature']}: {row['importance']:.4f}")
     
-    return model, feature_columns, {
+    return model, feature_columns, calibration, {
         'train_accuracy': train_acc,
         'test_accuracy': test_acc,
         'train_precision': train_precision,
@@ -298,11 +373,73 @@ def train_model(df):
         'test_recall': test_recall,
         'train_f1': train_f1,
         'test_f1': test_f1,
+        'test_brier_raw': test_brier_raw,
+        'test_brier': test_brier,
+        'calibration_samples': len(X_calibration),
         'feature_importance': feature_importance.to_dict('records')
     }
 
 
-def save_model(model, feature_columns, metrics):
+def train_curve_model(df, feature_columns):
+    """
+    Train the availability curve model: one forest, one output per horizon
+    
+    Output k is the probability that the bed is released within
+    settings.AVAILABILITY_CURVE_HORIZONS[k] hours. Samples without an
+    observed release whose data ends before the longest horizon are
+    censored and left out.
+    """
+    horizons = list(settings.AVAILABILITY_CURVE_HORIZONS)
+    logger.info(f"Training bed availability curve model for horizons {horizons}...")
+    
+    censored = censored_mask(df['hours_until_release'], df['hours_observed'], horizons)
+    curve_df = df[~censored]
+    logger.info(f"Curve training samples: {len(curve_df)} ({int(censored.sum())} censored samples left out)")
+    
+    X = curve_df[feature_columns]
+    Y = release_labels(curve_df['hours_until_release'], horizons)
+    
+    X_train, X_test, Y_train, Y_test = train_test_split(
+        X, Y,
+        test_size=settings.TEST_SIZE,
+        random_state=settings.RANDOM_STATE
+    )
+    
+    # Regression on 0/1 targets: leaf means are release probabilities, and
+    # since the targets are cumulative over horizons every curve is monotone
+    model = RandomForestRegressor(
+        n_estimators=100,
+        max_depth=10,
+        min_samples_leaf=5,      # Larger leaves: smoother probabilities, compact multi-output nodes
+        max_features='sqrt',
+        random_state=settings.RANDOM_STATE,
+        n_jobs=-1
+    )
+    model.fit(X_train, Y_train)
+    
+    test_pred = np.clip(model.predict(X_test), 0.0, 1.0)
+    brier_by_horizon = {
+        f"{hours}h": float(brier_score_loss(Y_test[:, k], test_pred[:, k]))
+        for k, hours in enumerate(horizons)
+        if len(np.unique(Y_test[:, k])) > 1
+    }
+    
+    logger.info("\n" + "="*60)
+    logger.info("MODEL EVALUATION - BED AVAILABILITY CURVE")
+    logger.info("="*60)
+    for horizon, brier in brier_by_horizon.items():
+        logger.info(f"Test Brier score {horizon:>5}: {brier:.4f}")
+    logger.info("="*60)
+    
+    return model, horizons, {
+        'test_brier_by_horizon': brier_by_horizon,
+        'test_brier_mean': float(np.mean(list(brier_by_horizon.values()))) if brier_by_horizon else None,
+        'train_samples': len(X_train),
+        'censored_samples': int(censored.sum())
+    }
+
+
+def save_model(model, feature_columns, metrics, model_path=None, model_type='bed_availability_classifier', **extra):
     """Save trained model and metadata to disk"""
     logger.info("Saving model to disk...")
     
@@ -314,12 +451,21 @@ def save_model(model, feature_columns, metrics):
         'metrics': metrics,
         'trained_at': datetime.now().isoformat(),
         'version': '1.0.0',
-        'model_type': 'bed_availability_classifier'
+        'model_type': model_type,
+        **extra
     }
     
-    model_path = settings.BED_AVAILABILITY_MODEL_PATH
+    model_path = model_path or settings.BED_AVAILABILITY_MODEL_PATH
     joblib.dump(model_package, model_path)
     
+    # Compact artifact served by the ML service (metadata JSON + .npy blocks)
+    artifact_path = artifact_path_for(model_path)
+    artifact = save_artifact(model_package, artifact_path)
+    logger.info(
+        f"Artifact saved to: {artifact_path} "
+        f"({artifact_size_bytes(artifact_path) / (1024 * 1024):.2f} MB, sha256 {artifact['content_sha256'][:12]})"
+    )
+    
     logger.info(f"Model saved successfully to: {model_path}")
     
     if os.path.exists(model_path):
@@ -349,9 +495,26 @@ def main():
         
         df = engineer_features(df)
         
-        model, feature_columns, metrics = train_model(df)
+        model, feature_columns, calibration, metrics = train_model(df)
+        
+        # Served with the model: live requests look up the rate of their hour,
+        # and the ward rates stand in for the live ward snapshot
+        ward_features = dict(
+            hour_availability_rates=hour_availability_table(df),
+            ward_occupancy_rates=ward_occupancy_table(df),
+            ward_features='point_in_time'
+        )
+        
+        model_path = save_model(model, feature_columns, metrics, probability_calibration=calibration, **ward_features)
         
-        model_path = save_model(model, feature_columns, metrics)
+        curve_model, horizons, curve_metrics = train_curve_model(df, feature_columns)
+        curve_path = save_model(
+            curve_model, feature_columns, curve_metrics,
+            model_path=settings.BED_AVAILABILITY_CURVE_MODEL_PATH,
+            model_type='bed_availability_curve',
+            horizons=horizons,
+            **ward_features
+        )
         
         client.close()
         logger.info("MongoDB connection closed")
@@ -361,6 +524,8 @@ def main():
         logger.info(f"Model saved to: {model_path}")
         logger.info(f"Test Accuracy: {metrics['test_accuracy']:.4f}")
         logger.info(f"Test F1 Score: {metrics['test_f1']:.4f}")
+        logger.info(f"Test Brier Score: {metrics['test_brier']:.4f} (raw forest {metrics['test_brier_raw']:.4f})")
+        logger.info(f"Curve model saved to: {curve_path}")
         logger.info("="*60)
         
     except Exception as e:
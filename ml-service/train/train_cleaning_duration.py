@@ -24,6 +24,7 @@ import logging
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import settings
+from services.model_artifact import artifact_path_for, artifact_size_bytes, save_artifact
 
 # Configure logging
 logging.basicConfig(
@@ -37,10 +38,9 @@ def connect_to_mongodb():
     """Connect to MongoDB and return database instance"""
     try:
         client = MongoClient(settings.MONGO_URI)
-        db_name = settings.MONGO_URI.split('/')[-1].split('?')[0]
-        if not db_name or db_name == '':
-            db_name = 'bedmanager'
-        db = client[db_name]
+        # Database named in the URI, bedmanager if it has none
+        db = client.get_default_database(settings.MONGO_DEFAULT_DB)
+        db_name = db.name
         
         db.command('ping')
         logger.info(f"Successfully connected to MongoDB: {db_name}")
@@ -288,6 +288,14 @@ def save_model(model, feature_columns, metrics):
     model_path = settings.CLEANING_DURATION_MODEL_PATH
     joblib.dump(model_package, model_path)
     
+    # Compact artifact served by the ML service (metadata JSON + .npy blocks)
+    artifact_path = artifact_path_for(model_path)
+    artifact = save_artifact(model_package, artifact_path)
+    logger.info(
+        f"Artifact saved to: {artifact_path} "
+        f"({artifact_size_bytes(artifact_path) / (1024 * 1024):.2f} MB, sha256 {artifact['content_sha256'][:12]})"
+    )
+    
     logger.info(f"Model saved successfully to: {model_path}")
     
     if os.path.exists(model_path):
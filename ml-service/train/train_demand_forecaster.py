@@ -0,0 +1,157 @@
+"""
+Training script for the Emergency Demand Forecaster
+
+This script:
+1. Connects to MongoDB
+2. Builds hour-of-week arrival tables per ward from 'assigned' occupancy logs
+   and EmergencyRequest documents, week by week up to the last week
+3. Evaluates the smoothed tables on the held-out last week against a flat
+   per-ward hourly rate
+4. Folds in the last week (the same incremental step the service runs)
+5. Saves the tables to models/demand_forecast.npz
+
+The service keeps the tables up to date on its own from then on; rerun this
+script only to rebuild them from scratch (e.g. after changing the smoothing).
+
+Usage:
+    python train/train_demand_forecaster.py [--weeks 26]
+"""
+
+import sys
+import os
+import argparse
+from datetime import datetime, timedelta
+import numpy as np
+from pymongo import MongoClient
+import logging
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import settings
+from services.demand_forecast import DEMAND_SOURCES, build_tables, fetch_arrival_counts, slot_exposure
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def connect_to_mongodb():
+    """Connect to MongoDB and return database instance"""
+    try:
+        client = MongoClient(settings.MONGO_URI)
+        # Database named in the URI, bedmanager if it has none
+        db = client.get_default_database(settings.MONGO_DEFAULT_DB)
+        db_name = db.name
+
+        db.command('ping')
+        logger.info(f"Successfully connected to MongoDB: {db_name}")
+        return db, client
+    except Exception as e:
+        logger.error(f"Failed to connect to MongoDB: {e}")
+        raise
+
+
+def evaluate_holdout(tables, actual_counts, exposure):
+    """
+    Compare table forecasts with the arrivals of a held-out period
+
+    Args:
+        tables: DemandTables built from the data before the period
+        actual_counts: Source -> ward -> (168,) arrivals in the period
+        exposure: (168,) hours of each slot in the period
+
+    Returns:
+        Dict of metrics per source: MAE per hour of the tables and of a flat
+        per-ward rate, and the arrivals in the period
+    """
+    metrics = {}
+    for source_position, source in enumerate(DEMAND_SOURCES):
+        by_ward = actual_counts.get(source, {})
+        wards = sorted(set(tables.wards) | set(by_ward))
+        if not wards:
+            continue
+        actual = np.stack([by_ward.get(ward, np.zeros(len(exposure))) for ward in wards])
+
+        rates = np.zeros((len(wards), len(exposure)))
+        flat = np.zeros((len(wards), 1))
+        for position, ward in enumerate(wards):
+            if ward in tables.ward_positions:
+                ward_position = tables.ward_positions[ward]
+                rates[position] = tables.rates[ward_position, source_position]
+                flat[position] = tables.counts[ward_position, source_position].sum() / max(tables.exposure.sum(), 1e-9)
+
+        hours = max(exposure.sum(), 1e-9)
+        metrics[source] = {
+            'arrivals': float(actual.sum()),
+            'mae_per_hour': float(np.abs(actual - rates * exposure).sum() / hours / len(wards)),
+            'flat_rate_mae_per_hour': float(np.abs(actual - flat * exposure).sum() / hours / len(wards))
+        }
+    return metrics
+
+
+def main():
+    """Main training pipeline"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--weeks', type=int, default=settings.DEMAND_HISTORY_WEEKS, help='Weeks of history')
+    args = parser.parse_args()
+
+    try:
+        logger.info("="*60)
+        logger.info("EMERGENCY DEMAND FORECASTER TRAINING")
+        logger.info("="*60)
+
+        db, client = connect_to_mongodb()
+
+        now = datetime.utcnow()
+        since = now - timedelta(weeks=args.weeks)
+        holdout_start = now - timedelta(weeks=1)
+
+        logger.info(f"Building arrival tables from {since.isoformat()} to {holdout_start.isoformat()}...")
+        tables = build_tables(db, since, holdout_start)
+        logger.info(f"Wards: {tables.wards}")
+
+        if not tables.wards:
+            logger.error("No arrivals available for training")
+            return
+
+        holdout_counts = fetch_arrival_counts(db, holdout_start, now)
+        metrics = evaluate_holdout(tables, holdout_counts, slot_exposure(holdout_start, now))
+        for source, source_metrics in metrics.items():
+            logger.info(
+                f"{source}: {source_metrics['arrivals']:.0f} arrivals in the last week, "
+                f"MAE per hour {source_metrics['mae_per_hour']:.3f} "
+                f"(flat rate {source_metrics['flat_rate_mae_per_hour']:.3f})"
+            )
+
+        # The last week joins the tables through the same incremental step the service uses
+        tables = tables.fold(holdout_counts, now)
+
+        os.makedirs(settings.MODELS_DIR, exist_ok=True)
+        tables.save(settings.DEMAND_FORECAST_PATH)
+
+        client.close()
+        logger.info("MongoDB connection closed")
+
+        weekly = tables.rates.sum(axis=2)  # One hour of each slot per week
+        logger.info("\n" + "="*60)
+        logger.info("TRAINING COMPLETE!")
+        logger.info(f"Tables saved to: {settings.DEMAND_FORECAST_PATH}")
+        for position, ward in enumerate(tables.wards):
+            logger.info(
+                f"{ward}: " + ", ".join(
+                    f"{weekly[position, source_position]:.1f} {source}/week"
+                    for source_position, source in enumerate(DEMAND_SOURCES)
+                )
+            )
+        logger.info("="*60)
+
+    except Exception as e:
+        logger.error(f"Training failed: {e}", exc_info=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
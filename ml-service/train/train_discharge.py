@@ -24,6 +24,8 @@ import logging
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import settings
+from services.model_artifact import artifact_path_for, artifact_size_bytes, save_artifact
+from services.occupancy_sessions import fetch_occupancy_logs, occupancy_sessions
 
 # Configure logging
 logging.basicConfig(
@@ -37,11 +39,9 @@ def connect_to_mongodb():
     """Connect to MongoDB and return database instance"""
     try:
         client = MongoClient(settings.MONGO_URI)
-        # Extract database name from URI
-        db_name = settings.MONGO_URI.split('/')[-1].split('?')[0]
-        if not db_name or db_name == '':
-            db_name = 'bedmanager'
-        db = client[db_name]
+        # Database named in the URI, bedmanager if it has none
+        db = client.get_default_database(settings.MONGO_DEFAULT_DB)
+        db_name = db.name
         
         # Test connection
         db.command('ping')
@@ -62,60 +62,25 @@ def extract_occupancy_data(db):
     logger.info("Extracting occupancy data from MongoDB...")
     
     # Get collections
-    occupancy_logs = db['occupancylogs']
     beds = db['beds']
     
     # Get all occupancy logs sorted by timestamp
-    logs = list(occupancy_logs.find().sort('timestamp', 1))
-    logger.info(f"Found {len(logs)} occupancy log entries")
+    logs = fetch_occupancy_logs(db)
+    logger.info(f"Found {len(logs['timestamp'])} occupancy log entries")
     
-    if len(logs) == 0:
+    if len(logs['timestamp']) == 0:
         logger.warning("No occupancy logs found in database")
         return pd.DataFrame()
     
-    # Build bed occupancy sessions
-    bed_sessions = {}  # bed_id -> list of sessions
+    # Pair each release with the bed's most recent unclosed admission
+    df = occupancy_sessions(logs['bedId'], logs['timestamp'], logs['statusChange'], logs['userId'])
     
-    for log in logs:
-        bed_id = str(log['bedId'])
-        status_change = log['statusChange']
-        timestamp = log['timestamp']
-        
-        if status_change == 'assigned':
-            # Start new session
-            if bed_id not in bed_sessions:
-                bed_sessions[bed_id] = []
-            
-            bed_sessions[bed_id].append({
-                'bed_id': bed_id,
-                'assigned_time': timestamp,
-                'released_time': None,
-                'user_id': str(log.get('userId', ''))
-            })
-        
-        elif status_change == 'released' and bed_id in bed_sessions:
-            # Find the most recent unclosed session for this bed
-            for session in reversed(bed_sessions[bed_id]):
-                if session['released_time'] is None:
-                    session['released_time'] = timestamp
-                    break
-    
-    # Flatten sessions and calculate durations
-    all_sessions = []
-    for bed_id, sessions in bed_sessions.items():
-        for session in sessions:
-            if session['released_time'] is not None:
-                all_sessions.append(session)
-    
-    logger.info(f"Found {len(all_sessions)} complete occupancy sessions")
-    
-    if len(all_sessions) == 0:
+    logger.info(f"Found {len(df)} complete occupancy sessions")
+    
+    if len(df) == 0:
         logger.warning("No complete occupancy sessions found")
         return pd.DataFrame()
     
-    # Convert to DataFrame
-    df = pd.DataFrame(all_sessions)
-    
     # Calculate occupancy duration in hours
     df['duration_hours'] = (
         df['released_time'] - df['assigned_time']
@@ -314,6 +279,14 @@ def save_model(model, feature_columns, metrics):
     model_path = settings.DISCHARGE_MODEL_PATH
     joblib.dump(model_package, model_path)
     
+    # Compact artifact served by the ML service (metadata JSON + .npy blocks)
+    artifact_path = artifact_path_for(model_path)
+    artifact = save_artifact(model_package, artifact_path)
+    logger.info(
+        f"Artifact saved to: {artifact_path} "
+        f"({artifact_size_bytes(artifact_path) / (1024 * 1024):.2f} MB, sha256 {artifact['content_sha256'][:12]})"
+    )
+    
     logger.info(f"Model saved successfully to: {model_path}")
     
     # Verify saved file
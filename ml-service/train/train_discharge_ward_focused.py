@@ -20,6 +20,8 @@ import logging
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import settings
+from services.model_artifact import artifact_path_for, artifact_size_bytes, save_artifact
+from services.occupancy_sessions import fetch_occupancy_logs, occupancy_sessions
 
 # Configure logging
 logging.basicConfig(
@@ -33,10 +35,9 @@ def connect_to_mongodb():
     """Connect to MongoDB and return database instance"""
     try:
         client = MongoClient(settings.MONGO_URI)
-        db_name = settings.MONGO_URI.split('/')[-1].split('?')[0]
-        if not db_name or db_name == '':
-            db_name = 'bedmanager'
-        db = client[db_name]
+        # Database named in the URI, bedmanager if it has none
+        db = client.get_default_database(settings.MONGO_DEFAULT_DB)
+        db_name = db.name
         db.command('ping')
         logger.info(f"Successfully connected to MongoDB: {db_name}")
         return db, client
@@ -49,66 +50,33 @@ def extract_occupancy_data(db):
     """Extract occupancy log data and create discharge duration dataset"""
     logger.info("Extracting occupancy data from MongoDB...")
     
-    occupancy_logs = db['occupancylogs']
     beds = db['beds']
     
-    logs = list(occupancy_logs.find().sort('timestamp', 1))
-    logger.info(f"Found {len(logs)} occupancy log entries")
+    logs = fetch_occupancy_logs(db)
+    logger.info(f"Found {len(logs['timestamp'])} occupancy log entries")
     
-    if len(logs) == 0:
+    if len(logs['timestamp']) == 0:
         logger.warning("No occupancy logs found in database")
         return pd.DataFrame()
     
     # Build bed occupancy sessions
-    bed_sessions = {}
-    
-    for log in logs:
-        bed_id = str(log['bedId'])
-        status_change = log['statusChange']
-        timestamp = log['timestamp']
-        
-        if status_change == 'assigned':
-            if bed_id not in bed_sessions:
-                bed_sessions[bed_id] = []
-            
-            bed_sessions[bed_id].append({
-                'bed_id': bed_id,
-                'assigned_time': timestamp,
-                'released_time': None,
-                'user_id': str(log.get('userId', ''))
-            })
-        
-        elif status_change == 'released' and bed_id in bed_sessions:
-            for session in reversed(bed_sessions[bed_id]):
-                if session['released_time'] is None:
-                    session['released_time'] = timestamp
-                    break
+    sessions = occupancy_sessions(logs['bedId'], logs['timestamp'], logs['statusChange'])
     
     # Get bed ward information
     bed_ward_map = {}
     for bed in beds.find():
         bed_ward_map[str(bed['_id'])] = bed['ward']
     
-    # Convert to pandas DataFrame
-    data = []
-    for bed_id, sessions in bed_sessions.items():
-        ward = bed_ward_map.get(bed_id, 'General')
-        
-        for session in sessions:
-            if session['released_time'] is not None:
-                duration_hours = (session['released_time'] - session['assigned_time']).total_seconds() / 3600
-                
-                # Only keep valid durations
-                if 0 < duration_hours < 8760:  # Between 0 and 1 year
-                    data.append({
-                        'bed_id': bed_id,
-                        'ward': ward,
-                        'assigned_time': session['assigned_time'],
-                        'released_time': session['released_time'],
-                        'duration_hours': duration_hours
-                    })
-    
-    df = pd.DataFrame(data)
+    sessions['ward'] = sessions['bed_id'].map(bed_ward_map).fillna('General')
+    sessions['duration_hours'] = (
+        sessions['released_time'] - sessions['assigned_time']
+    ).dt.total_seconds() / 3600
+    
+    # Only keep valid durations
+    valid = (sessions['duration_hours'] > 0) & (sessions['duration_hours'] < 8760)  # Between 0 and 1 year
+    columns = ['bed_id', 'ward', 'assigned_time', 'released_time', 'duration_hours']
+    
+    df = sessions.loc[valid, columns].reset_index(drop=True)
     logger.info(f"Found {len(df)} complete occupancy sessions")
     logger.info(f"Valid sessions after filtering: {len(df)}")
     
@@ -253,6 +221,14 @@ def save_model(model, feature_columns, metrics):
     model_path = os.path.join(settings.MODELS_DIR, 'discharge_model.pkl')
     joblib.dump(model_package, model_path)
     
+    # Compact artifact served by the ML service (metadata JSON + .npy blocks)
+    artifact_path = artifact_path_for(model_path)
+    artifact = save_artifact(model_package, artifact_path)
+    logger.info(
+        f"Artifact saved to: {artifact_path} "
+        f"({artifact_size_bytes(artifact_path) / (1024 * 1024):.2f} MB, sha256 {artifact['content_sha256'][:12]})"
+    )
+    
     file_size = os.path.getsize(model_path) / (1024 * 1024)
     logger.info(f"Model saved successfully to: {model_path}")
     logger.info(f"Model file size: {file_size:.2f} MB")
@@ -61,6 +61,19 @@ def calculate_duration_minutes(start_time: datetime, end_time: datetime) -> floa
     duration = end_time - start_time
     return duration.total_seconds() / 60.0
 
+# Numeric ward encoding shared by every model
+WARD_CODES = {
+    "ICU": 0,
+    "Emergency": 1,
+    "General": 2,
+    "Pediatrics": 3,
+    "Pediatric": 3,  # Alternative spelling
+    "Surgery": 4,
+    "Cardiology": 5,
+    "Maternity": 6
+}
+DEFAULT_WARD_CODE = WARD_CODES["General"]
+
 def ward_to_numeric(ward: str) -> int:
     """
     Convert ward name to numeric encoding
@@ -71,17 +84,7 @@ def ward_to_numeric(ward: str) -> int:
     Returns:
         Numeric encoding
     """
-    ward_mapping = {
-        "ICU": 0,
-        "Emergency": 1,
-        "General": 2,
-        "Pediatrics": 3,
-        "Pediatric": 3,  # Alternative spelling
-        "Surgery": 4,
-        "Cardiology": 5,
-        "Maternity": 6
-    }
-    return ward_mapping.get(ward, 2)  # Default to General
+    return WARD_CODES.get(ward, DEFAULT_WARD_CODE)  # Default to General
 
 def priority_to_numeric(priority: str) -> int:
     """
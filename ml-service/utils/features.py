@@ -0,0 +1,258 @@
+"""
+Vectorized feature construction for prediction requests
+
+Builds whole feature matrices (one row per request) so that single and
+batch endpoints share the same code path and a batch costs one model call.
+"""
+
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from utils import ward_to_numeric
+
+# Time of day category for every hour (0=morning, 1=afternoon, 2=evening, 3=night),
+# same buckets as utils.get_time_of_day
+TIME_OF_DAY_BY_HOUR = np.array(
+    [3] * 6 + [0] * 6 + [1] * 6 + [2] * 4 + [3] * 2,
+    dtype=np.int64
+)
+
+
+def calendar_columns(
+    hour: np.ndarray,
+    day_of_week: np.ndarray,
+    month: np.ndarray,
+    day_of_month: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    Derive every calendar feature from its four base fields
+
+    The base fields do not have to form real dates, which lets lookup tables
+    enumerate each field independently.
+
+    Returns:
+        Dictionary of feature name -> array
+    """
+    hour = np.asarray(hour, dtype=np.int64)
+    day_of_week = np.asarray(day_of_week, dtype=np.int64)
+    return {
+        'hour': hour,
+        'day_of_week': day_of_week,
+        'month': np.asarray(month, dtype=np.int64),
+        'day_of_month': np.asarray(day_of_month, dtype=np.int64),
+        'is_weekend': (day_of_week >= 5).astype(np.int64),
+        'is_business_hours': ((hour >= 8) & (hour <= 17)).astype(np.int64),
+        'time_of_day': TIME_OF_DAY_BY_HOUR[hour]
+    }
+
+
+def time_feature_columns(times: Sequence[datetime]) -> Dict[str, np.ndarray]:
+    """
+    Extract calendar features for many timestamps at once
+
+    Args:
+        times: Sequence of datetime objects
+
+    Returns:
+        Dictionary of feature name -> array (one entry per timestamp)
+    """
+    n = len(times)
+    return calendar_columns(
+        np.fromiter((t.hour for t in times), dtype=np.int64, count=n),
+        np.fromiter((t.weekday() for t in times), dtype=np.int64, count=n),
+        np.fromiter((t.month for t in times), dtype=np.int64, count=n),
+        np.fromiter((t.day for t in times), dtype=np.int64, count=n)
+    )
+
+
+def ward_codes(wards: Sequence[str]) -> np.ndarray:
+    """Encode ward names with utils.ward_to_numeric"""
+    return np.fromiter((ward_to_numeric(w) for w in wards), dtype=np.int64, count=len(wards))
+
+
+def assemble_matrix(columns: Dict[str, np.ndarray], feature_columns: Sequence[str], n_rows: int) -> np.ndarray:
+    """
+    Stack feature columns in model order
+
+    Scalars are broadcast to every row.
+
+    Raises:
+        KeyError: If the model expects a feature that was not built
+    """
+    X = np.empty((n_rows, len(feature_columns)), dtype=np.float64)
+    for j, col in enumerate(feature_columns):
+        X[:, j] = columns[col]
+    return X
+
+
+def build_discharge_features(
+    wards: Sequence[str],
+    admission_times: Sequence[datetime],
+    duration_stats,
+    feature_columns: Sequence[str]
+) -> np.ndarray:
+    """
+    Build the discharge model feature matrix
+
+    Args:
+        wards: Ward name per row
+        admission_times: Admission time per row
+        duration_stats: DurationStatsEngine used for historical averages
+        feature_columns: Feature order expected by the model
+
+    Returns:
+        Feature matrix of shape (len(wards), len(feature_columns))
+    """
+    columns = discharge_columns(wards, time_feature_columns(admission_times), duration_stats)
+    return assemble_matrix(columns, feature_columns, len(wards))
+
+
+def discharge_columns(wards: Sequence[str], columns: Dict[str, np.ndarray], duration_stats) -> Dict[str, np.ndarray]:
+    """
+    Add ward and historical average features to calendar columns
+
+    Historical averages are looked up once per distinct (ward, time_of_day)
+    pair and scattered back to the rows.
+    """
+    n = len(wards)
+    columns['ward_encoded'] = ward_codes(wards)
+
+    # Averages depend only on (ward, time_of_day)
+    pair_index = {}
+    row_pair = np.empty(n, dtype=np.int64)
+    pair_values = []
+    for i, (ward, tod) in enumerate(zip(wards, columns['time_of_day'].tolist())):
+        key = (ward, tod)
+        idx = pair_index.get(key)
+        if idx is None:
+            idx = pair_index[key] = len(pair_values)
+            pair_values.append(duration_stats.lookup(ward, tod))
+        row_pair[i] = idx
+
+    averages = np.asarray(pair_values, dtype=np.float64).reshape(-1, 3)[row_pair]
+    columns['ward_avg_duration'] = averages[:, 0]
+    columns['time_avg_duration'] = averages[:, 1]
+    columns['ward_time_avg_duration'] = averages[:, 2]
+    return columns
+
+
+# Bed availability inputs used until the ward snapshot and training-time
+# ward and hour rates are available
+BED_AVAILABILITY_DEFAULTS = {
+    'is_occupied': 1,  # Assume bed is currently occupied
+    'is_cleaning': 0,
+    'ward_occupancy_rate': 0.75,  # Default occupancy rate
+    'hour_availability_rate': 0.15  # Default availability rate
+}
+
+# Historical cleaning averages (minutes) by ward
+CLEANING_WARD_AVG_DURATIONS = {
+    'ICU': 35.0,
+    'Emergency': 28.0,
+    'General': 30.0,
+    'Pediatrics': 32.0,
+    'Maternity': 33.0
+}
+CLEANING_DEFAULT_DURATION = 30.0
+CLEANING_DEFAULT_STD_DURATION = 10.0
+
+
+def build_bed_availability_features(
+    wards: Sequence[str],
+    current_times: Sequence[datetime],
+    feature_columns: Sequence[str],
+    ward_snapshot=None,
+    hour_availability_rates: Optional[Sequence[float]] = None,
+    ward_occupancy_rates: Optional[Dict[str, float]] = None
+) -> np.ndarray:
+    """
+    Build the bed availability model feature matrix
+
+    Requests ask when an occupied bed of the ward frees up, so the bed
+    status features are those of an occupied bed (is_occupied=1,
+    is_cleaning=0), as in the training samples taken at admissions.
+
+    Args:
+        wards: Ward name per row
+        current_times: Reference time per row
+        feature_columns: Feature order expected by the model
+        ward_snapshot: Optional WardSnapshot; for wards it covers, the
+            occupancy rate is the live one. Only pass it for models
+            trained on the point-in-time rate (model package
+            'ward_features' == 'point_in_time')
+        hour_availability_rates: Optional (24,) availability rate per hour
+            of day learned at training time (model package
+            'hour_availability_rates')
+        ward_occupancy_rates: Optional mean occupancy rate per ward name
+            learned at training time (model package 'ward_occupancy_rates'),
+            used for wards the snapshot does not cover
+
+    Returns:
+        Feature matrix of shape (len(wards), len(feature_columns))
+    """
+    columns = time_feature_columns(current_times)
+    codes = ward_codes(wards)
+    columns['ward_encoded'] = codes
+    columns.update(BED_AVAILABILITY_DEFAULTS)
+
+    if ward_occupancy_rates is not None:
+        default_rate = BED_AVAILABILITY_DEFAULTS['ward_occupancy_rate']
+        columns['ward_occupancy_rate'] = np.fromiter(
+            (ward_occupancy_rates.get(w, default_rate) for w in wards), dtype=np.float64, count=len(wards)
+        )
+
+    if ward_snapshot is not None:
+        columns['ward_occupancy_rate'] = np.where(
+            ward_snapshot.known[codes], ward_snapshot.occupancy_rate[codes], columns['ward_occupancy_rate']
+        )
+
+    if hour_availability_rates is not None:
+        columns['hour_availability_rate'] = np.asarray(hour_availability_rates, dtype=np.float64)[columns['hour']]
+
+    return assemble_matrix(columns, feature_columns, len(wards))
+
+
+def build_cleaning_features(
+    wards: Sequence[str],
+    start_times: Sequence[datetime],
+    estimated_durations: Sequence[float],
+    feature_columns: Sequence[str]
+) -> np.ndarray:
+    """
+    Build the cleaning duration model feature matrix
+
+    Args:
+        wards: Ward name per row
+        start_times: Cleaning start time per row
+        estimated_durations: Initial estimate in minutes per row
+        feature_columns: Feature order expected by the model
+
+    Returns:
+        Feature matrix of shape (len(wards), len(feature_columns))
+    """
+    columns = cleaning_columns(wards, time_feature_columns(start_times), estimated_durations)
+    return assemble_matrix(columns, feature_columns, len(wards))
+
+
+def cleaning_columns(
+    wards: Sequence[str],
+    columns: Dict[str, np.ndarray],
+    estimated_durations: Sequence[float]
+) -> Dict[str, np.ndarray]:
+    """Add ward, estimate and historical average features to calendar columns"""
+    n = len(wards)
+    columns['ward_encoded'] = ward_codes(wards)
+    columns['estimated_duration'] = np.asarray(estimated_durations, dtype=np.float64)
+
+    avg_duration = np.fromiter(
+        (CLEANING_WARD_AVG_DURATIONS.get(w, CLEANING_DEFAULT_DURATION) for w in wards),
+        dtype=np.float64,
+        count=n
+    )
+    columns['ward_avg_duration'] = avg_duration
+    columns['time_avg_duration'] = avg_duration
+    columns['ward_time_avg_duration'] = avg_duration
+    columns['ward_std_duration'] = CLEANING_DEFAULT_STD_DURATION
+    return columns